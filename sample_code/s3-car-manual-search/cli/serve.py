@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+HTTP search server for the car manual search system.
+Concurrent requests are collected into micro-batches, so each batch costs one
+encode call and one pass over the embeddings.
+"""
+
+import sys
+import asyncio
+import argparse
+import logging
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.search_server import SearchServer
+from config import SERVER_HOST, SERVER_PORT, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, SERVER_QUEUE_SIZE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main server function."""
+    parser = argparse.ArgumentParser(
+        description="Serve car manual search over HTTP",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python cli/serve.py                            # Listen on 127.0.0.1:8080
+  python cli/serve.py --host 0.0.0.0 --port 9000
+  python cli/serve.py --batch-size 64 --batch-wait-ms 10
+
+  curl 'http://127.0.0.1:8080/search?q=brake+noise&top_k=3'
+  curl -X POST http://127.0.0.1:8080/search -d '{"query": "oil change", "filters": {"category": "Engine"}}'
+        """
+    )
+
+    parser.add_argument('--host', default=SERVER_HOST, help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help='Port to listen on')
+    parser.add_argument('--batch-size', type=int, default=BATCH_MAX_SIZE, help='Most queries per micro-batch')
+    parser.add_argument('--batch-wait-ms', type=float, default=BATCH_MAX_WAIT_MS,
+                        help='Longest wait for a micro-batch to fill')
+    parser.add_argument('--queue-size', type=int, default=SERVER_QUEUE_SIZE,
+                        help='Most waiting requests before new ones get 503')
+
+    args = parser.parse_args()
+
+    server = SearchServer(host=args.host, port=args.port, max_batch_size=args.batch_size,
+                          max_wait_ms=args.batch_wait_ms, queue_size=args.queue_size)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+
+if __name__ == "__main__":
+    main()
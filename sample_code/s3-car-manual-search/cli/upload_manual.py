@@ -18,18 +18,18 @@ from src.search_service import SearchService
 from src.manual_processor import ManualProcessor
 from src.embedding_service import EmbeddingService
 from src.s3_vector_service import S3VectorService
-from config import LOCAL_MANUAL_FILE, S3_BUCKET_NAME
+from config import LOCAL_MANUAL_FILE, S3_BUCKET_NAME, COMPACTION_THRESHOLD
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def check_prerequisites():
+def check_prerequisites(file_path=LOCAL_MANUAL_FILE):
     """Check if all prerequisites are met before uploading."""
     logger.info("Checking prerequisites...")
     
     # Check if manual data file exists
-    if not os.path.exists(LOCAL_MANUAL_FILE):
-        logger.error(f"Manual data file not found: {LOCAL_MANUAL_FILE}")
+    if not os.path.exists(file_path):
+        logger.error(f"Manual data file not found: {file_path}")
         return False
     
     # Test S3 connection
@@ -44,22 +44,31 @@ def check_prerequisites():
     logger.info("✓ Prerequisites check passed")
     return True
 
-def upload_manual_data(force_regenerate=False):
+def upload_manual_data(force_regenerate=False, file_path=LOCAL_MANUAL_FILE, namespace=None):
     """
     Upload manual data to S3 with embeddings.
     
     Args:
         force_regenerate: If True, regenerate embeddings even if they exist
+        file_path: Manual data file (JSON or JSON Lines)
+        namespace: Namespace (e.g. vehicle model) to upload into, None for the bucket root
     """
     try:
         logger.info("Starting manual data upload process...")
         
         # Initialize search service
-        search_service = SearchService()
+        search_service = SearchService(namespace)
         
         # Check if data already exists in S3
         if not force_regenerate:
             logger.info("Checking if data already exists in S3...")
+            manifest = search_service.s3_service.download_manifest()
+            if manifest is not None:
+                logger.info("Data already exists in S3. Use --force to regenerate or --incremental to update.")
+                logger.info(f"Manifest version {manifest['version']}: {manifest['live_rows']} sections "
+                            f"in {len(manifest['shards'])} shards")
+                return True
+            
             embeddings = search_service.s3_service.download_embeddings()
             metadata = search_service.s3_service.download_metadata()
             manual_data = search_service.s3_service.download_manual_data()
@@ -71,7 +80,7 @@ def upload_manual_data(force_regenerate=False):
         
         # Initialize data (this will generate embeddings and upload to S3)
         logger.info("Initializing search service data...")
-        success = search_service.initialize_data()
+        success = search_service.initialize_data(file_path=file_path)
         
         if success:
             logger.info("✓ Manual data uploaded successfully!")
@@ -89,12 +98,50 @@ def upload_manual_data(force_regenerate=False):
         logger.error(f"Error uploading manual data: {e}")
         return False
 
-def test_search_functionality():
-    """Test the search functionality after upload."""
+def upload_incremental(compact=False, file_path=LOCAL_MANUAL_FILE, namespace=None):
+    """
+    Publish only new or changed sections, turning removed sections into tombstones.
+    
+    Args:
+        compact: If True, always merge shards after the upload
+        file_path: Manual data file (JSON or JSON Lines)
+        namespace: Namespace (e.g. vehicle model) to upload into, None for the bucket root
+    """
+    try:
+        logger.info("Starting incremental upload...")
+        
+        search_service = SearchService(namespace)
+        if not search_service.s3_service.create_bucket_if_not_exists():
+            return False
+        
+        report = search_service.indexer.upsert(file_path)
+        if not report['success']:
+            logger.error("✗ Incremental upload failed")
+            return False
+        
+        logger.info(f"✓ Added {report['added']}, changed {report['changed']}, "
+                    f"deleted {report['deleted']}, unchanged {report['unchanged']}")
+        
+        # Compact once superseded and deleted rows make up too much of the index
+        if compact or report.get('dead_fraction', 0.0) > COMPACTION_THRESHOLD:
+            logger.info("Compacting shards...")
+            if not search_service.indexer.compact():
+                logger.error("✗ Compaction failed")
+                return False
+            logger.info("✓ Shards compacted")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error during incremental upload: {e}")
+        return False
+
+def test_search_functionality(namespace=None):
+    """Test the search functionality after upload (of a namespace if given)."""
     try:
         logger.info("Testing search functionality...")
         
-        search_service = SearchService()
+        search_service = SearchService(namespace)
         
         # Test queries
         test_queries = [
@@ -147,6 +194,7 @@ def show_system_info():
         logger.info(f"  Model: {model_info.get('model_name', 'Unknown')}")
         logger.info(f"  Dimension: {model_info.get('embedding_dimension', 'Unknown')}")
         logger.info(f"  Device: {model_info.get('device', 'Unknown')}")
+        logger.info(f"  Loaded: {model_info.get('loaded', False)} (loads on first encode)")
         
         # S3 service info
         s3_service = S3VectorService()
@@ -180,6 +228,10 @@ def main():
 Examples:
   python cli/upload_manual.py                    # Upload data (skip if exists)
   python cli/upload_manual.py --force            # Force regenerate embeddings
+  python cli/upload_manual.py --incremental      # Embed and upload only changed sections
+  python cli/upload_manual.py --incremental --compact  # ...then merge all shards
+  python cli/upload_manual.py --force --file manuals.jsonl  # Stream a large JSON Lines manual
+  python cli/upload_manual.py --namespace sedan-2021 --file sedan.json  # Upload one vehicle model
   python cli/upload_manual.py --test             # Test search after upload
   python cli/upload_manual.py --info             # Show system information
   python cli/upload_manual.py --check            # Check prerequisites only
@@ -192,6 +244,29 @@ Examples:
         help='Force regenerate embeddings even if they exist in S3'
     )
     
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only embed and upload sections that changed since the last upload'
+    )
+    
+    parser.add_argument(
+        '--compact',
+        action='store_true',
+        help='Merge shards and drop deleted sections after an incremental upload'
+    )
+    
+    parser.add_argument(
+        '--file',
+        default=LOCAL_MANUAL_FILE,
+        help='Manual data file to upload (JSON or JSON Lines)'
+    )
+    
+    parser.add_argument(
+        '--namespace',
+        help='Upload into this namespace (e.g. a vehicle model) instead of the bucket root'
+    )
+    
     parser.add_argument(
         '--test',
         action='store_true',
@@ -225,7 +300,7 @@ Examples:
     logger.info("=== S3 Car Manual Search - Data Upload Tool ===")
     
     # Check prerequisites
-    if not check_prerequisites():
+    if not check_prerequisites(args.file):
         logger.error("Prerequisites check failed. Exiting.")
         sys.exit(1)
     
@@ -238,11 +313,15 @@ Examples:
         logger.info("Prerequisites check completed successfully")
     else:
         # Upload data
-        success = upload_manual_data(force_regenerate=args.force)
+        if args.incremental:
+            success = upload_incremental(compact=args.compact, file_path=args.file, namespace=args.namespace)
+        else:
+            success = upload_manual_data(force_regenerate=args.force, file_path=args.file,
+                                         namespace=args.namespace)
         
         # Test if requested
         if success and args.test:
-            success = test_search_functionality()
+            success = test_search_functionality(args.namespace)
     
     if success:
         logger.info("✓ Operation completed successfully")
@@ -16,15 +16,151 @@ S3_DATA_PATH = 'data/'
 S3_METADATA_FILE = 'embeddings/metadata.json'
 S3_EMBEDDINGS_FILE = 'embeddings/sections_embeddings.npy'
 S3_MANUAL_DATA_FILE = 'data/manual_sections.json'
+S3_QUANTIZED_EMBEDDINGS_FILE = 'embeddings/sections_embeddings_{dtype}.npy'
+S3_QUANTIZED_SCALES_FILE = 'embeddings/sections_scales_{dtype}.npy'
+S3_KEYWORD_INDEX_FILE = 'embeddings/keyword_index.npz'
+
+# Sharded artifacts published through a manifest (incremental ingestion)
+S3_MANIFEST_FILE = 'embeddings/manifest.json'
+S3_MANIFEST_PREFIX = 'embeddings/manifests/'
+S3_STATE_PREFIX = 'embeddings/state/'
+S3_KEYWORD_INDEX_PREFIX = 'embeddings/keyword/'
+S3_PROJECTION_PREFIX = 'embeddings/projection/'
+S3_SHARD_PREFIX = 'shards/'
+COMPACTION_THRESHOLD = float(os.getenv('COMPACTION_THRESHOLD', '0.3'))
+# Artifacts of the newest N manifest versions are kept so readers of an older version can finish
+MANIFEST_RETAINED_VERSIONS = int(os.getenv('MANIFEST_RETAINED_VERSIONS', '3'))
+# Seconds between manifest polls of the background snapshot refresher (0 disables it)
+SNAPSHOT_REFRESH_INTERVAL = float(os.getenv('SNAPSHOT_REFRESH_INTERVAL', '30'))
+
+# Namespaces: one manual corpus per vehicle model, stored under S3_NAMESPACE_PREFIX<name>/
+# with the same layout as the bucket root. A namespace's indexes are loaded on its first
+# query; when loaded namespaces hold more than NAMESPACE_MEMORY_BUDGET_MB the least
+# recently queried ones are unloaded. Cross-namespace queries name at most
+# NAMESPACE_MAX_FANOUT namespaces and search up to NAMESPACE_SEARCH_WORKERS in parallel.
+# The list of namespaces in the bucket is cached for NAMESPACE_LIST_TTL seconds.
+S3_NAMESPACE_PREFIX = 'namespaces/'
+NAMESPACE_MEMORY_BUDGET_MB = int(os.getenv('NAMESPACE_MEMORY_BUDGET_MB', '2048'))
+NAMESPACE_SEARCH_WORKERS = int(os.getenv('NAMESPACE_SEARCH_WORKERS', '8'))
+NAMESPACE_MAX_FANOUT = int(os.getenv('NAMESPACE_MAX_FANOUT', '16'))
+NAMESPACE_LIST_TTL = float(os.getenv('NAMESPACE_LIST_TTL', '300'))
+
+# Streaming full rebuilds: sections are read incrementally, embedded INGEST_BATCH_SIZE at a
+# time and uploaded as shards of INGEST_SHARD_ROWS sections by INGEST_UPLOAD_WORKERS threads.
+# At most INGEST_QUEUE_DEPTH batches and shards wait between stages, which bounds the section
+# and embedding buffers (ids, content hashes and keyword postings still grow with the file).
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '256'))
+INGEST_SHARD_ROWS = int(os.getenv('INGEST_SHARD_ROWS', '10000'))
+INGEST_QUEUE_DEPTH = int(os.getenv('INGEST_QUEUE_DEPTH', '2'))
+INGEST_UPLOAD_WORKERS = int(os.getenv('INGEST_UPLOAD_WORKERS', '2'))
+
+# Maximum parallel S3 GETs when loading artifacts and fetching embedding rows
+S3_DOWNLOAD_CONCURRENCY = int(os.getenv('S3_DOWNLOAD_CONCURRENCY', '8'))
+
+# Streaming multipart uploads of .npy artifacts (parts are at least 5 MiB;
+# peak extra memory is about part size x concurrency)
+UPLOAD_PART_SIZE_MB = int(os.getenv('UPLOAD_PART_SIZE_MB', '16'))
+UPLOAD_CONCURRENCY = int(os.getenv('UPLOAD_CONCURRENCY', '4'))
+# 'CRC32', 'SHA1', 'SHA256' or empty to disable part checksums
+UPLOAD_CHECKSUM_ALGORITHM = os.getenv('UPLOAD_CHECKSUM_ALGORITHM', 'CRC32')
+
+# Shard artifact compression: 'zstd' (falls back to the standard library's zlib when the
+# zstandard package is not installed), 'zlib' or empty to disable. Arrays are byte-shuffled
+# and split into COMPRESSION_CHUNK_MB chunks that DECOMPRESSION_WORKERS threads decompress
+# in parallel; sections are compressed one by one so they can still be read by byte range.
+# Compressed artifacts are decompressed into memory instead of being memory-mapped.
+ARTIFACT_COMPRESSION = os.getenv('ARTIFACT_COMPRESSION', '')
+ARTIFACT_COMPRESSION_LEVEL = int(os.getenv('ARTIFACT_COMPRESSION_LEVEL', '3'))
+COMPRESSION_CHUNK_MB = int(os.getenv('COMPRESSION_CHUNK_MB', '4'))
+DECOMPRESSION_WORKERS = int(os.getenv('DECOMPRESSION_WORKERS', '4'))
+
+# Local artifact cache (set LOCAL_CACHE_DIR to an empty string to disable)
+LOCAL_CACHE_DIR = os.getenv('LOCAL_CACHE_DIR', '.cache/s3')
 
 # Embedding Configuration
 EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
 EMBEDDING_DIMENSION = 384
 
+# Query embedding cache: the QUERY_CACHE_SIZE most recent queries (case and whitespace
+# normalized, which the uncased default model ignores anyway) skip the model for up to
+# QUERY_CACHE_TTL seconds. QUERY_CACHE_SIZE=0 disables it, QUERY_CACHE_TTL=0 never expires.
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '1024'))
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '3600'))
+
+# Embedding storage format: 'float32', 'float16' or 'int8'. Quantized formats are
+# scored first and the top_k * RERANK_FACTOR candidates re-scored at float32.
+EMBEDDING_STORAGE_DTYPE = os.getenv('EMBEDDING_STORAGE_DTYPE', 'float32')
+QUANTIZATION_SCALE_MODE = os.getenv('QUANTIZATION_SCALE_MODE', 'vector')
+RERANK_FACTOR = int(os.getenv('RERANK_FACTOR', '4'))
+
+# Two-stage (coarse-to-fine) vector search: uploads also store every embedding projected
+# to COARSE_DIMENSIONS with a PCA fitted at upload time. Queries score that compact matrix
+# first and re-score only the top_k * COARSE_CANDIDATE_FACTOR best rows at full dimension.
+# COARSE_DIMENSIONS=0 disables it; section mode only.
+COARSE_DIMENSIONS = int(os.getenv('COARSE_DIMENSIONS', '0'))
+COARSE_CANDIDATE_FACTOR = int(os.getenv('COARSE_CANDIDATE_FACTOR', '64'))
+
 # Search Configuration
 MAX_SEARCH_RESULTS = 5
 SIMILARITY_THRESHOLD = 0.3
 
+# Hybrid search: 'vector' or 'hybrid' (vector + BM25 fused with reciprocal rank fusion)
+SEARCH_MODE = os.getenv('SEARCH_MODE', 'vector')
+HYBRID_CANDIDATES = 50
+RRF_K = 60
+
+# Typo-tolerant keyword fallback: when a query term is not in the BM25 vocabulary, the
+# fallback also matches query terms to title and keyword terms sharing at least
+# FUZZY_MIN_SIMILARITY of their character trigrams (at most FUZZY_MAX_EXPANSIONS terms
+# per query term) and fuses that ranking with BM25's
+FUZZY_MIN_SIMILARITY = float(os.getenv('FUZZY_MIN_SIMILARITY', '0.3'))
+FUZZY_MAX_EXPANSIONS = int(os.getenv('FUZZY_MAX_EXPANSIONS', '5'))
+
+# Semantic result cache: the vector matches of the last RESULT_CACHE_SIZE queries are reused
+# by a query with the same top_k and filters whose embedding has cosine similarity of at
+# least RESULT_CACHE_THRESHOLD to one of them (lower values catch looser paraphrases at the
+# cost of less exact results). Short queries on related topics ("brake pad", "brake fluid")
+# can clear the threshold, so it is off by default; reused results carry 'cached_from'.
+# Cleared whenever a new snapshot is swapped in; 0 disables it.
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '0'))
+RESULT_CACHE_THRESHOLD = float(os.getenv('RESULT_CACHE_THRESHOLD', '0.9'))
+
+# Section content is stored per shard as a packed blob plus a byte offset index; snapshots
+# load only the index and results read their sections with ranged GETs. The last
+# SECTION_CACHE_SIZE sections read stay in memory across snapshot swaps (0 disables it).
+SECTION_CACHE_SIZE = int(os.getenv('SECTION_CACHE_SIZE', '1024'))
+
+# Embedding granularity: 'section' (one vector per section) or 'passage' (overlapping
+# word windows per section, so long procedures are not truncated by the model)
+PASSAGE_MODE = os.getenv('PASSAGE_MODE', 'section')
+PASSAGE_MAX_TOKENS = int(os.getenv('PASSAGE_MAX_TOKENS', '150'))
+PASSAGE_OVERLAP_TOKENS = int(os.getenv('PASSAGE_OVERLAP_TOKENS', '30'))
+# Section score from its passage scores: 'max' or 'mean' (mean of the top PASSAGE_TOP_N)
+PASSAGE_AGGREGATION = os.getenv('PASSAGE_AGGREGATION', 'max')
+PASSAGE_TOP_N = int(os.getenv('PASSAGE_TOP_N', '2'))
+
+# In-process latency histograms and counters (exposed in the system status)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Background S3 health checks: the status page reads the last probe instead of
+# calling S3. Failed probes back off exponentially up to HEALTH_CHECK_MAX_BACKOFF.
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', '60'))
+HEALTH_CHECK_MAX_BACKOFF = float(os.getenv('HEALTH_CHECK_MAX_BACKOFF', '600'))
+# Also put and delete a test object on every probe
+HEALTH_CHECK_WRITE_PROBE = os.getenv('HEALTH_CHECK_WRITE_PROBE', 'false').lower() == 'true'
+
+# HTTP search server (cli/serve.py): concurrent queries are collected for up to
+# BATCH_MAX_WAIT_MS into micro-batches of at most BATCH_MAX_SIZE. Requests arriving
+# while SERVER_QUEUE_SIZE queries are already waiting are rejected with 503. Namespaced
+# queries skip the batches and run on SERVER_NAMESPACE_WORKERS threads, with at most
+# SERVER_QUEUE_SIZE of them pending (running or waiting) before new ones get 503.
+SERVER_HOST = os.getenv('SERVER_HOST', '127.0.0.1')
+SERVER_PORT = int(os.getenv('SERVER_PORT', '8080'))
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '32'))
+BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', '5'))
+SERVER_QUEUE_SIZE = int(os.getenv('SERVER_QUEUE_SIZE', '256'))
+SERVER_NAMESPACE_WORKERS = int(os.getenv('SERVER_NAMESPACE_WORKERS', '4'))
+
 # Local Data Paths
 LOCAL_DATA_DIR = 'data'
 LOCAL_MANUAL_FILE = 'data/car_manual_sections.json'
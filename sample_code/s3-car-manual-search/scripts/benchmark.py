@@ -0,0 +1,786 @@
+#!/usr/bin/env python3
+"""
+Offline scale benchmark for the S3 Car Manual Search System.
+Generates synthetic manual sections and embeddings, serves them from an
+in-process S3 stand-in and measures cold load time, memory, QPS and query
+latency for each embedding storage format and search mode, the recall
+and latency of two-stage search across candidate factors, the load
+time and memory of shard metadata as JSON versus the columnar format,
+and with compression enabled the size and (de)compression throughput of
+every shard artifact. No AWS account or model download is needed.
+"""
+
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import logging
+import threading
+import gc
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from unittest.mock import patch
+
+import numpy as np
+
+# Add the parent directory to the path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.local_s3 import LocalS3Client
+from scripts.stub_encoder import HashingEmbeddingService
+from src.keyword_index import tokenize
+from src.search_service import SearchService
+from src.search_server import MicroBatcher
+from src.vector_index import VectorIndex, CoarseIndex
+from src.metadata_table import MetadataTable
+from src.compression import compress_array, compress_bytes, decompress, decompress_block, is_compressed
+from config import MANUAL_CATEGORIES, LOCAL_MANUAL_FILE, EMBEDDING_STORAGE_DTYPE, DECOMPRESSION_WORKERS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ('vector', 'filtered', 'hybrid')
+THREAD_COUNTS = (1, 2, 4, 8)
+BATCH_CLIENTS = 32
+STORAGE_DTYPES = ('float32', 'float16', 'int8')
+# Two-stage candidate factors swept when coarse search is enabled (0 is single-stage search)
+COARSE_FACTORS = (0, 2, 4, 8, 16)
+# Node bandwidth the cold-load transfer time is estimated for
+BANDWIDTH_MBPS = 100
+
+# Synthetic corpus shape
+TOPICS = 256
+TOPIC_WORDS = 32
+CONTENT_WORDS = 60
+GENERATION_CHUNK = 100_000
+
+RESULT_MARKER = 'BENCHMARK_RESULT '
+
+
+def load_vocabulary() -> np.ndarray:
+    """Get the distinct words of the bundled manual, used to write synthetic sections."""
+    with open(Path(__file__).parent.parent / LOCAL_MANUAL_FILE, 'r', encoding='utf-8') as file:
+        sections = json.load(file)['sections']
+    words = set()
+    for section in sections:
+        words.update(tokenize(f"{section['title']} {section['content']}"))
+    return np.array(sorted(words))
+
+
+def generate_corpus(size: int, dimension: int, seed: int = 0) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Generate synthetic sections with topic-clustered embeddings.
+    Sections of one topic share a category, a preferred vocabulary and an
+    embedding centroid, so vector, keyword and filtered search all have
+    meaningful neighbours.
+
+    Args:
+        size: Number of sections
+        dimension: Embedding dimension
+        seed: Random seed
+
+    Returns:
+        Tuple of (sections, float32 embeddings)
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = load_vocabulary()
+    centroids = rng.standard_normal((TOPICS, dimension), dtype=np.float32)
+    topic_words = rng.integers(0, len(vocabulary), (TOPICS, TOPIC_WORDS))
+
+    sections = []
+    embeddings = np.empty((size, dimension), dtype=np.float32)
+    for start in range(0, size, GENERATION_CHUNK):
+        count = min(GENERATION_CHUNK, size - start)
+        topics = rng.integers(0, TOPICS, count)
+
+        noise = rng.standard_normal((count, dimension), dtype=np.float32)
+        embeddings[start:start + count] = centroids[topics] + 0.6 * noise
+
+        # 70% of the words come from the topic's vocabulary
+        from_topic = rng.random((count, CONTENT_WORDS)) < 0.7
+        words = np.where(
+            from_topic,
+            topic_words[topics[:, None], rng.integers(0, TOPIC_WORDS, (count, CONTENT_WORDS))],
+            rng.integers(0, len(vocabulary), (count, CONTENT_WORDS))
+        )
+
+        for i in range(count):
+            row = start + i
+            category = MANUAL_CATEGORIES[topics[i] % len(MANUAL_CATEGORIES)]
+            content = vocabulary[words[i]]
+            sections.append({
+                'id': f"SYN_{row:07d}",
+                'category': category,
+                'title': f"{category} procedure {row}",
+                'content': ' '.join(content),
+                'keywords': list(content[:3])
+            })
+
+    return sections, embeddings
+
+
+def generate_queries(sections: List[Dict[str, Any]], embeddings: np.ndarray,
+                     count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    """
+    Generate queries near random sections.
+
+    Args:
+        sections: Synthetic sections
+        embeddings: Their embeddings
+        count: Number of queries
+        seed: Random seed
+
+    Returns:
+        List of queries with text, vector and source category
+    """
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i, row in enumerate(rng.integers(0, len(sections), count)):
+        words = sections[row]['content'].split()
+        picked = rng.choice(len(words), 4, replace=False)
+        noise = rng.standard_normal(embeddings.shape[1], dtype=np.float32)
+        queries.append({
+            'text': f"{' '.join(words[j] for j in picked)} q{i}",
+            'vector': embeddings[row] + 0.3 * np.linalg.norm(embeddings[row]) / np.sqrt(len(noise)) * noise,
+            'category': sections[row]['category']
+        })
+    return queries
+
+
+def rss_mb() -> float:
+    """Get the resident set size of this process in MB."""
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_service(encoder: HashingEmbeddingService, client: LocalS3Client) -> SearchService:
+    """Create a search service on the S3 stand-in with the stub encoder."""
+    with patch('src.search_service.EmbeddingService', lambda **kwargs: encoder):
+        service = SearchService()
+    service.s3_service.s3_client = client
+    service.s3_service.cache_dir = None
+    # Queries repeat across passes; measure the search itself, not the result cache
+    service.result_cache.max_size = 0
+    return service
+
+
+def percentile_ms(latencies: List[float], p: float) -> float:
+    return round(float(np.percentile(latencies, p)) * 1000, 3) if latencies else 0.0
+
+
+def measure_cold_start(encoder: HashingEmbeddingService, client: LocalS3Client,
+                       query_set: List[Dict[str, Any]], threads: int, top_k: int) -> Dict[str, Any]:
+    """
+    Send the first queries of a fresh service from several threads at once.
+
+    Args:
+        encoder: Stub encoder with the queries registered
+        client: S3 stand-in holding the published corpus
+        query_set: Queries to send
+        threads: Number of concurrent first queries
+        top_k: Results per query
+
+    Returns:
+        Time until every query answered and the number of snapshot loads
+    """
+    service = make_service(encoder, client)
+    barrier = threading.Barrier(threads)
+
+    def first_query(query: Dict[str, Any]) -> int:
+        barrier.wait()
+        return len(service.search(query['text'], top_k))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        answered = list(executor.map(first_query, query_set[:threads]))
+    return {
+        'threads': threads,
+        'seconds': round(time.perf_counter() - start, 3),
+        'answered': sum(1 for count in answered if count),
+        'snapshot_loads': service.metrics.counter('snapshot.swaps')
+    }
+
+
+def measure_metadata_formats(sections: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Compare loading shard metadata from indented JSON (the format written
+    before columnar metadata) with loading a columnar MetadataTable.
+
+    Args:
+        sections: Sections whose metadata is encoded
+
+    Returns:
+        Per format: stored size, load time, RSS growth and memory retained by the loaded metadata
+    """
+    records = [{key: section.get(key) for key in ('id', 'category', 'title', 'keywords')} for section in sections]
+    encoded = {
+        'json': json.dumps({'metadata': records}, indent=2).encode('utf-8'),
+        'columnar': MetadataTable.from_records(records).to_bytes()
+    }
+    del records
+    loaders = {'json': lambda data: json.loads(data)['metadata'], 'columnar': MetadataTable.from_bytes}
+
+    formats = {}
+    for name, data in encoded.items():
+        gc.collect()
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        loaded = loaders[name](data)
+        seconds = time.perf_counter() - start
+        rss_growth = rss_mb() - rss_before
+        del loaded
+
+        # Traced separately, since tracing slows allocation-heavy parsing down
+        gc.collect()
+        tracemalloc.start()
+        loaded = loaders[name](data)
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del loaded
+
+        formats[name] = {
+            'stored_mb': round(len(data) / 1024 ** 2, 2),
+            'load_ms': round(seconds * 1000, 2),
+            'rss_mb': round(rss_growth, 1),
+            'retained_mb': round(retained / 1024 ** 2, 2)
+        }
+    return formats
+
+
+def measure_compression(objects: Dict[str, Tuple[bytes, str]], manifest: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Measure the size and codec throughput of the compressed artifacts of every shard.
+
+    Args:
+        objects: Stored objects of the bucket, keyed by S3 key
+        manifest: Published manifest
+
+    Returns:
+        Per artifact file name: raw and stored MB, ratio, and compression,
+        single-thread and parallel decompression throughput in MB/s
+    """
+    totals: Dict[str, Dict[str, float]] = {}
+
+    def add(name: str, **measured: float):
+        entry = totals.setdefault(name, {})
+        for field, value in measured.items():
+            entry[field] = entry.get(field, 0.0) + value
+
+    for shard in manifest['shards']:
+        codec = shard.get('compression')
+        if not codec:
+            continue
+        quantized = shard.get('quantized') or {}
+        for key in (shard['embeddings'], quantized.get('embeddings'), quantized.get('scales'),
+                    shard.get('reduced'), shard['metadata_columns'], shard['section_offsets']):
+            if key is None or not is_compressed(objects[key][0]):
+                continue
+            frame = objects[key][0]
+            start = time.perf_counter()
+            restored = decompress(frame, 1)
+            serial = time.perf_counter() - start
+            start = time.perf_counter()
+            decompress(frame, DECOMPRESSION_WORKERS)
+            parallel = time.perf_counter() - start
+            start = time.perf_counter()
+            if restored.dtype == np.uint8 and restored.ndim == 1:
+                compress_bytes(restored, codec)
+            else:
+                compress_array(restored, codec)
+            add(key.rsplit('/', 1)[-1], raw=restored.nbytes, stored=len(frame),
+                compress=time.perf_counter() - start, serial=serial, parallel=parallel)
+
+        # Sections are compressed one by one and decompressed when read
+        blob = objects[shard['section_blob']][0]
+        offsets = decompress(objects[shard['section_offsets']][0]) \
+            if is_compressed(objects[shard['section_offsets']][0]) else None
+        if offsets is None:
+            continue
+        start = time.perf_counter()
+        raw = sum(len(decompress_block(blob[int(a):int(b)], codec)) for a, b in zip(offsets[:-1], offsets[1:]))
+        seconds = time.perf_counter() - start
+        add('sections.bin', raw=raw, stored=len(blob), serial=seconds, parallel=seconds)
+
+    return {
+        name: {
+            'raw_mb': round(entry['raw'] / 1024 ** 2, 2),
+            'stored_mb': round(entry['stored'] / 1024 ** 2, 2),
+            'ratio': round(entry['raw'] / max(entry['stored'], 1), 2),
+            'compress_mb_s': round(entry['raw'] / 1024 ** 2 / entry['compress'], 1) if entry.get('compress') else None,
+            'decompress_mb_s': round(entry['raw'] / 1024 ** 2 / max(entry['serial'], 1e-9), 1),
+            'parallel_decompress_mb_s': round(entry['raw'] / 1024 ** 2 / max(entry['parallel'], 1e-9), 1)
+        }
+        for name, entry in totals.items()
+    }
+
+
+def measure_scaling(service: SearchService, query_set: List[Dict[str, Any]], top_k: int,
+                    thread_counts: Tuple[int, ...]) -> Dict[str, Dict[str, Any]]:
+    """
+    Measure vector search throughput with several threads sharing one service.
+
+    Args:
+        service: Loaded search service
+        query_set: Queries to send (each thread count sends all of them)
+        top_k: Results per query
+        thread_counts: Numbers of client threads
+
+    Returns:
+        QPS, latency percentiles and speedup over the first thread count, per thread count
+    """
+    def timed_query(query: Dict[str, Any]) -> float:
+        start = time.perf_counter()
+        service.search(query['text'], top_k)
+        return time.perf_counter() - start
+
+    scaling = {}
+    for threads in thread_counts:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(timed_query, query_set[:threads * 2]))
+            started = time.perf_counter()
+            latencies = list(executor.map(timed_query, query_set))
+            elapsed = time.perf_counter() - started
+        scaling[str(threads)] = {
+            'qps': round(len(latencies) / elapsed, 1),
+            'p50_ms': percentile_ms(latencies, 50),
+            'p99_ms': percentile_ms(latencies, 99)
+        }
+
+    base = scaling[str(thread_counts[0])]['qps']
+    for measured in scaling.values():
+        measured['speedup'] = round(measured['qps'] / base, 2) if base else 0.0
+    return scaling
+
+
+def measure_coarse(service: SearchService, query_set: List[Dict[str, Any]], truth: List[set],
+                   top_k: int, factors: Tuple[int, ...]) -> Dict[str, Dict[str, Any]]:
+    """
+    Measure recall and latency of two-stage vector search for several candidate factors.
+
+    Args:
+        service: Search service loaded with reduced vectors
+        query_set: Queries to send (each factor sends all of them)
+        truth: Exact top-k rows of every query
+        top_k: Results per query
+        factors: Candidate factors to try (0 searches the full matrix only)
+
+    Returns:
+        QPS, latency percentiles and recall@k per candidate factor
+    """
+    index = service.snapshot.vector_index
+    configured = index.candidate_factor
+    sweep = {}
+    try:
+        for factor in factors:
+            index.candidate_factor = factor
+            latencies, recalls = [], []
+            started = time.perf_counter()
+            for query, expected in zip(query_set, truth):
+                query_start = time.perf_counter()
+                results = service.search(query['text'], top_k)
+                latencies.append(time.perf_counter() - query_start)
+                found = {service.snapshot.section_index.row_for_id(r['metadata']['id']) for r in results}
+                recalls.append(len(found & expected) / max(len(expected), 1))
+            elapsed = time.perf_counter() - started
+            sweep[str(factor)] = {
+                'qps': round(len(latencies) / elapsed, 1),
+                'p50_ms': percentile_ms(latencies, 50),
+                'p99_ms': percentile_ms(latencies, 99),
+                'recall_at_k': round(float(np.mean(recalls)), 4)
+            }
+    finally:
+        index.candidate_factor = configured
+    return sweep
+
+
+def measure_batching(service: SearchService, query_set: List[Dict[str, Any]], top_k: int,
+                     clients: int) -> Dict[str, Any]:
+    """
+    Compare one-query-at-a-time serving with micro-batched serving of concurrent clients.
+
+    Args:
+        service: Loaded search service
+        query_set: Queries to send
+        top_k: Results per query
+        clients: Concurrent clients submitting to the micro-batcher
+
+    Returns:
+        QPS of both, latency percentiles of the batched run and the mean batch size
+    """
+    started = time.perf_counter()
+    for query in query_set:
+        service.search(query['text'], top_k)
+    sequential_qps = len(query_set) / (time.perf_counter() - started)
+
+    async def serve() -> List[float]:
+        batcher = MicroBatcher(service, queue_size=len(query_set))
+        batcher.start()
+        pending = iter(query_set)
+        latencies = []
+
+        async def client():
+            for query in pending:
+                start = time.perf_counter()
+                await batcher.search(query['text'], top_k, 'vector')
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*[client() for _ in range(clients)])
+        await batcher.stop()
+        return latencies
+
+    batches = service.metrics.counter('search.batches')
+    started = time.perf_counter()
+    latencies = asyncio.run(serve())
+    batched_qps = len(latencies) / (time.perf_counter() - started)
+    batches = service.metrics.counter('search.batches') - batches
+
+    return {
+        'clients': clients,
+        'sequential_qps': round(sequential_qps, 1),
+        'qps': round(batched_qps, 1),
+        'p50_ms': percentile_ms(latencies, 50),
+        'p99_ms': percentile_ms(latencies, 99),
+        'speedup': round(batched_qps / sequential_qps, 2) if sequential_qps else 0.0,
+        'mean_batch_size': round(len(latencies) / batches, 1) if batches else 0.0
+    }
+
+
+def run_worker(size: int, dimension: int = 384, queries: int = 200, top_k: int = 5,
+               search_modes: Tuple[str, ...] = SEARCH_MODES, shard_rows: int = 0,
+               seed: int = 0, thread_counts: Tuple[int, ...] = THREAD_COUNTS,
+               batch_clients: int = BATCH_CLIENTS,
+               coarse_factors: Tuple[int, ...] = COARSE_FACTORS,
+               bandwidth_mbps: float = BANDWIDTH_MBPS) -> Dict[str, Any]:
+    """
+    Benchmark one corpus size with the storage format configured in this process.
+
+    Args:
+        size: Number of synthetic sections
+        dimension: Embedding dimension
+        queries: Timed queries per search mode
+        top_k: Results per query
+        search_modes: Modes to measure ('vector', 'filtered', 'hybrid')
+        shard_rows: Sections per shard (0 for a single shard)
+        seed: Random seed
+        thread_counts: Client thread counts for the concurrency measurements
+                       (empty to skip them)
+        batch_clients: Concurrent clients for the micro-batching measurement (0 to skip it)
+        coarse_factors: Candidate factors for the two-stage measurement, run when
+                        COARSE_DIMENSIONS is set in this process
+        bandwidth_mbps: Node bandwidth the cold-load transfer time is estimated for
+
+    Returns:
+        Measurements for this run
+    """
+    run = {'size': size, 'dtype': EMBEDDING_STORAGE_DTYPE, 'dimension': dimension, 'top_k': top_k}
+
+    start = time.perf_counter()
+    sections, embeddings = generate_corpus(size, dimension, seed)
+    query_set = generate_queries(sections, embeddings, queries, seed + 1)
+    run['generate_seconds'] = round(time.perf_counter() - start, 3)
+    run['metadata_formats'] = measure_metadata_formats(sections)
+    logger.info(f"size={size} metadata formats: {run['metadata_formats']}")
+
+    encoder = HashingEmbeddingService(dimension)
+    for query in query_set:
+        encoder.register(query['text'], query['vector'])
+
+    # Publish through the indexer, as an upload would
+    client = LocalS3Client()
+    publisher = make_service(encoder, client)
+    publisher.s3_service.create_bucket_if_not_exists()
+    start = time.perf_counter()
+    report = publisher.indexer.publish(sections, embeddings, shard_rows)
+    if not report['success']:
+        raise RuntimeError("Failed to publish the synthetic corpus")
+    run['ingest_seconds'] = round(time.perf_counter() - start, 3)
+    run['stored_mb'] = round(sum(len(data) for data, _ in client.buckets[publisher.s3_service.bucket_name].values())
+                             / 1024 ** 2, 1)
+
+    # Ground truth from exact float32 search
+    exact = VectorIndex(embeddings)
+    truth = [{row for row, _ in exact.search(query['vector'], top_k)} for query in query_set]
+    del exact, publisher
+
+    # Cold load in a fresh service
+    service = make_service(encoder, client)
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    if not service._load_data_from_s3():
+        raise RuntimeError("Failed to load the synthetic corpus")
+    run['cold_load_seconds'] = round(time.perf_counter() - start, 3)
+    run['load_breakdown'] = service.snapshot.load_timings
+    run['rss_mb'] = round(rss_mb(), 1)
+    run['load_memory_mb'] = round(run['rss_mb'] - rss_before, 1)
+    run['embedding_mb'] = round(service.snapshot.embeddings.nbytes / 1024 ** 2, 1)
+    if isinstance(service.snapshot.vector_index, CoarseIndex):
+        run['reduced_mb'] = round(service.snapshot.vector_index.reduced.nbytes / 1024 ** 2, 1)
+
+    # Bytes a cold load transfers, and how long that takes on a bandwidth-limited node
+    objects = client.buckets[service.s3_service.bucket_name]
+    loaded = sum(len(objects[key][0]) for key in run['load_breakdown']['artifacts'] if key in objects)
+    run['loaded_mb'] = round(loaded / 1024 ** 2, 2)
+    run['transfer_seconds'] = round(loaded * 8 / (bandwidth_mbps * 1e6), 3)
+    run['bandwidth_mbps'] = bandwidth_mbps
+    run['compression'] = measure_compression(objects, service.snapshot.manifest)
+    if run['compression']:
+        logger.info(f"size={size} dtype={run['dtype']} compression: {run['compression']}")
+
+    run['modes'] = {}
+    for mode in search_modes:
+        search_mode = 'hybrid' if mode == 'hybrid' else 'vector'
+        for query in query_set[:5]:
+            service.search(query['text'], top_k, mode=search_mode)
+
+        service.metrics.reset()
+        latencies, recalls = [], []
+        started = time.perf_counter()
+        for query, expected in zip(query_set, truth):
+            filters = {'category': query['category']} if mode == 'filtered' else None
+            query_start = time.perf_counter()
+            results = service.search(query['text'], top_k, mode=search_mode, filters=filters)
+            latencies.append(time.perf_counter() - query_start)
+            if mode == 'vector':
+                found = {service.snapshot.section_index.row_for_id(r['metadata']['id']) for r in results}
+                recalls.append(len(found & expected) / max(len(expected), 1))
+        elapsed = time.perf_counter() - started
+
+        metrics = service.get_metrics_snapshot()
+        run['modes'][mode] = {
+            'queries': len(latencies),
+            'qps': round(len(latencies) / elapsed, 1),
+            'p50_ms': percentile_ms(latencies, 50),
+            'p99_ms': percentile_ms(latencies, 99),
+            'recall_at_k': round(float(np.mean(recalls)), 4) if recalls else None,
+            'fallback_rate': metrics['rates']['fallback_rate'],
+            'stages_p50_ms': {name: stage['p50_ms'] for name, stage in metrics['latency'].items()
+                              if name.startswith('search.')}
+        }
+        logger.info(f"size={size} dtype={run['dtype']} mode={mode}: {run['modes'][mode]['qps']} QPS, "
+                    f"p50 {run['modes'][mode]['p50_ms']}ms, p99 {run['modes'][mode]['p99_ms']}ms")
+
+    if thread_counts:
+        run['concurrency'] = {
+            'cold_start': measure_cold_start(encoder, client, query_set, max(thread_counts), top_k),
+            'scaling': measure_scaling(service, query_set, top_k, thread_counts)
+        }
+        logger.info(f"size={size} dtype={run['dtype']} concurrency: {run['concurrency']}")
+
+    if batch_clients:
+        run['batching'] = measure_batching(service, query_set, top_k, batch_clients)
+        logger.info(f"size={size} dtype={run['dtype']} batching: {run['batching']}")
+
+    if coarse_factors and isinstance(service.snapshot.vector_index, CoarseIndex):
+        run['coarse'] = measure_coarse(service, query_set, truth, top_k, coarse_factors)
+        logger.info(f"size={size} dtype={run['dtype']} coarse: {run['coarse']}")
+
+    return run
+
+
+def run_subprocess(size: int, dtype: str, args: argparse.Namespace) -> Optional[Dict[str, Any]]:
+    """
+    Run one benchmark in a child process, so storage settings take effect and
+    memory is measured in isolation.
+
+    Args:
+        size: Number of synthetic sections
+        dtype: Embedding storage format
+        args: Parsed command line arguments
+
+    Returns:
+        Measurements or None if the run failed
+    """
+    command = [
+        sys.executable, __file__, '--worker',
+        '--sizes', str(size), '--dimension', str(args.dimension),
+        '--queries', str(args.queries), '--top-k', str(args.top_k),
+        '--modes', ','.join(args.modes), '--shard-rows', str(args.shard_rows), '--seed', str(args.seed),
+        '--threads', args.threads, '--batch-clients', str(args.batch_clients),
+        '--coarse-factors', args.coarse_factors, '--bandwidth-mbps', str(args.bandwidth_mbps)
+    ]
+    env = dict(os.environ, EMBEDDING_STORAGE_DTYPE=dtype, LOCAL_CACHE_DIR='', SNAPSHOT_REFRESH_INTERVAL='0',
+               COARSE_DIMENSIONS=str(args.coarse_dimensions), ARTIFACT_COMPRESSION=args.compression)
+
+    logger.info(f"Running size={size} dtype={dtype}...")
+    completed = subprocess.run(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+
+    logger.error(f"Run size={size} dtype={dtype} failed:\n{completed.stderr[-2000:]}")
+    return None
+
+
+def result_rows(results: Dict[str, Any]) -> Dict[Tuple[int, str, str], Dict[str, Any]]:
+    """Flatten runs into one row per (size, dtype, mode)."""
+    rows = {}
+    for run in results['runs']:
+        for mode, measured in run['modes'].items():
+            rows[(run['size'], run['dtype'], mode)] = dict(
+                measured, cold_load_seconds=run['cold_load_seconds'], rss_mb=run['rss_mb']
+            )
+        if 'batching' in run:
+            rows[(run['size'], run['dtype'], 'batched')] = dict(
+                run['batching'], cold_load_seconds=run['cold_load_seconds'], rss_mb=run['rss_mb']
+            )
+        for factor, measured in run.get('coarse', {}).items():
+            rows[(run['size'], run['dtype'], f"coarse x{factor}")] = dict(
+                measured, cold_load_seconds=run['cold_load_seconds'], rss_mb=run['rss_mb']
+            )
+        for threads, measured in run.get('concurrency', {}).get('scaling', {}).items():
+            rows[(run['size'], run['dtype'], f"{threads} threads")] = dict(
+                measured, cold_load_seconds=run['cold_load_seconds'], rss_mb=run['rss_mb']
+            )
+    return rows
+
+
+def format_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Format results as a comparison table, with changes against a baseline run.
+
+    Args:
+        results: Benchmark results
+        baseline: Earlier results to compare against
+
+    Returns:
+        Report text
+    """
+    columns = ('cold_load_seconds', 'rss_mb', 'qps', 'p50_ms', 'p99_ms', 'recall_at_k')
+    header = f"{'size':>9} {'dtype':>8} {'mode':>9} " + ' '.join(f"{c:>17}" for c in columns)
+    lines = [header, '-' * len(header)]
+
+    previous = result_rows(baseline) if baseline else {}
+    for key, row in sorted(result_rows(results).items()):
+        cells = []
+        for column in columns:
+            value = row.get(column)
+            cell = '-' if value is None else f"{value:g}"
+            before = previous.get(key, {}).get(column)
+            if value is not None and before:
+                cell += f" ({(value - before) / before * 100:+.0f}%)"
+            cells.append(f"{cell:>17}")
+        lines.append(f"{key[0]:>9} {key[1]:>8} {key[2]:>9} " + ' '.join(cells))
+
+    for run in results['runs']:
+        lines.append('')
+        lines.append(f"{run['size']} {run['dtype']}: cold load transfers {run.get('loaded_mb', 0):g} MB, "
+                     f"{run.get('transfer_seconds', 0):g}s at {run.get('bandwidth_mbps', BANDWIDTH_MBPS):g} Mbit/s")
+        for name, measured in run.get('compression', {}).items():
+            lines.append(f"  {name}: {measured['raw_mb']:g} -> {measured['stored_mb']:g} MB "
+                         f"(x{measured['ratio']:g}), compress {measured['compress_mb_s'] or '-'} MB/s, "
+                         f"decompress {measured['decompress_mb_s']:g} MB/s "
+                         f"({measured['parallel_decompress_mb_s']:g} MB/s with {DECOMPRESSION_WORKERS} threads)")
+
+    # Metadata formats do not depend on the storage format; report them once per size
+    reported = set()
+    for run in results['runs']:
+        if 'metadata_formats' not in run or run['size'] in reported:
+            continue
+        reported.add(run['size'])
+        lines.append('')
+        lines.append(f"metadata at {run['size']} sections: " + '; '.join(
+            f"{name} {measured['stored_mb']:g} MB stored, {measured['load_ms']:g} ms load, "
+            f"{measured['rss_mb']:g} MB RSS, {measured['retained_mb']:g} MB retained"
+            for name, measured in run['metadata_formats'].items()
+        ))
+    return '\n'.join(lines)
+
+
+def main():
+    """Main benchmark function."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the car manual search system on synthetic data",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python scripts/benchmark.py                                   # 10k and 100k sections, all formats
+  python scripts/benchmark.py --sizes 1000000,5000000 --dtypes int8
+  python scripts/benchmark.py --output after.json --baseline before.json
+  python scripts/benchmark.py --sizes 100000 --dtypes float32 --coarse-dimensions 64
+  python scripts/benchmark.py --sizes 100000 --compression zstd --bandwidth-mbps 50
+        """
+    )
+    parser.add_argument('--sizes', default='10000,100000', help='Comma-separated corpus sizes')
+    parser.add_argument('--dtypes', default=','.join(STORAGE_DTYPES), help='Comma-separated storage formats')
+    parser.add_argument('--modes', default=','.join(SEARCH_MODES), help='Comma-separated search modes')
+    parser.add_argument('--dimension', type=int, default=384, help='Embedding dimension')
+    parser.add_argument('--queries', type=int, default=200, help='Timed queries per mode')
+    parser.add_argument('--top-k', type=int, default=5, help='Results per query')
+    parser.add_argument('--shard-rows', type=int, default=0, help='Sections per shard (0 for one shard)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--threads', default=','.join(map(str, THREAD_COUNTS)),
+                        help='Comma-separated client thread counts for the concurrency runs (empty to skip)')
+    parser.add_argument('--batch-clients', type=int, default=BATCH_CLIENTS,
+                        help='Concurrent clients for the micro-batching run (0 to skip)')
+    parser.add_argument('--coarse-dimensions', type=int, default=0,
+                        help='Reduced dimension for two-stage search (0 to skip the sweep)')
+    parser.add_argument('--coarse-factors', default=','.join(map(str, COARSE_FACTORS)),
+                        help='Comma-separated two-stage candidate factors to sweep')
+    parser.add_argument('--compression', default='',
+                        help="Shard artifact compression ('zstd', 'zlib'; empty for none)")
+    parser.add_argument('--bandwidth-mbps', type=float, default=BANDWIDTH_MBPS,
+                        help='Node bandwidth the cold-load transfer time is estimated for')
+    parser.add_argument('--output', default='benchmark_results.json', help='Results JSON file')
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    args.modes = [mode for mode in args.modes.split(',') if mode]
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    if args.worker:
+        logging.getLogger().setLevel(logging.WARNING)
+        run = run_worker(sizes[0], args.dimension, args.queries, args.top_k,
+                         tuple(args.modes), args.shard_rows, args.seed,
+                         tuple(int(threads) for threads in args.threads.split(',') if threads),
+                         args.batch_clients,
+                         tuple(int(factor) for factor in args.coarse_factors.split(',') if factor),
+                         args.bandwidth_mbps)
+        print(RESULT_MARKER + json.dumps(run))
+        return
+
+    results = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'settings': {key: value for key, value in vars(args).items() if key not in ('worker', 'output', 'baseline')},
+        'runs': []
+    }
+    for size in sizes:
+        for dtype in args.dtypes.split(','):
+            run = run_subprocess(size, dtype, args)
+            if run is not None:
+                results['runs'].append(run)
+
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    print(format_report(results, baseline))
+
+    if len(results['runs']) != len(sizes) * len(args.dtypes.split(',')):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
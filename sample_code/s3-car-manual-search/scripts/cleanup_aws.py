@@ -7,6 +7,7 @@ This script safely removes all AWS resources created by the system.
 import sys
 import os
 import argparse
+import shutil
 import logging
 from pathlib import Path
 
@@ -14,7 +15,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.s3_vector_service import S3VectorService
-from config import S3_BUCKET_NAME, AWS_REGION
+from config import S3_BUCKET_NAME, AWS_REGION, LOCAL_CACHE_DIR
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -128,6 +129,11 @@ def cleanup_local_cache():
         "*.log"
     ]
     
+    # Remove downloaded S3 artifacts kept by the local cache tier
+    if LOCAL_CACHE_DIR and os.path.isdir(LOCAL_CACHE_DIR):
+        shutil.rmtree(LOCAL_CACHE_DIR, ignore_errors=True)
+        logger.info(f"Removed local artifact cache: {LOCAL_CACHE_DIR}")
+    
     # This is a simple cleanup - in a real scenario you might want to be more thorough
     logger.info("Local cache cleanup completed")
     return True
@@ -0,0 +1,167 @@
+"""
+In-process stand-in for the subset of the boto3 S3 client used by the
+car manual search system. Used by the tests and the benchmark harness so
+neither needs AWS.
+"""
+
+import base64
+import hashlib
+import io
+import itertools
+import threading
+import zlib
+from botocore.exceptions import ClientError
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def _client_error(code: str, operation: str) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': code}}, operation)
+
+
+def _verify_checksum(data: bytes, kwargs: dict, operation: str):
+    """Reject a body whose Checksum<Algorithm> argument does not match."""
+    algorithm = kwargs.get('ChecksumAlgorithm')
+    if not algorithm or f'Checksum{algorithm}' not in kwargs:
+        return
+    if algorithm == 'CRC32':
+        digest = zlib.crc32(data).to_bytes(4, 'big')
+    else:
+        digest = hashlib.new(algorithm.lower(), data).digest()
+    if base64.b64encode(digest).decode('ascii') != kwargs[f'Checksum{algorithm}']:
+        raise _client_error('BadDigest', operation)
+
+
+class LocalS3Client:
+    """Dictionary-backed S3 client with ETags, conditional and ranged GETs."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.calls = []
+        self.uploads = {}
+        self._upload_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _objects(self, bucket: str, operation: str) -> dict:
+        if bucket not in self.buckets:
+            raise _client_error('404', operation)
+        return self.buckets[bucket]
+
+    def list_buckets(self):
+        self.calls.append('list_buckets')
+        return {'Buckets': [{'Name': name} for name in self.buckets]}
+
+    def create_bucket(self, Bucket, **kwargs):
+        self.calls.append('create_bucket')
+        self.buckets.setdefault(Bucket, {})
+        return {}
+
+    def head_bucket(self, Bucket):
+        self.calls.append('head_bucket')
+        self._objects(Bucket, 'HeadBucket')
+        return {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.calls.append('put_object')
+        if isinstance(Body, str):
+            Body = Body.encode('utf-8')
+        elif not isinstance(Body, (bytes, bytearray)):
+            Body = Body.read()
+        data = bytes(Body)
+        _verify_checksum(data, kwargs, 'PutObject')
+        etag = '"%s"' % hashlib.md5(data).hexdigest()
+        self._objects(Bucket, 'PutObject')[Key] = (data, etag)
+        return {'ETag': etag}
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.calls.append('create_multipart_upload')
+        self._objects(Bucket, 'CreateMultipartUpload')
+        with self._lock:
+            upload_id = str(next(self._upload_ids))
+            self.uploads[upload_id] = {'bucket': Bucket, 'key': Key, 'parts': {}}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        with self._lock:
+            self.calls.append('upload_part')
+        if UploadId not in self.uploads:
+            raise _client_error('NoSuchUpload', 'UploadPart')
+        data = bytes(Body)
+        _verify_checksum(data, kwargs, 'UploadPart')
+        etag = '"%s"' % hashlib.md5(data).hexdigest()
+        with self._lock:
+            self.uploads[UploadId]['parts'][PartNumber] = (data, etag)
+        return {'ETag': etag}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.calls.append('complete_multipart_upload')
+        upload = self.uploads.pop(UploadId, None)
+        if upload is None:
+            raise _client_error('NoSuchUpload', 'CompleteMultipartUpload')
+        parts = MultipartUpload['Parts']
+        if [part['PartNumber'] for part in parts] != list(range(1, len(parts) + 1)):
+            raise _client_error('InvalidPartOrder', 'CompleteMultipartUpload')
+
+        chunks = []
+        for part in parts:
+            data, etag = upload['parts'][part['PartNumber']]
+            if etag != part['ETag']:
+                raise _client_error('InvalidPart', 'CompleteMultipartUpload')
+            if part['PartNumber'] < len(parts) and len(data) < MIN_PART_SIZE:
+                raise _client_error('EntityTooSmall', 'CompleteMultipartUpload')
+            chunks.append(data)
+
+        digests = b''.join(bytes.fromhex(part['ETag'].strip('"')) for part in parts)
+        etag = '"%s-%d"' % (hashlib.md5(digests).hexdigest(), len(parts))
+        self._objects(Bucket, 'CompleteMultipartUpload')[Key] = (b''.join(chunks), etag)
+        return {'ETag': etag}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.calls.append('abort_multipart_upload')
+        self.uploads.pop(UploadId, None)
+        return {}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj.read())
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, Range=None):
+        self.calls.append('get_object')
+        objects = self._objects(Bucket, 'GetObject')
+        if Key not in objects:
+            raise _client_error('NoSuchKey', 'GetObject')
+        data, etag = objects[Key]
+        if IfNoneMatch is not None and IfNoneMatch == etag:
+            raise _client_error('304', 'GetObject')
+        if Range:
+            start, end = Range.replace('bytes=', '').split('-')
+            data = data[int(start):int(end) + 1]
+        return {'Body': io.BytesIO(data), 'ETag': etag, 'ContentLength': len(data)}
+
+    def download_fileobj(self, Bucket, Key, Fileobj, Config=None):
+        Fileobj.write(self.get_object(Bucket=Bucket, Key=Key)['Body'].read())
+
+    def head_object(self, Bucket, Key):
+        self.calls.append('head_object')
+        objects = self._objects(Bucket, 'HeadObject')
+        if Key not in objects:
+            raise _client_error('404', 'HeadObject')
+        data, etag = objects[Key]
+        return {'ETag': etag, 'ContentLength': len(data)}
+
+    def list_objects_v2(self, Bucket, Prefix='', MaxKeys=1000, Delimiter=None, **kwargs):
+        self.calls.append('list_objects_v2')
+        keys = sorted(key for key in self._objects(Bucket, 'ListObjectsV2') if key.startswith(Prefix))
+        if Delimiter:
+            prefixes = sorted({Prefix + key[len(Prefix):].split(Delimiter, 1)[0] + Delimiter
+                               for key in keys if Delimiter in key[len(Prefix):]})
+            keys = [key for key in keys if Delimiter not in key[len(Prefix):]]
+            if prefixes:
+                return {'CommonPrefixes': [{'Prefix': prefix} for prefix in prefixes[:MaxKeys]],
+                        **({'Contents': [{'Key': key} for key in keys[:MaxKeys]]} if keys else {})}
+        contents = [{'Key': key} for key in keys[:MaxKeys]]
+        return {'Contents': contents} if contents else {}
+
+    def delete_object(self, Bucket, Key):
+        self.calls.append('delete_object')
+        self._objects(Bucket, 'DeleteObject').pop(Key, None)
+        return {}
@@ -0,0 +1,44 @@
+"""
+Deterministic stand-in for the sentence-transformers embedding service.
+Used by the tests and the benchmark harness so neither needs a model download.
+"""
+
+import zlib
+import numpy as np
+from typing import Dict, List
+
+
+class HashingEmbeddingService:
+    """
+    Bag-of-words encoder hashing each token into one of `dimension` buckets.
+    Vectors registered for a text (e.g. synthetic benchmark queries) are
+    returned as-is instead.
+    """
+
+    def __init__(self, dimension: int = 64, **kwargs):
+        self.dimension = dimension
+        self.registered: Dict[str, np.ndarray] = {}
+
+    def register(self, text: str, vector: np.ndarray):
+        """Return a fixed vector whenever this exact text is encoded."""
+        self.registered[text] = np.asarray(vector, dtype=np.float32)
+
+    def generate_embedding(self, text: str) -> np.ndarray:
+        if text in self.registered:
+            return self.registered[text]
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in text.lower().split():
+            vector[zlib.crc32(token.strip('.,:?!').encode()) % self.dimension] += 1.0
+        return vector
+
+    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32,
+                                  show_progress_bar: bool = True) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.stack([self.generate_embedding(text) for text in texts])
+
+    def generate_query_embeddings(self, texts: List[str]) -> np.ndarray:
+        return self.generate_embeddings_batch(texts)
+
+    def get_model_info(self) -> dict:
+        return {'model_name': 'hashing', 'embedding_dimension': self.dimension}
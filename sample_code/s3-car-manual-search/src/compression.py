@@ -0,0 +1,167 @@
+import json
+import struct
+import zlib
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+from config import ARTIFACT_COMPRESSION_LEVEL, COMPRESSION_CHUNK_MB, DECOMPRESSION_WORKERS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CODECS = ('zstd', 'zlib')
+
+# Frame layout: magic, uint32 header length, JSON header, then the compressed chunks back to back
+MAGIC = b'CARZFRM1'
+
+
+@lru_cache(maxsize=None)
+def resolve_codec(name: Optional[str]) -> Optional[str]:
+    """
+    Resolve a configured codec to one that can be used in this process.
+
+    Args:
+        name: 'zstd', 'zlib', or empty/None for no compression
+
+    Returns:
+        Codec name or None if compression is disabled
+    """
+    name = (name or '').strip().lower()
+    if not name or name == 'none':
+        return None
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression codec '{name}', expected one of {CODECS}")
+    if name == 'zstd' and zstandard is None:
+        logger.warning("zstandard is not installed, compressing artifacts with zlib instead")
+        return 'zlib'
+    return name
+
+
+def compress_block(data: bytes, codec: str, level: int = ARTIFACT_COMPRESSION_LEVEL) -> bytes:
+    """Compress one block of bytes with a codec."""
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    # zlib levels stop at 9; zstd levels go up to 22
+    return zlib.compress(data, min(level, 9))
+
+
+def decompress_block(data: bytes, codec: str) -> bytes:
+    """
+    Decompress one block of bytes (see compress_block).
+
+    Raises:
+        RuntimeError: If the block needs a codec that is not installed
+    """
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Artifact is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def is_compressed(data: bytes) -> bool:
+    """Check whether bytes (or their first bytes) start a compressed frame."""
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def compress_bytes(data: bytes, codec: str, level: int = ARTIFACT_COMPRESSION_LEVEL,
+                   chunk_size: int = COMPRESSION_CHUNK_MB * 1024 * 1024, itemsize: int = 1,
+                   header: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Compress bytes into a self-describing frame of independently compressed chunks.
+
+    Args:
+        data: Bytes to compress
+        codec: 'zstd' or 'zlib'
+        level: Compression level
+        chunk_size: Uncompressed bytes per chunk
+        itemsize: Bytes per element; above 1 the bytes of each chunk are shuffled so
+                  byte k of every element is stored together, which compresses
+                  numeric arrays far better
+        header: Extra fields to record in the frame header
+
+    Returns:
+        Compressed frame
+    """
+    data = memoryview(data).cast('B')
+    chunk_size = max(chunk_size - chunk_size % itemsize, itemsize)
+    if len(data) % itemsize:
+        raise ValueError(f"{len(data)} bytes do not hold whole {itemsize}-byte elements")
+
+    chunks, sizes = [], []
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
+        if itemsize > 1:
+            chunk = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, itemsize).T.tobytes()
+        compressed = compress_block(bytes(chunk), codec, level)
+        chunks.append(compressed)
+        sizes.append([len(chunk), len(compressed)])
+
+    frame_header = dict(header or {}, codec=codec, itemsize=itemsize, chunks=sizes)
+    encoded = json.dumps(frame_header).encode('utf-8')
+    return b''.join([MAGIC, struct.pack('<I', len(encoded)), encoded] + chunks)
+
+
+def compress_array(array: np.ndarray, codec: str, level: int = ARTIFACT_COMPRESSION_LEVEL,
+                   chunk_size: int = COMPRESSION_CHUNK_MB * 1024 * 1024) -> bytes:
+    """Compress an array into a byte-shuffled frame that records its dtype and shape."""
+    array = np.ascontiguousarray(array)
+    return compress_bytes(array.reshape(-1).view(np.uint8) if array.size else b'', codec, level, chunk_size,
+                          array.dtype.itemsize, {'dtype': array.dtype.str, 'shape': list(array.shape)})
+
+
+def decompress(frame: bytes, max_workers: int = DECOMPRESSION_WORKERS) -> np.ndarray:
+    """
+    Decompress a frame, its chunks in parallel threads (both codecs release the GIL).
+
+    Args:
+        frame: Output of compress_bytes or compress_array
+        max_workers: Maximum concurrent chunk decompressions
+
+    Returns:
+        The array for frames of compress_array, otherwise a uint8 array of the bytes
+
+    Raises:
+        ValueError: If the data is not a compressed frame
+    """
+    frame = memoryview(frame).cast('B')
+    if not is_compressed(frame):
+        raise ValueError("Not a compressed frame")
+    header_length = struct.unpack_from('<I', frame, len(MAGIC))[0]
+    position = len(MAGIC) + 4 + header_length
+    header = json.loads(bytes(frame[len(MAGIC) + 4:position]).decode('utf-8'))
+    codec, itemsize = header['codec'], header['itemsize']
+
+    jobs, output_position = [], 0
+    for raw_size, compressed_size in header['chunks']:
+        jobs.append((output_position, raw_size, frame[position:position + compressed_size]))
+        output_position += raw_size
+        position += compressed_size
+    output = np.empty(output_position, dtype=np.uint8)
+
+    def inflate(job):
+        start, raw_size, compressed = job
+        block = np.frombuffer(decompress_block(compressed, codec), dtype=np.uint8)
+        if itemsize > 1:
+            output[start:start + raw_size].reshape(-1, itemsize)[:] = block.reshape(itemsize, -1).T
+        else:
+            output[start:start + raw_size] = block
+
+    if len(jobs) > 1 and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+            list(executor.map(inflate, jobs))
+    else:
+        for job in jobs:
+            inflate(job)
+
+    if 'dtype' in header:
+        return output.view(np.dtype(header['dtype'])).reshape(header['shape'])
+    return output
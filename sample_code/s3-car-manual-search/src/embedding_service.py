@@ -1,9 +1,11 @@
 import numpy as np
 import logging
 from typing import List, Union
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
-from config import EMBEDDING_MODEL, EMBEDDING_DIMENSION
+from config import EMBEDDING_MODEL, EMBEDDING_DIMENSION, QUERY_CACHE_SIZE, QUERY_CACHE_TTL
+from .model_registry import ModelRegistry, MODEL_REGISTRY
+from .query_cache import QueryEmbeddingCache, normalize_query
+from .metrics import MetricsRegistry, NULL_METRICS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -11,74 +13,120 @@ logger = logging.getLogger(__name__)
 class EmbeddingService:
     """
     Service for generating and managing embeddings using sentence-transformers.
+    The model comes from a process-wide registry and is loaded on the first encode,
+    so creating services is cheap and every service shares one copy of the model.
+    Query embeddings are cached, so repeated queries skip the model.
     """
     
-    def __init__(self, model_name: str = EMBEDDING_MODEL):
+    def __init__(self, model_name: str = EMBEDDING_MODEL, registry: ModelRegistry = MODEL_REGISTRY,
+                 metrics: MetricsRegistry = NULL_METRICS,
+                 cache_size: int = QUERY_CACHE_SIZE, cache_ttl: float = QUERY_CACHE_TTL):
         """
         Initialize the embedding service.
         
         Args:
             model_name: Name of the sentence-transformers model to use
+            registry: Registry that loads and shares the model
+            metrics: Registry for query cache counters
+            cache_size: Most query embeddings cached (0 disables the cache)
+            cache_ttl: Seconds a cached query embedding stays valid (0 never expires)
         """
         self.model_name = model_name
-        self.model = None
-        self._load_model()
+        self.registry = registry
+        # Shared by every service using the same model
+        self._encode_lock = registry.encode_lock(model_name)
+        self.query_cache = QueryEmbeddingCache(cache_size, cache_ttl, metrics=metrics)
     
-    def _load_model(self):
-        """Load the sentence-transformers model."""
-        try:
-            logger.info(f"Loading embedding model: {self.model_name}")
-            self.model = SentenceTransformer(self.model_name)
-            logger.info(f"Model loaded successfully. Embedding dimension: {self.model.get_sentence_embedding_dimension()}")
-        except Exception as e:
-            logger.error(f"Error loading model: {e}")
-            raise
+    @property
+    def model(self):
+        """The shared sentence-transformers model, loaded on first access."""
+        return self.registry.get(self.model_name)
+    
+    @property
+    def model_loaded(self) -> bool:
+        """Whether the model has been loaded in this process."""
+        return self.registry.is_loaded(self.model_name)
     
     def generate_embedding(self, text: str) -> np.ndarray:
         """
-        Generate embedding for a single text.
+        Generate embedding for a single query text, reusing a cached one if the
+        same (normalized) query was embedded recently.
         
         Args:
             text: Input text to embed
             
         Returns:
-            Numpy array containing the embedding vector
+            Read-only float32 array containing the embedding vector
         """
-        if not self.model:
-            raise RuntimeError("Model not loaded")
+        cached = self.query_cache.get(text)
+        if cached is not None:
+            return cached
+        
+        model = self.model
         
         try:
             # Generate embedding
-            embedding = self.model.encode(text, convert_to_numpy=True)
-            return embedding
+            with self._encode_lock:
+                embedding = model.encode(text, convert_to_numpy=True)
+            return self.query_cache.put(text, embedding)
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             raise
     
-    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+    def generate_query_embeddings(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed a batch of queries. Cached queries skip the model and the rest
+        (each distinct query once) are encoded in one batch.
+        
+        Args:
+            queries: Query texts
+            
+        Returns:
+            Float32 array with one row per query
+        """
+        vectors = [self.query_cache.get(query) for query in queries]
+        missing = {}
+        for query, vector in zip(queries, vectors):
+            if vector is None:
+                missing.setdefault(normalize_query(query), query)
+        
+        if missing:
+            embeddings = self.generate_embeddings_batch(list(missing.values()), show_progress_bar=False)
+            encoded = {key: self.query_cache.put(query, embedding)
+                       for (key, query), embedding in zip(missing.items(), embeddings)}
+            vectors = [encoded[normalize_query(query)] if vector is None else vector
+                       for query, vector in zip(queries, vectors)]
+        
+        if not vectors:
+            return np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+        return np.stack(vectors)
+    
+    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 32,
+                                  show_progress_bar: bool = True) -> np.ndarray:
         """
         Generate embeddings for multiple texts in batches.
         
         Args:
             texts: List of texts to embed
             batch_size: Number of texts to process at once
+            show_progress_bar: Whether to show a progress bar (off for query batches)
             
         Returns:
             Numpy array containing all embeddings
         """
-        if not self.model:
-            raise RuntimeError("Model not loaded")
+        model = self.model
         
         try:
             logger.info(f"Generating embeddings for {len(texts)} texts")
             
             # Generate embeddings in batches for memory efficiency
-            embeddings = self.model.encode(
-                texts, 
-                batch_size=batch_size,
-                convert_to_numpy=True,
-                show_progress_bar=True
-            )
+            with self._encode_lock:
+                embeddings = model.encode(
+                    texts, 
+                    batch_size=batch_size,
+                    convert_to_numpy=True,
+                    show_progress_bar=show_progress_bar
+                )
             
             logger.info(f"Generated embeddings shape: {embeddings.shape}")
             return embeddings
@@ -179,19 +227,26 @@ class EmbeddingService:
     
     def get_model_info(self) -> dict:
         """
-        Get information about the loaded model.
+        Get information about the model without loading it. Until the first
+        encode, the dimension is the configured one.
         
         Returns:
             Dictionary with model information
         """
-        if not self.model:
-            return {"error": "Model not loaded"}
+        if not self.model_loaded:
+            return {
+                "model_name": self.model_name,
+                "embedding_dimension": EMBEDDING_DIMENSION,
+                "loaded": False
+            }
         
+        model = self.model
         return {
             "model_name": self.model_name,
-            "embedding_dimension": self.model.get_sentence_embedding_dimension(),
-            "max_sequence_length": getattr(self.model, 'max_seq_length', 'Unknown'),
-            "device": str(self.model.device)
+            "embedding_dimension": model.get_sentence_embedding_dimension(),
+            "max_sequence_length": getattr(model, 'max_seq_length', 'Unknown'),
+            "device": str(model.device),
+            "loaded": True
         }
     
     def validate_embeddings(self, embeddings: np.ndarray) -> dict:
@@ -0,0 +1,239 @@
+import logging
+import numpy as np
+from itertools import chain
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple, Union
+
+from .keyword_index import tokenize
+from .metadata_table import MetadataTable
+from .vector_index import top_k_indices
+from config import FUZZY_MIN_SIMILARITY, FUZZY_MAX_EXPANSIONS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def trigrams(term: str) -> Set[str]:
+    """
+    Get the character trigrams of a term, padded like PostgreSQL's pg_trgm
+    (two spaces before, one after) so word starts weigh more than word ends.
+
+    Args:
+        term: Lowercase term
+
+    Returns:
+        Set of trigrams
+    """
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Character-trigram index over the terms of section titles and keywords.
+
+    Two inverted indexes are kept as flat arrays grouped by key, like BM25Index:
+    trigram -> terms containing it, and term -> rows containing it. A query term
+    is matched to indexed terms by trigram similarity (shared trigrams over the
+    union of both sets), so misspellings such as 'alternater' still reach
+    'alternator'; rows are ranked by how closely their terms match the query.
+    """
+
+    def __init__(self, vocabulary: List[str], gram_ids: Dict[str, int],
+                 gram_offsets: np.ndarray, gram_terms: np.ndarray, term_grams: np.ndarray,
+                 term_offsets: np.ndarray, term_rows: np.ndarray, num_rows: int,
+                 min_similarity: float = FUZZY_MIN_SIMILARITY, max_expansions: int = FUZZY_MAX_EXPANSIONS):
+        """
+        Initialize the index from its arrays (use TrigramIndex.build to create one).
+
+        Args:
+            vocabulary: Terms, in term id order
+            gram_ids: Trigram -> trigram id
+            gram_offsets: Start of each trigram's terms in gram_terms
+            gram_terms: Term ids containing each trigram
+            term_grams: Number of trigrams of each term
+            term_offsets: Start of each term's rows in term_rows
+            term_rows: Rows containing each term
+            num_rows: Number of indexed rows
+            min_similarity: Least trigram similarity for a term to match a query term
+            max_expansions: Most indexed terms matched per query term
+        """
+        self.vocabulary = vocabulary
+        self.gram_ids = gram_ids
+        self.gram_offsets = gram_offsets
+        self.gram_terms = gram_terms
+        self.term_grams = term_grams
+        self.term_offsets = term_offsets
+        self.term_rows = term_rows
+        self.num_rows = num_rows
+        self.min_similarity = min_similarity
+        self.max_expansions = max_expansions
+
+    @classmethod
+    def build(cls, documents: Iterable[List[str]], **kwargs) -> 'TrigramIndex':
+        """
+        Build an index from tokenized documents.
+
+        Args:
+            documents: Token lists, one per row
+            **kwargs: min_similarity and max_expansions
+
+        Returns:
+            TrigramIndex instance
+        """
+        term_ids: Dict[str, int] = {}
+        id_lists = [[term_ids.setdefault(term, len(term_ids)) for term in tokens] for tokens in documents]
+        return cls._from_postings(list(term_ids), id_lists, np.arange(len(id_lists)), len(id_lists), **kwargs)
+
+    @classmethod
+    def from_metadata(cls, records: Union[MetadataTable, List[Dict[str, Any]]], **kwargs) -> 'TrigramIndex':
+        """
+        Build an index over the titles and keywords of metadata or section rows.
+
+        Args:
+            records: Metadata table, or metadata or section dictionaries in row order
+            **kwargs: min_similarity and max_expansions
+
+        Returns:
+            TrigramIndex instance
+        """
+        if isinstance(records, MetadataTable):
+            strings = records.strings('title') + records.strings('keyword')
+            keyword_counts = np.diff(records.columns['keyword_rows'])
+        else:
+            strings = [record.get('title') or '' for record in records]
+            keywords = [list(record.get('keywords') or []) for record in records]
+            strings.extend(chain.from_iterable(keywords))
+            keyword_counts = np.fromiter(map(len, keywords), dtype=np.int64, count=len(keywords))
+        num_rows = len(records)
+        string_rows = np.concatenate([np.arange(num_rows), np.repeat(np.arange(num_rows), keyword_counts)])
+
+        # Keywords (and often titles) repeat across sections; tokenize each distinct string once
+        term_ids: Dict[str, int] = {}
+        string_terms = {
+            string: [term_ids.setdefault(term, len(term_ids)) for term in tokenize(string)]
+            for string in dict.fromkeys(strings)
+        }
+        return cls._from_postings(list(term_ids), [string_terms[string] for string in strings],
+                                  string_rows, num_rows, **kwargs)
+
+    @classmethod
+    def _from_postings(cls, vocabulary: List[str], id_lists: List[List[int]], item_rows: np.ndarray,
+                       num_rows: int, **kwargs) -> 'TrigramIndex':
+        """
+        Build an index from the term ids of text items (titles, keywords) and their rows.
+
+        Args:
+            vocabulary: Terms, in term id order
+            id_lists: Term ids of every item
+            item_rows: Row of every item
+            num_rows: Number of rows
+            **kwargs: min_similarity and max_expansions
+
+        Returns:
+            TrigramIndex instance
+        """
+        counts = np.fromiter(map(len, id_lists), dtype=np.int64, count=len(id_lists))
+        ids = np.fromiter(chain.from_iterable(id_lists), dtype=np.int64, count=int(counts.sum()))
+
+        # Unique (term, row) pairs, grouped by term
+        width = max(num_rows, 1)
+        pairs = np.sort(ids * width + np.repeat(item_rows, counts))
+        pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])] if len(pairs) else pairs
+        terms, term_rows = pairs // width, (pairs % width).astype(np.int32)
+        term_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(vocabulary)), out=term_offsets[1:])
+
+        gram_ids: Dict[str, int] = {}
+        gram_lists = [[gram_ids.setdefault(gram, len(gram_ids)) for gram in trigrams(term)] for term in vocabulary]
+        term_grams = np.fromiter(map(len, gram_lists), dtype=np.int32, count=len(gram_lists))
+        grams = np.fromiter(chain.from_iterable(gram_lists), dtype=np.int32, count=int(term_grams.sum()))
+        order = np.argsort(grams, kind='stable')
+        gram_terms = np.repeat(np.arange(len(vocabulary), dtype=np.int32), term_grams)[order]
+        gram_offsets = np.zeros(len(gram_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(grams, minlength=len(gram_ids)), out=gram_offsets[1:])
+
+        logger.info(f"Built trigram index: {num_rows} rows, {len(vocabulary)} terms, {len(gram_ids)} trigrams")
+        return cls(vocabulary, gram_ids, gram_offsets, gram_terms, term_grams,
+                   term_offsets, term_rows, num_rows, **kwargs)
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate bytes held by the index (arrays plus term and trigram strings)."""
+        arrays = (self.gram_offsets, self.gram_terms, self.term_grams, self.term_offsets, self.term_rows)
+        strings = sum(len(term) + 50 for term in self.vocabulary) + 60 * len(self.gram_ids)
+        return sum(array.nbytes for array in arrays) + strings
+
+    def similar_terms(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the indexed terms closest to a term by trigram similarity.
+
+        Args:
+            term: Lowercase query term
+
+        Returns:
+            Tuple of (term ids, similarities) of at most max_expansions terms with
+            similarity of at least min_similarity, best first
+        """
+        grams = trigrams(term)
+        known = [self.gram_ids[gram] for gram in grams if gram in self.gram_ids]
+        if not known:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        candidates = np.concatenate([self.gram_terms[self.gram_offsets[g]:self.gram_offsets[g + 1]] for g in known])
+        terms, shared = np.unique(candidates, return_counts=True)
+        similarity = shared / (len(grams) + self.term_grams[terms] - shared)
+        keep = similarity >= self.min_similarity
+        terms, similarity = terms[keep], similarity[keep]
+        top = top_k_indices(similarity, self.max_expansions)
+        return terms[top], similarity[top]
+
+    def search(self, query: str, top_k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Rank rows by how closely their title and keyword terms match the query terms.
+
+        Args:
+            query: Search query
+            top_k: Number of results to return
+            rows: Optional sorted row ids to restrict the results to
+
+        Returns:
+            List of tuples (row id, similarity) sorted by similarity, where similarity
+            is the mean over query terms of the best matching term of the row (0-1)
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        row_parts, score_parts = [], []
+        for token in tokens:
+            terms, similarities = self.similar_terms(token)
+            if not len(terms):
+                continue
+            starts, ends = self.term_offsets[terms], self.term_offsets[terms + 1]
+            matched = np.concatenate([self.term_rows[start:end] for start, end in zip(starts, ends)])
+            scores = np.repeat(similarities, ends - starts)
+
+            # Keep the best matching term of every row for this query term
+            order = np.lexsort((-scores, matched))
+            matched, scores = matched[order], scores[order]
+            first = np.flatnonzero(np.concatenate([[True], matched[1:] != matched[:-1]]))
+            row_parts.append(matched[first])
+            score_parts.append(scores[first])
+        if not row_parts:
+            return []
+
+        unique_rows, inverse = np.unique(np.concatenate(row_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts)) / len(tokens)
+
+        if rows is not None:
+            keep = np.zeros(len(unique_rows), dtype=bool)
+            if len(rows):
+                positions = np.minimum(np.searchsorted(rows, unique_rows), len(rows) - 1)
+                keep = rows[positions] == unique_rows
+            unique_rows, scores = unique_rows[keep], scores[keep]
+
+        top = top_k_indices(scores, top_k)
+        return [(int(unique_rows[i]), float(scores[i])) for i in top]
@@ -0,0 +1,137 @@
+import time
+import threading
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, Optional
+
+from .metrics import MetricsRegistry, NULL_METRICS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """
+    Daemon thread that probes S3 on an interval and caches the last result, so
+    status requests are answered from memory. While probes fail, the delay
+    between them doubles up to max_backoff.
+    """
+
+    def __init__(self, probe: Callable[[], Dict[str, Any]], interval: float, max_backoff: float,
+                 metrics: MetricsRegistry = NULL_METRICS):
+        """
+        Initialize the monitor.
+
+        Args:
+            probe: Function returning a connection status with a 'connected' flag
+            interval: Seconds between probes while healthy
+            max_backoff: Upper bound in seconds on the delay while unhealthy
+            metrics: Registry for probe latency and failure counts
+        """
+        self.probe = probe
+        self.interval = interval
+        self.max_backoff = max(max_backoff, interval)
+        self.metrics = metrics
+        self.consecutive_failures = 0
+        self._status: Optional[Dict[str, Any]] = None
+        self._checked_at: Optional[float] = None
+        self._probe_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the monitor thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the monitor thread (no-op if it is already running)."""
+        if self.running:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+        self._thread.start()
+        logger.info(f"Health monitor started (every {self.interval}s, backoff up to {self.max_backoff}s)")
+
+    def trigger(self):
+        """Probe now instead of waiting for the next interval."""
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop the monitor thread.
+
+        Args:
+            timeout: Seconds to wait for the thread to exit
+        """
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        logger.info("Health monitor stopped")
+
+    def next_delay(self) -> float:
+        """Get the seconds until the next probe, backing off while probes fail."""
+        if self.consecutive_failures == 0:
+            return self.interval
+        return min(self.interval * 2 ** self.consecutive_failures, self.max_backoff)
+
+    def check_now(self) -> Dict[str, Any]:
+        """
+        Run a probe and cache its result. Concurrent callers share one probe.
+
+        Returns:
+            The probed connection status
+        """
+        checked_at = self._checked_at
+        with self._probe_lock:
+            # Another caller probed while we waited for the lock
+            if self._checked_at != checked_at:
+                return self._status
+
+            with self.metrics.timer('health.probe'):
+                try:
+                    status = self.probe()
+                except Exception as e:
+                    status = {'connected': False, 'error': f"Health probe error: {e}"}
+
+            if status.get('connected') and not status.get('error'):
+                if self.consecutive_failures:
+                    logger.info("S3 health probe recovered")
+                self.consecutive_failures = 0
+            else:
+                self.consecutive_failures += 1
+                self.metrics.increment('health.probe_failures')
+                logger.warning(f"S3 health probe failed ({self.consecutive_failures} in a row): "
+                               f"{status.get('error')}")
+
+            self._status = status
+            self._checked_at = time.time()
+            return status
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the last probed status without touching S3. Without a running monitor
+        thread, a probe runs inline when there is no result yet or it is older than
+        the interval.
+
+        Returns:
+            Connection status with checked_at, age_seconds and consecutive_failures
+        """
+        if self._status is None or (not self.running and time.time() - self._checked_at > self.interval):
+            self.check_now()
+
+        checked_at = self._checked_at
+        status = dict(self._status)
+        status['checked_at'] = datetime.fromtimestamp(checked_at, timezone.utc).isoformat()
+        status['age_seconds'] = round(time.time() - checked_at, 1)
+        status['consecutive_failures'] = self.consecutive_failures
+        status['next_check_seconds'] = self.next_delay()
+        return status
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.check_now()
+            self._wake.wait(self.next_delay())
+            self._wake.clear()
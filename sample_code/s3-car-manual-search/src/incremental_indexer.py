@@ -0,0 +1,670 @@
+import time
+import queue
+import threading
+import numpy as np
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+from .manual_processor import ManualProcessor
+from .embedding_service import EmbeddingService
+from .s3_vector_service import S3VectorService
+from .keyword_index import BM25Index, BM25Builder, section_tokens
+from .section_stream import iter_sections
+from .projection import fit_projection, project_embeddings
+from .section_store import pack_sections, read_shard_sections
+from .metadata_table import MetadataTable, read_shard_metadata
+from .manifest import (
+    content_hash, new_manifest, shard_name, shard_entry, state_key,
+    keyword_index_key, manifest_version_key, stamp, live_masks, manifest_keys,
+    passage_settings, coarse_dimensions, coarse_changed, projection_key
+)
+from config import (
+    LOCAL_MANUAL_FILE, MANIFEST_RETAINED_VERSIONS,
+    INGEST_BATCH_SIZE, INGEST_SHARD_ROWS, INGEST_QUEUE_DEPTH, INGEST_UPLOAD_WORKERS
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for a failed stage while a pipeline stage waits on a queue
+_QUEUE_POLL_SECONDS = 0.1
+
+
+def _put(items: queue.Queue, item: Any, failed: threading.Event) -> bool:
+    """Put an item on a bounded queue, giving up once another stage has failed."""
+    while not failed.is_set():
+        try:
+            items.put(item, timeout=_QUEUE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(items: queue.Queue, failed: threading.Event) -> Any:
+    """Get the next item from a queue, or None once another stage has failed."""
+    while not failed.is_set():
+        try:
+            return items.get(timeout=_QUEUE_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return None
+
+
+class IncrementalIndexer:
+    """
+    Publishes manual sections to S3 as immutable shards tracked by a manifest.
+    Only new or changed sections (by content hash) are embedded and written as
+    a new shard; removed sections become tombstones until the next compaction.
+    """
+
+    def __init__(self, manual_processor: ManualProcessor,
+                 embedding_service: EmbeddingService,
+                 s3_service: S3VectorService):
+        """
+        Initialize the indexer.
+
+        Args:
+            manual_processor: Processor used to load and prepare sections
+            embedding_service: Service used to embed changed sections
+            s3_service: Service used to read and write artifacts
+        """
+        self.manual_processor = manual_processor
+        self.embedding_service = embedding_service
+        self.s3_service = s3_service
+
+    def _load_state(self, manifest: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Load the content hashes and shard section ids of a manifest.
+
+        Args:
+            manifest: Manifest dictionary
+
+        Returns:
+            State dictionary or None if it could not be loaded
+        """
+        if not manifest.get('state'):
+            return {'hashes': {}, 'shard_ids': {}}
+        return self.s3_service.download_json_data(manifest['state'])
+
+    def _embed(self, sections: List[Dict[str, Any]],
+               show_progress_bar: bool = True) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Embed sections, or all of their passages in one batch in passage mode.
+
+        Args:
+            sections: Sections to embed
+            show_progress_bar: Whether the encoder shows a progress bar
+
+        Returns:
+            Tuple of (embeddings, passage offsets or None in section mode)
+        """
+        settings = passage_settings()
+        if settings is None:
+            texts = [self.manual_processor.prepare_text_for_embedding(section) for section in sections]
+            return self.embedding_service.generate_embeddings_batch(
+                texts, show_progress_bar=show_progress_bar), None
+
+        texts, offsets = self.manual_processor.get_passages_for_embedding(
+            sections, settings['max_tokens'], settings['overlap_tokens']
+        )
+        return self.embedding_service.generate_embeddings_batch(
+            texts, show_progress_bar=show_progress_bar), offsets
+
+    def _projection(self, base: Dict[str, Any], version: int,
+                    embeddings: Optional[np.ndarray]) -> Optional[Tuple[Dict[str, Any], np.ndarray]]:
+        """
+        Get the PCA projection the shards of a version are reduced with: the one
+        the base manifest already uses, or a new one fitted on embeddings.
+
+        Args:
+            base: Manifest the new version builds on
+            version: New manifest version
+            embeddings: Float32 embeddings to fit on when base has no projection
+
+        Returns:
+            Tuple of (manifest coarse entry, component matrix) or None if unavailable
+        """
+        coarse = base.get('coarse')
+        if coarse:
+            components = self.s3_service.download_embeddings(coarse['projection'])
+            if components is None:
+                logger.error(f"Failed to load projection {coarse['projection']}")
+                return None
+            return coarse, np.asarray(components, dtype=np.float32)
+
+        coarse = {'dimensions': coarse_dimensions(), 'projection': projection_key(version)}
+        try:
+            components = fit_projection(embeddings, coarse['dimensions'])
+        except ValueError as e:
+            logger.error(f"Failed to fit projection: {e}")
+            return None
+        if not self.s3_service.upload_embeddings(components, coarse['projection']):
+            return None
+        return coarse, components
+
+    def _write_shard(self, shard_id: str, sections: List[Dict[str, Any]],
+                     embeddings: np.ndarray,
+                     passage_offsets: Optional[np.ndarray] = None,
+                     components: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """
+        Upload the artifacts of one shard.
+
+        Args:
+            shard_id: Shard identifier
+            sections: Sections in the shard
+            embeddings: Float32 embeddings of the sections (or of their passages)
+            passage_offsets: Passage rows of section i are offsets[i]:offsets[i + 1]
+            components: Projection for the reduced vectors of two-stage search
+
+        Returns:
+            Shard entry for the manifest or None if an upload failed
+        """
+        entry = shard_entry(shard_id, len(sections))
+        codec = entry.get('compression')
+        quantized = entry.get('quantized')
+
+        # Full-precision rows of quantized shards are read by row range for
+        # re-ranking, so they stay uncompressed
+        if not self.s3_service.upload_embeddings(embeddings, entry['embeddings'],
+                                                 None if quantized else codec):
+            return None
+        if quantized and not self.s3_service.upload_quantized_embeddings(
+                embeddings, quantized['dtype'], key=quantized['embeddings'],
+                scales_key=quantized.get('scales'), codec=codec):
+            return None
+        if entry.get('reduced'):
+            if components is None:
+                logger.error(f"No projection for the reduced vectors of shard {shard_id}")
+                return None
+            if not self.s3_service.upload_embeddings(project_embeddings(embeddings, components),
+                                                     entry['reduced'], codec):
+                return None
+        if passage_offsets is not None:
+            entry['passages'] = int(passage_offsets[-1])
+
+        metadata = MetadataTable.from_records(sections, passage_offsets)
+        if not self.s3_service.upload_bytes(metadata.to_bytes(), entry['metadata_columns'], codec=codec):
+            return None
+        blob, offsets = pack_sections(sections, codec)
+        if not self.s3_service.upload_bytes(blob, entry['section_blob']):
+            return None
+        if not self.s3_service.upload_embeddings(offsets, entry['section_offsets'], codec):
+            return None
+
+        logger.info(f"Wrote shard {shard_id} with {len(sections)} sections")
+        return entry
+
+    def _expire_versions(self, version: int):
+        """
+        Delete the artifacts of the manifest version that just fell out of the
+        retention window. Readers still serving a retained version keep every
+        artifact it references.
+
+        Args:
+            version: Newly published manifest version
+        """
+        expired_version = version - MANIFEST_RETAINED_VERSIONS
+        if expired_version < 1:
+            return
+        expired = self.s3_service.download_manifest(expired_version)
+        if expired is None:
+            return
+
+        # Keep everything if a retained version cannot be read; leaking beats deleting live data
+        retained = set()
+        for retained_version in range(expired_version + 1, version + 1):
+            manifest = self.s3_service.download_manifest(retained_version)
+            if manifest is None:
+                logger.warning(f"Manifest version {retained_version} unavailable, skipping expiry")
+                return
+            retained |= manifest_keys(manifest)
+
+        for key in manifest_keys(expired) - retained:
+            self.s3_service.delete_object(key)
+        self.s3_service.delete_object(manifest_version_key(expired_version))
+        logger.info(f"Expired manifest version {expired_version}")
+
+    def _publish(self, version: int, shards: List[Dict[str, Any]], shard_ids: Dict[str, List[str]],
+                 tombstones: set, hashes: Dict[str, str],
+                 keyword_index: Optional[BM25Index] = None,
+                 keyword_index_ref: Optional[str] = None,
+                 coarse: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Upload the state and keyword index of a version, then swap the manifest.
+
+        Args:
+            version: New manifest version
+            shards: Shard entries in load order
+            shard_ids: Section ids of every shard
+            tombstones: Deleted section ids
+            hashes: Content hash of every live section
+            keyword_index: Keyword index to upload for this version
+            keyword_index_ref: Existing keyword index key to reuse instead
+            coarse: Dimension and projection key of the shards' reduced vectors
+
+        Returns:
+            The published manifest or None if publishing failed
+        """
+        masks = live_masks([shard_ids[shard['id']] for shard in shards], tombstones)
+        manifest = new_manifest()
+        manifest.update({
+            'version': version,
+            'shards': shards,
+            'tombstones': sorted(tombstones),
+            'state': state_key(version),
+            'keyword_index': keyword_index_ref,
+            'coarse': coarse,
+            'live_rows': int(sum(mask.sum() for mask in masks)),
+            'total_rows': int(sum(len(mask) for mask in masks))
+        })
+
+        state = {'hashes': hashes, 'shard_ids': {shard['id']: shard_ids[shard['id']] for shard in shards}}
+        if not self.s3_service.upload_json_data(state, manifest['state']):
+            return None
+        if keyword_index is not None:
+            manifest['keyword_index'] = keyword_index_key(version)
+            if not self.s3_service.upload_bytes(keyword_index.to_bytes(), manifest['keyword_index'],
+                                                codec=manifest['compression']):
+                return None
+
+        if not self.s3_service.upload_manifest(stamp(manifest)):
+            return None
+        logger.info(f"Published manifest version {version}: "
+                    f"{manifest['live_rows']} live rows in {len(shards)} shards")
+
+        self._expire_versions(version)
+        return manifest
+
+    @staticmethod
+    def _live_order(shards: List[Dict[str, Any]], shard_ids: Dict[str, List[str]],
+                    tombstones: set) -> List[str]:
+        """Get live section ids in the row order readers load them in."""
+        masks = live_masks([shard_ids[shard['id']] for shard in shards], tombstones)
+        ordered = []
+        for shard, mask in zip(shards, masks):
+            ids = shard_ids[shard['id']]
+            ordered.extend(ids[row] for row in np.flatnonzero(mask))
+        return ordered
+
+    def upsert(self, file_path: str = LOCAL_MANUAL_FILE, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Publish the sections of a manual file, embedding only what changed.
+
+        Args:
+            file_path: Path to the manual data JSON file
+            rebuild: If True, ignore the current manifest and re-embed everything
+
+        Returns:
+            Report with counts of added, changed and deleted sections
+        """
+        report = {'success': False, 'added': 0, 'changed': 0, 'deleted': 0, 'unchanged': 0}
+
+        previous = self.s3_service.download_manifest()
+        if previous is not None and previous.get('passages') != passage_settings():
+            logger.info("Passage settings changed, re-embedding all sections")
+            rebuild = True
+        if previous is not None and coarse_changed(previous):
+            logger.info("Coarse search dimension changed, re-embedding all sections")
+            rebuild = True
+        base = new_manifest() if rebuild or previous is None else previous
+        state = self._load_state(base)
+        if state is None:
+            logger.error("Failed to load ingestion state")
+            return report
+
+        sections = self.manual_processor.load_manual_data(file_path)
+        if not sections:
+            logger.error("No manual sections loaded")
+            return report
+
+        # Compare content hashes against the published state
+        hashes, changed = {}, []
+        for section in sections:
+            section_hash = content_hash(self.manual_processor.prepare_text_for_embedding(section))
+            hashes[section['id']] = section_hash
+            old_hash = state['hashes'].get(section['id'])
+            if old_hash != section_hash:
+                changed.append(section)
+                report['added' if old_hash is None else 'changed'] += 1
+        deleted = set(state['hashes']) - set(hashes)
+        report['deleted'] = len(deleted)
+        report['unchanged'] = len(sections) - len(changed)
+
+        if not changed and not deleted and previous is not None and not rebuild:
+            logger.info("Manifest is up to date, nothing to publish")
+            report.update(success=True, version=previous['version'])
+            return report
+
+        version = max(base['version'], previous['version'] if previous else 0) + 1
+        shards = list(base['shards'])
+        shard_ids = dict(state['shard_ids'])
+
+        coarse, components = base.get('coarse'), None
+        if changed:
+            embeddings, passage_offsets = self._embed(changed)
+            if coarse_dimensions():
+                projection = self._projection(base, version, embeddings)
+                if projection is None:
+                    return report
+                coarse, components = projection
+            shard = self._write_shard(shard_name(version), changed, embeddings, passage_offsets,
+                                      components)
+            if shard is None:
+                logger.error("Failed to write shard")
+                return report
+            shards.append(shard)
+            shard_ids[shard['id']] = [section['id'] for section in changed]
+
+        tombstones = (set(base['tombstones']) | deleted) - {section['id'] for section in changed}
+
+        # Keyword index rows must follow the order readers load live rows in
+        by_id = {section['id']: section for section in sections}
+        ordered = [by_id[section_id] for section_id in self._live_order(shards, shard_ids, tombstones)]
+        manifest = self._publish(version, shards, shard_ids, tombstones, hashes,
+                                 keyword_index=BM25Index.from_sections(ordered), coarse=coarse)
+        if manifest is None:
+            return report
+
+        report.update(
+            success=True,
+            version=version,
+            live_rows=manifest['live_rows'],
+            dead_fraction=1.0 - manifest['live_rows'] / max(manifest['total_rows'], 1)
+        )
+        logger.info(f"Upsert complete: {report}")
+        return report
+
+    @staticmethod
+    def _merge_batches(parts: List[Tuple[List[Dict[str, Any]], np.ndarray, Optional[np.ndarray]]]
+                       ) -> Tuple[List[Dict[str, Any]], np.ndarray, Optional[np.ndarray]]:
+        """Join embedded batches of (sections, embeddings, passage offsets) into one shard."""
+        sections = [section for part_sections, _, _ in parts for section in part_sections]
+        embeddings = np.concatenate([part_embeddings for _, part_embeddings, _ in parts])
+        if parts[0][2] is None:
+            return sections, embeddings, None
+        counts = np.concatenate([np.diff(offsets) for _, _, offsets in parts])
+        return sections, embeddings, np.concatenate([[0], np.cumsum(counts)])
+
+    def stream_rebuild(self, file_path: str = LOCAL_MANUAL_FILE, batch_size: int = INGEST_BATCH_SIZE,
+                       shard_rows: int = INGEST_SHARD_ROWS, queue_depth: int = INGEST_QUEUE_DEPTH,
+                       upload_workers: int = INGEST_UPLOAD_WORKERS) -> Dict[str, Any]:
+        """
+        Publish every section of a manual file as a new version, replacing everything
+        the current manifest lists, without loading the file into memory.
+
+        A reader thread parses sections one at a time and hands them on in batches,
+        this thread embeds each batch and collects full shards, and upload threads
+        write shards while later batches are embedded. The queues between the stages
+        hold at most queue_depth items each, which bounds the sections and embedding
+        buffers in flight by the batch and shard sizes. Memory is not flat in the
+        file size, though: the section ids, content hashes and BM25 postings of every
+        section are kept until the version is published, since the published state
+        and keyword index cover the whole file.
+
+        Args:
+            file_path: Path to the manual data file (JSON or JSON Lines)
+            batch_size: Sections embedded per encoder call
+            shard_rows: Sections per shard
+            queue_depth: Batches (and shards) that may wait between two stages
+            upload_workers: Threads uploading shards
+
+        Returns:
+            Report with the published version, section and shard counts
+        """
+        report = {'success': False, 'added': 0, 'shards': 0}
+        started = time.perf_counter()
+        previous = self.s3_service.download_manifest()
+        version = (previous['version'] if previous else 0) + 1
+
+        batches = queue.Queue(maxsize=queue_depth)
+        shard_queue = queue.Queue(maxsize=queue_depth)
+        failed = threading.Event()
+        errors = []
+        hashes = {}
+        keywords = BM25Builder()
+        uploaded, attempted, shard_ids = {}, [], {}
+        # The coarse search projection is fitted on the first shard
+        projection = []
+
+        def fail(message: str):
+            logger.error(message)
+            errors.append(message)
+            failed.set()
+
+        def read():
+            batch = []
+            try:
+                for section in iter_sections(file_path):
+                    section_id = section['id']
+                    if section_id in hashes:
+                        raise ValueError(f"duplicate section id {section_id!r}")
+                    hashes[section_id] = content_hash(self.manual_processor.prepare_text_for_embedding(section))
+                    keywords.add(section_tokens(section))
+                    batch.append(section)
+                    # Batches never straddle a shard boundary
+                    if len(batch) == batch_size or len(hashes) % shard_rows == 0:
+                        if not _put(batches, batch, failed):
+                            return
+                        batch = []
+                if batch and not _put(batches, batch, failed):
+                    return
+                _put(batches, None, failed)
+            except Exception as e:
+                fail(f"Failed to read {file_path}: {e}")
+
+        def upload():
+            while True:
+                item = _get(shard_queue, failed)
+                if item is None:
+                    return
+                sequence, sections, embeddings, passage_offsets = item
+                shard_id = shard_name(version, sequence)
+                attempted.append(shard_entry(shard_id, len(sections)))
+                try:
+                    entry = self._write_shard(shard_id, sections, embeddings, passage_offsets,
+                                              projection[0][1] if projection else None)
+                except Exception as e:
+                    logger.error(f"Error writing shard {shard_id}: {e}")
+                    entry = None
+                if entry is None:
+                    fail(f"Failed to write shard {shard_id}")
+                    return
+                uploaded[sequence] = entry
+                shard_ids[shard_id] = [section['id'] for section in sections]
+
+        def queue_shard(sequence: int, parts: List[Tuple]) -> bool:
+            sections, embeddings, passage_offsets = self._merge_batches(parts)
+            if coarse_dimensions() and not projection:
+                fitted = self._projection(new_manifest(), version, embeddings)
+                if fitted is None:
+                    fail("Failed to fit the coarse search projection")
+                    return False
+                projection.append(fitted)
+            return _put(shard_queue, (sequence, sections, embeddings, passage_offsets), failed)
+
+        workers = [threading.Thread(target=read, name='ingest-reader', daemon=True)]
+        workers += [threading.Thread(target=upload, name=f'ingest-upload-{i}', daemon=True)
+                    for i in range(max(1, upload_workers))]
+        for worker in workers:
+            worker.start()
+
+        # Embed batches on this thread and queue every full shard for upload
+        sequence, parts, rows = 0, [], 0
+        try:
+            while True:
+                batch = _get(batches, failed)
+                if batch is None:
+                    break
+                embeddings, passage_offsets = self._embed(batch, show_progress_bar=False)
+                parts.append((batch, embeddings, passage_offsets))
+                rows += len(batch)
+                if rows == shard_rows:
+                    if not queue_shard(sequence, parts):
+                        break
+                    sequence, parts, rows = sequence + 1, [], 0
+            if parts and not failed.is_set():
+                queue_shard(sequence, parts)
+        except Exception as e:
+            fail(f"Failed to embed sections: {e}")
+        for _ in workers[1:]:
+            _put(shard_queue, None, failed)
+        for worker in workers:
+            worker.join()
+
+        if not failed.is_set() and not hashes:
+            fail(f"No manual sections in {file_path}")
+        if failed.is_set():
+            # Nothing references the shards written so far
+            coarse = projection[0][0] if projection else None
+            for key in manifest_keys({'shards': attempted, 'coarse': coarse}):
+                self.s3_service.delete_object(key)
+            report['error'] = errors[0]
+            return report
+
+        shards = [uploaded[sequence] for sequence in sorted(uploaded)]
+        manifest = self._publish(version, shards, shard_ids, set(), hashes,
+                                 keyword_index=keywords.build(),
+                                 coarse=projection[0][0] if projection else None)
+        if manifest is None:
+            return report
+
+        seconds = time.perf_counter() - started
+        report.update(success=True, added=len(hashes), shards=len(shards), version=version,
+                      live_rows=manifest['live_rows'], seconds=round(seconds, 2))
+        logger.info(f"Streamed {len(hashes)} sections into {len(shards)} shards in {seconds:.1f}s "
+                    f"({len(hashes) / max(seconds, 1e-9):.0f} sections/s)")
+        return report
+
+    def publish(self, sections: List[Dict[str, Any]], embeddings: np.ndarray,
+                shard_rows: int = 0) -> Dict[str, Any]:
+        """
+        Publish sections with precomputed section embeddings as a new version,
+        replacing everything the current manifest lists.
+
+        Args:
+            sections: Sections to publish
+            embeddings: Float32 embedding of every section (one row per section)
+            shard_rows: Sections per shard (0 writes a single shard)
+
+        Returns:
+            Report with the published version and row count
+        """
+        report = {'success': False, 'added': len(sections)}
+        if passage_settings() is not None:
+            logger.error("Precomputed embeddings can only be published in section mode")
+            return report
+        if len(sections) != len(embeddings):
+            logger.error(f"Got {len(embeddings)} embeddings for {len(sections)} sections")
+            return report
+
+        previous = self.s3_service.download_manifest()
+        version = (previous['version'] if previous else 0) + 1
+        shard_rows = shard_rows or len(sections)
+
+        coarse, components = None, None
+        if coarse_dimensions():
+            projection = self._projection(new_manifest(), version, embeddings)
+            if projection is None:
+                return report
+            coarse, components = projection
+
+        shards, shard_ids = [], {}
+        for sequence, start in enumerate(range(0, len(sections), shard_rows)):
+            part = sections[start:start + shard_rows]
+            shard = self._write_shard(shard_name(version, sequence), part,
+                                      embeddings[start:start + shard_rows], components=components)
+            if shard is None:
+                logger.error("Failed to write shard")
+                return report
+            shards.append(shard)
+            shard_ids[shard['id']] = [section['id'] for section in part]
+
+        hashes = {
+            section['id']: content_hash(self.manual_processor.prepare_text_for_embedding(section))
+            for section in sections
+        }
+        manifest = self._publish(version, shards, shard_ids, set(), hashes,
+                                 keyword_index=BM25Index.from_sections(sections), coarse=coarse)
+        if manifest is None:
+            return report
+
+        report.update(success=True, version=version, live_rows=manifest['live_rows'])
+        return report
+
+    def compact(self) -> bool:
+        """
+        Merge all shards into one, dropping superseded rows and tombstones.
+        No section is re-embedded.
+
+        Returns:
+            True if compaction succeeded (or there was nothing to compact)
+        """
+        previous = self.s3_service.download_manifest()
+        if previous is None:
+            logger.warning("No manifest to compact")
+            return True
+        if len(previous['shards']) <= 1 and not previous['tombstones']:
+            logger.info("Manifest is already compact")
+            return True
+
+        if previous.get('passages') != passage_settings():
+            logger.error("Passage settings changed since the last upload; run an upsert to rebuild")
+            return False
+        if coarse_changed(previous):
+            logger.error("Coarse search dimension changed since the last upload; run an upsert to rebuild")
+            return False
+
+        state = self._load_state(previous)
+        if state is None:
+            logger.error("Failed to load ingestion state")
+            return False
+
+        masks = live_masks([state['shard_ids'][shard['id']] for shard in previous['shards']],
+                           set(previous['tombstones']))
+        embeddings, sections, passage_counts = [], [], []
+        for shard, mask in zip(previous['shards'], masks):
+            if not mask.any():
+                continue
+            shard_embeddings = self.s3_service.download_embeddings(shard['embeddings'])
+            shard_sections = read_shard_sections(self.s3_service, shard)
+            if shard_embeddings is None or shard_sections is None:
+                logger.error(f"Failed to read shard {shard['id']}")
+                return False
+
+            # In passage mode, keep every passage of the live sections
+            row_mask = mask
+            if previous.get('passages'):
+                shard_metadata = read_shard_metadata(self.s3_service, shard)
+                if shard_metadata is None:
+                    logger.error(f"Failed to read shard {shard['id']}")
+                    return False
+                counts = np.diff(shard_metadata.passage_offsets)
+                row_mask = np.repeat(mask, counts)
+                passage_counts.append(counts[mask])
+
+            embeddings.append(np.asarray(shard_embeddings)[row_mask])
+            sections.extend(shard_sections[row] for row in np.flatnonzero(mask))
+
+        passage_offsets = None
+        if passage_counts:
+            passage_offsets = np.concatenate([[0], np.cumsum(np.concatenate(passage_counts))])
+
+        version = previous['version'] + 1
+        components = None
+        if previous.get('coarse'):
+            projection = self._projection(previous, version, None)
+            if projection is None:
+                return False
+            components = projection[1]
+        shard = self._write_shard(shard_name(version), sections, np.concatenate(embeddings),
+                                  passage_offsets, components)
+        if shard is None:
+            return False
+
+        # Live row order is unchanged, so the keyword index can be reused
+        manifest = self._publish(
+            version, [shard], {shard['id']: [section['id'] for section in sections]},
+            set(), state['hashes'], keyword_index_ref=previous.get('keyword_index'),
+            coarse=previous.get('coarse')
+        )
+        return manifest is not None
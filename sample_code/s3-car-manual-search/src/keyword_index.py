@@ -0,0 +1,256 @@
+import io
+import re
+from array import array
+import numpy as np
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Tuple, Iterable, Optional
+from .vector_index import top_k_indices
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase alphanumeric tokens.
+
+    Args:
+        text: Input text
+
+    Returns:
+        List of tokens
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def section_tokens(section: Dict[str, Any]) -> List[str]:
+    """
+    Get the searchable tokens of a manual section (title, content and keywords).
+
+    Args:
+        section: Manual section data
+
+    Returns:
+        List of tokens
+    """
+    keywords = ' '.join(section.get('keywords', []))
+    return tokenize(f"{section.get('title', '')} {section.get('content', '')} {keywords}")
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse several ranked lists of row ids with reciprocal rank fusion.
+
+    Args:
+        rankings: Ranked lists of row ids (best first)
+        k: RRF smoothing constant
+
+    Returns:
+        List of tuples (row id, fused score) sorted by score
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking, 1):
+            fused[row] = fused.get(row, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Inverted index with precomputed BM25 weights.
+    Postings are stored as flat numpy arrays grouped by term, so a query only
+    touches the postings of its own terms.
+    """
+
+    def __init__(self, vocabulary: List[str], term_offsets: np.ndarray,
+                 doc_ids: np.ndarray, weights: np.ndarray, num_docs: int):
+        """
+        Initialize the index from its posting arrays (use BM25Index.build to create one).
+
+        Args:
+            vocabulary: Terms, in term id order
+            term_offsets: Start of each term's postings (length len(vocabulary) + 1)
+            doc_ids: Document (row) id of each posting
+            weights: BM25 weight of each posting
+            num_docs: Number of indexed documents
+        """
+        self.vocabulary = list(vocabulary)
+        self.term_ids = {term: i for i, term in enumerate(self.vocabulary)}
+        self.term_offsets = term_offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.num_docs = num_docs
+
+    @classmethod
+    def build(cls, documents: Iterable[List[str]], k1: float = 1.2, b: float = 0.75) -> 'BM25Index':
+        """
+        Build an index from tokenized documents.
+
+        Args:
+            documents: Token lists, one per row
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+
+        Returns:
+            BM25Index instance
+        """
+        builder = BM25Builder()
+        for tokens in documents:
+            builder.add(tokens)
+        return builder.build(k1, b)
+
+    @classmethod
+    def from_sections(cls, sections: List[Dict[str, Any]]) -> 'BM25Index':
+        """
+        Build an index over manual sections.
+
+        Args:
+            sections: List of manual sections
+
+        Returns:
+            BM25Index instance
+        """
+        return cls.build(section_tokens(section) for section in sections)
+
+    def search(self, query: str, top_k: int, rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Rank documents for a query with BM25.
+
+        Args:
+            query: Search query
+            top_k: Number of results to return
+            rows: Optional sorted row ids to restrict the results to
+
+        Returns:
+            List of tuples (row id, bm25 score) sorted by score
+        """
+        term_ids = [self.term_ids[t] for t in set(tokenize(query)) if t in self.term_ids]
+        if not term_ids:
+            return []
+
+        slices = [slice(self.term_offsets[t], self.term_offsets[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.doc_ids[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+
+        # Sum contributions per document without touching unmatched documents
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+
+        if rows is not None:
+            keep = np.zeros(len(unique_docs), dtype=bool)
+            if len(rows):
+                positions = np.minimum(np.searchsorted(rows, unique_docs), len(rows) - 1)
+                keep = rows[positions] == unique_docs
+            unique_docs, scores = unique_docs[keep], scores[keep]
+
+        top = top_k_indices(scores, top_k)
+        return [(int(unique_docs[i]), float(scores[i])) for i in top]
+
+    def missing_terms(self, query: str) -> List[str]:
+        """
+        Get the query terms that occur in no document (often misspellings).
+
+        Args:
+            query: Search query
+
+        Returns:
+            List of unknown terms
+        """
+        return [term for term in dict.fromkeys(tokenize(query)) if term not in self.term_ids]
+
+    def to_bytes(self) -> bytes:
+        """Serialize the index to .npz bytes."""
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            vocabulary=np.asarray(self.vocabulary, dtype=str),
+            term_offsets=self.term_offsets,
+            doc_ids=self.doc_ids,
+            weights=self.weights,
+            num_docs=np.asarray(self.num_docs)
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BM25Index':
+        """Deserialize an index produced by to_bytes."""
+        with np.load(io.BytesIO(data)) as arrays:
+            return cls(
+                arrays['vocabulary'].tolist(),
+                arrays['term_offsets'],
+                arrays['doc_ids'],
+                arrays['weights'],
+                int(arrays['num_docs'])
+            )
+
+
+class BM25Builder:
+    """
+    Accumulates BM25 postings one document at a time, so an index can be built
+    while documents stream past without keeping their text. Postings are kept in
+    compact typed arrays until build() turns them into a BM25Index.
+    """
+
+    def __init__(self):
+        self.term_ids: Dict[str, int] = {}
+        self.posting_terms = array('i')
+        self.posting_docs = array('i')
+        self.posting_tfs = array('i')
+        self.doc_lengths = array('i')
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, tokens: List[str]):
+        """
+        Add the next document (row).
+
+        Args:
+            tokens: Document tokens
+        """
+        doc_id = len(self.doc_lengths)
+        self.doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            self.posting_terms.append(self.term_ids.setdefault(term, len(self.term_ids)))
+            self.posting_docs.append(doc_id)
+            self.posting_tfs.append(tf)
+
+    def build(self, k1: float = 1.2, b: float = 0.75) -> BM25Index:
+        """
+        Build the index over all added documents.
+
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+
+        Returns:
+            BM25Index instance
+        """
+        num_docs = len(self.doc_lengths)
+        terms = np.asarray(self.posting_terms, dtype=np.int32)
+        docs = np.asarray(self.posting_docs, dtype=np.int32)
+        tfs = np.asarray(self.posting_tfs, dtype=np.float32)
+        lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+
+        # Group postings by term
+        order = np.argsort(terms, kind='stable')
+        terms, docs, tfs = terms[order], docs[order], tfs[order]
+        doc_freq = np.bincount(terms, minlength=len(self.term_ids))
+        term_offsets = np.zeros(len(self.term_ids) + 1, dtype=np.int64)
+        np.cumsum(doc_freq, out=term_offsets[1:])
+
+        # Precompute the BM25 contribution of every posting
+        avg_length = float(lengths.mean()) if num_docs else 0.0
+        idf = np.log(1.0 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        norm = k1 * (1.0 - b + b * lengths[docs] / (avg_length or 1.0))
+        weights = (idf[terms] * tfs * (k1 + 1.0) / (tfs + norm)).astype(np.float32)
+
+        vocabulary = [None] * len(self.term_ids)
+        for term, term_id in self.term_ids.items():
+            vocabulary[term_id] = term
+
+        logger.info(f"Built BM25 index: {num_docs} documents, {len(vocabulary)} terms, {len(docs)} postings")
+        return BM25Index(vocabulary, term_offsets, docs, weights, num_docs)
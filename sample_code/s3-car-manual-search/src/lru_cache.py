@@ -0,0 +1,148 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+
+from .metrics import MetricsRegistry, NULL_METRICS
+
+
+class LRUCache:
+    """
+    Thread-safe bounded LRU mapping with optional expiry and hit counting.
+
+    Once more than max_size entries are stored the least recently used ones are
+    evicted; with a ttl, entries also expire ttl seconds after they were stored.
+    Hits, misses, expirations and evictions are counted on the instance and, when
+    the cache has a name, as '<name>.hits' etc. counters of the metrics registry.
+    """
+
+    def __init__(self, max_size: int, ttl: float = 0, name: Optional[str] = None,
+                 metrics: MetricsRegistry = NULL_METRICS, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Most entries kept (0 disables the cache)
+            ttl: Seconds an entry stays valid (0 keeps entries until evicted)
+            name: Prefix of the metrics counters (None records none)
+            metrics: Registry for hit, miss, expiry and eviction counters
+            clock: Time source, in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self.metrics = metrics
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def _count(self, event: str, amount: int = 1):
+        if self.name and amount:
+            self.metrics.increment(f'{self.name}.{event}', amount)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key: Entry key
+
+        Returns:
+            The cached value or None on a miss (including expired entries)
+        """
+        if self.max_size <= 0:
+            return None
+
+        expired = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl > 0 and self.clock() - entry[1] > self.ttl:
+                del self._entries[key]
+                expired = True
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        if expired:
+            self._count('expired')
+        self._count('misses' if entry is None else 'hits')
+        return None if entry is None else entry[0]
+
+    def record_miss(self):
+        """Count a lookup that found nothing without looking up a key."""
+        with self._lock:
+            self.misses += 1
+        self._count('misses')
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Store an entry, evicting the least recently used ones if full.
+
+        Args:
+            key: Entry key
+            value: Value to cache
+        """
+        if self.max_size <= 0:
+            return
+
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (value, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                evicted += 1
+        self._count('evictions', evicted)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Remove an entry, returning its value or None if it was not cached."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return None if entry is None else entry[0]
+
+    def pop_oldest(self) -> Optional[Tuple[Hashable, Any]]:
+        """
+        Evict the least recently used entry.
+
+        Returns:
+            Tuple of (key, value) or None if the cache is empty
+        """
+        with self._lock:
+            if not self._entries:
+                return None
+            key, (value, _) = self._entries.popitem(last=False)
+        self._count('evictions')
+        return key, value
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache size and hit counts.
+
+        Returns:
+            Dictionary with size, limits, hits, misses and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
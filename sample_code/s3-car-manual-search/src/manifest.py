@@ -0,0 +1,184 @@
+import hashlib
+import numpy as np
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Set
+from config import (
+    S3_SHARD_PREFIX, S3_STATE_PREFIX, S3_KEYWORD_INDEX_PREFIX, S3_MANIFEST_PREFIX,
+    S3_PROJECTION_PREFIX, EMBEDDING_DIMENSION, EMBEDDING_STORAGE_DTYPE,
+    PASSAGE_MODE, PASSAGE_MAX_TOKENS, PASSAGE_OVERLAP_TOKENS, COARSE_DIMENSIONS, ARTIFACT_COMPRESSION
+)
+from .compression import resolve_codec
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash the text a section is embedded from.
+
+    Args:
+        text: Output of ManualProcessor.prepare_text_for_embedding
+
+    Returns:
+        Hex digest identifying the content
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+def passage_settings() -> Optional[Dict[str, int]]:
+    """Get the passage splitting settings embeddings are built with (None in section mode)."""
+    if PASSAGE_MODE != 'passage':
+        return None
+    return {'max_tokens': PASSAGE_MAX_TOKENS, 'overlap_tokens': PASSAGE_OVERLAP_TOKENS}
+
+
+def coarse_dimensions() -> int:
+    """Get the dimension of the reduced vectors uploads store for two-stage search (0 if none)."""
+    if PASSAGE_MODE == 'passage':
+        return 0
+    return max(COARSE_DIMENSIONS, 0)
+
+
+def coarse_changed(manifest: Dict[str, Any]) -> bool:
+    """Whether a manifest stores reduced vectors of a different dimension than configured."""
+    return (manifest.get('coarse') or {}).get('dimensions', 0) != coarse_dimensions()
+
+
+def artifact_codec() -> Optional[str]:
+    """Get the codec new artifacts are compressed with (None if compression is disabled)."""
+    return resolve_codec(ARTIFACT_COMPRESSION)
+
+
+def new_manifest() -> Dict[str, Any]:
+    """Create an empty manifest (version 0, no shards)."""
+    return {
+        'version': 0,
+        'created_at': None,
+        'embedding_dimension': EMBEDDING_DIMENSION,
+        'storage_dtype': EMBEDDING_STORAGE_DTYPE,
+        'passages': passage_settings(),
+        'coarse': None,
+        'compression': artifact_codec(),
+        'shards': [],
+        'tombstones': [],
+        'state': None,
+        'keyword_index': None,
+        'live_rows': 0,
+        'total_rows': 0
+    }
+
+
+def shard_name(version: int, sequence: int = 0) -> str:
+    """Get the id of the sequence-th shard written for a manifest version."""
+    return f"v{version:06d}-{sequence:04d}"
+
+
+def shard_entry(shard_id: str, rows: int, storage_dtype: str = EMBEDDING_STORAGE_DTYPE) -> Dict[str, Any]:
+    """
+    Describe a shard and the S3 keys of its artifacts.
+
+    Args:
+        shard_id: Shard identifier
+        rows: Number of sections in the shard
+        storage_dtype: Embedding storage format of the shard
+
+    Returns:
+        Shard entry for the manifest
+    """
+    prefix = f"{S3_SHARD_PREFIX}{shard_id}/"
+    entry = {
+        'id': shard_id,
+        'rows': rows,
+        'embeddings': prefix + 'embeddings.npy',
+        'metadata_columns': prefix + 'metadata.bin',
+        'section_blob': prefix + 'sections.bin',
+        'section_offsets': prefix + 'sections_offsets.npy'
+    }
+    if storage_dtype != 'float32':
+        entry['quantized'] = {
+            'dtype': storage_dtype,
+            'embeddings': prefix + f'embeddings_{storage_dtype}.npy'
+        }
+        if storage_dtype == 'int8':
+            entry['quantized']['scales'] = prefix + f'scales_{storage_dtype}.npy'
+    if coarse_dimensions():
+        entry['reduced'] = prefix + 'reduced.npy'
+    # Readers detect compressed artifacts themselves; the codec records how the shard was written
+    codec = artifact_codec()
+    if codec:
+        entry['compression'] = codec
+    return entry
+
+
+def state_key(version: int) -> str:
+    """Get the S3 key of the ingestion state (content hashes, shard ids) of a version."""
+    return f"{S3_STATE_PREFIX}v{version:06d}.json"
+
+
+def keyword_index_key(version: int) -> str:
+    """Get the S3 key of the keyword index of a version."""
+    return f"{S3_KEYWORD_INDEX_PREFIX}v{version:06d}.npz"
+
+
+def projection_key(version: int) -> str:
+    """Get the S3 key of the PCA projection fitted for a version."""
+    return f"{S3_PROJECTION_PREFIX}v{version:06d}.npy"
+
+
+def manifest_version_key(version: int) -> str:
+    """Get the S3 key of the immutable copy of a manifest version."""
+    return f"{S3_MANIFEST_PREFIX}v{version:06d}.json"
+
+
+def stamp(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the creation time of a manifest."""
+    manifest['created_at'] = datetime.now(timezone.utc).isoformat()
+    return manifest
+
+
+def live_masks(shard_ids: List[List[str]], tombstones: Set[str]) -> List[np.ndarray]:
+    """
+    Work out which shard rows are live. The newest copy of a section id wins,
+    and ids in the tombstone set are dropped entirely.
+
+    Args:
+        shard_ids: Section ids of every shard, in manifest order
+        tombstones: Deleted section ids
+
+    Returns:
+        One boolean mask per shard
+    """
+    latest = {}
+    for shard, ids in enumerate(shard_ids):
+        for row, section_id in enumerate(ids):
+            latest[section_id] = (shard, row)
+
+    masks = [np.zeros(len(ids), dtype=bool) for ids in shard_ids]
+    for section_id, (shard, row) in latest.items():
+        if section_id not in tombstones:
+            masks[shard][row] = True
+    return masks
+
+
+def manifest_keys(manifest: Optional[Dict[str, Any]]) -> Set[str]:
+    """
+    Collect every S3 key referenced by a manifest.
+
+    Args:
+        manifest: Manifest dictionary
+
+    Returns:
+        Set of S3 keys
+    """
+    if not manifest:
+        return set()
+
+    keys = {manifest.get('state'), manifest.get('keyword_index'),
+            (manifest.get('coarse') or {}).get('projection')}
+    for shard in manifest.get('shards', []):
+        keys.update([shard['embeddings'], shard.get('metadata'), shard.get('metadata_columns'),
+                     shard.get('reduced'), shard.get('sections'), shard.get('section_blob'),
+                     shard.get('section_offsets')])
+        quantized = shard.get('quantized')
+        if quantized:
+            keys.update([quantized['embeddings'], quantized.get('scales')])
+    keys.discard(None)
+    return keys
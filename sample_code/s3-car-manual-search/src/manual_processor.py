@@ -1,7 +1,12 @@
 import json
 import logging
-from typing import List, Dict, Any
-from config import LOCAL_MANUAL_FILE
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from config import LOCAL_MANUAL_FILE, PASSAGE_MAX_TOKENS, PASSAGE_OVERLAP_TOKENS
+from .keyword_index import BM25Index
+from .fuzzy_index import TrigramIndex
+from .section_stream import iter_sections
+from .section_index import SectionIndex
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,23 +18,33 @@ class ManualProcessor:
     
     def __init__(self):
         self.sections = []
+        self.keyword_index: Optional[BM25Index] = None
+        self.fuzzy_index: Optional[TrigramIndex] = None
+        self._section_index: Optional[SectionIndex] = None
+        # Sections list the indexes above were built from
+        self._indexed_sections: Optional[List[Dict[str, Any]]] = None
         
     def load_manual_data(self, file_path: str = LOCAL_MANUAL_FILE) -> List[Dict[str, Any]]:
         """
-        Load car manual sections from JSON file.
+        Load car manual sections from a JSON or JSON Lines file.
         
         Args:
-            file_path: Path to the manual data JSON file
+            file_path: Path to the manual data file
             
         Returns:
             List of manual sections
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                self.sections = data.get('sections', [])
-                logger.info(f"Loaded {len(self.sections)} manual sections")
-                return self.sections
+            sections = list(iter_sections(file_path))
+            # Build the indexes before publishing the sections, so concurrent
+            # readers never see sections without them
+            self.keyword_index = BM25Index.from_sections(sections)
+            self._section_index = SectionIndex(sections)
+            self.fuzzy_index = None
+            self._indexed_sections = sections
+            self.sections = sections
+            logger.info(f"Loaded {len(self.sections)} manual sections")
+            return self.sections
         except FileNotFoundError:
             logger.error(f"Manual data file not found: {file_path}")
             return []
@@ -37,6 +52,31 @@ class ManualProcessor:
             logger.error(f"Error parsing JSON file: {e}")
             return []
     
+    def clear_cache(self):
+        """
+        Drop the lookup, keyword and fuzzy indexes, so they are rebuilt from the
+        current sections on next use. Call this after editing sections in place;
+        assigning a new sections list is detected without it.
+        """
+        self.keyword_index = None
+        self.fuzzy_index = None
+        self._section_index = None
+        self._indexed_sections = None
+    
+    def _sync_indexes(self):
+        """Drop the indexes if the sections list was replaced since they were built."""
+        if self._indexed_sections is not self.sections:
+            self.clear_cache()
+            self._indexed_sections = self.sections
+    
+    @property
+    def section_index(self) -> SectionIndex:
+        """Lookup index over the loaded sections, rebuilt if the sections were replaced."""
+        self._sync_indexes()
+        if self._section_index is None:
+            self._section_index = SectionIndex(self.sections)
+        return self._section_index
+    
     def get_sections_by_category(self, category: str) -> List[Dict[str, Any]]:
         """
         Get all sections for a specific category.
@@ -47,7 +87,8 @@ class ManualProcessor:
         Returns:
             List of sections in the specified category
         """
-        return [section for section in self.sections if section.get('category') == category]
+        rows = self.section_index.rows_for({'category': category})
+        return [self.sections[idx] for idx in rows]
     
     def get_section_by_id(self, section_id: str) -> Dict[str, Any]:
         """
@@ -59,10 +100,8 @@ class ManualProcessor:
         Returns:
             Section data or empty dict if not found
         """
-        for section in self.sections:
-            if section.get('id') == section_id:
-                return section
-        return {}
+        row = self.section_index.row_for_id(section_id)
+        return self.sections[row] if row is not None else {}
     
     def prepare_text_for_embedding(self, section: Dict[str, Any]) -> str:
         """
@@ -84,6 +123,71 @@ class ManualProcessor:
         combined_text = f"{category}: {title}. {content} Keywords: {keywords}"
         return combined_text.strip()
     
+    def split_into_passages(self, section: Dict[str, Any],
+                            max_tokens: int = PASSAGE_MAX_TOKENS,
+                            overlap_tokens: int = PASSAGE_OVERLAP_TOKENS) -> List[str]:
+        """
+        Split a section into overlapping passages for embedding.
+        Every passage is prefixed with the category and title; keywords are added
+        to the first one. Sections that fit in one window yield exactly the
+        text of prepare_text_for_embedding.
+        
+        Args:
+            section: Manual section data
+            max_tokens: Maximum content words per passage
+            overlap_tokens: Words shared by consecutive passages
+            
+        Returns:
+            List of passage texts (at least one)
+        """
+        if overlap_tokens >= max_tokens:
+            raise ValueError("Passage overlap must be smaller than the passage length")
+        
+        words = section.get('content', '').split()
+        if len(words) <= max_tokens:
+            return [self.prepare_text_for_embedding(section)]
+        
+        prefix = f"{section.get('category', '')}: {section.get('title', '')}."
+        keywords = ' '.join(section.get('keywords', []))
+        step = max_tokens - overlap_tokens
+        
+        passages = []
+        for start in range(0, len(words) - overlap_tokens, step):
+            text = f"{prefix} {' '.join(words[start:start + max_tokens])}"
+            if not passages:
+                text += f" Keywords: {keywords}"
+            passages.append(text.strip())
+        return passages
+    
+    def get_passages_for_embedding(self, sections: Optional[List[Dict[str, Any]]] = None,
+                                   max_tokens: int = PASSAGE_MAX_TOKENS,
+                                   overlap_tokens: int = PASSAGE_OVERLAP_TOKENS) -> Tuple[List[str], np.ndarray]:
+        """
+        Get the passages of many sections as one flat batch.
+        
+        Args:
+            sections: Sections to split (defaults to all loaded sections)
+            max_tokens: Maximum content words per passage
+            overlap_tokens: Words shared by consecutive passages
+            
+        Returns:
+            Tuple of (passage texts, offsets) where the passages of section i are
+            texts[offsets[i]:offsets[i + 1]]
+        """
+        if sections is None:
+            if not self.sections:
+                self.load_manual_data()
+            sections = self.sections
+        
+        texts = []
+        offsets = np.zeros(len(sections) + 1, dtype=np.int64)
+        for i, section in enumerate(sections):
+            texts.extend(self.split_into_passages(section, max_tokens, overlap_tokens))
+            offsets[i + 1] = len(texts)
+        
+        logger.info(f"Prepared {len(texts)} passages from {len(sections)} sections")
+        return texts, offsets
+    
     def get_all_texts_for_embedding(self) -> List[str]:
         """
         Get all section texts prepared for embedding generation.
@@ -121,31 +225,56 @@ class ManualProcessor:
         
         return metadata
     
-    def search_sections_by_keywords(self, query: str) -> List[Dict[str, Any]]:
+    def keyword_search(self, query: str, top_k: int,
+                       rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
         """
-        Simple keyword-based search for fallback when embeddings are not available.
+        BM25 keyword search over the loaded sections.
         
         Args:
             query: Search query
+            top_k: Number of results to return
+            rows: Optional sorted section indices to restrict the results to
             
         Returns:
-            List of matching sections
+            List of tuples (section index, bm25 score) sorted by score
+        """
+        self._sync_indexes()
+        if self.keyword_index is None:
+            self.keyword_index = BM25Index.from_sections(self.sections)
+        return self.keyword_index.search(query, top_k, rows)
+    
+    def fuzzy_search(self, query: str, top_k: int,
+                     rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
         """
-        query_lower = query.lower()
-        matching_sections = []
+        Typo-tolerant search over the titles and keywords of the loaded sections.
         
-        for section in self.sections:
-            # Check title, content, and keywords
-            title = section.get('title', '').lower()
-            content = section.get('content', '').lower()
-            keywords = ' '.join(section.get('keywords', [])).lower()
+        Args:
+            query: Search query
+            top_k: Number of results to return
+            rows: Optional sorted section indices to restrict the results to
             
-            if (query_lower in title or 
-                query_lower in content or 
-                query_lower in keywords):
-                matching_sections.append(section)
+        Returns:
+            List of tuples (section index, trigram similarity) sorted by similarity
+        """
+        self._sync_indexes()
+        if self.fuzzy_index is None:
+            self.fuzzy_index = TrigramIndex.from_metadata(self.sections)
+        return self.fuzzy_index.search(query, top_k, rows)
+    
+    def search_sections_by_keywords(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Keyword-based search for fallback when embeddings are not available.
+        Sections are ranked by BM25 over title, content, and keywords.
         
-        return matching_sections
+        Args:
+            query: Search query
+            top_k: Maximum number of sections to return (all matches if None)
+            
+        Returns:
+            List of matching sections, best match first
+        """
+        results = self.keyword_search(query, top_k or len(self.sections))
+        return [self.sections[idx] for idx, _ in results]
     
     def get_categories(self) -> List[str]:
         """
@@ -154,13 +283,7 @@ class ManualProcessor:
         Returns:
             List of category names
         """
-        categories = set()
-        for section in self.sections:
-            category = section.get('category')
-            if category:
-                categories.add(category)
-        
-        return sorted(list(categories))
+        return list(self.section_index.categories)
     
     def get_section_count_by_category(self) -> Dict[str, int]:
         """
@@ -169,12 +292,7 @@ class ManualProcessor:
         Returns:
             Dictionary with category names and counts
         """
-        category_counts = {}
-        for section in self.sections:
-            category = section.get('category', 'Unknown')
-            category_counts[category] = category_counts.get(category, 0) + 1
-        
-        return category_counts
+        return dict(self.section_index.category_counts)
     
     def validate_sections(self) -> Dict[str, Any]:
         """
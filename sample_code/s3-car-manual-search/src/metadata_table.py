@@ -0,0 +1,311 @@
+import json
+import struct
+import logging
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+
+from .s3_vector_service import S3VectorService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File layout: magic, uint32 header length, JSON header, then 8-byte aligned column buffers
+MAGIC = b'CARMETA1'
+ALIGNMENT = 8
+
+# Variable-length string columns, stored as one UTF-8 blob plus int64 offsets
+STRING_COLUMNS = ('id', 'title')
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate arange(start, end) for every (start, end) pair without a Python loop."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    shifts = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return np.arange(total, dtype=np.int64) + shifts
+
+
+def _offsets(lengths: np.ndarray) -> np.ndarray:
+    """Turn lengths into int64 offsets with a leading zero."""
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _encode_strings(values: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode strings (None as empty) into (int64 offsets, uint8 blob)."""
+    parts = [(value or '').encode('utf-8') for value in values]
+    blob = np.frombuffer(b''.join(parts), dtype=np.uint8)
+    return _offsets(np.fromiter((len(part) for part in parts), dtype=np.int64, count=len(parts))), blob
+
+
+def _take_strings(offsets: np.ndarray, data: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Gather the strings at rows of an (offsets, blob) column into a new column."""
+    starts, ends = offsets[rows], offsets[rows + 1]
+    return _offsets(ends - starts), data[_ranges(starts, ends)]
+
+
+class MetadataTable:
+    """
+    Read-only, columnar metadata of section rows (id, category, title, keywords).
+
+    Strings live in UTF-8 blobs addressed by int64 offsets, categories are
+    dictionary-encoded int32 codes and keyword lists are a string column with
+    per-row offsets into it. A table loaded with from_bytes is a set of views
+    over the downloaded (or memory-mapped) buffer, so loading a shard costs no
+    parsing and no per-row Python objects; rows are decoded into dictionaries
+    only when a result is built.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: List[Optional[str]]):
+        """
+        Initialize the table.
+
+        Args:
+            columns: Column arrays (see from_records for the names)
+            categories: Category dictionary; category_codes index into it
+        """
+        self.columns = columns
+        self.categories = categories
+        self.category_codes = columns['category_codes']
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]],
+                     passage_offsets: Optional[Sequence[int]] = None) -> 'MetadataTable':
+        """
+        Build a table from metadata dictionaries.
+
+        Args:
+            records: Metadata or section dictionaries, in row order
+            passage_offsets: Passage rows of section i are offsets[i]:offsets[i + 1]
+
+        Returns:
+            MetadataTable
+        """
+        columns = {}
+        for name in STRING_COLUMNS:
+            columns[f'{name}_offsets'], columns[f'{name}_data'] = _encode_strings(
+                [record.get(name) for record in records]
+            )
+
+        codes = {}
+        columns['category_codes'] = np.fromiter(
+            (codes.setdefault(record.get('category'), len(codes)) for record in records),
+            dtype=np.int32,
+            count=len(records)
+        )
+
+        keywords = [record.get('keywords') or [] for record in records]
+        columns['keyword_rows'] = _offsets(np.fromiter((len(words) for words in keywords),
+                                                       dtype=np.int64, count=len(keywords)))
+        columns['keyword_offsets'], columns['keyword_data'] = _encode_strings(
+            [word for words in keywords for word in words]
+        )
+        if passage_offsets is not None:
+            columns['passage_offsets'] = np.asarray(passage_offsets, dtype=np.int64)
+        return cls(columns, list(codes))
+
+    def to_bytes(self) -> bytes:
+        """Serialize the table (see from_bytes)."""
+        layout, position = {}, 0
+        for name, array in self.columns.items():
+            array = np.ascontiguousarray(array)
+            layout[name] = {'dtype': array.dtype.str, 'offset': position, 'length': len(array)}
+            position += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+        header = json.dumps({'rows': len(self), 'categories': self.categories, 'columns': layout},
+                            ensure_ascii=False).encode('utf-8')
+        prefix = MAGIC + struct.pack('<I', len(header)) + header
+        prefix += b'\0' * (-len(prefix) % ALIGNMENT)
+
+        body = bytearray(position)
+        for name, array in self.columns.items():
+            data = np.ascontiguousarray(array).tobytes()
+            start = layout[name]['offset']
+            body[start:start + len(data)] = data
+        return prefix + bytes(body)
+
+    @classmethod
+    def from_bytes(cls, buffer: Union[bytes, np.ndarray]) -> 'MetadataTable':
+        """
+        Load a table serialized by to_bytes without copying its columns.
+
+        Args:
+            buffer: Serialized table (bytes or a memory-mapped uint8 array)
+
+        Returns:
+            MetadataTable whose columns are read-only views of buffer
+
+        Raises:
+            ValueError: If the buffer is not a serialized metadata table
+        """
+        raw = memoryview(buffer).cast('B')
+        if bytes(raw[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a columnar metadata table")
+        header_length = struct.unpack_from('<I', raw, len(MAGIC))[0]
+        header_end = len(MAGIC) + 4 + header_length
+        header = json.loads(bytes(raw[len(MAGIC) + 4:header_end]).decode('utf-8'))
+        base = header_end + (-header_end % ALIGNMENT)
+
+        columns = {}
+        for name, column in header['columns'].items():
+            array = np.frombuffer(raw, dtype=np.dtype(column['dtype']), count=column['length'],
+                                  offset=base + column['offset'])
+            array.flags.writeable = False
+            columns[name] = array
+        return cls(columns, header['categories'])
+
+    @classmethod
+    def concat(cls, tables: List['MetadataTable']) -> 'MetadataTable':
+        """
+        Stack tables row-wise, merging their category dictionaries.
+
+        Args:
+            tables: Tables in row order
+
+        Returns:
+            The table itself if there is only one, otherwise a new table
+        """
+        if len(tables) == 1:
+            return tables[0]
+
+        columns, codes = {}, {}
+        for name in STRING_COLUMNS + ('keyword',):
+            columns[f'{name}_data'] = np.concatenate([table.columns[f'{name}_data'] for table in tables])
+            columns[f'{name}_offsets'] = cls._stack_offsets([table.columns[f'{name}_offsets'] for table in tables])
+        columns['keyword_rows'] = cls._stack_offsets([table.columns['keyword_rows'] for table in tables])
+        columns['category_codes'] = np.concatenate([
+            np.asarray([codes.setdefault(category, len(codes)) for category in table.categories],
+                       dtype=np.int32)[table.category_codes]
+            for table in tables
+        ])
+        if all(table.passage_offsets is not None for table in tables):
+            columns['passage_offsets'] = cls._stack_offsets([table.passage_offsets for table in tables])
+        return cls(columns, list(codes))
+
+    @staticmethod
+    def _stack_offsets(parts: List[np.ndarray]) -> np.ndarray:
+        """Concatenate offset arrays, shifting each one past the end of the previous."""
+        shifted, end = [np.zeros(1, dtype=np.int64)], 0
+        for offsets in parts:
+            shifted.append(np.asarray(offsets[1:], dtype=np.int64) - offsets[0] + end)
+            end += int(offsets[-1] - offsets[0])
+        return np.concatenate(shifted)
+
+    def take(self, rows: np.ndarray) -> 'MetadataTable':
+        """
+        Select rows into a new table.
+
+        Args:
+            rows: Row indices
+
+        Returns:
+            MetadataTable of the selected rows, in the order given
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = {'category_codes': self.category_codes[rows]}
+        for name in STRING_COLUMNS:
+            columns[f'{name}_offsets'], columns[f'{name}_data'] = _take_strings(
+                self.columns[f'{name}_offsets'], self.columns[f'{name}_data'], rows
+            )
+
+        keyword_rows = self.columns['keyword_rows']
+        columns['keyword_rows'] = _offsets(keyword_rows[rows + 1] - keyword_rows[rows])
+        columns['keyword_offsets'], columns['keyword_data'] = _take_strings(
+            self.columns['keyword_offsets'], self.columns['keyword_data'],
+            _ranges(keyword_rows[rows], keyword_rows[rows + 1])
+        )
+        if self.passage_offsets is not None:
+            counts = np.diff(self.passage_offsets)
+            columns['passage_offsets'] = _offsets(counts[rows])
+        return MetadataTable(columns, self.categories)
+
+    @property
+    def passage_offsets(self) -> Optional[np.ndarray]:
+        """Passage offsets of the rows, or None outside passage mode."""
+        return self.columns.get('passage_offsets')
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays."""
+        return sum(array.nbytes for array in self.columns.values())
+
+    def __len__(self) -> int:
+        return len(self.category_codes)
+
+    def _string(self, name: str, row: int) -> str:
+        offsets = self.columns[f'{name}_offsets']
+        return self.columns[f'{name}_data'][offsets[row]:offsets[row + 1]].tobytes().decode('utf-8')
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if not -len(self) <= row < len(self):
+            raise IndexError(f"metadata row {row} out of range")
+        row = int(row) % len(self)
+        keyword_rows = self.columns['keyword_rows']
+        return {
+            'id': self._string('id', row),
+            'category': self.categories[self.category_codes[row]],
+            'title': self._string('title', row),
+            'keywords': [self._string('keyword', k) for k in range(keyword_rows[row], keyword_rows[row + 1])]
+        }
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def strings(self, name: str) -> List[str]:
+        """
+        Decode a whole string column at once.
+
+        Args:
+            name: 'id', 'title' or 'keyword' (every keyword of every row, see keyword_rows)
+
+        Returns:
+            List of strings
+        """
+        offsets, data = self.columns[f'{name}_offsets'], self.columns[f'{name}_data'].tobytes()
+        return [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+    def ids(self) -> List[str]:
+        """Decode every id (used once per load to resolve live rows)."""
+        return self.strings('id')
+
+    def sorted_ids(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Build a binary-search index over the ids.
+
+        Returns:
+            Tuple of (ids as a sorted fixed-width bytes array, row of each sorted id)
+        """
+        offsets, data = self.columns['id_offsets'], self.columns['id_data']
+        lengths = np.diff(offsets)
+        width = max(int(lengths.max()) if len(lengths) else 0, 1)
+        matrix = np.zeros((len(self), width), dtype=np.uint8)
+        positions = _ranges(offsets[:-1], offsets[1:])
+        matrix[np.repeat(np.arange(len(self)), lengths), positions - np.repeat(offsets[:-1], lengths)] = data[positions]
+        keys = matrix.view(f'S{width}').ravel()
+        order = np.argsort(keys, kind='stable')
+        return keys[order], order.astype(np.int64)
+
+
+def read_shard_metadata(s3_service: S3VectorService, shard: Dict[str, Any]) -> Optional[MetadataTable]:
+    """
+    Read the metadata of a shard, columnar or written as JSON before tables existed.
+
+    Args:
+        s3_service: Service used to read artifacts
+        shard: Shard entry of a manifest
+
+    Returns:
+        MetadataTable of the shard or None if the artifact could not be read
+    """
+    if shard.get('metadata_columns'):
+        buffer = s3_service.download_buffer(shard['metadata_columns'])
+        return None if buffer is None else MetadataTable.from_bytes(buffer)
+
+    data = s3_service.download_json_data(shard['metadata'])
+    if data is None:
+        return None
+    return MetadataTable.from_records(data.get('metadata', []), data.get('passage_offsets'))
@@ -0,0 +1,235 @@
+import json
+import bisect
+import math
+import threading
+import time
+import logging
+from typing import Dict, Any, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds: 10 microseconds to ~100 seconds, 25% apart
+BUCKET_BOUNDS = [1e-5 * 1.25 ** i for i in range(int(math.log(1e7) / math.log(1.25)) + 2)]
+
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram. Recording is O(log buckets) and memory is
+    constant; percentiles are accurate to the bucket width (25%).
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """
+        Record one observation.
+
+        Args:
+            seconds: Observed latency in seconds
+        """
+        bucket = bisect.bisect_left(BUCKET_BOUNDS, seconds)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, p: float) -> float:
+        """
+        Estimate a percentile from the bucket counts.
+
+        Args:
+            p: Percentile between 0 and 100
+
+        Returns:
+            Upper bound of the bucket holding the percentile, in seconds
+        """
+        if self.count == 0:
+            return 0.0
+        rank = math.ceil(p / 100.0 * self.count)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                bound = BUCKET_BOUNDS[bucket] if bucket < len(BUCKET_BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        """Get count, mean, percentiles and max in milliseconds."""
+        summary = {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0
+        }
+        for p in PERCENTILES:
+            summary[f'p{p}_ms'] = round(self.percentile(p) * 1000, 3)
+        summary['max_ms'] = round(self.max * 1000, 3)
+        return summary
+
+
+class _Span:
+    """Context manager recording its duration into a histogram."""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    """Shared no-op span returned when metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class MetricsRegistry:
+    """
+    In-process latency histograms and counters.
+    When disabled, timer() returns a shared no-op span and increment() returns
+    immediately, so instrumented code pays almost nothing.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize the registry.
+
+        Args:
+            enabled: Whether to record anything
+        """
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        """Get (or create) the histogram of a stage."""
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def timer(self, name: str):
+        """
+        Time a block of code into the histogram of a stage.
+
+        Args:
+            name: Stage name, e.g. 'search.encode'
+
+        Returns:
+            Context manager
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.histogram(name))
+
+    def observe(self, name: str, seconds: float):
+        """
+        Record a latency measured elsewhere.
+
+        Args:
+            name: Stage name
+            seconds: Observed latency in seconds
+        """
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def increment(self, name: str, amount: int = 1):
+        """
+        Increase a counter.
+
+        Args:
+            name: Counter name, e.g. 'search.fallbacks'
+            amount: Amount to add
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def counter(self, name: str) -> int:
+        """Get the value of a counter."""
+        return self._counters.get(name, 0)
+
+    def _rate(self, numerator: str, denominators: List[str]) -> float:
+        total = sum(self.counter(name) for name in denominators)
+        return round(self.counter(numerator) / total, 4) if total else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a JSON-serializable view of all metrics.
+
+        Returns:
+            Dictionary with latency summaries, counters and derived rates
+        """
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+        return {
+            'enabled': self.enabled,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'latency': {name: histograms[name].summary() for name in sorted(histograms)},
+            'counters': dict(sorted(counters.items())),
+            'rates': {
+                'fallback_rate': self._rate('search.fallbacks', ['search.queries']),
+                's3_cache_hit_rate': self._rate('s3_cache.hits', ['s3_cache.hits', 's3_cache.misses']),
+                'query_cache_hit_rate': self._rate('query_cache.hits', ['query_cache.hits', 'query_cache.misses']),
+                'result_cache_hit_rate': self._rate('result_cache.hits', ['result_cache.hits', 'result_cache.misses'])
+            }
+        }
+
+    def export_json(self, path: str) -> bool:
+        """
+        Write a metrics snapshot to a JSON file.
+
+        Args:
+            path: Output file path
+
+        Returns:
+            True if the file was written
+        """
+        try:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(self.snapshot(), file, indent=2)
+            logger.info(f"Exported metrics to {path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error exporting metrics: {e}")
+            return False
+
+    def reset(self):
+        """Drop all recorded metrics."""
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+            self.started_at = time.time()
+
+
+# Default for components created without a registry
+NULL_METRICS = MetricsRegistry(enabled=False)
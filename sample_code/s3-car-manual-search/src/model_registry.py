@@ -0,0 +1,126 @@
+import time
+import threading
+import logging
+from typing import Dict, Any, Callable, List, Optional
+
+from .metrics import MetricsRegistry
+from config import METRICS_ENABLED
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_sentence_transformer(model_name: str):
+    """Load a sentence-transformers model (imported here so startup does not pay for it)."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of embedding models keyed by model name. A model is loaded
+    the first time it is needed; concurrent callers wait for that one load and
+    every service using the model shares the instance and its encode lock.
+    """
+
+    def __init__(self, loader: Callable[[str], Any] = load_sentence_transformer,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            loader: Function loading a model by name
+            metrics: Registry for model load latency and counts
+        """
+        self.loader = loader
+        self.metrics = metrics or MetricsRegistry(enabled=METRICS_ENABLED)
+        self._models: Dict[str, Any] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._encode_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _named_lock(self, locks: Dict[str, threading.Lock], model_name: str) -> threading.Lock:
+        with self._lock:
+            return locks.setdefault(model_name, threading.Lock())
+
+    def encode_lock(self, model_name: str) -> threading.Lock:
+        """
+        Get the lock serializing encode calls on a model. The fast tokenizer is
+        not safe to call from several threads at once.
+
+        Args:
+            model_name: Model name
+
+        Returns:
+            Lock shared by every user of the model
+        """
+        return self._named_lock(self._encode_locks, model_name)
+
+    def is_loaded(self, model_name: str) -> bool:
+        """Whether a model has been loaded in this process."""
+        return model_name in self._models
+
+    def get(self, model_name: str) -> Any:
+        """
+        Get a model, loading it on first use.
+
+        Args:
+            model_name: Model name
+
+        Returns:
+            The shared model instance
+
+        Raises:
+            Exception: Whatever the loader raised; the next call tries again
+        """
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._named_lock(self._load_locks, model_name):
+            # Another caller loaded it while we waited
+            model = self._models.get(model_name)
+            if model is not None:
+                return model
+
+            logger.info(f"Loading embedding model: {model_name}")
+            started = time.perf_counter()
+            try:
+                model = self.loader(model_name)
+            except Exception as e:
+                self.metrics.increment('model.load_failures')
+                logger.error(f"Error loading model {model_name}: {e}")
+                raise
+            seconds = time.perf_counter() - started
+            self.metrics.observe('model.load', seconds)
+            self.metrics.increment('model.loads')
+            self._models[model_name] = model
+            logger.info(f"Model {model_name} loaded in {seconds:.2f}s")
+            return model
+
+    def loaded_models(self) -> List[str]:
+        """Get the names of the models loaded in this process."""
+        return sorted(self._models)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the loaded models with load counts and latency.
+
+        Returns:
+            JSON-serializable status dictionary
+        """
+        return {
+            'loaded_models': self.loaded_models(),
+            'loads': self.metrics.counter('model.loads'),
+            'load_failures': self.metrics.counter('model.load_failures'),
+            'load_latency': self.metrics.histogram('model.load').summary()
+        }
+
+    def clear(self):
+        """Drop all loaded models (they are reloaded on next use)."""
+        with self._lock:
+            self._models = {}
+
+
+# Shared by every EmbeddingService in the process
+MODEL_REGISTRY = ModelRegistry()
@@ -0,0 +1,187 @@
+import io
+import base64
+import hashlib
+import zlib
+import threading
+import numpy as np
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Iterator, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# S3 rejects multipart parts below 5 MiB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+CHECKSUM_ALGORITHMS = ('CRC32', 'SHA1', 'SHA256')
+
+
+def npy_header(dtype: np.dtype, shape: Tuple[int, ...]) -> bytes:
+    """
+    Build the .npy header np.save would write for a C-ordered array.
+
+    Args:
+        dtype: Array dtype
+        shape: Array shape
+
+    Returns:
+        Header bytes (magic string, version and padded header dict)
+    """
+    buffer = io.BytesIO()
+    header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+              'fortran_order': False, 'shape': tuple(shape)}
+    np.lib.format.write_array_header_1_0(buffer, header)
+    return buffer.getvalue()
+
+
+def npy_size(array: np.ndarray) -> int:
+    """Get the size in bytes of an array serialized as .npy."""
+    return len(npy_header(array.dtype, array.shape)) + array.nbytes
+
+
+def iter_npy_parts(array: np.ndarray, part_size: int) -> Iterator[bytes]:
+    """
+    Serialize an array as .npy in parts of exactly part_size bytes (the last may be shorter).
+    Rows are sliced from the array as needed, so at most one part is materialized
+    at a time.
+
+    Args:
+        array: Array to serialize
+        part_size: Bytes per part
+
+    Yields:
+        Consecutive parts of the .npy file
+    """
+    array = np.asarray(array)
+
+    def views() -> Iterator[memoryview]:
+        yield memoryview(npy_header(array.dtype, array.shape))
+        row_bytes = array.dtype.itemsize * int(np.prod(array.shape[1:], dtype=np.int64))
+        rows_per_block = max(1, part_size // max(row_bytes, 1))
+        for start in range(0, len(array) if array.ndim else 0, rows_per_block):
+            block = np.ascontiguousarray(array[start:start + rows_per_block])
+            yield memoryview(block.reshape(-1)).cast('B')
+
+    pieces, filled = [], 0
+    for view in views():
+        while len(view):
+            take = min(part_size - filled, len(view))
+            pieces.append(view[:take])
+            filled += take
+            view = view[take:]
+            if filled == part_size:
+                yield b''.join(pieces)
+                pieces, filled = [], 0
+
+    if pieces:
+        yield b''.join(pieces)
+
+
+def part_checksum(data: bytes, algorithm: str) -> str:
+    """
+    Compute the base64 checksum S3 expects for a part.
+
+    Args:
+        data: Part bytes
+        algorithm: 'CRC32', 'SHA1' or 'SHA256'
+
+    Returns:
+        Base64-encoded checksum
+    """
+    if algorithm == 'CRC32':
+        digest = zlib.crc32(data).to_bytes(4, 'big')
+    else:
+        digest = hashlib.new(algorithm.lower(), data).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def _checksum_args(data: bytes, algorithm: str) -> Dict[str, str]:
+    """Get the checksum request arguments for a body (empty if checksums are disabled)."""
+    if not algorithm:
+        return {}
+    return {'ChecksumAlgorithm': algorithm, f'Checksum{algorithm}': part_checksum(data, algorithm)}
+
+
+def upload_stream(s3_client, bucket_name: str, key: str, parts: Iterable[bytes],
+                  total_size: int, part_size: int, max_workers: int = 4,
+                  checksum_algorithm: str = 'CRC32',
+                  content_type: str = 'application/octet-stream') -> Dict[str, Any]:
+    """
+    Upload a stream of parts, as a single PUT when it fits in one part and as a
+    multipart upload otherwise. At most max_workers parts are held in memory:
+    the next part is only produced once a worker slot is free.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket_name: Target bucket
+        key: Target key
+        parts: Parts of part_size bytes (the last may be shorter)
+        total_size: Total number of bytes in parts
+        part_size: Bytes per part (at least MIN_PART_SIZE)
+        max_workers: Parts uploaded concurrently
+        checksum_algorithm: 'CRC32', 'SHA1', 'SHA256' or '' to disable checksums
+        content_type: Content type of the object
+
+    Returns:
+        Response of the final PUT or CompleteMultipartUpload request
+    """
+    if part_size < MIN_PART_SIZE:
+        raise ValueError(f"Part size must be at least {MIN_PART_SIZE} bytes")
+    if checksum_algorithm and checksum_algorithm not in CHECKSUM_ALGORITHMS:
+        raise ValueError(f"Unsupported checksum algorithm: {checksum_algorithm}")
+
+    if total_size <= part_size:
+        body = b''.join(parts)
+        return s3_client.put_object(Bucket=bucket_name, Key=key, Body=body, ContentType=content_type,
+                                    **_checksum_args(body, checksum_algorithm))
+
+    request = {'Bucket': bucket_name, 'Key': key, 'ContentType': content_type}
+    if checksum_algorithm:
+        request['ChecksumAlgorithm'] = checksum_algorithm
+    upload_id = s3_client.create_multipart_upload(**request)['UploadId']
+
+    def upload_part(number: int, data: bytes) -> Dict[str, Any]:
+        checksum = _checksum_args(data, checksum_algorithm)
+        response = s3_client.upload_part(Bucket=bucket_name, Key=key, UploadId=upload_id,
+                                         PartNumber=number, Body=data, **checksum)
+        part = {'PartNumber': number, 'ETag': response['ETag']}
+        if checksum_algorithm:
+            name = f'Checksum{checksum_algorithm}'
+            part[name] = checksum[name]
+        return part
+
+    slots = threading.BoundedSemaphore(max_workers)
+    failed = threading.Event()
+
+    def release(future):
+        if future.exception() is not None:
+            failed.set()
+        slots.release()
+
+    try:
+        futures = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            source = iter(parts)
+            while not failed.is_set():
+                slots.acquire()
+                data = next(source, None)
+                if data is None:
+                    slots.release()
+                    break
+                future = executor.submit(upload_part, len(futures) + 1, data)
+                future.add_done_callback(release)
+                futures.append(future)
+                del data
+
+        uploaded = [future.result() for future in futures]
+        response = s3_client.complete_multipart_upload(
+            Bucket=bucket_name, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': uploaded}
+        )
+        logger.info(f"Uploaded s3://{bucket_name}/{key} in {len(uploaded)} parts")
+        return response
+
+    except Exception:
+        s3_client.abort_multipart_upload(Bucket=bucket_name, Key=key, UploadId=upload_id)
+        raise
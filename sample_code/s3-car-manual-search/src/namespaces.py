@@ -0,0 +1,298 @@
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+
+from .metrics import MetricsRegistry, NULL_METRICS
+from .s3_vector_service import validate_namespace
+from config import NAMESPACE_MEMORY_BUDGET_MB, NAMESPACE_SEARCH_WORKERS, NAMESPACE_MAX_FANOUT
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def merge_results(per_namespace: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    Merge the ranked results of several namespaces.
+
+    Scores are only comparable when every namespace searched the same way: a
+    namespace that fell back to keyword search scores its best hit 1.0 whatever
+    its quality. Results are therefore merged by similarity score when they all
+    have the same search type, and otherwise by their rank within their namespace
+    (reciprocal rank fusion of lists without overlap), so each namespace
+    contributes its best hits in turn.
+
+    Args:
+        per_namespace: Results of every namespace, in the order the namespaces were given
+        top_k: Number of results to return
+
+    Returns:
+        The top_k results, re-ranked, each with its 'namespace_rank'
+    """
+    results = [result for namespace_results in per_namespace for result in namespace_results]
+    for result in results:
+        result['namespace_rank'] = result['rank']
+
+    # Stable sorts: ties keep the order the namespaces were given in
+    if len({result.get('search_type', 'vector') for result in results}) <= 1:
+        merged = sorted(results, key=lambda result: -result['similarity_score'])[:top_k]
+    else:
+        merged = sorted(results, key=lambda result: result['namespace_rank'])[:top_k]
+    for rank, result in enumerate(merged, 1):
+        result['rank'] = rank
+    return merged
+
+
+class NamespacePool:
+    """
+    Snapshot searchers of the namespaces (one manual corpus per vehicle model) of a bucket.
+
+    A namespace's searcher is created on first use and its snapshot loaded by its
+    first query. Searchers share their owner's caches, so a namespace's memory is
+    its snapshot. Whenever loaded snapshots hold more than the memory budget, the
+    least recently queried namespaces are unloaded; their next query loads them
+    again (from the local artifact cache when one is configured). A query that
+    already holds an evicted snapshot finishes on it, since snapshots are immutable.
+    """
+
+    def __init__(self, factory: Callable[[str], Any],
+                 memory_budget_mb: float = NAMESPACE_MEMORY_BUDGET_MB,
+                 max_workers: int = NAMESPACE_SEARCH_WORKERS,
+                 metrics: MetricsRegistry = NULL_METRICS,
+                 max_fanout: int = NAMESPACE_MAX_FANOUT):
+        """
+        Initialize the pool.
+
+        Args:
+            factory: Creates the (unloaded) SnapshotSearcher of a namespace
+            memory_budget_mb: Most megabytes of loaded snapshots (the namespace being
+                              queried is never evicted, even if it alone exceeds this)
+            max_workers: Most namespaces searched in parallel by one query
+            metrics: Registry for load and eviction counters
+            max_fanout: Most namespaces one query may search
+        """
+        self.factory = factory
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.max_workers = max(1, max_workers)
+        self.max_fanout = max_fanout
+        self.metrics = metrics
+        self.loads = 0
+        self.evictions = 0
+        # Searchers in least to most recently used order
+        self._searchers: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='namespace-search')
+
+    def __contains__(self, namespace: str) -> bool:
+        return namespace in self._searchers
+
+    def searcher(self, namespace: str):
+        """
+        Get the searcher of a namespace, creating it if needed, and mark it as recently used.
+
+        Args:
+            namespace: Namespace name
+
+        Returns:
+            SnapshotSearcher of the namespace (its snapshot may not be loaded yet)
+
+        Raises:
+            ValueError: If the namespace name is invalid
+        """
+        validate_namespace(namespace)
+        with self._lock:
+            searcher = self._searchers.get(namespace)
+            if searcher is None:
+                searcher = self._searchers[namespace] = self.factory(namespace)
+            self._searchers.move_to_end(namespace)
+        return searcher
+
+    def acquire(self, namespace: str):
+        """
+        Get the searcher of a namespace with its snapshot loaded, unloading cold
+        namespaces if the load went over the memory budget.
+
+        Args:
+            namespace: Namespace name
+
+        Returns:
+            Loaded SnapshotSearcher or None if the namespace has no published data
+        """
+        searcher = self.searcher(namespace)
+        if searcher.snapshot is not None:
+            return searcher
+
+        if not searcher._load_data_from_s3():
+            # Don't keep searchers of unknown namespaces around
+            with self._lock:
+                if self._searchers.get(namespace) is searcher:
+                    del self._searchers[namespace]
+            logger.warning(f"Namespace '{namespace}' has no data to load")
+            return None
+
+        with self._lock:
+            self.loads += 1
+        self.metrics.increment('namespaces.loads')
+        logger.info(f"Loaded namespace '{namespace}' ({searcher.snapshot.nbytes / 1024 / 1024:.1f} MB)")
+        self.enforce_budget(keep=namespace)
+        return searcher
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Get the approximate bytes held by every loaded namespace.
+
+        Returns:
+            Dictionary of namespace to bytes, least recently used first
+        """
+        with self._lock:
+            searchers = list(self._searchers.items())
+        usage = {}
+        for namespace, searcher in searchers:
+            snapshot = searcher.snapshot
+            if snapshot is not None:
+                usage[namespace] = snapshot.nbytes
+        return usage
+
+    def enforce_budget(self, keep: Optional[str] = None) -> List[str]:
+        """
+        Unload least recently used namespaces until the loaded ones fit the memory budget.
+
+        Args:
+            keep: Namespace that must stay loaded (the one being queried)
+
+        Returns:
+            Evicted namespaces
+        """
+        usage = self.memory_usage()
+        total = sum(usage.values())
+        evicted = []
+        with self._lock:
+            for namespace in list(self._searchers):
+                if total <= self.memory_budget:
+                    break
+                if namespace == keep or namespace not in usage:
+                    continue
+                total -= usage[namespace]
+                evicted.append((namespace, self._searchers.pop(namespace)))
+            self.evictions += len(evicted)
+
+        for namespace, searcher in evicted:
+            searcher.clear_cache()
+            self.metrics.increment('namespaces.evictions')
+            logger.info(f"Evicted namespace '{namespace}' to stay within the memory budget")
+        return [namespace for namespace, _ in evicted]
+
+    def evict(self, namespace: str) -> bool:
+        """
+        Unload a namespace.
+
+        Args:
+            namespace: Namespace name
+
+        Returns:
+            True if the namespace was in the pool
+        """
+        with self._lock:
+            searcher = self._searchers.pop(namespace, None)
+        if searcher is None:
+            return False
+        searcher.clear_cache()
+        return True
+
+    def clear(self):
+        """Unload every namespace."""
+        with self._lock:
+            searchers = list(self._searchers.values())
+            self._searchers.clear()
+        for searcher in searchers:
+            searcher.clear_cache()
+
+    def refresh(self) -> int:
+        """
+        Pick up newly published manifests of the loaded namespaces.
+
+        Returns:
+            Number of namespaces that swapped in a new snapshot
+        """
+        with self._lock:
+            searchers = [searcher for searcher in self._searchers.values() if searcher.snapshot is not None]
+        swapped = sum(1 for searcher in searchers if searcher.refresh_snapshot())
+        if swapped:
+            self.enforce_budget()
+        return swapped
+
+    def _search_one(self, namespace: str, query: str, query_embedding: Optional[np.ndarray],
+                    top_k: int, mode: str, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Search a single namespace; see search for the arguments."""
+        searcher = self.acquire(namespace)
+        if searcher is None:
+            return []
+        results = searcher._search(query, top_k, mode, filters, query_embedding)
+        for result in results:
+            result['namespace'] = namespace
+        return results
+
+    def search(self, namespaces: List[str], query: str, query_embedding: Optional[np.ndarray],
+               top_k: int, mode: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search several namespaces in parallel and merge their top results.
+
+        Args:
+            namespaces: Namespaces to search
+            query: Search query
+            query_embedding: Embedding of the query, computed once for every namespace
+                             (None lets each namespace encode it)
+            top_k: Number of results to return
+            mode: 'vector' or 'hybrid'
+            filters: Optional filters applied in every namespace
+
+        Returns:
+            The top_k results over all namespaces, each with a 'namespace' key and
+            its 'namespace_rank' (see merge_results)
+
+        Raises:
+            ValueError: If a namespace name is invalid or more than max_fanout are given
+        """
+        for namespace in namespaces:
+            validate_namespace(namespace)
+        namespaces = list(dict.fromkeys(namespaces))
+        if len(namespaces) > self.max_fanout:
+            raise ValueError(f"At most {self.max_fanout} namespaces can be searched at once")
+        if not namespaces:
+            return []
+
+        with self.metrics.timer('namespaces.fanout'):
+            if len(namespaces) == 1:
+                per_namespace = [self._search_one(namespaces[0], query, query_embedding, top_k, mode, filters)]
+            else:
+                per_namespace = list(self._executor.map(
+                    lambda namespace: self._search_one(namespace, query, query_embedding, top_k, mode, filters),
+                    namespaces
+                ))
+
+        return merge_results(per_namespace, top_k)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the loaded namespaces and memory use.
+
+        Returns:
+            Dictionary with per-namespace versions and sizes, budget, loads and evictions
+        """
+        loaded = {}
+        with self._lock:
+            searchers = list(self._searchers.items())
+        for namespace, searcher in searchers:
+            snapshot = searcher.snapshot
+            if snapshot is not None:
+                loaded[namespace] = {'version': snapshot.version,
+                                     'memory_mb': round(snapshot.nbytes / 1024 / 1024, 2)}
+        return {
+            'loaded': loaded,
+            'memory_used_mb': round(sum(entry['memory_mb'] for entry in loaded.values()), 2),
+            'memory_budget_mb': round(self.memory_budget / 1024 / 1024, 2),
+            'loads': self.loads,
+            'evictions': self.evictions
+        }
@@ -0,0 +1,56 @@
+import numpy as np
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows are left as they are)."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+
+def fit_projection(embeddings: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Fit a PCA projection of normalized embeddings to a lower dimension.
+
+    The projection is not centered: its components are the top eigenvectors of
+    the second-moment matrix of the normalized rows, so the dot product of two
+    projected rows is the best rank-`dimensions` approximation of their cosine
+    similarity.
+
+    Args:
+        embeddings: 2D float array of embeddings to fit on
+        dimensions: Number of components to keep
+
+    Returns:
+        Float32 component matrix of shape (embedding dimension, dimensions)
+    """
+    rows = _normalize_rows(embeddings).astype(np.float64)
+    if dimensions <= 0 or dimensions > rows.shape[1]:
+        raise ValueError(f"Cannot project {rows.shape[1]}-d embeddings to {dimensions} dimensions")
+
+    # eigh returns eigenvalues in ascending order
+    eigenvalues, eigenvectors = np.linalg.eigh(rows.T @ rows)
+    components = eigenvectors[:, ::-1][:, :dimensions]
+    explained = eigenvalues[::-1][:dimensions].sum() / max(eigenvalues.sum(), 1e-12)
+    logger.info(f"Fitted {dimensions}-d projection on {len(rows)} embeddings "
+                f"({explained:.1%} of the variance kept)")
+    return np.ascontiguousarray(components, dtype=np.float32)
+
+
+def project_embeddings(embeddings: np.ndarray, components: np.ndarray) -> np.ndarray:
+    """
+    Project embeddings (one vector or a matrix) with a fitted projection.
+
+    Args:
+        embeddings: Float embeddings, normalized before projecting
+        components: Output of fit_projection
+
+    Returns:
+        Float32 reduced embeddings
+    """
+    return np.ascontiguousarray(_normalize_rows(embeddings) @ components, dtype=np.float32)
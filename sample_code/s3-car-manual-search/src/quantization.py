@@ -0,0 +1,90 @@
+import numpy as np
+import logging
+from typing import List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DTYPES = ('float32', 'float16', 'int8')
+SCALE_MODES = ('vector', 'dimension')
+
+
+def quantize_embeddings(embeddings: np.ndarray, dtype: str = 'int8',
+                        scale_mode: str = 'vector') -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantize float embeddings for compact storage.
+
+    Args:
+        embeddings: 2D float array of embeddings
+        dtype: Target storage type ('float32', 'float16' or 'int8')
+        scale_mode: For int8, 'vector' (one scale per row) or 'dimension' (one scale per column)
+
+    Returns:
+        Tuple of (quantized array, scale factors or None)
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported storage dtype: {dtype}")
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dtype == 'float32':
+        return embeddings, None
+    if dtype == 'float16':
+        return embeddings.astype(np.float16), None
+
+    if scale_mode not in SCALE_MODES:
+        raise ValueError(f"Unsupported scale mode: {scale_mode}")
+
+    # Scales keep a broadcastable shape: (n, 1) per vector or (1, d) per dimension
+    axis = 1 if scale_mode == 'vector' else 0
+    scales = np.abs(embeddings).max(axis=axis, keepdims=True) / 127.0
+    scales[scales == 0] = 1.0
+    scales = scales.astype(np.float32)
+
+    quantized = np.clip(np.rint(embeddings / scales), -127, 127).astype(np.int8)
+    logger.info(f"Quantized embeddings {embeddings.shape} to int8 with per-{scale_mode} scales")
+    return quantized, scales
+
+
+def dequantize_embeddings(quantized: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert quantized embeddings back to float32.
+
+    Args:
+        quantized: Quantized embeddings (float16 or int8)
+        scales: Scale factors returned by quantize_embeddings (int8 only)
+
+    Returns:
+        Float32 array of embeddings
+    """
+    values = np.asarray(quantized, dtype=np.float32)
+    if scales is None:
+        return values
+    return values * scales
+
+
+def merge_embedding_parts(parts: List[np.ndarray],
+                          scale_parts: List[Optional[np.ndarray]]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Concatenate per-shard embedding matrices and their scale factors.
+    Per-dimension int8 scales differ between shards, so when several shards are
+    merged those shards are re-quantized with per-vector scales.
+
+    Args:
+        parts: Embedding matrices, one per shard
+        scale_parts: Matching scale factors (None for float formats)
+
+    Returns:
+        Tuple of (embeddings, scales or None)
+    """
+    if len(parts) == 1:
+        return parts[0], scale_parts[0]
+    if scale_parts[0] is None:
+        return np.concatenate(parts), None
+
+    merged_parts, merged_scales = [], []
+    for part, scales in zip(parts, scale_parts):
+        if scales.shape[1] != 1:
+            part, scales = quantize_embeddings(dequantize_embeddings(part, scales), 'int8', 'vector')
+        merged_parts.append(part)
+        merged_scales.append(scales.reshape(-1, 1))
+    return np.concatenate(merged_parts), np.concatenate(merged_scales)
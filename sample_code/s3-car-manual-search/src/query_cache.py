@@ -0,0 +1,64 @@
+import time
+import logging
+import numpy as np
+from typing import Callable, Optional
+
+from .lru_cache import LRUCache
+from .metrics import MetricsRegistry, NULL_METRICS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Get the cache key of a query: lower-cased with whitespace runs collapsed."""
+    return ' '.join(text.lower().split())
+
+
+class QueryEmbeddingCache(LRUCache):
+    """
+    Bounded LRU cache of query embeddings keyed by normalized query text.
+    Entries expire ttl seconds after they were stored. Vectors are kept as
+    read-only float32 arrays, so one cached vector can be handed to every caller.
+    """
+
+    def __init__(self, max_size: int, ttl: float, metrics: MetricsRegistry = NULL_METRICS,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Most queries kept (0 disables the cache)
+            ttl: Seconds an entry stays valid (0 keeps entries until evicted)
+            metrics: Registry for hit, miss and eviction counters
+            clock: Time source, in seconds
+        """
+        super().__init__(max_size, ttl, name='query_cache', metrics=metrics, clock=clock)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """
+        Look up the embedding of a query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            The cached read-only vector or None on a miss
+        """
+        return super().get(normalize_query(text))
+
+    def put(self, text: str, embedding: np.ndarray) -> np.ndarray:
+        """
+        Store the embedding of a query, evicting the least recently used entry if full.
+
+        Args:
+            text: Query text
+            embedding: Query embedding
+
+        Returns:
+            The stored read-only float32 vector
+        """
+        vector = np.array(embedding, dtype=np.float32)
+        vector.flags.writeable = False
+        super().put(normalize_query(text), vector)
+        return vector
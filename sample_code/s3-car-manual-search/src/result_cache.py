@@ -0,0 +1,160 @@
+import weakref
+import threading
+import logging
+import numpy as np
+from typing import Dict, Any, Hashable, List, Optional, Tuple
+
+from .lru_cache import LRUCache
+from .metrics import MetricsRegistry, NULL_METRICS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SemanticResultCache:
+    """
+    Cache of vector search results keyed by query embedding, so near-paraphrases
+    ("brakes squeal", "squealing brakes") reuse the matches of a recent query.
+
+    Recent query vectors are kept normalized in one small matrix; a lookup is a
+    single matrix-vector product over it, which at this size is faster than any
+    approximate index. A lookup hits when the closest vector stored under the
+    same search parameters has cosine similarity >= threshold. The least recently
+    used entry is evicted when the cache is full, and all entries are dropped when
+    results are requested for a different snapshot than they were computed on.
+    """
+
+    def __init__(self, max_size: int, threshold: float, metrics: MetricsRegistry = NULL_METRICS):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Most queries kept (0 disables the cache)
+            threshold: Minimum cosine similarity between query embeddings for a hit
+            metrics: Registry for hit and miss counters and the latency saved by hits
+        """
+        self.max_size = max_size
+        self.threshold = threshold
+        self.metrics = metrics
+        self.saved_seconds = 0.0
+        # Rows of the vector matrix in use, least recently used first, each with its
+        # (results, seconds, query)
+        self._slots = LRUCache(max_size, name='result_cache', metrics=metrics)
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._reset(0)
+
+    @property
+    def hits(self) -> int:
+        return self._slots.hits
+
+    @property
+    def misses(self) -> int:
+        return self._slots.misses
+
+    def _reset(self, dimension: int):
+        """Drop all entries; the caller holds the lock (or is __init__)."""
+        self._vectors = np.zeros((max(self.max_size, 0), dimension), dtype=np.float32)
+        self._keys: List[Optional[Hashable]] = [None] * max(self.max_size, 0)
+        self._slots.clear()
+
+    def _bind(self, snapshot: Any, dimension: int):
+        """Start over if the snapshot or the embedding dimension changed; the caller holds the lock."""
+        current = self._snapshot() if self._snapshot is not None else None
+        if current is not snapshot or self._vectors.shape[1] != dimension:
+            if len(self._slots):
+                logger.info("Search results changed, clearing the semantic result cache")
+            self._reset(dimension)
+            self._snapshot = weakref.ref(snapshot)
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def lookup(self, snapshot: Any, key: Hashable,
+               embedding: np.ndarray) -> Optional[Tuple[List[Tuple[int, float]], Optional[str]]]:
+        """
+        Find the results of a semantically equivalent recent query.
+
+        Args:
+            snapshot: Snapshot the results must have been computed on
+            key: Search parameters the results depend on (e.g. k and filters)
+            embedding: Query embedding
+
+        Returns:
+            Tuple of (cached (row, score) matches, text of the query they were computed
+            for) or None on a miss
+        """
+        if self.max_size <= 0:
+            return None
+        vector = self._normalize(embedding)
+
+        entry = None
+        with self._lock:
+            self._bind(snapshot, len(vector) if vector is not None else self._vectors.shape[1])
+            size = len(self._slots)
+            if vector is not None and size:
+                similarities = self._vectors[:size] @ vector
+                similarities[[slot_key != key for slot_key in self._keys[:size]]] = -np.inf
+                slot = int(np.argmax(similarities))
+                if similarities[slot] >= self.threshold:
+                    entry = self._slots.get(slot)
+            if entry is None:
+                self._slots.record_miss()
+            else:
+                self.saved_seconds += entry[1]
+
+        if entry is None:
+            return None
+        self.metrics.observe('result_cache.saved', entry[1])
+        return list(entry[0]), entry[2]
+
+    def store(self, snapshot: Any, key: Hashable, embedding: np.ndarray,
+              results: List[Tuple[int, float]], seconds: float, query: Optional[str] = None):
+        """
+        Remember the results of a query, evicting the least recently used entry if full.
+
+        Args:
+            snapshot: Snapshot the results were computed on
+            key: Search parameters the results depend on
+            embedding: Query embedding
+            results: (row, score) matches
+            seconds: Time the search took, reported as saved on later hits
+            query: Text of the query, reported to later hits as where their results came from
+        """
+        if self.max_size <= 0:
+            return
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        with self._lock:
+            self._bind(snapshot, len(vector))
+            # Slots fill in order and are only freed all at once, so a full cache reuses the LRU slot
+            slot = len(self._slots) if len(self._slots) < self.max_size else self._slots.pop_oldest()[0]
+            self._vectors[slot] = vector
+            self._keys[slot] = key
+            self._slots.put(slot, (list(results), seconds, query))
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._reset(self._vectors.shape[1])
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache size, hit counts and the search time saved by hits.
+
+        Returns:
+            JSON-serializable statistics dictionary
+        """
+        stats = self._slots.stats()
+        del stats['ttl_seconds']
+        stats['threshold'] = self.threshold
+        stats['saved_seconds'] = round(self.saved_seconds, 4)
+        return stats
@@ -1,34 +1,103 @@
 import boto3
+import codecs
 import json
 import numpy as np
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union
 from botocore.exceptions import ClientError, NoCredentialsError
 import io
 from config import (
     AWS_REGION, S3_BUCKET_NAME, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY,
     S3_EMBEDDINGS_PATH, S3_DATA_PATH, S3_METADATA_FILE, 
-    S3_EMBEDDINGS_FILE, S3_MANUAL_DATA_FILE
+    S3_EMBEDDINGS_FILE, S3_MANUAL_DATA_FILE, LOCAL_CACHE_DIR, S3_NAMESPACE_PREFIX,
+    S3_QUANTIZED_EMBEDDINGS_FILE, S3_QUANTIZED_SCALES_FILE,
+    EMBEDDING_STORAGE_DTYPE, QUANTIZATION_SCALE_MODE, S3_MANIFEST_FILE, S3_DOWNLOAD_CONCURRENCY,
+    UPLOAD_PART_SIZE_MB, UPLOAD_CONCURRENCY, UPLOAD_CHECKSUM_ALGORITHM, DECOMPRESSION_WORKERS
 )
+from .quantization import quantize_embeddings
+from .compression import compress_array, compress_bytes, decompress, is_compressed
+from .multipart_upload import iter_npy_parts, npy_size, upload_stream
+from .lru_cache import LRUCache
+from .metrics import MetricsRegistry, NULL_METRICS
+from .manifest import manifest_version_key
+from .section_stream import read_sections
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Namespace names become one S3 key segment
+NAMESPACE_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,127}$')
+
+# Most .npy headers kept for ranged row reads (one per embeddings artifact read)
+NPY_HEADER_CACHE_SIZE = 1024
+
+def validate_namespace(namespace: str) -> str:
+    """
+    Check that a namespace name is safe to use as an S3 key segment.
+    
+    Args:
+        namespace: Namespace name, e.g. 'sedan-2021'
+        
+    Returns:
+        The namespace name
+        
+    Raises:
+        ValueError: If the name is empty or contains other characters than
+                    letters, digits, '.', '_' and '-'
+    """
+    if not isinstance(namespace, str) or not NAMESPACE_PATTERN.match(namespace):
+        raise ValueError(f"Invalid namespace {namespace!r}: use letters, digits, '.', '_' and '-'")
+    return namespace
+
+def _file_fingerprint(stat: os.stat_result) -> str:
+    """Identify one file version by inode, size and modification time."""
+    return f"{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}"
+
 class S3VectorService:
     """
     Service for storing and retrieving embeddings and manual data from AWS S3.
     """
     
-    def __init__(self, bucket_name: str = S3_BUCKET_NAME):
+    def __init__(self, bucket_name: str = S3_BUCKET_NAME, cache_dir: Optional[str] = LOCAL_CACHE_DIR,
+                 metrics: MetricsRegistry = NULL_METRICS, namespace: Optional[str] = None,
+                 s3_client=None, executor: Optional[ThreadPoolExecutor] = None):
         """
         Initialize the S3 vector service.
         
         Args:
             bucket_name: Name of the S3 bucket to use
+            cache_dir: Local directory for cached artifacts (None or empty disables caching)
+            metrics: Registry for cache hit/miss counters and download timings
+            namespace: Manual corpus (e.g. one vehicle model) whose artifacts live under
+                       S3_NAMESPACE_PREFIX<namespace>/; None uses the bucket root
+            s3_client: Existing S3 client to share instead of creating one
+            executor: Existing pool for concurrent ranged GETs to share instead of creating one
         """
         self.bucket_name = bucket_name
-        self.s3_client = None
-        self._initialize_s3_client()
+        self.cache_dir = cache_dir or None
+        self.metrics = metrics
+        self.namespace = validate_namespace(namespace) if namespace is not None else None
+        self.key_prefix = f"{S3_NAMESPACE_PREFIX}{namespace}/" if namespace is not None else ''
+        self.s3_client = s3_client
+        self._npy_headers = LRUCache(NPY_HEADER_CACHE_SIZE)
+        # Ranged GETs of one request run concurrently on a pool kept for the service's lifetime
+        self.download_executor = executor or ThreadPoolExecutor(max_workers=S3_DOWNLOAD_CONCURRENCY,
+                                                                thread_name_prefix='s3-download')
+        
+        # Multipart upload tuning for .npy artifacts
+        self.upload_part_size = UPLOAD_PART_SIZE_MB * 1024 * 1024
+        self.upload_concurrency = UPLOAD_CONCURRENCY
+        self.upload_checksum_algorithm = UPLOAD_CHECKSUM_ALGORITHM
+        # Threads decompressing the chunks of one compressed artifact
+        self.decompression_workers = DECOMPRESSION_WORKERS
+        
+        if self.s3_client is None:
+            self._initialize_s3_client()
     
     def _initialize_s3_client(self):
         """Initialize the S3 client with credentials."""
@@ -92,32 +161,160 @@ class S3VectorService:
                 logger.error(f"Error checking bucket: {e}")
                 return False
     
-    def upload_embeddings(self, embeddings: np.ndarray, key: str = S3_EMBEDDINGS_FILE) -> bool:
+    def object_key(self, key: str) -> str:
+        """
+        Map an artifact key to its S3 object key in this namespace. Artifact keys
+        (manifests included) are relative to the namespace, so the indexer and
+        the snapshot loader work the same way in every namespace.
+        
+        Args:
+            key: Artifact key, e.g. embeddings/manifest.json
+            
+        Returns:
+            S3 object key
+        """
+        return self.key_prefix + key
+    
+    def _cache_paths(self, key: str) -> Tuple[str, str]:
+        """
+        Get local paths for a cached object and its ETag sidecar.
+        
+        Args:
+            key: S3 key of the object
+            
+        Returns:
+            Tuple of (data path, etag path)
+        """
+        data_path = os.path.join(self.cache_dir, self.bucket_name, self.object_key(key).replace('/', '__'))
+        return data_path, data_path + '.etag'
+    
+    def _cached_etag(self, data_path: str, etag_path: str) -> Optional[str]:
+        """
+        Get the ETag of a cached copy. The sidecar names the data file it was
+        written for (inode, size and modification time); if the data file was
+        replaced since, by another writer or before a crash, it is ignored.
+        
+        Args:
+            data_path: Local path of the cached object
+            etag_path: Local path of its ETag sidecar
+            
+        Returns:
+            ETag of the bytes at data_path or None if it is unknown
+        """
+        try:
+            with open(etag_path, 'r', encoding='utf-8') as file:
+                etag, _, fingerprint = file.read().partition('\n')
+            stat = os.stat(data_path)
+        except OSError:
+            return None
+        if fingerprint.strip() != _file_fingerprint(stat):
+            return None
+        return etag.strip() or None
+    
+    def fetch_to_cache(self, key: str) -> Optional[str]:
+        """
+        Make sure an up-to-date copy of an S3 object exists in the local cache.
+        A cached copy is revalidated with a conditional GET (If-None-Match), so
+        unchanged objects are never downloaded twice.
+        
+        Args:
+            key: S3 key of the object
+            
+        Returns:
+            Local file path of the cached object or None if the object does not exist
+        """
+        data_path, etag_path = self._cache_paths(key)
+        cached_etag = self._cached_etag(data_path, etag_path)
+        
+        request = {'Bucket': self.bucket_name, 'Key': self.object_key(key)}
+        if cached_etag:
+            request['IfNoneMatch'] = cached_etag
+        
+        try:
+            with self.metrics.timer('s3.get'):
+                response = self.s3_client.get_object(**request)
+        except ClientError as e:
+            error_code = e.response['Error']['Code']
+            if error_code in ('304', 'NotModified'):
+                self.metrics.increment('s3_cache.hits')
+                logger.info(f"Cache hit for s3://{self.bucket_name}/{self.object_key(key)} (ETag {cached_etag})")
+                return data_path
+            if error_code == 'NoSuchKey':
+                logger.warning(f"Object not found: {key}")
+                return None
+            raise
+        
+        self.metrics.increment('s3_cache.misses')
+        
+        # Write to a private temp file and rename, so readers never see a partial file.
+        # The sidecar is bound to this file (a rename keeps its inode and times), so
+        # if another writer's rename lands in between, the pair no longer matches
+        # and the next fetch downloads again instead of trusting a foreign ETag
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(data_path + suffix, 'wb') as file:
+            shutil.copyfileobj(response['Body'], file, 1024 * 1024)
+        fingerprint = _file_fingerprint(os.stat(data_path + suffix))
+        os.replace(data_path + suffix, data_path)
+        
+        with open(etag_path + suffix, 'w', encoding='utf-8') as file:
+            file.write(f"{response.get('ETag', '')}\n{fingerprint}")
+        os.replace(etag_path + suffix, etag_path)
+        
+        logger.info(f"Cached s3://{self.bucket_name}/{self.object_key(key)} at {data_path}")
+        return data_path
+    
+    def _decompress(self, data: bytes, key: str) -> np.ndarray:
         """
-        Upload embeddings array to S3.
+        Decompress a compressed artifact with parallel chunk decompression.
+        
+        Args:
+            data: Compressed frame
+            key: S3 key of the artifact (for logging)
+            
+        Returns:
+            Decompressed array (uint8 for compressed bytes)
+        """
+        with self.metrics.timer('s3.decompress'):
+            result = decompress(data, self.decompression_workers)
+        logger.info(f"Decompressed s3://{self.bucket_name}/{self.object_key(key)}: {len(data)} -> {result.nbytes} bytes")
+        return result
+    
+    def upload_embeddings(self, embeddings: np.ndarray, key: str = S3_EMBEDDINGS_FILE,
+                          codec: Optional[str] = None) -> bool:
+        """
+        Upload embeddings array to S3 as .npy, using a multipart upload when it
+        is larger than one part.
         
         Args:
             embeddings: Numpy array of embeddings
             key: S3 key for the embeddings file
+            codec: Compress the array with this codec instead of writing .npy
+                   (compressed arrays cannot be read by row range)
             
         Returns:
             True if upload successful
         """
+        if codec:
+            self._npy_headers.pop(key)
+            return self.upload_bytes(compress_array(embeddings, codec), key)
+        
         try:
-            # Convert numpy array to bytes
-            buffer = io.BytesIO()
-            np.save(buffer, embeddings)
-            buffer.seek(0)
-            
-            # Upload to S3
-            self.s3_client.upload_fileobj(
-                buffer, 
-                self.bucket_name, 
-                key,
-                ExtraArgs={'ContentType': 'application/octet-stream'}
+            # Stream the .npy header and rows straight into the upload,
+            # without serializing the whole matrix in memory first
+            upload_stream(
+                self.s3_client,
+                self.bucket_name,
+                self.object_key(key),
+                iter_npy_parts(embeddings, self.upload_part_size),
+                total_size=npy_size(embeddings),
+                part_size=self.upload_part_size,
+                max_workers=self.upload_concurrency,
+                checksum_algorithm=self.upload_checksum_algorithm
             )
+            self._npy_headers.pop(key)
             
-            logger.info(f"Uploaded embeddings to s3://{self.bucket_name}/{key}")
+            logger.info(f"Uploaded embeddings to s3://{self.bucket_name}/{self.object_key(key)}")
             return True
             
         except Exception as e:
@@ -135,14 +332,31 @@ class S3VectorService:
             Numpy array of embeddings or None if error
         """
         try:
-            # Download from S3
-            buffer = io.BytesIO()
-            self.s3_client.download_fileobj(self.bucket_name, key, buffer)
-            buffer.seek(0)
-            
-            # Load numpy array
-            embeddings = np.load(buffer)
-            logger.info(f"Downloaded embeddings from s3://{self.bucket_name}/{key}, shape: {embeddings.shape}")
+            if self.cache_dir:
+                # Memory-map the cached file so processes share the page cache
+                path = self.fetch_to_cache(key)
+                if path is None:
+                    return None
+                with open(path, 'rb') as file:
+                    compressed = is_compressed(file.read(16))
+                if compressed:
+                    with open(path, 'rb') as file:
+                        embeddings = self._decompress(file.read(), key)
+                else:
+                    embeddings = np.load(path, mmap_mode='r')
+            else:
+                # Download from S3
+                buffer = io.BytesIO()
+                self.s3_client.download_fileobj(self.bucket_name, self.object_key(key), buffer)
+                
+                # Load numpy array
+                if is_compressed(buffer.getbuffer()):
+                    embeddings = self._decompress(buffer.getbuffer(), key)
+                else:
+                    buffer.seek(0)
+                    embeddings = np.load(buffer)
+            
+            logger.info(f"Downloaded embeddings from s3://{self.bucket_name}/{self.object_key(key)}, shape: {embeddings.shape}")
             return embeddings
             
         except ClientError as e:
@@ -155,6 +369,292 @@ class S3VectorService:
             logger.error(f"Error loading embeddings: {e}")
             return None
     
+    def map_embeddings(self, key: str = S3_EMBEDDINGS_FILE) -> Optional[np.ndarray]:
+        """
+        Memory-map the locally cached copy of an uncompressed embeddings file,
+        so single rows can be read without holding the matrix in memory.
+        
+        Args:
+            key: S3 key for the embeddings file
+            
+        Returns:
+            Read-only memory-mapped array, or None if no local cache is configured,
+            the file does not exist or it is compressed
+        """
+        if not self.cache_dir:
+            return None
+        
+        try:
+            path = self.fetch_to_cache(key)
+            if path is None:
+                return None
+            with open(path, 'rb') as file:
+                if is_compressed(file.read(16)):
+                    logger.warning(f"s3://{self.bucket_name}/{self.object_key(key)} is compressed and cannot be mapped")
+                    return None
+            return np.load(path, mmap_mode='r')
+            
+        except Exception as e:
+            logger.error(f"Error mapping embeddings: {e}")
+            return None
+    
+    def upload_quantized_embeddings(self, embeddings: np.ndarray,
+                                    dtype: str = EMBEDDING_STORAGE_DTYPE,
+                                    scale_mode: str = QUANTIZATION_SCALE_MODE,
+                                    key: Optional[str] = None,
+                                    scales_key: Optional[str] = None,
+                                    codec: Optional[str] = None) -> bool:
+        """
+        Upload a quantized copy of the embeddings (and its scale factors) to S3.
+        
+        Args:
+            embeddings: Float32 numpy array of embeddings
+            dtype: Storage type ('float16' or 'int8')
+            scale_mode: Int8 scale granularity ('vector' or 'dimension')
+            key: S3 key for the quantized matrix (defaults to the single-file layout)
+            scales_key: S3 key for the scale factors (defaults to the single-file layout)
+            codec: Compress both arrays with this codec
+            
+        Returns:
+            True if upload successful
+        """
+        try:
+            quantized, scales = quantize_embeddings(embeddings, dtype, scale_mode)
+        except Exception as e:
+            logger.error(f"Error quantizing embeddings: {e}")
+            return False
+        
+        key = key or S3_QUANTIZED_EMBEDDINGS_FILE.format(dtype=dtype)
+        scales_key = scales_key or S3_QUANTIZED_SCALES_FILE.format(dtype=dtype)
+        
+        if not self.upload_embeddings(quantized, key, codec):
+            return False
+        if scales is not None:
+            return self.upload_embeddings(scales, scales_key, codec)
+        return True
+    
+    def download_quantized_embeddings(self, dtype: str = EMBEDDING_STORAGE_DTYPE,
+                                      key: Optional[str] = None,
+                                      scales_key: Optional[str] = None) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        """
+        Download a quantized embeddings matrix and its scale factors from S3.
+        
+        Args:
+            dtype: Storage type ('float16' or 'int8')
+            key: S3 key for the quantized matrix (defaults to the single-file layout)
+            scales_key: S3 key for the scale factors (defaults to the single-file layout)
+            
+        Returns:
+            Tuple of (quantized embeddings, scales or None) or None if error
+        """
+        quantized = self.download_embeddings(key or S3_QUANTIZED_EMBEDDINGS_FILE.format(dtype=dtype))
+        if quantized is None:
+            return None
+        
+        scales = None
+        if quantized.dtype == np.int8:
+            scales = self.download_embeddings(scales_key or S3_QUANTIZED_SCALES_FILE.format(dtype=dtype))
+            if scales is None:
+                return None
+        return quantized, scales
+    
+    def _read_npy_header(self, key: str) -> Tuple[int, np.dtype, Tuple[int, ...], str]:
+        """
+        Read the header of a .npy object with a ranged GET.
+        
+        Args:
+            key: S3 key of the .npy file
+            
+        Returns:
+            Tuple of (data offset, dtype, shape, ETag of the object the header was read from)
+        """
+        header = self._npy_headers.get(key)
+        if header is None:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.object_key(key), Range='bytes=0-4095')
+            buffer = io.BytesIO(response['Body'].read())
+            version = np.lib.format.read_magic(buffer)
+            if version == (1, 0):
+                shape, _, dtype = np.lib.format.read_array_header_1_0(buffer)
+            else:
+                shape, _, dtype = np.lib.format.read_array_header_2_0(buffer)
+            header = (buffer.tell(), dtype, shape, response.get('ETag'))
+            self._npy_headers.put(key, header)
+        return header
+    
+    def download_embedding_rows(self, row_ids: np.ndarray, key: str = S3_EMBEDDINGS_FILE) -> Optional[np.ndarray]:
+        """
+        Download selected rows of an embeddings file with ranged GETs.
+        Adjacent rows are coalesced into one request and requests run concurrently.
+        Headers are cached per key together with their ETag; if the object was
+        rewritten since (another process replaced it), the header is read again.
+        
+        Args:
+            row_ids: Sorted, unique row indices
+            key: S3 key for the embeddings file
+            
+        Returns:
+            Numpy array with one row per requested index or None if error
+        """
+        try:
+            row_ids = np.asarray(row_ids, dtype=np.int64)
+            for _ in range(2):
+                offset, dtype, shape, etag = self._read_npy_header(key)
+                if len(row_ids) == 0:
+                    return np.empty((0, shape[1]), dtype=dtype)
+                row_bytes = dtype.itemsize * shape[1]
+                
+                # Split the ids into runs of consecutive rows
+                breaks = np.flatnonzero(np.diff(row_ids) != 1) + 1
+                runs = [(int(run[0]), int(run[-1])) for run in np.split(row_ids, breaks)]
+                
+                def fetch(run: Tuple[int, int]) -> Tuple[str, np.ndarray]:
+                    start = offset + run[0] * row_bytes
+                    end = offset + (run[1] + 1) * row_bytes - 1
+                    response = self.s3_client.get_object(
+                        Bucket=self.bucket_name, Key=self.object_key(key), Range=f"bytes={start}-{end}"
+                    )
+                    return response.get('ETag'), response['Body'].read()
+                
+                blocks = [fetch(runs[0])] if len(runs) == 1 else list(self.download_executor.map(fetch, runs))
+                
+                if all(block_etag == etag for block_etag, _ in blocks):
+                    return np.concatenate([np.frombuffer(data, dtype=dtype).reshape(-1, shape[1])
+                                           for _, data in blocks])
+                logger.info(f"s3://{self.bucket_name}/{self.object_key(key)} changed, re-reading its header")
+                self._npy_headers.pop(key)
+            
+            logger.error(f"s3://{self.bucket_name}/{self.object_key(key)} kept changing while reading rows")
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error downloading embedding rows: {e}")
+            return None
+    
+    def upload_bytes(self, data: bytes, key: str, content_type: str = 'application/octet-stream',
+                     codec: Optional[str] = None) -> bool:
+        """
+        Upload raw bytes to S3.
+        
+        Args:
+            data: Bytes to upload
+            key: S3 key for the object
+            content_type: Content type of the object
+            codec: Compress the bytes with this codec
+            
+        Returns:
+            True if upload successful
+        """
+        try:
+            if codec:
+                data = compress_bytes(data, codec)
+            
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.object_key(key),
+                Body=data,
+                ContentType=content_type
+            )
+            
+            logger.info(f"Uploaded {len(data)} bytes to s3://{self.bucket_name}/{self.object_key(key)}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error uploading object: {e}")
+            return False
+    
+    def download_bytes(self, key: str) -> Optional[bytes]:
+        """
+        Download raw bytes from S3.
+        
+        Args:
+            key: S3 key for the object
+            
+        Returns:
+            Object bytes or None if error
+        """
+        try:
+            if self.cache_dir:
+                path = self.fetch_to_cache(key)
+                if path is None:
+                    return None
+                with open(path, 'rb') as file:
+                    data = file.read()
+            else:
+                response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.object_key(key))
+                data = response['Body'].read()
+            
+            if is_compressed(data):
+                return self._decompress(data, key).tobytes()
+            return data
+            
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchKey':
+                logger.warning(f"Object not found: {key}")
+            else:
+                logger.error(f"Error downloading object: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error reading object: {e}")
+            return None
+    
+    def download_buffer(self, key: str) -> Optional[Union[bytes, np.ndarray]]:
+        """
+        Download an object as a read-only buffer for zero-copy array views.
+        
+        Args:
+            key: S3 key for the object
+            
+        Returns:
+            Memory-mapped uint8 array of the cached copy when a local cache is
+            configured (decompressed into memory if the object is compressed),
+            otherwise the object bytes; None if error
+        """
+        if not self.cache_dir:
+            return self.download_bytes(key)
+        
+        try:
+            path = self.fetch_to_cache(key)
+            if path is None:
+                return None
+            buffer = np.memmap(path, dtype=np.uint8, mode='r')
+            if is_compressed(buffer):
+                return self._decompress(buffer, key)
+            return buffer
+            
+        except Exception as e:
+            logger.error(f"Error mapping object: {e}")
+            return None
+    
+    def download_byte_ranges(self, key: str, ranges: List[Tuple[int, int]]) -> Optional[List[bytes]]:
+        """
+        Download byte ranges of an object with concurrent ranged GETs.
+        
+        Args:
+            key: S3 key for the object
+            ranges: (start, end) byte offsets, end exclusive
+        
+        Returns:
+            Bytes of every range, in order, or None if error
+        """
+        try:
+            if not ranges:
+                return []
+            
+            def fetch(byte_range: Tuple[int, int]) -> bytes:
+                with self.metrics.timer('s3.get'):
+                    response = self.s3_client.get_object(
+                        Bucket=self.bucket_name, Key=self.object_key(key), Range=f"bytes={byte_range[0]}-{byte_range[1] - 1}"
+                    )
+                    return response['Body'].read()
+            
+            if len(ranges) == 1:
+                return [fetch(ranges[0])]
+            return list(self.download_executor.map(fetch, ranges))
+        
+        except Exception as e:
+            logger.error(f"Error downloading byte ranges of {key}: {e}")
+            return None
+    
     def upload_json_data(self, data: Dict[str, Any], key: str) -> bool:
         """
         Upload JSON data to S3.
@@ -171,12 +671,12 @@ class S3VectorService:
             
             self.s3_client.put_object(
                 Bucket=self.bucket_name,
-                Key=key,
+                Key=self.object_key(key),
                 Body=json_string,
                 ContentType='application/json'
             )
             
-            logger.info(f"Uploaded JSON data to s3://{self.bucket_name}/{key}")
+            logger.info(f"Uploaded JSON data to s3://{self.bucket_name}/{self.object_key(key)}")
             return True
             
         except Exception as e:
@@ -194,11 +694,18 @@ class S3VectorService:
             Dictionary with JSON data or None if error
         """
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=key)
-            json_string = response['Body'].read().decode('utf-8')
-            data = json.loads(json_string)
+            if self.cache_dir:
+                path = self.fetch_to_cache(key)
+                if path is None:
+                    return None
+                with open(path, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+            else:
+                # json.load reads the whole body first; sections go through download_sections
+                response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.object_key(key))
+                data = json.load(response['Body'])
             
-            logger.info(f"Downloaded JSON data from s3://{self.bucket_name}/{key}")
+            logger.info(f"Downloaded JSON data from s3://{self.bucket_name}/{self.object_key(key)}")
             return data
             
         except ClientError as e:
@@ -211,6 +718,42 @@ class S3VectorService:
             logger.error(f"Error parsing JSON data: {e}")
             return None
     
+    def download_sections(self, key: str = S3_MANUAL_DATA_FILE) -> Optional[List[Dict[str, Any]]]:
+        """
+        Download a sections file ({"sections": [...]}), decoding one section at a
+        time from the cached file or the response stream, so the raw JSON is
+        never held in memory next to the parsed sections.
+        
+        Args:
+            key: S3 key for the sections file
+            
+        Returns:
+            List of sections or None if error
+        """
+        try:
+            if self.cache_dir:
+                path = self.fetch_to_cache(key)
+                if path is None:
+                    return None
+                with open(path, 'r', encoding='utf-8') as file:
+                    sections = list(read_sections(file))
+            else:
+                response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.object_key(key))
+                sections = list(read_sections(codecs.getreader('utf-8')(response['Body'])))
+            
+            logger.info(f"Downloaded {len(sections)} sections from s3://{self.bucket_name}/{self.object_key(key)}")
+            return sections
+            
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchKey':
+                logger.warning(f"Sections file not found: {key}")
+            else:
+                logger.error(f"Error downloading sections: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error parsing sections: {e}")
+            return None
+    
     def upload_manual_data(self, manual_sections: List[Dict[str, Any]]) -> bool:
         """
         Upload car manual sections to S3.
@@ -231,10 +774,7 @@ class S3VectorService:
         Returns:
             List of manual sections or None if error
         """
-        data = self.download_json_data(S3_MANUAL_DATA_FILE)
-        if data:
-            return data.get('sections', [])
-        return None
+        return self.download_sections(S3_MANUAL_DATA_FILE)
     
     def upload_metadata(self, metadata: List[Dict[str, Any]]) -> bool:
         """
@@ -261,6 +801,36 @@ class S3VectorService:
             return data.get('metadata', [])
         return None
     
+    def upload_manifest(self, manifest: Dict[str, Any]) -> bool:
+        """
+        Publish the artifact manifest. An immutable copy is written under its
+        version first, then the current-manifest object is replaced, so readers
+        switch to the new shards in a single step.
+        
+        Args:
+            manifest: Manifest dictionary
+            
+        Returns:
+            True if upload successful
+        """
+        if not self.upload_json_data(manifest, manifest_version_key(manifest['version'])):
+            return False
+        return self.upload_json_data(manifest, S3_MANIFEST_FILE)
+    
+    def download_manifest(self, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Download the artifact manifest.
+        
+        Args:
+            version: Manifest version to download (defaults to the current one)
+        
+        Returns:
+            Manifest dictionary or None if no manifest has been published
+        """
+        if version is None:
+            return self.download_json_data(S3_MANIFEST_FILE)
+        return self.download_json_data(manifest_version_key(version))
+    
     def list_bucket_contents(self, prefix: str = "") -> List[str]:
         """
         List contents of the S3 bucket.
@@ -269,17 +839,17 @@ class S3VectorService:
             prefix: Prefix to filter objects
             
         Returns:
-            List of object keys
+            List of object keys (relative to the namespace)
         """
         try:
             response = self.s3_client.list_objects_v2(
                 Bucket=self.bucket_name,
-                Prefix=prefix
+                Prefix=self.object_key(prefix)
             )
             
             objects = []
             if 'Contents' in response:
-                objects = [obj['Key'] for obj in response['Contents']]
+                objects = [obj['Key'][len(self.key_prefix):] for obj in response['Contents']]
             
             logger.info(f"Found {len(objects)} objects with prefix '{prefix}'")
             return objects
@@ -288,6 +858,29 @@ class S3VectorService:
             logger.error(f"Error listing bucket contents: {e}")
             return []
     
+    def list_namespaces(self) -> List[str]:
+        """
+        List the namespaces stored in the bucket.
+        
+        Returns:
+            Sorted namespace names
+        """
+        try:
+            namespaces = []
+            request = {'Bucket': self.bucket_name, 'Prefix': S3_NAMESPACE_PREFIX, 'Delimiter': '/'}
+            while True:
+                response = self.s3_client.list_objects_v2(**request)
+                namespaces.extend(
+                    entry['Prefix'][len(S3_NAMESPACE_PREFIX):-1] for entry in response.get('CommonPrefixes', [])
+                )
+                if not response.get('IsTruncated'):
+                    return sorted(namespaces)
+                request['ContinuationToken'] = response['NextContinuationToken']
+            
+        except Exception as e:
+            logger.error(f"Error listing namespaces: {e}")
+            return []
+    
     def delete_object(self, key: str) -> bool:
         """
         Delete an object from S3.
@@ -299,18 +892,22 @@ class S3VectorService:
             True if deletion successful
         """
         try:
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
-            logger.info(f"Deleted object: s3://{self.bucket_name}/{key}")
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=self.object_key(key))
+            logger.info(f"Deleted object: s3://{self.bucket_name}/{self.object_key(key)}")
             return True
             
         except Exception as e:
             logger.error(f"Error deleting object: {e}")
             return False
     
-    def check_connection(self) -> Dict[str, Any]:
+    def check_connection(self, check_write: bool = True) -> Dict[str, Any]:
         """
         Check S3 connection and bucket access.
         
+        Args:
+            check_write: Whether to test write access with a put and delete of a test
+                         object (can_write is None when skipped)
+        
         Returns:
             Dictionary with connection status
         """
@@ -318,7 +915,7 @@ class S3VectorService:
             "connected": False,
             "bucket_exists": False,
             "can_read": False,
-            "can_write": False,
+            "can_write": False if check_write else None,
             "error": None
         }
         
@@ -340,6 +937,8 @@ class S3VectorService:
                     pass
                 
                 # Test write access
+                if not check_write:
+                    return status
                 try:
                     test_key = "test_connection.txt"
                     self.s3_client.put_object(
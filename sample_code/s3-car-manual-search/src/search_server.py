@@ -0,0 +1,423 @@
+import json
+import time
+import asyncio
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+from .search_service import SearchService
+from .s3_vector_service import validate_namespace
+from .section_index import validate_filters
+from config import (
+    MAX_SEARCH_RESULTS, SEARCH_MODE, SERVER_HOST, SERVER_PORT,
+    BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, SERVER_QUEUE_SIZE, SERVER_NAMESPACE_WORKERS
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ('vector', 'hybrid')
+MAX_TOP_K = 50
+MAX_BODY_BYTES = 64 * 1024
+
+HTTP_REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'
+}
+
+
+class MicroBatcher:
+    """
+    Collects concurrent search requests into micro-batches for SearchService.search_batch.
+    A batch is dispatched once max_batch_size requests are waiting or max_wait_ms
+    after its first request, and runs on a worker thread so the event loop keeps
+    accepting requests. While a batch runs, new requests queue up and form the
+    next one, so batches grow with load. The queue is bounded: submit raises
+    asyncio.QueueFull instead of letting latency grow without limit.
+    """
+
+    def __init__(self, search_service: SearchService, max_batch_size: int = BATCH_MAX_SIZE,
+                 max_wait_ms: float = BATCH_MAX_WAIT_MS, queue_size: int = SERVER_QUEUE_SIZE):
+        """
+        Initialize the batcher.
+
+        Args:
+            search_service: Service running the batches
+            max_batch_size: Most queries per batch
+            max_wait_ms: Longest wait for a batch to fill after its first request
+            queue_size: Most requests waiting for a batch
+        """
+        self.search_service = search_service
+        self.metrics = search_service.metrics
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue_size = queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='search-batch')
+        self._task = None
+
+    def start(self):
+        """Start dispatching batches (call from the event loop)."""
+        self.queue = asyncio.Queue(self.queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop dispatching and fail the requests still waiting."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        while self.queue is not None and not self.queue.empty():
+            request = self.queue.get_nowait()
+            if not request['future'].done():
+                request['future'].set_exception(RuntimeError("Search server stopped"))
+        self._executor.shutdown(wait=True)
+
+    @property
+    def depth(self) -> int:
+        """Number of requests waiting for a batch."""
+        return self.queue.qsize() if self.queue is not None else 0
+
+    async def search(self, query: str, top_k: int = MAX_SEARCH_RESULTS, mode: str = SEARCH_MODE,
+                     filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search as part of the next micro-batch.
+
+        Args:
+            query: Search query
+            top_k: Number of results
+            mode: 'vector' or 'hybrid'
+            filters: Optional search filters
+
+        Returns:
+            Search results, as SearchService.search returns
+
+        Raises:
+            asyncio.QueueFull: If too many requests are already waiting
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait({
+            'query': query, 'top_k': top_k, 'mode': mode, 'filters': filters,
+            'future': future, 'enqueued_at': time.perf_counter()
+        })
+        return await future
+
+    async def _collect(self) -> List[Dict[str, Any]]:
+        """Wait for the next batch of requests."""
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            for request in batch:
+                self.metrics.observe('server.queue_wait', started - request['enqueued_at'])
+
+            # Queries of one batch call share top_k, mode and filters
+            groups: Dict[Tuple[int, str, str], List[Dict[str, Any]]] = {}
+            for request in batch:
+                key = (request['top_k'], request['mode'], json.dumps(request['filters'], sort_keys=True))
+                groups.setdefault(key, []).append(request)
+
+            for (top_k, mode, _), requests in groups.items():
+                queries = [request['query'] for request in requests]
+                try:
+                    results = await loop.run_in_executor(
+                        self._executor, self.search_service.search_batch,
+                        queries, top_k, mode, requests[0]['filters']
+                    )
+                except Exception as e:
+                    logger.error(f"Error running search batch: {e}")
+                    results = [e] * len(requests)
+
+                for request, result in zip(requests, results):
+                    # The caller may have disconnected in the meantime
+                    if request['future'].done():
+                        continue
+                    if isinstance(result, Exception):
+                        request['future'].set_exception(result)
+                    else:
+                        request['future'].set_result(result)
+
+
+def _json_default(value):
+    """Convert numpy scalars and arrays in search results to JSON types."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class SearchServer:
+    """
+    Minimal asyncio HTTP/1.1 server for the search service.
+
+    Endpoints:
+        GET  /search?q=...&top_k=5&mode=vector&category=Brakes&namespaces=sedan-2021,suv-2022
+        POST /search  {"query": ..., "top_k": 5, "mode": "vector", "filters": {...}, "namespaces": [...]}
+        GET  /health
+        GET  /metrics
+    """
+
+    def __init__(self, search_service: Optional[SearchService] = None, host: str = SERVER_HOST,
+                 port: int = SERVER_PORT, max_batch_size: int = BATCH_MAX_SIZE,
+                 max_wait_ms: float = BATCH_MAX_WAIT_MS, queue_size: int = SERVER_QUEUE_SIZE,
+                 namespace_workers: int = SERVER_NAMESPACE_WORKERS):
+        """
+        Initialize the server.
+
+        Args:
+            search_service: Service to serve (created if None)
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            max_batch_size: Most queries per micro-batch
+            max_wait_ms: Longest wait for a micro-batch to fill
+            queue_size: Most requests waiting for a micro-batch, and most namespaced
+                        requests running or waiting
+            namespace_workers: Threads running namespaced requests
+        """
+        self.search_service = search_service or SearchService()
+        self.host = host
+        self.port = port
+        self.batcher = MicroBatcher(self.search_service, max_batch_size, max_wait_ms, queue_size)
+        self.queue_size = queue_size
+        self.namespace_pending = 0
+        self._namespace_executor = ThreadPoolExecutor(max_workers=namespace_workers,
+                                                      thread_name_prefix='namespace-request')
+        self._server = None
+
+    async def start(self):
+        """Load the search data, then start accepting connections."""
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, self.search_service._load_data_from_s3):
+            logger.warning("Search data not loaded; queries will use the keyword fallback")
+        self.search_service.start_refresher()
+        self.search_service.start_health_monitor()
+
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Search server listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        """Start the server and serve until cancelled."""
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Stop accepting connections and shut down background work."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.stop()
+        self._namespace_executor.shutdown(wait=True)
+        self.search_service.stop_refresher()
+        self.search_service.stop_health_monitor()
+        logger.info("Search server stopped")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                if 'error' in request:
+                    status, payload = request['error']
+                else:
+                    status, payload = await self._route(request)
+
+                keep_alive = request.get('keep_alive', False)
+                await self._write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Error handling connection: {e}")
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+        """Read one HTTP request; None when the client closed the connection."""
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            return {'error': (400, {'error': 'Malformed request line'})}
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return {'error': (400, {'error': 'Invalid Content-Length'}), 'keep_alive': False}
+        if length > MAX_BODY_BYTES:
+            return {'error': (413, {'error': 'Request body too large'}), 'keep_alive': False}
+        body = await reader.readexactly(length) if length else b''
+
+        url = urlsplit(target)
+        return {
+            'method': method.upper(),
+            'path': url.path,
+            'params': {name: values[-1] for name, values in parse_qs(url.query).items()},
+            'body': body,
+            'keep_alive': keep_alive
+        }
+
+    async def _write_response(self, writer: asyncio.StreamWriter, status: int,
+                              payload: Dict[str, Any], keep_alive: bool):
+        body = json.dumps(payload, default=_json_default).encode('utf-8')
+        headers = [
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        if status == 503:
+            headers.append("Retry-After: 1")
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def _route(self, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Dispatch a request to its endpoint; returns (status, JSON payload)."""
+        path, method = request['path'], request['method']
+        if path == '/search':
+            if method not in ('GET', 'POST'):
+                return 405, {'error': 'Use GET or POST'}
+            return await self._search(request)
+        if method != 'GET':
+            return (405, {'error': 'Use GET'}) if path in ('/health', '/metrics') else (404, {'error': 'Not found'})
+        if path == '/health':
+            snapshot = self.search_service.snapshot
+            payload = {
+                'status': 'ok' if snapshot is not None else 'degraded',
+                'snapshot_version': snapshot.version if snapshot is not None else None,
+                'queue_depth': self.batcher.depth
+            }
+            return 200, payload
+        if path == '/metrics':
+            metrics = self.search_service.get_metrics_snapshot()
+            metrics['queue_depth'] = self.batcher.depth
+            metrics['namespace_pending'] = self.namespace_pending
+            return 200, metrics
+        return 404, {'error': 'Not found'}
+
+    def _parse_search(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Read the search arguments of a request.
+
+        Raises:
+            ValueError: If an argument is missing or invalid
+        """
+        if request['method'] == 'POST':
+            try:
+                params = json.loads(request['body'] or b'{}')
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON body: {e}")
+            if not isinstance(params, dict):
+                raise ValueError("JSON body must be an object")
+            query = params.get('query')
+            filters = params.get('filters')
+            namespaces = params.get('namespaces')
+        else:
+            params = request['params']
+            query = params.get('q', params.get('query'))
+            filters = {'category': params['category']} if params.get('category') else None
+            namespaces = params['namespaces'].split(',') if params.get('namespaces') else None
+
+        if not isinstance(query, str) or not query.strip():
+            raise ValueError("Missing query")
+        try:
+            top_k = int(params.get('top_k', MAX_SEARCH_RESULTS))
+        except (TypeError, ValueError):
+            raise ValueError("top_k must be an integer")
+        if not 1 <= top_k <= MAX_TOP_K:
+            raise ValueError(f"top_k must be between 1 and {MAX_TOP_K}")
+        mode = params.get('mode', SEARCH_MODE)
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode must be one of {', '.join(SEARCH_MODES)}")
+        validate_filters(filters)
+        if namespaces is not None:
+            if not isinstance(namespaces, list) or not namespaces:
+                raise ValueError("namespaces must be a non-empty list")
+            for namespace in namespaces:
+                validate_namespace(namespace)
+            if len(set(namespaces)) > self.search_service.namespaces.max_fanout:
+                raise ValueError(f"At most {self.search_service.namespaces.max_fanout} namespaces per query")
+        return {'query': query, 'top_k': top_k, 'mode': mode, 'filters': filters or None, 'namespaces': namespaces}
+
+    async def _search(self, request: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        try:
+            args = self._parse_search(request)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+
+        namespaces = args.pop('namespaces')
+        try:
+            with self.search_service.metrics.timer('server.request'):
+                if namespaces is None:
+                    results = await self.batcher.search(**args)
+                else:
+                    results = await self._search_namespaces(namespaces, **args)
+        except asyncio.QueueFull:
+            self.search_service.metrics.increment('server.rejected')
+            return 503, {'error': 'Server overloaded, retry later'}
+        except Exception as e:
+            logger.error(f"Error serving search: {e}")
+            return 500, {'error': 'Search failed'}
+
+        return 200, {'query': args['query'], 'count': len(results), 'results': results}
+
+    async def _search_namespaces(self, namespaces: List[str], query: str, top_k: int, mode: str,
+                                 filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Run a namespaced query. These fan out per namespace instead of joining a
+        batch, so they run on their own bounded pool.
+
+        Raises:
+            asyncio.QueueFull: If queue_size namespaced requests are already pending
+        """
+        if self.namespace_pending >= self.queue_size:
+            raise asyncio.QueueFull()
+        self.namespace_pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._namespace_executor, self.search_service.search_namespaces,
+                query, namespaces, top_k, mode, filters
+            )
+        finally:
+            self.namespace_pending -= 1
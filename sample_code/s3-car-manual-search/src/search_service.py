@@ -1,37 +1,98 @@
-import numpy as np
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from typing import List, Dict, Any, Optional
 from .manual_processor import ManualProcessor
 from .embedding_service import EmbeddingService
 from .s3_vector_service import S3VectorService
-from config import MAX_SEARCH_RESULTS, SIMILARITY_THRESHOLD
+from .incremental_indexer import IncrementalIndexer
+from .search_snapshot import SearchSnapshot, SnapshotRefresher
+from .snapshot_searcher import SnapshotSearcher
+from .metrics import MetricsRegistry
+from .health_monitor import HealthMonitor
+from .model_registry import MODEL_REGISTRY
+from .result_cache import SemanticResultCache
+from .section_store import SectionCache
+from .lru_cache import LRUCache
+from .namespaces import NamespacePool
+from .section_index import validate_filters
+from config import (
+    MAX_SEARCH_RESULTS, EMBEDDING_STORAGE_DTYPE, SEARCH_MODE, SNAPSHOT_REFRESH_INTERVAL, PASSAGE_MODE,
+    METRICS_ENABLED, HEALTH_CHECK_INTERVAL, HEALTH_CHECK_MAX_BACKOFF, HEALTH_CHECK_WRITE_PROBE,
+    LOCAL_MANUAL_FILE, RESULT_CACHE_SIZE, RESULT_CACHE_THRESHOLD, SECTION_CACHE_SIZE,
+    NAMESPACE_MEMORY_BUDGET_MB, NAMESPACE_SEARCH_WORKERS, NAMESPACE_LIST_TTL
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SearchService:
+class SearchService(SnapshotSearcher):
     """
     Main search service that combines manual processing, embeddings, and S3 storage
     to provide vector-based search functionality for car manual sections.
     """
     
-    def __init__(self):
-        """Initialize the search service with all required components."""
+    def __init__(self, namespace: Optional[str] = None, s3_client=None,
+                 embedding_service: Optional[EmbeddingService] = None,
+                 metrics: Optional[MetricsRegistry] = None):
+        """
+        Initialize the search service with all required components.
+        
+        Args:
+            namespace: Manual corpus to serve (e.g. one vehicle model); None serves
+                       the bucket root
+            s3_client: S3 client to share instead of creating one
+            embedding_service: Embedding service to share instead of creating one
+            metrics: Metrics registry to share instead of creating one
+        """
+        self.namespace = namespace
+        metrics = metrics or MetricsRegistry(enabled=METRICS_ENABLED)
         self.manual_processor = ManualProcessor()
-        self.embedding_service = EmbeddingService()
-        self.s3_service = S3VectorService()
+        super().__init__(
+            S3VectorService(metrics=metrics, namespace=namespace, s3_client=s3_client),
+            embedding_service or EmbeddingService(metrics=metrics),
+            metrics,
+            SemanticResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_THRESHOLD, metrics=metrics),
+            SectionCache(SECTION_CACHE_SIZE, metrics=metrics)
+        )
+        self._manual_lock = threading.Lock()
         
-        # Cache for loaded data
-        self._embeddings_cache = None
-        self._metadata_cache = None
-        self._sections_cache = None
+        # Other namespaces of the bucket, loaded by their first query
+        self.namespaces = NamespacePool(self._namespace_searcher, NAMESPACE_MEMORY_BUDGET_MB,
+                                        NAMESPACE_SEARCH_WORKERS, metrics=self.metrics)
+        self._namespace_list = LRUCache(1, NAMESPACE_LIST_TTL)
+        self.refresher = SnapshotRefresher(self._refresh_all, SNAPSHOT_REFRESH_INTERVAL)
         
-        logger.info("Search service initialized")
+        # S3 status served from the last background probe
+        self.health = HealthMonitor(self._probe_s3, HEALTH_CHECK_INTERVAL, HEALTH_CHECK_MAX_BACKOFF,
+                                    metrics=self.metrics)
+        
+        self.indexer = IncrementalIndexer(self.manual_processor, self.embedding_service, self.s3_service)
+        
+        logger.info("Search service initialized" + (f" for namespace '{namespace}'" if namespace else ""))
     
-    def initialize_data(self) -> bool:
+    def _namespace_searcher(self, namespace: str) -> SnapshotSearcher:
+        """
+        Create the searcher of a namespace. It shares this service's S3 client and
+        download pool, local cache directory, model, metrics and section cache
+        (whose keys include the namespace), so a loaded namespace only adds its
+        snapshot to memory. The semantic result cache is bound to a single
+        snapshot, so namespaces don't use it.
+        """
+        s3_service = S3VectorService(self.s3_service.bucket_name, self.s3_service.cache_dir, self.metrics,
+                                     namespace, self.s3_service.s3_client, self.s3_service.download_executor)
+        return SnapshotSearcher(s3_service, self.embedding_service, self.metrics,
+                                SemanticResultCache(0, RESULT_CACHE_THRESHOLD), self.section_cache)
+    
+    def initialize_data(self, incremental: bool = False, file_path: str = LOCAL_MANUAL_FILE) -> bool:
         """
         Initialize the search service by loading manual data and generating embeddings.
-        This should be called once during setup.
+        This should be called once during setup. A full upload streams the file through
+        bounded embed and upload stages, so memory stays flat for large manuals.
+        
+        Args:
+            incremental: If True, only embed and upload sections whose content changed
+                         since the last published manifest
+            file_path: Path to the manual data file (JSON or JSON Lines)
         
         Returns:
             True if initialization successful
@@ -39,22 +100,15 @@ class SearchService:
         try:
             logger.info("Initializing search service data...")
             
-            # Load manual sections
-            sections = self.manual_processor.load_manual_data()
-            if not sections:
-                logger.error("No manual sections loaded")
+            # Create bucket if needed
+            if not self.s3_service.create_bucket_if_not_exists():
                 return False
             
-            # Generate embeddings for all sections
-            texts = self.manual_processor.get_all_texts_for_embedding()
-            embeddings = self.embedding_service.generate_embeddings_batch(texts)
-            
-            # Get metadata
-            metadata = self.manual_processor.get_section_metadata()
-            
-            # Upload to S3
-            success = self._upload_all_data(sections, embeddings, metadata)
-            if success:
+            if incremental:
+                report = self.indexer.upsert(file_path)
+            else:
+                report = self.indexer.stream_rebuild(file_path)
+            if report['success']:
                 logger.info("Search service initialized successfully")
                 return True
             else:
@@ -65,181 +119,104 @@ class SearchService:
             logger.error(f"Error initializing search service: {e}")
             return False
     
-    def _upload_all_data(self, sections: List[Dict[str, Any]], 
-                        embeddings: np.ndarray, 
-                        metadata: List[Dict[str, Any]]) -> bool:
+    def _refresh_all(self) -> bool:
+        """Refresh the snapshot and those of the loaded namespaces (see refresh_snapshot)."""
+        swapped = self.refresh_snapshot()
+        return self.namespaces.refresh() > 0 or swapped
+    
+    def start_refresher(self):
+        """Start polling the manifest in the background (if SNAPSHOT_REFRESH_INTERVAL > 0)."""
+        if self.refresher.interval > 0:
+            self.refresher.start()
+    
+    def stop_refresher(self):
+        """Stop the background manifest poller."""
+        self.refresher.stop()
+    
+    def request_refresh(self):
         """
-        Upload all data to S3.
-        
-        Args:
-            sections: Manual sections
-            embeddings: Generated embeddings
-            metadata: Section metadata
-            
-        Returns:
-            True if all uploads successful
+        Pick up a newly published manifest. With the refresher running the reload
+        happens in the background; otherwise it runs immediately.
         """
-        try:
-            # Create bucket if needed
-            if not self.s3_service.create_bucket_if_not_exists():
-                return False
-            
-            # Upload manual data
-            if not self.s3_service.upload_manual_data(sections):
-                return False
-            
-            # Upload embeddings
-            if not self.s3_service.upload_embeddings(embeddings):
-                return False
-            
-            # Upload metadata
-            if not self.s3_service.upload_metadata(metadata):
-                return False
-            
-            logger.info("All data uploaded to S3 successfully")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error uploading data to S3: {e}")
-            return False
+        if self.refresher.running:
+            self.refresher.trigger()
+        else:
+            self.refresh_snapshot()
+    
+    def _probe_s3(self) -> Dict[str, Any]:
+        """Check S3 access for the health monitor."""
+        return self.s3_service.check_connection(check_write=HEALTH_CHECK_WRITE_PROBE)
+    
+    def start_health_monitor(self):
+        """Start probing S3 in the background (if HEALTH_CHECK_INTERVAL > 0)."""
+        if self.health.interval > 0:
+            self.health.start()
     
-    def _load_data_from_s3(self) -> bool:
+    def stop_health_monitor(self):
+        """Stop the background S3 health probes."""
+        self.health.stop()
+    
+    def request_health_check(self):
+        """
+        Re-probe S3. With the monitor running the probe happens in the background;
+        otherwise it runs immediately.
+        """
+        if self.health.running:
+            self.health.trigger()
+        else:
+            self.health.check_now()
+    
+    def list_namespaces(self) -> List[str]:
         """
-        Load embeddings, metadata, and sections from S3 into cache.
+        Get the namespaces of the bucket, listed from S3 at most once per NAMESPACE_LIST_TTL.
         
         Returns:
-            True if data loaded successfully
+            Sorted namespace names
         """
-        try:
-            # Load embeddings
-            if self._embeddings_cache is None:
-                self._embeddings_cache = self.s3_service.download_embeddings()
-                if self._embeddings_cache is None:
-                    logger.error("Failed to load embeddings from S3")
-                    return False
-            
-            # Load metadata
-            if self._metadata_cache is None:
-                self._metadata_cache = self.s3_service.download_metadata()
-                if self._metadata_cache is None:
-                    logger.error("Failed to load metadata from S3")
-                    return False
-            
-            # Load sections
-            if self._sections_cache is None:
-                self._sections_cache = self.s3_service.download_manual_data()
-                if self._sections_cache is None:
-                    logger.error("Failed to load manual data from S3")
-                    return False
-            
-            logger.info("Data loaded from S3 successfully")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error loading data from S3: {e}")
-            return False
+        namespaces = self._namespace_list.get('namespaces')
+        if namespaces is None:
+            namespaces = self.s3_service.list_namespaces()
+            # An empty list may be a failed listing; don't keep it
+            if namespaces:
+                self._namespace_list.put('namespaces', namespaces)
+        return list(namespaces)
     
-    def search(self, query: str, top_k: int = MAX_SEARCH_RESULTS) -> List[Dict[str, Any]]:
+    def search_namespaces(self, query: str, namespaces: List[str],
+                          top_k: int = MAX_SEARCH_RESULTS, mode: str = SEARCH_MODE,
+                          filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
-        Search for relevant manual sections based on a query.
+        Search the manuals of several namespaces (e.g. vehicle models) at once.
+        The query is encoded once, the namespaces are searched in parallel (each
+        loaded on its first query) and their results merged (see merge_results).
+        Namespaces must be named explicitly: searching every namespace of a bucket
+        larger than the memory budget would reload all of them on every query.
         
         Args:
             query: Search query from the user
+            namespaces: Namespaces to search (at most NAMESPACE_MAX_FANOUT; see list_namespaces)
             top_k: Number of top results to return
+            mode: 'vector' for semantic search or 'hybrid' to fuse it with BM25
+            filters: Optional filters applied in every namespace
             
         Returns:
-            List of search results with sections and similarity scores
-        """
-        try:
-            logger.info(f"Searching for: '{query}'")
+            List of search results, each with the 'namespace' it came from
             
-            # Load data from S3 if not cached
-            if not self._load_data_from_s3():
-                # Fallback to local keyword search
-                logger.warning("Using fallback keyword search")
-                return self._fallback_search(query, top_k)
-            
-            # Generate embedding for the query
-            query_embedding = self.embedding_service.generate_embedding(query)
-            
-            # Find most similar sections
-            similar_results = self.embedding_service.find_most_similar(
-                query_embedding, 
-                self._embeddings_cache, 
-                top_k
-            )
-            
-            # Prepare results with section data
-            search_results = []
-            for idx, similarity_score in similar_results:
-                if similarity_score >= SIMILARITY_THRESHOLD:
-                    section = self._sections_cache[idx]
-                    metadata = self._metadata_cache[idx]
-                    
-                    result = {
-                        'section': section,
-                        'metadata': metadata,
-                        'similarity_score': similarity_score,
-                        'rank': len(search_results) + 1
-                    }
-                    search_results.append(result)
-            
-            # If no results above threshold, use fallback
-            if not search_results:
-                logger.warning(f"No results above similarity threshold {SIMILARITY_THRESHOLD}")
-                return self._fallback_search(query, top_k)
-            
-            logger.info(f"Found {len(search_results)} relevant results")
-            return search_results
-            
-        except Exception as e:
-            logger.error(f"Error during search: {e}")
-            # Fallback to keyword search
-            return self._fallback_search(query, top_k)
-    
-    def _fallback_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        Raises:
+            ValueError: If a namespace name or the filters are invalid, or too many
+                        namespaces are given
         """
-        Fallback keyword-based search when vector search is not available.
+        validate_filters(filters)
         
-        Args:
-            query: Search query
-            top_k: Number of results to return
-            
-        Returns:
-            List of search results
-        """
-        try:
-            logger.info("Using fallback keyword search")
-            
-            # Use local manual processor for keyword search
-            if not self.manual_processor.sections:
-                self.manual_processor.load_manual_data()
-            
-            matching_sections = self.manual_processor.search_sections_by_keywords(query)
-            
-            # Limit results and format
-            results = []
-            for i, section in enumerate(matching_sections[:top_k]):
-                result = {
-                    'section': section,
-                    'metadata': {
-                        'id': section.get('id'),
-                        'category': section.get('category'),
-                        'title': section.get('title'),
-                        'keywords': section.get('keywords', [])
-                    },
-                    'similarity_score': 0.5,  # Default score for keyword matches
-                    'rank': i + 1,
-                    'search_type': 'keyword_fallback'
-                }
-                results.append(result)
-            
-            logger.info(f"Fallback search found {len(results)} results")
-            return results
-            
-        except Exception as e:
-            logger.error(f"Error in fallback search: {e}")
-            return []
+        self.metrics.increment('search.queries')
+        with self.metrics.timer('search.total'):
+            query_embedding = None
+            try:
+                with self.metrics.timer('search.encode'):
+                    query_embedding = self.embedding_service.generate_embedding(query)
+            except Exception as e:
+                # Each namespace falls back to keyword search on its own
+                logger.error(f"Error encoding query: {e}")
+            return self.namespaces.search(namespaces, query, query_embedding, top_k, mode, filters)
     
     def search_by_category(self, category: str, top_k: int = MAX_SEARCH_RESULTS) -> List[Dict[str, Any]]:
         """
@@ -254,16 +231,13 @@ class SearchService:
         """
         try:
             # Load sections if not cached
-            if self._sections_cache is None:
-                if not self._load_data_from_s3():
-                    # Use local data
-                    if not self.manual_processor.sections:
-                        self.manual_processor.load_manual_data()
-                    sections = self.manual_processor.get_sections_by_category(category)
-                else:
-                    sections = [s for s in self._sections_cache if s.get('category') == category]
+            if not self._load_data_from_s3():
+                # Use local data
+                if not self.manual_processor.sections:
+                    self.manual_processor.load_manual_data()
+                sections = self.manual_processor.get_sections_by_category(category)
             else:
-                sections = [s for s in self._sections_cache if s.get('category') == category]
+                sections = self._category_sections(self._snapshot, category, top_k)
             
             # Format results
             results = []
@@ -289,6 +263,11 @@ class SearchService:
             logger.error(f"Error searching by category: {e}")
             return []
     
+    def _category_sections(self, snapshot: SearchSnapshot, category: str, top_k: int) -> List[Dict[str, Any]]:
+        """Get the first top_k sections of a category via the snapshot's category row lists."""
+        rows = snapshot.section_index.rows_for({'category': category})
+        return snapshot.get_sections(rows[:top_k])
+    
     def get_section_by_id(self, section_id: str) -> Optional[Dict[str, Any]]:
         """
         Get a specific section by its ID.
@@ -301,18 +280,14 @@ class SearchService:
         """
         try:
             # Load sections if not cached
-            if self._sections_cache is None:
-                if not self._load_data_from_s3():
-                    if not self.manual_processor.sections:
-                        self.manual_processor.load_manual_data()
-                    return self.manual_processor.get_section_by_id(section_id)
-            
-            # Search in cached sections
-            for section in self._sections_cache:
-                if section.get('id') == section_id:
-                    return section
+            if not self._load_data_from_s3():
+                if not self.manual_processor.sections:
+                    self.manual_processor.load_manual_data()
+                return self.manual_processor.get_section_by_id(section_id)
             
-            return None
+            snapshot = self._snapshot
+            row = snapshot.section_index.row_for_id(section_id)
+            return snapshot.sections[row] if row is not None else None
             
         except Exception as e:
             logger.error(f"Error getting section by ID: {e}")
@@ -326,19 +301,12 @@ class SearchService:
             List of category names
         """
         try:
-            if self._sections_cache is None:
-                if not self._load_data_from_s3():
-                    if not self.manual_processor.sections:
-                        self.manual_processor.load_manual_data()
-                    return self.manual_processor.get_categories()
-            
-            categories = set()
-            for section in self._sections_cache:
-                category = section.get('category')
-                if category:
-                    categories.add(category)
+            if not self._load_data_from_s3():
+                if not self.manual_processor.sections:
+                    self.manual_processor.load_manual_data()
+                return self.manual_processor.get_categories()
             
-            return sorted(list(categories))
+            return list(self._snapshot.section_index.categories)
             
         except Exception as e:
             logger.error(f"Error getting categories: {e}")
@@ -351,20 +319,27 @@ class SearchService:
         Returns:
             Dictionary with system status information
         """
+        snapshot = self._snapshot
         status = {
             'search_service': 'operational',
+            'namespace': self.namespace,
             's3_connection': 'unknown',
-            'embeddings_loaded': self._embeddings_cache is not None,
-            'metadata_loaded': self._metadata_cache is not None,
-            'sections_loaded': self._sections_cache is not None,
+            'embeddings_loaded': snapshot is not None,
+            'embedding_storage_dtype': EMBEDDING_STORAGE_DTYPE,
+            'passage_mode': PASSAGE_MODE,
+            'manifest_version': snapshot.manifest['version'] if snapshot and snapshot.manifest else None,
+            'snapshot_refresher': 'running' if self.refresher.running else 'stopped',
+            'health_monitor': 'running' if self.health.running else 'stopped',
+            'metadata_loaded': snapshot is not None,
+            'sections_loaded': snapshot is not None,
             'embedding_model': 'unknown',
             'total_sections': 0,
             'categories': []
         }
         
         try:
-            # Check S3 connection
-            s3_status = self.s3_service.check_connection()
+            # Last S3 probe (no S3 calls while the health monitor is running)
+            s3_status = self.health.status()
             status['s3_connection'] = 'connected' if s3_status['connected'] else 'disconnected'
             status['s3_details'] = s3_status
             
@@ -372,26 +347,63 @@ class SearchService:
             model_info = self.embedding_service.get_model_info()
             status['embedding_model'] = model_info.get('model_name', 'unknown')
             status['embedding_dimension'] = model_info.get('embedding_dimension', 0)
+            status['model_registry'] = MODEL_REGISTRY.status()
+            status['result_cache'] = self.result_cache.stats()
+            status['section_cache'] = self.section_cache.stats()
+            status['namespaces'] = self.namespaces.stats()
             
             # Get section count and categories
-            if self._sections_cache:
-                status['total_sections'] = len(self._sections_cache)
-                status['categories'] = self.get_available_categories()
+            if snapshot is not None:
+                status['total_sections'] = len(snapshot.section_index)
+                status['categories'] = list(snapshot.section_index.categories)
+                status['category_counts'] = dict(snapshot.section_index.category_counts)
+                status['snapshot_load'] = snapshot.load_timings
             elif self.manual_processor.sections:
                 status['total_sections'] = len(self.manual_processor.sections)
                 status['categories'] = self.manual_processor.get_categories()
             
+            status['metrics'] = self.metrics.snapshot()
+            
         except Exception as e:
             logger.error(f"Error getting system status: {e}")
             status['error'] = str(e)
         
         return status
     
+    def get_metrics_snapshot(self) -> Dict[str, Any]:
+        """
+        Get per-stage latency percentiles and counters, plus the process-wide
+        model load counts.
+        
+        Returns:
+            JSON-serializable metrics dictionary
+        """
+        metrics = self.metrics.snapshot()
+        metrics['models'] = MODEL_REGISTRY.status()
+        return metrics
+    
+    def _local_manual(self) -> Optional[ManualProcessor]:
+        """Get the local manual file's sections, loading them on first use."""
+        if self.namespace is not None:
+            # The local manual file is the root corpus, not this namespace's
+            return None
+        if not self.manual_processor.sections:
+            with self._manual_lock:
+                if not self.manual_processor.sections:
+                    self.manual_processor.load_manual_data()
+        return self.manual_processor
+    
     def clear_cache(self):
-        """Clear all cached data to force reload from S3."""
-        self._embeddings_cache = None
-        self._metadata_cache = None
-        self._sections_cache = None
+        """
+        Drop the loaded snapshot so the next call reloads it from S3.
+        Use request_refresh to pick up a new version without a cold reload.
+        """
+        super().clear_cache()
+        self.result_cache.clear()
+        self.section_cache.clear()
+        self.namespaces.clear()
+        self._namespace_list.clear()
+        self.manual_processor.clear_cache()
         logger.info("Cache cleared")
 
 if __name__ == "__main__":
@@ -0,0 +1,525 @@
+import json
+import numpy as np
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, partial
+from typing import List, Dict, Any, Optional, Callable, Tuple, Union
+from .s3_vector_service import S3VectorService
+from .vector_index import VectorIndex, PassageIndex, CoarseIndex
+from .keyword_index import BM25Index
+from .fuzzy_index import TrigramIndex
+from .section_index import SectionIndex
+from .manifest import live_masks, coarse_changed
+from .quantization import merge_embedding_parts
+from .section_store import SectionStore, SectionCache
+from .metadata_table import MetadataTable
+from config import EMBEDDING_STORAGE_DTYPE, S3_EMBEDDINGS_FILE, S3_KEYWORD_INDEX_FILE, S3_DOWNLOAD_CONCURRENCY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Version reported for data published before manifests existed
+LEGACY_VERSION = 0
+
+
+class SearchSnapshot:
+    """
+    Fully built, read-only search data for one manifest version.
+    A snapshot is never modified after construction: a newer version is loaded
+    into a new snapshot and swapped in, so a query holding a reference always
+    sees embeddings, metadata, sections and indexes from the same version.
+    Index arrays are flagged read-only, so any number of threads can query a
+    snapshot in parallel without locking.
+    """
+
+    def __init__(self, s3_service: S3VectorService, version: int,
+                 embeddings: np.ndarray, scales: Optional[np.ndarray],
+                 metadata: Union[MetadataTable, List[Dict[str, Any]]], sections: List[Dict[str, Any]],
+                 keyword_index: Optional[BM25Index] = None,
+                 manifest: Optional[Dict[str, Any]] = None,
+                 row_locations: Optional[tuple] = None,
+                 load_timings: Optional[Dict[str, Any]] = None,
+                 passage_offsets: Optional[np.ndarray] = None,
+                 coarse: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+        """
+        Build the indexes of a snapshot.
+
+        Args:
+            s3_service: Service used to fetch full-precision rows for re-ranking
+            version: Manifest version (LEGACY_VERSION for the single-file layout)
+            embeddings: Embedding matrix (float32, float16 or int8)
+            scales: Int8 scale factors or None
+            metadata: Metadata of every row (a columnar table, or dictionaries for the legacy layout)
+            sections: Section of every row (a list, or a SectionStore hydrating them on demand)
+            keyword_index: Prebuilt keyword index (if None, built from in-memory sections;
+                           a SectionStore gets an empty one rather than reading every blob)
+            manifest: Manifest the snapshot was loaded from
+            row_locations: (shard embedding keys, shard of each row, row within shard,
+                           float32 embeddings of each shard, memory-mapped, or None to read rows from S3)
+            load_timings: Timing breakdown of the artifact downloads
+            passage_offsets: If embeddings are passages, passage rows of section i
+                             are offsets[i]:offsets[i + 1]
+            coarse: (reduced rows, projection components) for two-stage search
+        """
+        self.s3_service = s3_service
+        self.version = version
+        self.manifest = manifest
+        self.embeddings = embeddings
+        self.metadata = metadata
+        self.sections = sections
+        self.row_locations = row_locations
+        self.load_timings = load_timings or {}
+        self.section_index = SectionIndex(metadata)
+        if keyword_index is None and isinstance(sections, SectionStore):
+            # Building BM25 here would pull the whole corpus through ranged GETs
+            logger.warning(f"Manifest version {version} has no keyword index; "
+                           "searching with the vector index only")
+            keyword_index = BM25Index.build([])
+        self.keyword_index = keyword_index or BM25Index.from_sections(sections)
+        self.fuzzy_index = TrigramIndex.from_metadata(metadata)
+        self.vector_index = VectorIndex(embeddings, scales=scales, rerank_rows=self.fetch_full_rows,
+                                        metrics=s3_service.metrics)
+        if passage_offsets is not None:
+            self.vector_index = PassageIndex(self.vector_index, passage_offsets)
+        elif coarse is not None:
+            self.vector_index = CoarseIndex(self.vector_index, *coarse)
+            _read_only(*coarse)
+        _read_only(embeddings, scales, self.keyword_index.term_offsets, self.keyword_index.doc_ids,
+                   self.keyword_index.weights, self.fuzzy_index.gram_offsets, self.fuzzy_index.gram_terms,
+                   self.fuzzy_index.term_grams, self.fuzzy_index.term_offsets, self.fuzzy_index.term_rows,
+                   getattr(self.vector_index, 'offsets', None),
+                   getattr(self.vector_index, 'passage_index', self.vector_index).row_norms)
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    @cached_property
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the snapshot: its index arrays (memory-mapped
+        ones included) plus, for the legacy layout, the JSON size of records kept
+        as dictionaries. Sections hydrated on demand are not counted; they live in
+        the bounded SectionCache. Neither are the float32 rows mapped for
+        re-ranking, of which only the few candidate rows per query are paged in.
+        """
+        index = getattr(self.vector_index, 'passage_index', self.vector_index)
+        index = getattr(index, 'index', index)
+        arrays = [self.embeddings, index.scales, index.row_norms,
+                  getattr(self.vector_index, 'offsets', None), getattr(self.vector_index, 'reduced', None),
+                  self.keyword_index.term_offsets, self.keyword_index.doc_ids, self.keyword_index.weights,
+                  getattr(self.section_index, 'sorted_ids', None), getattr(self.section_index, 'sorted_rows', None)]
+        arrays.extend(self.section_index.category_rows.values())
+        if isinstance(self.sections, SectionStore):
+            arrays.extend([self.sections.row_shard, self.sections.row_local])
+            arrays.extend(shard[1] for shard in self.sections.shards if isinstance(shard, tuple))
+
+        total = sum(array.nbytes for array in {id(a): a for a in arrays if a is not None}.values())
+        total += sum(len(term) + 50 for term in self.keyword_index.vocabulary) + self.fuzzy_index.nbytes
+        for records in (self.metadata, self.sections):
+            if isinstance(records, MetadataTable):
+                total += records.nbytes
+            elif isinstance(records, list):
+                total += len(json.dumps(records, ensure_ascii=False, separators=(',', ':')))
+        return total
+
+    def get_sections(self, rows: List[int]) -> List[Dict[str, Any]]:
+        """
+        Get the sections of several rows, fetching lazily stored ones in one batch.
+
+        Args:
+            rows: Snapshot rows
+
+        Returns:
+            Sections in the order of rows
+        """
+        if isinstance(self.sections, SectionStore):
+            return self.sections.get_many(rows)
+        return [self.sections[row] for row in rows]
+
+    def fetch_full_rows(self, row_ids: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Fetch float32 embeddings of snapshot rows (sections or passages) for exact re-ranking.
+        Rows are read from this snapshot's own shards: from their memory-mapped
+        local copies when the cache tier is enabled, otherwise with ranged GETs
+        (the shards stay in S3 for the retained manifest versions).
+
+        Args:
+            row_ids: Sorted row indices
+
+        Returns:
+            Array with one row per index or None if error
+        """
+        if self.row_locations is None:
+            return self.s3_service.download_embedding_rows(row_ids)
+
+        keys, row_shard, row_local, full_rows = self.row_locations
+        shard_of_rows = row_shard[row_ids]
+        result = None
+        for shard in np.unique(shard_of_rows):
+            selected = shard_of_rows == shard
+            local = row_local[row_ids[selected]]
+            if full_rows[shard] is not None:
+                rows = full_rows[shard][local]
+            else:
+                rows = self.s3_service.download_embedding_rows(local, keys[shard])
+            if rows is None:
+                return None
+            if result is None:
+                result = np.empty((len(row_ids), rows.shape[1]), dtype=np.float32)
+            result[selected] = rows
+        return result
+
+
+def _read_only(*arrays: Optional[np.ndarray]):
+    """Flag arrays as read-only, so an accidental in-place write raises instead of racing."""
+    for array in arrays:
+        if isinstance(array, np.ndarray):
+            array.flags.writeable = False
+
+
+def fetch_artifacts(jobs: Dict[str, Callable[[], Any]],
+                    max_workers: int = S3_DOWNLOAD_CONCURRENCY) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Download independent artifacts concurrently, timing each one.
+
+    Args:
+        jobs: Download functions keyed by S3 key
+        max_workers: Maximum concurrent downloads
+
+    Returns:
+        Tuple of (results keyed like jobs, timing breakdown in seconds)
+    """
+    def timed(key: str) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        result = jobs[key]()
+        return result, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+        outcomes = dict(zip(jobs, executor.map(timed, jobs)))
+
+    results = {key: result for key, (result, _) in outcomes.items()}
+    timings = {
+        'artifacts': {key: round(seconds, 4) for key, (_, seconds) in outcomes.items()},
+        'fetch_seconds': round(time.perf_counter() - start, 4)
+    }
+    return results, timings
+
+
+def _log_timings(timings: Dict[str, Any]):
+    """Log the artifact timing breakdown of a snapshot load, slowest first."""
+    slowest = sorted(timings['artifacts'].items(), key=lambda item: item[1], reverse=True)
+    breakdown = ', '.join(f"{key}={seconds:.3f}s" for key, seconds in slowest)
+    logger.info(f"Fetched {len(slowest)} artifacts in {timings['fetch_seconds']:.3f}s "
+                f"(built in {timings['build_seconds']:.3f}s): {breakdown}")
+
+
+def _load_manifest_snapshot(s3_service: S3VectorService, manifest: Dict[str, Any],
+                            section_cache: Optional[SectionCache] = None) -> Optional[SearchSnapshot]:
+    """
+    Load the live rows of every shard listed in a manifest. Section content is
+    not downloaded: only the offset index of each packed section blob is, and
+    sections are read with ranged GETs when results are built.
+
+    Args:
+        s3_service: Service used to read artifacts
+        manifest: Manifest dictionary
+        section_cache: Hot section cache shared between snapshots
+
+    Returns:
+        SearchSnapshot or None if an artifact could not be loaded
+    """
+    shards = manifest['shards']
+    if not shards:
+        logger.error(f"Manifest version {manifest['version']} has no shards")
+        return None
+
+    # Use the quantized artifacts only when every shard carries the configured format
+    use_quantized = EMBEDDING_STORAGE_DTYPE != 'float32' and all(
+        shard.get('quantized', {}).get('dtype') == EMBEDDING_STORAGE_DTYPE for shard in shards
+    )
+
+    # Reduced vectors are used when every shard has them at the configured dimension
+    use_coarse = bool(manifest.get('coarse')) and not coarse_changed(manifest) and all(
+        shard.get('reduced') for shard in shards
+    )
+
+    # Every shard artifact and the keyword index are independent downloads
+    jobs = {}
+    for shard in shards:
+        if shard.get('metadata_columns'):
+            jobs[shard['metadata_columns']] = partial(s3_service.download_buffer, shard['metadata_columns'])
+        else:
+            jobs[shard['metadata']] = partial(s3_service.download_json_data, shard['metadata'])
+        if shard.get('section_blob'):
+            jobs[shard['section_offsets']] = partial(s3_service.download_embeddings, shard['section_offsets'])
+        else:
+            jobs[shard['sections']] = partial(s3_service.download_sections, shard['sections'])
+        if use_quantized:
+            jobs[shard['quantized']['embeddings']] = partial(
+                s3_service.download_quantized_embeddings, EMBEDDING_STORAGE_DTYPE,
+                shard['quantized']['embeddings'], shard['quantized'].get('scales')
+            )
+            # Float32 rows for re-ranking are mapped from the local cache once, not fetched per query
+            jobs[shard['embeddings']] = partial(s3_service.map_embeddings, shard['embeddings'])
+        else:
+            jobs[shard['embeddings']] = partial(s3_service.download_embeddings, shard['embeddings'])
+        if use_coarse:
+            jobs[shard['reduced']] = partial(s3_service.download_embeddings, shard['reduced'])
+    if use_coarse:
+        projection = manifest['coarse']['projection']
+        jobs[projection] = partial(s3_service.download_embeddings, projection)
+    if manifest.get('keyword_index'):
+        jobs[manifest['keyword_index']] = partial(s3_service.download_bytes, manifest['keyword_index'])
+
+    artifacts, timings = fetch_artifacts(jobs)
+    build_start = time.perf_counter()
+
+    # Packed shards contribute (blob key, offsets, codec); shards written as JSON their sections.
+    # Columnar metadata is viewed in place, JSON metadata of older shards is converted
+    metadata_parts, section_parts = [], []
+    for shard in shards:
+        if shard.get('metadata_columns'):
+            metadata = artifacts[shard['metadata_columns']]
+            metadata = None if metadata is None else MetadataTable.from_bytes(metadata)
+        else:
+            metadata = artifacts[shard['metadata']]
+            metadata = None if metadata is None else MetadataTable.from_records(
+                metadata.get('metadata', []), metadata.get('passage_offsets')
+            )
+        if shard.get('section_blob'):
+            offsets = artifacts[shard['section_offsets']]
+            sections = None if offsets is None else (shard['section_blob'], np.asarray(offsets, dtype=np.int64),
+                                                     shard.get('compression'))
+        else:
+            sections = artifacts[shard['sections']]
+        if metadata is None or sections is None:
+            logger.error(f"Failed to load shard {shard['id']} from S3")
+            return None
+        metadata_parts.append(metadata)
+        section_parts.append(sections)
+
+    masks = live_masks([metadata.ids() for metadata in metadata_parts], set(manifest.get('tombstones', [])))
+
+    # Embedding rows are sections, or in passage mode the passages of every section
+    row_masks, passage_offsets = masks, None
+    if manifest.get('passages'):
+        counts = [np.diff(metadata.passage_offsets) for metadata in metadata_parts]
+        row_masks = [np.repeat(mask, count) for mask, count in zip(masks, counts)]
+        live_counts = np.concatenate([count[mask] for mask, count in zip(masks, counts)])
+        passage_offsets = np.concatenate([[0], np.cumsum(live_counts)])
+
+    embedding_parts, scale_parts = [], []
+    for shard, mask in zip(shards, row_masks):
+        if use_quantized:
+            quantized = artifacts[shard['quantized']['embeddings']]
+            if quantized is None:
+                logger.error(f"Failed to load embeddings of shard {shard['id']}")
+                return None
+            embeddings, scales = quantized
+        else:
+            embeddings, scales = artifacts[shard['embeddings']], None
+            if embeddings is None:
+                logger.error(f"Failed to load embeddings of shard {shard['id']}")
+                return None
+
+        # Keep fully live shards as loaded (memory-mapped when cached)
+        if not mask.all():
+            embeddings = embeddings[mask]
+            if scales is not None and scales.shape[1] == 1:
+                scales = scales[mask]
+        embedding_parts.append(embeddings)
+        scale_parts.append(scales)
+
+    embeddings, scales = merge_embedding_parts(embedding_parts, scale_parts)
+
+    coarse = None
+    if use_coarse:
+        reduced_parts = [artifacts[shard['reduced']] for shard in shards]
+        components = artifacts[manifest['coarse']['projection']]
+        if components is None or any(part is None for part in reduced_parts):
+            logger.error("Failed to load the reduced vectors of two-stage search")
+            return None
+        reduced = np.concatenate([np.asarray(part)[mask] for part, mask in zip(reduced_parts, row_masks)])
+        coarse = (np.ascontiguousarray(reduced, dtype=np.float32), np.asarray(components, dtype=np.float32))
+
+    # Fully live shards keep their columns as loaded
+    metadata = MetadataTable.concat([
+        metadata_part if mask.all() else metadata_part.take(np.flatnonzero(mask))
+        for metadata_part, mask in zip(metadata_parts, masks)
+    ])
+    sections = SectionStore(
+        s3_service.download_byte_ranges, section_parts,
+        np.concatenate([np.full(mask.sum(), i, dtype=np.int32) for i, mask in enumerate(masks)]),
+        np.concatenate([np.flatnonzero(mask) for mask in masks]),
+        section_cache, s3_service.key_prefix
+    )
+
+    # Map every live row back to its shard for full-precision re-ranking
+    row_locations = (
+        [shard['embeddings'] for shard in shards],
+        np.concatenate([np.full(mask.sum(), i, dtype=np.int32) for i, mask in enumerate(row_masks)]),
+        np.concatenate([np.flatnonzero(mask) for mask in row_masks]),
+        [artifacts[shard['embeddings']] for shard in shards]
+    )
+
+    keyword_index = None
+    index_bytes = artifacts.get(manifest.get('keyword_index'))
+    if index_bytes is not None:
+        keyword_index = BM25Index.from_bytes(index_bytes)
+
+    snapshot = SearchSnapshot(s3_service, manifest['version'], embeddings, scales, metadata,
+                              sections, keyword_index, manifest, row_locations, timings,
+                              passage_offsets, coarse)
+    timings['build_seconds'] = round(time.perf_counter() - build_start, 4)
+    _log_timings(timings)
+    logger.info(f"Loaded manifest version {manifest['version']}: "
+                f"{len(sections)} sections from {len(shards)} shards")
+    return snapshot
+
+
+def _load_legacy_snapshot(s3_service: S3VectorService) -> Optional[SearchSnapshot]:
+    """
+    Load the single-file layout uploaded before manifests existed.
+
+    Args:
+        s3_service: Service used to read artifacts
+
+    Returns:
+        SearchSnapshot or None if an artifact could not be loaded
+    """
+    # Quantized formats are re-ranked against float32 rows
+    use_quantized = EMBEDDING_STORAGE_DTYPE != 'float32'
+    jobs = {
+        'embeddings': (partial(s3_service.download_quantized_embeddings, EMBEDDING_STORAGE_DTYPE)
+                       if use_quantized else s3_service.download_embeddings),
+        'metadata': s3_service.download_metadata,
+        'sections': s3_service.download_manual_data,
+        'keyword_index': partial(s3_service.download_bytes, S3_KEYWORD_INDEX_FILE)
+    }
+    if use_quantized:
+        jobs['full_embeddings'] = partial(s3_service.map_embeddings, S3_EMBEDDINGS_FILE)
+    artifacts, timings = fetch_artifacts(jobs)
+    build_start = time.perf_counter()
+
+    embeddings, scales = artifacts['embeddings'], None
+    if use_quantized and embeddings is not None:
+        embeddings, scales = embeddings
+    if embeddings is None:
+        logger.error("Failed to load embeddings from S3")
+        return None
+
+    metadata = artifacts['metadata']
+    if metadata is None:
+        logger.error("Failed to load metadata from S3")
+        return None
+
+    sections = artifacts['sections']
+    if sections is None:
+        logger.error("Failed to load manual data from S3")
+        return None
+
+    # Keyword index is built locally for data uploaded without one
+    keyword_index = None
+    if artifacts['keyword_index'] is not None:
+        keyword_index = BM25Index.from_bytes(artifacts['keyword_index'])
+
+    # Every row lives in the single embeddings file
+    row_locations = ([S3_EMBEDDINGS_FILE], np.zeros(len(embeddings), dtype=np.int32),
+                     np.arange(len(embeddings)), [artifacts.get('full_embeddings')])
+
+    snapshot = SearchSnapshot(s3_service, LEGACY_VERSION, embeddings, scales, metadata,
+                              sections, keyword_index, row_locations=row_locations, load_timings=timings)
+    timings['build_seconds'] = round(time.perf_counter() - build_start, 4)
+    _log_timings(timings)
+    logger.info("Data loaded from S3 successfully")
+    return snapshot
+
+
+def load_snapshot(s3_service: S3VectorService,
+                  manifest: Optional[Dict[str, Any]] = None,
+                  section_cache: Optional[SectionCache] = None) -> Optional[SearchSnapshot]:
+    """
+    Load a complete snapshot of the search data.
+
+    Args:
+        s3_service: Service used to read artifacts
+        manifest: Manifest to load, or None for the single-file layout
+        section_cache: Hot section cache shared between snapshots
+
+    Returns:
+        SearchSnapshot or None if loading failed
+    """
+    try:
+        if manifest is not None:
+            return _load_manifest_snapshot(s3_service, manifest, section_cache)
+        return _load_legacy_snapshot(s3_service)
+
+    except Exception as e:
+        logger.error(f"Error loading data from S3: {e}")
+        return None
+
+
+class SnapshotRefresher:
+    """
+    Daemon thread that periodically calls a refresh function, so new manifest
+    versions are loaded off the request path.
+    """
+
+    def __init__(self, refresh: Callable[[], bool], interval: float):
+        """
+        Initialize the refresher.
+
+        Args:
+            refresh: Function that loads and swaps in a newer snapshot if one exists
+            interval: Seconds between refreshes
+        """
+        self.refresh = refresh
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the refresher thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the refresher thread (no-op if it is already running)."""
+        if self.running:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='snapshot-refresher', daemon=True)
+        self._thread.start()
+        logger.info(f"Snapshot refresher started (every {self.interval}s)")
+
+    def trigger(self):
+        """Run a refresh now instead of waiting for the next interval."""
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop the refresher thread.
+
+        Args:
+            timeout: Seconds to wait for the thread to exit
+        """
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        logger.info("Snapshot refresher stopped")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing snapshot: {e}")
@@ -0,0 +1,137 @@
+import numpy as np
+import logging
+from typing import List, Dict, Any, Optional, Union
+
+from .metadata_table import MetadataTable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FILTER_FIELDS = ('category',)
+
+
+def validate_filters(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Check that search filters only use supported fields and values.
+
+    Args:
+        filters: Mapping such as {'category': 'Brakes'} or {'category': ['Brakes', 'Engine']}
+
+    Returns:
+        The filters
+
+    Raises:
+        ValueError: If filters is not a mapping, names an unsupported field or a
+                    category is not a string or non-empty list of strings
+    """
+    if not filters:
+        return filters
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+
+    unsupported = set(filters) - set(FILTER_FIELDS)
+    if unsupported:
+        raise ValueError(f"Unsupported filter fields: {sorted(unsupported)}; supported: {list(FILTER_FIELDS)}")
+
+    value = filters['category']
+    values = [value] if isinstance(value, str) else value
+    if not isinstance(values, list) or not all(isinstance(category, str) for category in values):
+        raise ValueError("category filter must be a string or a list of strings")
+    if not values:
+        raise ValueError("category filter must not be empty")
+    return filters
+
+
+class SectionIndex:
+    """
+    Load-time lookup structures over section records (sections or metadata):
+    id -> row, category -> sorted row ids, the category list and per-category
+    counts. Filtered searches only touch matching rows and lookups are constant time.
+    Over a columnar MetadataTable the index is built from the category codes
+    and ids are found by binary search, so no per-row Python objects are created.
+    """
+
+    def __init__(self, records: Union[MetadataTable, List[Dict[str, Any]]]):
+        """
+        Build the index.
+
+        Args:
+            records: Metadata table, or section or metadata dictionaries in row order
+        """
+        self.num_rows = len(records)
+
+        if isinstance(records, MetadataTable):
+            codes, dictionary = records.category_codes, records.categories
+            self.id_rows = None
+            self.sorted_ids, self.sorted_rows = records.sorted_ids()
+        else:
+            category_codes = {}
+            codes = np.fromiter(
+                (category_codes.setdefault(record.get('category'), len(category_codes)) for record in records),
+                dtype=np.int32,
+                count=len(records)
+            )
+            dictionary = list(category_codes)
+            self.id_rows = {record.get('id'): row for row, record in enumerate(records)}
+
+        # Group row ids by category with a single stable sort, keeping categories
+        # in order of first appearance and dropping dictionary entries with no rows
+        order = np.argsort(codes, kind='stable')
+        boundaries = np.cumsum(np.bincount(codes, minlength=len(dictionary)))[:-1]
+        groups = np.split(order, boundaries)
+        present, first_rows = np.unique(codes, return_index=True)
+
+        self.category_rows = {
+            dictionary[code]: groups[code].astype(np.int64)
+            for code in present[np.argsort(first_rows)]
+        }
+
+        self.categories = sorted(category for category in self.category_rows if category)
+        self.category_counts = {
+            category or 'Unknown': len(rows) for category, rows in self.category_rows.items()
+        }
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def row_for_id(self, section_id: str) -> Optional[int]:
+        """
+        Get the row of a section id.
+
+        Args:
+            section_id: Section identifier
+
+        Returns:
+            Row index or None if the id is unknown
+        """
+        if self.id_rows is not None:
+            return self.id_rows.get(section_id)
+
+        key = np.bytes_(section_id.encode('utf-8'))
+        position = int(np.searchsorted(self.sorted_ids, key))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == key:
+            return int(self.sorted_rows[position])
+        return None
+
+    def rows_for(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Resolve search filters to the sorted row ids they allow.
+
+        Args:
+            filters: Mapping such as {'category': 'Brakes'} or {'category': ['Brakes', 'Engine']}
+
+        Returns:
+            Sorted array of row ids, or None when no filter applies
+
+        Raises:
+            ValueError: If the filters are invalid (see validate_filters)
+        """
+        if not validate_filters(filters):
+            return None
+
+        value = filters['category']
+        categories = [value] if isinstance(value, str) else list(value)
+        arrays = [self.category_rows.get(category, np.empty(0, dtype=np.int64)) for category in categories]
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.unique(np.concatenate(arrays))
@@ -0,0 +1,188 @@
+import json
+import logging
+import numpy as np
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple, Union
+
+from .lru_cache import LRUCache
+from .metrics import MetricsRegistry, NULL_METRICS
+from .compression import compress_block, decompress_block
+from .s3_vector_service import S3VectorService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Reads (key, [(start, end), ...]) byte ranges, end exclusive; None if a read failed
+RangeReader = Callable[[str, List[Tuple[int, int]]], Optional[List[bytes]]]
+
+
+def pack_sections(sections: List[Dict[str, Any]], codec: Optional[str] = None) -> Tuple[bytes, np.ndarray]:
+    """
+    Serialize sections into one blob addressable by byte range.
+
+    Args:
+        sections: Sections to pack
+        codec: Compress every section on its own with this codec
+
+    Returns:
+        Tuple of (blob, int64 offsets); section i is blob[offsets[i]:offsets[i + 1]]
+    """
+    parts = [json.dumps(section, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+             for section in sections]
+    if codec:
+        parts = [compress_block(part, codec) for part in parts]
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    np.cumsum([len(part) for part in parts], out=offsets[1:])
+    return b''.join(parts), offsets
+
+
+def decode_section(data: bytes, codec: Optional[str] = None) -> Dict[str, Any]:
+    """Decode one packed section (see pack_sections)."""
+    return json.loads(decompress_block(data, codec) if codec else data)
+
+
+def unpack_sections(blob: bytes, offsets: np.ndarray, codec: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Split a packed blob back into its sections (see pack_sections)."""
+    return [decode_section(blob[int(start):int(end)], codec) for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def read_shard_sections(s3_service: S3VectorService, shard: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Read every section of a shard, packed or written as JSON before blobs existed.
+
+    Args:
+        s3_service: Service used to read artifacts
+        shard: Shard entry of a manifest
+
+    Returns:
+        Sections of the shard or None if an artifact could not be read
+    """
+    if not shard.get('section_blob'):
+        return s3_service.download_sections(shard['sections'])
+
+    blob = s3_service.download_bytes(shard['section_blob'])
+    offsets = s3_service.download_embeddings(shard['section_offsets'])
+    if blob is None or offsets is None:
+        return None
+    return unpack_sections(blob, offsets, shard.get('compression'))
+
+
+class SectionCache(LRUCache):
+    """
+    Process-wide LRU of hydrated sections, keyed by (full blob key, row in blob).
+    Blobs are immutable, so entries stay valid across snapshot versions and
+    sections that did not change are not fetched again after a swap.
+    """
+
+    def __init__(self, max_size: int, metrics: MetricsRegistry = NULL_METRICS):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Most sections kept (0 disables the cache)
+            metrics: Registry for hit and miss counters
+        """
+        super().__init__(max_size, name='section_cache', metrics=metrics)
+
+
+class SectionStore:
+    """
+    Read-only sequence of a snapshot's sections, hydrated on demand.
+
+    Each shard is either a packed blob with its offset index and codec, read with
+    ranged GETs (adjacent rows in one request), or a list of sections already in memory
+    (shards written before blobs existed). Fetched sections go through a shared
+    SectionCache, so hot sections are served locally.
+    """
+
+    def __init__(self, read_ranges: RangeReader,
+                 shards: List[Union[Tuple[str, np.ndarray, Optional[str]], List[Dict[str, Any]]]],
+                 row_shard: np.ndarray, row_local: np.ndarray,
+                 cache: Optional[SectionCache] = None, key_prefix: str = ''):
+        """
+        Initialize the store.
+
+        Args:
+            read_ranges: Function reading byte ranges of an S3 object
+            shards: Per shard, (blob key, offsets, codec or None) or the list of its sections
+            row_shard: Shard of every row
+            row_local: Position of every row within its shard
+            cache: Hot section cache shared between snapshots
+            key_prefix: Namespace prefix of the blob keys, so stores of different
+                        namespaces can share one cache
+        """
+        self.read_ranges = read_ranges
+        self.shards = shards
+        self.row_shard = row_shard
+        self.row_local = row_local
+        self.cache = cache if cache is not None else SectionCache(0)
+        self.key_prefix = key_prefix
+
+    def __len__(self) -> int:
+        return len(self.row_shard)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if not -len(self) <= row < len(self):
+            raise IndexError(f"section row {row} out of range")
+        return self.get_many([row % len(self)])[0]
+
+    def __iter__(self):
+        """Iterate over every section, one shard at a time."""
+        for shard in np.unique(self.row_shard):
+            rows = np.flatnonzero(self.row_shard == shard)
+            yield from self.get_many(rows)
+
+    def get_many(self, rows: Sequence[int]) -> List[Dict[str, Any]]:
+        """
+        Get several sections with at most one batch of ranged reads per shard.
+
+        Args:
+            rows: Snapshot rows
+
+        Returns:
+            Sections in the order of rows
+
+        Raises:
+            OSError: If a blob could not be read
+        """
+        sections: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        missing: Dict[int, List[Tuple[int, int]]] = {}
+        for position, row in enumerate(rows):
+            shard, local = int(self.row_shard[row]), int(self.row_local[row])
+            source = self.shards[shard]
+            if isinstance(source, list):
+                sections[position] = source[local]
+                continue
+            section = self.cache.get((self.key_prefix + source[0], local))
+            if section is None:
+                missing.setdefault(shard, []).append((local, position))
+            else:
+                sections[position] = section
+
+        for shard, wanted in missing.items():
+            key, offsets, codec = self.shards[shard]
+            runs = self._runs(sorted({local for local, _ in wanted}))
+            blocks = self.read_ranges(key, [(int(offsets[first]), int(offsets[last + 1])) for first, last in runs])
+            if blocks is None:
+                raise OSError(f"Failed to read sections from {key}")
+
+            fetched = {}
+            for (first, last), block in zip(runs, blocks):
+                base = int(offsets[first])
+                for local in range(first, last + 1):
+                    section = decode_section(block[int(offsets[local]) - base:int(offsets[local + 1]) - base], codec)
+                    fetched[local] = section
+                    self.cache.put((self.key_prefix + key, local), section)
+            for local, position in wanted:
+                sections[position] = fetched[local]
+        return sections
+
+    @staticmethod
+    def _runs(rows: List[int]) -> List[Tuple[int, int]]:
+        """Group sorted rows into (first, last) runs of consecutive rows."""
+        runs = []
+        for row in rows:
+            if runs and runs[-1][1] == row - 1:
+                runs[-1] = (runs[-1][0], row)
+            else:
+                runs.append((row, row))
+        return runs
@@ -0,0 +1,147 @@
+import re
+import json
+import logging
+from typing import Dict, Any, Iterator, TextIO
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Characters read per refill; grows while a single value spans more than the buffer
+READ_CHUNK_SIZE = 1 << 16
+
+JSON_LINES_SUFFIXES = ('.jsonl', '.ndjson')
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+
+class _JsonStream:
+    """
+    Decodes JSON values one at a time from a text file, keeping only the
+    value being decoded (plus one read chunk) in memory.
+    """
+
+    def __init__(self, file: TextIO, chunk_size: int = READ_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the unread part of the buffer; False at end of file."""
+        chunk = self.file.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and get the next character ('' at end of file)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str):
+        """Consume the next character, which must be char."""
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buffer, self.pos)
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Most likely the value continues in the next chunk
+                if not self._fill():
+                    raise
+                continue
+            # A number ending at the buffer end may continue in the next chunk
+            if end == len(self.buffer) and not isinstance(value, (dict, list, str)) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        """Decode the items of the array starting at the current position."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+def iter_sections(file_path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Read manual sections one at a time, so files of any size can be processed
+    in constant memory.
+
+    Supported layouts:
+        {"sections": [{...}, ...], ...}   (other top-level keys are skipped)
+        [{...}, ...]
+        JSON Lines (.jsonl / .ndjson), one section per line
+
+    Args:
+        file_path: Path to the manual file
+        chunk_size: Characters read at a time
+
+    Yields:
+        Section dictionaries in file order
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        if file_path.endswith(JSON_LINES_SUFFIXES):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        yield from read_sections(file, chunk_size)
+
+
+def read_sections(file: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Read manual sections one at a time from an open JSON text stream, such as
+    an S3 response body, in either JSON layout of iter_sections.
+
+    Args:
+        file: Text stream positioned at the start of the JSON document
+        chunk_size: Characters read at a time
+
+    Yields:
+        Section dictionaries in stream order
+
+    Raises:
+        json.JSONDecodeError: If the stream is not valid JSON
+    """
+    stream = _JsonStream(file, chunk_size)
+    if stream.peek() == '[':
+        yield from stream.array_items()
+        return
+
+    stream.expect('{')
+    while stream.peek() != '}':
+        key = stream.value()
+        stream.expect(':')
+        if key == 'sections':
+            yield from stream.array_items()
+        else:
+            stream.value()
+        if stream.peek() == ',':
+            stream.pos += 1
+    stream.expect('}')
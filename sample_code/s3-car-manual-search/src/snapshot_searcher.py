@@ -0,0 +1,550 @@
+import json
+import time
+import numpy as np
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from .manual_processor import ManualProcessor
+from .embedding_service import EmbeddingService
+from .s3_vector_service import S3VectorService
+from .keyword_index import reciprocal_rank_fusion
+from .search_snapshot import SearchSnapshot, load_snapshot
+from .metrics import MetricsRegistry
+from .result_cache import SemanticResultCache
+from .section_store import SectionCache
+from .section_index import validate_filters
+from config import MAX_SEARCH_RESULTS, SIMILARITY_THRESHOLD, SEARCH_MODE, HYBRID_CANDIDATES, RRF_K
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SnapshotSearcher:
+    """
+    Searches the snapshot of one manual corpus (the bucket root or a namespace):
+    loads it on first use, swaps in newer manifest versions on refresh and runs
+    vector, hybrid and fallback keyword searches against it. A searcher starts no
+    threads and keeps no state besides its snapshot, so namespaces can each have
+    one; SearchService adds uploads, background refresh and health checks.
+    """
+    
+    def __init__(self, s3_service: S3VectorService, embedding_service: EmbeddingService,
+                 metrics: MetricsRegistry, result_cache: SemanticResultCache,
+                 section_cache: SectionCache):
+        """
+        Initialize the searcher.
+        
+        Args:
+            s3_service: Service reading the corpus's artifacts
+            embedding_service: Encoder for queries
+            metrics: Registry for latency and counters
+            result_cache: Semantic result cache (bound to one snapshot at a time)
+            section_cache: Hot section cache, may be shared between searchers
+        """
+        self.s3_service = s3_service
+        self.embedding_service = embedding_service
+        self.metrics = metrics
+        self.result_cache = result_cache
+        self.section_cache = section_cache
+        
+        # Search data of one manifest version, replaced as a whole by refreshes.
+        # Loads are serialized so concurrent first queries share a single download.
+        self._snapshot: Optional[SearchSnapshot] = None
+        self._load_lock = threading.Lock()
+        self._load_attempts = 0  # completed first-load attempts
+    
+    @property
+    def snapshot(self) -> Optional[SearchSnapshot]:
+        """The snapshot currently serving queries (None until data is loaded)."""
+        return self._snapshot
+    
+    def _load_data_from_s3(self) -> bool:
+        """
+        Load the current snapshot from S3 if none is loaded yet.
+        Once a snapshot is loaded, newer versions are picked up by refresh_snapshot.
+        Callers arriving while a load is in flight wait for it and share its
+        result instead of starting their own download.
+        
+        Returns:
+            True if a snapshot is available
+        """
+        if self._snapshot is not None:
+            return True
+        
+        attempt = self._load_attempts
+        with self._load_lock:
+            if self._snapshot is not None:
+                return True
+            # A load we waited on just failed; don't retry it once per waiting caller
+            if self._load_attempts != attempt:
+                return False
+            try:
+                return self._refresh_snapshot()
+            finally:
+                self._load_attempts += 1
+    
+    def refresh_snapshot(self) -> bool:
+        """
+        Load the current manifest version into a new snapshot and swap it in.
+        Queries keep using the previous snapshot until the new one is fully built;
+        the swap itself is a single reference assignment. Refreshes are serialized,
+        so concurrent callers never load the same version twice.
+        
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        with self._load_lock:
+            return self._refresh_snapshot()
+    
+    def _refresh_snapshot(self) -> bool:
+        """Load and swap in the current manifest version; the caller holds _load_lock."""
+        manifest = self.s3_service.download_manifest()
+        current = self._snapshot
+        if current is not None:
+            if manifest is None or manifest['version'] == current.version:
+                return False
+        
+        with self.metrics.timer('snapshot.load'):
+            snapshot = load_snapshot(self.s3_service, manifest, self.section_cache)
+        if snapshot is None:
+            self.metrics.increment('snapshot.load_failures')
+            return False
+        
+        self._snapshot = snapshot
+        self.metrics.increment('snapshot.swaps')
+        if current is not None:
+            logger.info(f"Swapped snapshot version {current.version} -> {snapshot.version}")
+        return True
+    
+    def search(self, query: str, top_k: int = MAX_SEARCH_RESULTS,
+               mode: str = SEARCH_MODE,
+               filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search for relevant manual sections based on a query.
+        
+        Args:
+            query: Search query from the user
+            top_k: Number of top results to return
+            mode: 'vector' for semantic search or 'hybrid' to fuse it with BM25
+            filters: Optional filters, e.g. {'category': 'Brakes'}; only matching
+                     sections are scored
+            
+        Returns:
+            List of search results with sections and similarity scores
+            
+        Raises:
+            ValueError: If the filters are invalid (e.g. an unsupported field)
+        """
+        self.metrics.increment('search.queries')
+        with self.metrics.timer('search.total'):
+            return self._search(query, top_k, mode, filters)
+    
+    def _search(self, query: str, top_k: int, mode: str,
+                filters: Optional[Dict[str, Any]],
+                query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Run a search; see search for the arguments (query_embedding skips encoding)."""
+        # A bad filter is the caller's error, not a reason to fall back to keyword search
+        validate_filters(filters)
+        try:
+            logger.info(f"Searching for: '{query}'")
+            
+            # Load data from S3 if not cached
+            if not self._load_data_from_s3():
+                # Fallback to local keyword search
+                logger.warning("Using fallback keyword search")
+                return self._fallback_search(query, top_k, filters)
+            
+            # Hold one snapshot for the whole query so a concurrent swap cannot mix versions
+            snapshot = self._snapshot
+            rows = snapshot.section_index.rows_for(filters)
+            if rows is not None and len(rows) == 0:
+                logger.info(f"No sections match filters {filters}")
+                return []
+            
+            if mode == 'hybrid' and not snapshot.keyword_index.num_docs:
+                # Snapshot published without a keyword index
+                mode = 'vector'
+            
+            # Generate embedding for the query
+            if query_embedding is None:
+                with self.metrics.timer('search.encode'):
+                    query_embedding = self.embedding_service.generate_embedding(query)
+            
+            if mode == 'hybrid':
+                vector_results, cached_from = self._cached_vector_search(
+                    snapshot, query, query_embedding, max(top_k, HYBRID_CANDIDATES), rows, filters
+                )
+                return self._mark_cached(
+                    self._hybrid_search(snapshot, query, query_embedding, top_k, rows, vector_results), cached_from
+                )
+            
+            # Find most similar sections
+            similar_results, cached_from = self._cached_vector_search(
+                snapshot, query, query_embedding, top_k, rows, filters
+            )
+            return self._mark_cached(
+                self._vector_results(snapshot, query, similar_results, top_k, filters), cached_from
+            )
+            
+        except Exception as e:
+            logger.error(f"Error during search: {e}")
+            self.metrics.increment('search.errors')
+            # Fallback to keyword search
+            return self._fallback_search(query, top_k, filters)
+    
+    def search_batch(self, queries: List[str], top_k: int = MAX_SEARCH_RESULTS,
+                     mode: str = SEARCH_MODE,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search several queries at once. All queries are encoded in one model call
+        and scored in one pass over the embedding matrix, which is much cheaper
+        than the same number of search calls.
+        
+        Args:
+            queries: Search queries
+            top_k: Number of top results per query
+            mode: 'vector' for semantic search or 'hybrid' to fuse it with BM25
+            filters: Optional filters applied to every query
+            
+        Returns:
+            One list of search results per query, as search returns
+            
+        Raises:
+            ValueError: If the filters are invalid
+        """
+        if not queries:
+            return []
+        self.metrics.increment('search.queries', len(queries))
+        self.metrics.increment('search.batches')
+        with self.metrics.timer('search.batch'):
+            return self._search_batch(queries, top_k, mode, filters)
+    
+    def _search_batch(self, queries: List[str], top_k: int, mode: str,
+                      filters: Optional[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Run a batch of searches; see search_batch for the arguments."""
+        validate_filters(filters)
+        try:
+            logger.info(f"Searching for a batch of {len(queries)} queries")
+            
+            if not self._load_data_from_s3():
+                logger.warning("Using fallback keyword search")
+                return [self._fallback_search(query, top_k, filters) for query in queries]
+            
+            snapshot = self._snapshot
+            rows = snapshot.section_index.rows_for(filters)
+            if rows is not None and len(rows) == 0:
+                logger.info(f"No sections match filters {filters}")
+                return [[] for _ in queries]
+            
+            with self.metrics.timer('search.encode'):
+                query_embeddings = self.embedding_service.generate_query_embeddings(queries)
+            
+            if mode == 'hybrid' and snapshot.keyword_index.num_docs:
+                candidates = max(top_k, HYBRID_CANDIDATES)
+                vector_batch = self._cached_vector_search_batch(snapshot, queries, query_embeddings, candidates,
+                                                                rows, filters)
+                return [
+                    self._mark_cached(
+                        self._hybrid_search(snapshot, query, query_embedding, top_k, rows, vector_results),
+                        cached_from
+                    )
+                    for query, query_embedding, (vector_results, cached_from)
+                    in zip(queries, query_embeddings, vector_batch)
+                ]
+            
+            vector_batch = self._cached_vector_search_batch(snapshot, queries, query_embeddings, top_k,
+                                                            rows, filters)
+            return [
+                self._mark_cached(self._vector_results(snapshot, query, similar_results, top_k, filters), cached_from)
+                for query, (similar_results, cached_from) in zip(queries, vector_batch)
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error during batch search: {e}")
+            self.metrics.increment('search.errors')
+            return [self._fallback_search(query, top_k, filters) for query in queries]
+    
+    @staticmethod
+    def _result_cache_key(k: int, filters: Optional[Dict[str, Any]]) -> Tuple[int, Optional[str]]:
+        """Search parameters vector matches depend on, as a result cache key."""
+        return k, json.dumps(filters, sort_keys=True, default=str) if filters else None
+    
+    def _cached_vector_search(self, snapshot: SearchSnapshot, query: str, query_embedding: np.ndarray, k: int,
+                              rows: Optional[np.ndarray],
+                              filters: Optional[Dict[str, Any]]) -> Tuple[List[Tuple[int, float]], Optional[str]]:
+        """
+        Get the vector matches of a query, reusing those of a recent query with a
+        near-identical embedding and the same parameters.
+        
+        Args:
+            snapshot: Snapshot to search
+            query: Search query (remembered with its matches)
+            query_embedding: Embedding of the query
+            k: Number of matches
+            rows: Optional row ids allowed by the search filters
+            filters: Search filters (part of the cache key)
+            
+        Returns:
+            Tuple of ((row, similarity score) matches sorted by score, text of the
+            query the matches were cached for or None if they were just computed)
+        """
+        key = self._result_cache_key(k, filters)
+        cached = self.result_cache.lookup(snapshot, key, query_embedding)
+        if cached is not None:
+            return cached
+        
+        started = time.perf_counter()
+        similar_results = snapshot.vector_index.search(query_embedding, k, rows)
+        self.result_cache.store(snapshot, key, query_embedding, similar_results,
+                                time.perf_counter() - started, query)
+        return similar_results, None
+    
+    def _cached_vector_search_batch(self, snapshot: SearchSnapshot, queries: List[str],
+                                    query_embeddings: np.ndarray, k: int, rows: Optional[np.ndarray],
+                                    filters: Optional[Dict[str, Any]]
+                                    ) -> List[Tuple[List[Tuple[int, float]], Optional[str]]]:
+        """Batch version of _cached_vector_search: only cache misses are scored, in one pass."""
+        key = self._result_cache_key(k, filters)
+        vector_batch = [self.result_cache.lookup(snapshot, key, embedding) for embedding in query_embeddings]
+        missing = [i for i, cached in enumerate(vector_batch) if cached is None]
+        if missing:
+            started = time.perf_counter()
+            computed = snapshot.vector_index.search_batch(query_embeddings[missing], k, rows)
+            seconds = (time.perf_counter() - started) / len(missing)
+            for i, similar_results in zip(missing, computed):
+                self.result_cache.store(snapshot, key, query_embeddings[i], similar_results, seconds, queries[i])
+                vector_batch[i] = (similar_results, None)
+        return vector_batch
+    
+    @staticmethod
+    def _mark_cached(results: List[Dict[str, Any]], cached_from: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Label results built on vector matches reused from the semantic result cache
+        with the query those matches were computed for (fallback results are left as is).
+        """
+        if cached_from is not None:
+            for result in results:
+                if result.get('search_type') in (None, 'hybrid'):
+                    result['cached_from'] = cached_from
+        return results
+    
+    def _vector_results(self, snapshot: SearchSnapshot, query: str,
+                        similar_results: List[Tuple[int, float]], top_k: int,
+                        filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Turn vector matches into search results, falling back to keyword search
+        when none clears the similarity threshold.
+        
+        Args:
+            snapshot: Snapshot the matches refer to
+            query: Search query (for the fallback)
+            similar_results: (row, similarity score) matches sorted by score
+            top_k: Number of results for the fallback
+            filters: Search filters (for the fallback)
+            
+        Returns:
+            List of search results
+        """
+        with self.metrics.timer('search.threshold'):
+            relevant = [(idx, score) for idx, score in similar_results if score >= SIMILARITY_THRESHOLD]
+        
+        # Prepare results with section data
+        with self.metrics.timer('search.hydrate'):
+            sections = snapshot.get_sections([idx for idx, _ in relevant])
+            search_results = [
+                self._build_result(snapshot, idx, section, similarity_score, rank)
+                for rank, ((idx, similarity_score), section) in enumerate(zip(relevant, sections), 1)
+            ]
+        
+        # If no results above threshold, use fallback
+        if not search_results:
+            logger.warning(f"No results above similarity threshold {SIMILARITY_THRESHOLD}")
+            return self._fallback_search(query, top_k, filters)
+        
+        logger.info(f"Found {len(search_results)} relevant results")
+        return search_results
+    
+    def _build_result(self, snapshot: SearchSnapshot, idx: int, section: Dict[str, Any],
+                      score: float, rank: int, search_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Build a search result for a row of a snapshot.
+        
+        Args:
+            snapshot: Snapshot the row index refers to
+            idx: Row index into the snapshot sections and metadata
+            section: Section of the row (see SearchSnapshot.get_sections)
+            score: Score to report as similarity_score
+            rank: 1-based rank of the result
+            search_type: Optional search type label
+            
+        Returns:
+            Search result dictionary
+        """
+        result = {
+            'section': section,
+            'metadata': snapshot.metadata[idx],
+            'similarity_score': score,
+            'rank': rank
+        }
+        if search_type:
+            result['search_type'] = search_type
+        return result
+    
+    def _hybrid_search(self, snapshot: SearchSnapshot, query: str, query_embedding: np.ndarray,
+                       top_k: int, rows: Optional[np.ndarray] = None,
+                       vector_results: Optional[List[Tuple[int, float]]] = None) -> List[Dict[str, Any]]:
+        """
+        Fuse vector and BM25 rankings with reciprocal rank fusion.
+        
+        Args:
+            snapshot: Snapshot to search
+            query: Search query
+            query_embedding: Embedding of the query
+            top_k: Number of results to return
+            rows: Optional row ids allowed by the search filters
+            vector_results: Vector matches already computed for the query (e.g. by a batch)
+            
+        Returns:
+            List of search results
+        """
+        candidates = max(top_k, HYBRID_CANDIDATES)
+        if vector_results is None:
+            vector_results = snapshot.vector_index.search(query_embedding, candidates, rows)
+        with self.metrics.timer('search.keyword'):
+            keyword_results = snapshot.keyword_index.search(query, candidates, rows)
+        
+        fused = reciprocal_rank_fusion(
+            [[idx for idx, _ in vector_results], [idx for idx, _ in keyword_results]],
+            k=RRF_K
+        )
+        
+        # Scale so a row ranked first by both lists scores 1.0
+        best_possible = 2.0 / (RRF_K + 1)
+        vector_scores = dict(vector_results)
+        keyword_scores = dict(keyword_results)
+        
+        results = []
+        with self.metrics.timer('search.hydrate'):
+            sections = snapshot.get_sections([idx for idx, _ in fused[:top_k]])
+            for rank, ((idx, score), section) in enumerate(zip(fused[:top_k], sections), 1):
+                result = self._build_result(snapshot, idx, section, score / best_possible, rank, 'hybrid')
+                result['vector_score'] = vector_scores.get(idx)
+                result['keyword_score'] = keyword_scores.get(idx)
+                results.append(result)
+        
+        logger.info(f"Hybrid search found {len(results)} results")
+        return results
+    
+    def _fallback_search(self, query: str, top_k: int,
+                         filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Fallback BM25 keyword search when vector search is not available.
+        
+        Args:
+            query: Search query
+            top_k: Number of results to return
+            filters: Optional search filters
+            
+        Returns:
+            List of search results
+        """
+        self.metrics.increment('search.fallbacks')
+        with self.metrics.timer('search.fallback'):
+            return self._keyword_fallback(query, top_k, filters)
+    
+    def _keyword_fallback(self, query: str, top_k: int,
+                          filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run the fallback keyword search; see _fallback_search for the arguments."""
+        try:
+            logger.info("Using fallback keyword search")
+            
+            snapshot = self._snapshot
+            if snapshot is not None:
+                rows = snapshot.section_index.rows_for(filters)
+                matches = snapshot.keyword_index.search(query, top_k, rows)
+                fuzzy_matches = []
+                if snapshot.keyword_index.missing_terms(query):
+                    with self.metrics.timer('search.fuzzy'):
+                        fuzzy_matches = snapshot.fuzzy_index.search(query, top_k, rows)
+                ranked = self._fuse_fuzzy(matches, fuzzy_matches, top_k)
+                sections = snapshot.get_sections([idx for idx, _ in ranked])
+            else:
+                # Use the local manual for keyword search, if this corpus has one
+                manual = self._local_manual()
+                if manual is None:
+                    return []
+                rows = manual.section_index.rows_for(filters)
+                matches = manual.keyword_search(query, top_k, rows)
+                fuzzy_matches = []
+                if manual.keyword_index.missing_terms(query):
+                    with self.metrics.timer('search.fuzzy'):
+                        fuzzy_matches = manual.fuzzy_search(query, top_k, rows)
+                ranked = self._fuse_fuzzy(matches, fuzzy_matches, top_k)
+                sections = [manual.sections[idx] for idx, _ in ranked]
+            
+            keyword_scores = dict(matches)
+            fuzzy_scores = dict(fuzzy_matches)
+            search_type = 'fuzzy_fallback' if fuzzy_matches else 'keyword_fallback'
+            
+            results = []
+            for i, ((idx, score), section) in enumerate(zip(ranked, sections)):
+                result = {
+                    'section': section,
+                    'metadata': {
+                        'id': section.get('id'),
+                        'category': section.get('category'),
+                        'title': section.get('title'),
+                        'keywords': section.get('keywords', [])
+                    },
+                    'similarity_score': score,
+                    'keyword_score': keyword_scores.get(idx),
+                    'rank': i + 1,
+                    'search_type': search_type
+                }
+                if fuzzy_matches:
+                    result['fuzzy_score'] = fuzzy_scores.get(idx)
+                results.append(result)
+            
+            logger.info(f"Fallback search found {len(results)} results")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in fallback search: {e}")
+            return []
+    
+    @staticmethod
+    def _fuse_fuzzy(matches: List[Tuple[int, float]], fuzzy_matches: List[Tuple[int, float]],
+                    top_k: int) -> List[Tuple[int, float]]:
+        """
+        Combine BM25 and trigram matches into one ranking with 0-1 scores.
+        
+        Args:
+            matches: (row, bm25 score) matches sorted by score
+            fuzzy_matches: (row, trigram similarity) matches sorted by similarity
+            top_k: Number of rows to keep
+            
+        Returns:
+            (row, score) pairs: BM25 scores relative to the best match when there
+            are no fuzzy matches, trigram similarities when BM25 found nothing,
+            otherwise the reciprocal rank fusion of both scaled like hybrid search
+        """
+        if not fuzzy_matches:
+            # Report BM25 scores relative to the best match
+            top_score = matches[0][1] if matches else 1.0
+            return [(idx, score / top_score) for idx, score in matches]
+        if not matches:
+            return fuzzy_matches[:top_k]
+        
+        fused = reciprocal_rank_fusion(
+            [[idx for idx, _ in matches], [idx for idx, _ in fuzzy_matches]], k=RRF_K
+        )
+        best_possible = 2.0 / (RRF_K + 1)
+        return [(idx, score / best_possible) for idx, score in fused[:top_k]]
+    
+    
+    def _local_manual(self) -> Optional[ManualProcessor]:
+        """Get the local manual to search while no snapshot is loaded (None if there is none)."""
+        return None
+    
+    def clear_cache(self):
+        """Drop the loaded snapshot so the next call reloads it from S3."""
+        self._snapshot = None
@@ -0,0 +1,512 @@
+import numpy as np
+import logging
+from typing import List, Tuple, Optional, Callable
+from config import RERANK_FACTOR, PASSAGE_AGGREGATION, PASSAGE_TOP_N, COARSE_CANDIDATE_FACTOR
+from .metrics import MetricsRegistry, NULL_METRICS
+from .projection import project_embeddings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rows scored per block; bounds the float32 temporary used for quantized matrices
+SCORING_CHUNK_ROWS = 65536
+
+# Above this fraction of rows a filtered query scores the whole matrix and selects
+# afterwards, since gathering rows would cost more than the contiguous scan
+FULL_SCAN_FRACTION = 0.5
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Get indices of the k highest scores, sorted by descending score.
+
+    Args:
+        scores: 1D array of scores
+        k: Number of indices to return
+
+    Returns:
+        Array of indices
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+def aggregate_passage_scores(scores: np.ndarray, offsets: np.ndarray,
+                             method: str = 'max', top_n: int = 2) -> np.ndarray:
+    """
+    Reduce passage scores to one score per section.
+
+    Args:
+        scores: Score of every passage, grouped by section
+        offsets: Passages of section i are scores[offsets[i]:offsets[i + 1]] (non-empty)
+        method: 'max' or 'mean' (mean of each section's top_n passages)
+        top_n: Passages averaged per section for 'mean'
+
+    Returns:
+        Array with one score per section
+    """
+    if method not in ('max', 'mean'):
+        raise ValueError(f"Unsupported passage aggregation: {method}")
+    counts = np.diff(offsets)
+    if len(counts) == 0:
+        return np.empty(0, dtype=np.float32)
+    if method == 'max':
+        return np.maximum.reduceat(scores, offsets[:-1])
+
+    # Sort passages by score within their section, then keep the first top_n of each
+    groups = np.repeat(np.arange(len(counts)), counts)
+    order = np.lexsort((-scores, groups))
+    rank = np.arange(len(scores)) - np.repeat(offsets[:-1], counts)
+    kept = order[rank < top_n]
+    sums = np.bincount(groups[kept], weights=scores[kept], minlength=len(counts))
+    return (sums / np.minimum(counts, top_n)).astype(np.float32)
+
+
+class VectorIndex:
+    """
+    Brute-force cosine similarity index over a (possibly quantized) embedding matrix.
+    When the matrix is quantized, the top_k * rerank_factor candidates are re-scored
+    against full-precision rows fetched on demand.
+    """
+
+    def __init__(self, embeddings: np.ndarray, scales: Optional[np.ndarray] = None,
+                 rerank_rows: Optional[Callable[[np.ndarray], Optional[np.ndarray]]] = None,
+                 rerank_factor: int = RERANK_FACTOR, metrics: MetricsRegistry = NULL_METRICS):
+        """
+        Initialize the vector index.
+
+        Args:
+            embeddings: Embedding matrix (float32, float16 or int8)
+            scales: Int8 scale factors, shape (n, 1) per vector or (1, d) per dimension
+            rerank_rows: Callable returning full-precision rows for sorted row ids
+            rerank_factor: Candidate multiplier for exact re-ranking (0 disables)
+            metrics: Registry for score/top-k/re-rank timings
+        """
+        self.embeddings = embeddings
+        self.metrics = metrics
+        self.scales = scales
+        self.rerank_rows = rerank_rows
+        self.rerank_factor = rerank_factor
+
+        # Per-vector scales cancel out in cosine similarity; per-dimension scales
+        # are folded into the query instead of the matrix
+        self._dimension_scales = None
+        if scales is not None and scales.shape[1] != 1:
+            self._dimension_scales = scales.reshape(-1)
+
+        self.row_norms = self._compute_row_norms()
+
+    @property
+    def quantized(self) -> bool:
+        """Whether the scoring matrix is stored below full precision."""
+        return self.embeddings.dtype != np.float32
+
+    def __len__(self) -> int:
+        return self.embeddings.shape[0]
+
+    def _iter_blocks(self, rows: Optional[np.ndarray] = None):
+        """Yield (start, float32 block) pairs over the embedding matrix or selected rows."""
+        total = len(self) if rows is None else len(rows)
+        for start in range(0, total, SCORING_CHUNK_ROWS):
+            if rows is None:
+                block = self.embeddings[start:start + SCORING_CHUNK_ROWS]
+            else:
+                block = self.embeddings[rows[start:start + SCORING_CHUNK_ROWS]]
+            yield start, np.asarray(block, dtype=np.float32)
+
+    def _compute_row_norms(self) -> np.ndarray:
+        """Compute the L2 norm of every (dequantized) row."""
+        norms = np.empty(len(self), dtype=np.float32)
+        for start, block in self._iter_blocks():
+            if self._dimension_scales is not None:
+                block = block * self._dimension_scales
+            norms[start:start + len(block)] = np.linalg.norm(block, axis=1)
+        norms[norms == 0] = 1.0
+        return norms
+
+    def score(self, query_embedding: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Calculate cosine similarity between the query and every row.
+
+        Args:
+            query_embedding: Query embedding vector
+            rows: Optional row ids to restrict scoring to
+
+        Returns:
+            Array of similarity scores (aligned with rows when given)
+        """
+        if rows is not None and len(rows) > FULL_SCAN_FRACTION * len(self):
+            return self.score(query_embedding)[rows]
+
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        query_norm = float(np.linalg.norm(query)) or 1.0
+        if self._dimension_scales is not None:
+            query = query * self._dimension_scales
+
+        scores = np.empty(len(self) if rows is None else len(rows), dtype=np.float32)
+        for start, block in self._iter_blocks(rows):
+            scores[start:start + len(block)] = block @ query
+
+        scores /= self.row_norms if rows is None else self.row_norms[rows]
+        scores /= query_norm
+        return scores
+
+    def rerank_scores(self, query_embedding: np.ndarray, candidates: np.ndarray) -> Optional[np.ndarray]:
+        """Re-score candidates at full precision, or None if rows are unavailable."""
+        row_ids = np.sort(candidates)
+        rows = self.rerank_rows(row_ids)
+        if rows is None:
+            logger.warning("Full-precision rows unavailable, keeping approximate scores")
+            return None
+
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        rows = np.asarray(rows, dtype=np.float32)
+        norms = np.linalg.norm(rows, axis=1) * (float(np.linalg.norm(query)) or 1.0)
+        norms[norms == 0] = 1.0
+        exact = (rows @ query) / norms
+
+        # Map back to the caller's candidate order
+        return exact[np.searchsorted(row_ids, candidates)]
+
+    def search(self, query_embedding: np.ndarray, top_k: int,
+               rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Find the most similar rows to a query.
+
+        Args:
+            query_embedding: Query embedding vector
+            top_k: Number of top results to return
+            rows: Optional sorted row ids to restrict the search to (e.g. a category filter)
+
+        Returns:
+            List of tuples (index, similarity_score) sorted by similarity
+        """
+        with self.metrics.timer('search.score'):
+            scores = self.score(query_embedding, rows)
+
+        use_rerank = self.quantized and self.rerank_rows is not None and self.rerank_factor > 0
+        with self.metrics.timer('search.top_k'):
+            positions = top_k_indices(scores, top_k * self.rerank_factor if use_rerank else top_k)
+        candidates = positions if rows is None else rows[positions]
+        if not use_rerank:
+            return [(int(idx), float(score)) for idx, score in zip(candidates, scores[positions])]
+
+        with self.metrics.timer('search.rerank'):
+            exact = self.rerank_scores(query_embedding, candidates)
+        if exact is None:
+            exact = scores[positions]
+
+        order = np.argsort(exact)[::-1][:top_k]
+        return [(int(candidates[i]), float(exact[i])) for i in order]
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int,
+                     rows: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Find the most similar rows to several queries in one pass over the matrix.
+        Each block of rows is multiplied with all queries at once and a running
+        top-k is kept per query, so the matrix is read once per batch.
+
+        Args:
+            query_embeddings: Query embedding matrix, one row per query
+            top_k: Number of top results per query
+            rows: Optional sorted row ids to restrict the search to
+
+        Returns:
+            One list of (index, similarity_score) tuples per query, as search returns
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        total = len(self) if rows is None else len(rows)
+        use_rerank = self.quantized and self.rerank_rows is not None and self.rerank_factor > 0
+        k = min(top_k * self.rerank_factor if use_rerank else top_k, total)
+        if len(queries) == 0 or k <= 0:
+            return [[] for _ in queries]
+
+        query_norms = np.linalg.norm(queries, axis=1)
+        query_norms[query_norms == 0] = 1.0
+        scaled = queries if self._dimension_scales is None else queries * self._dimension_scales
+
+        with self.metrics.timer('search.score'):
+            best_scores = np.empty((0, len(queries)), dtype=np.float32)
+            best_positions = np.empty((0, len(queries)), dtype=np.int64)
+            for start, block in self._iter_blocks(rows):
+                block_rows = slice(start, start + len(block)) if rows is None else rows[start:start + len(block)]
+                scores = (block @ scaled.T) / self.row_norms[block_rows][:, None]
+                positions = np.broadcast_to(np.arange(start, start + len(block))[:, None], scores.shape)
+
+                best_scores = np.concatenate([best_scores, scores])
+                best_positions = np.concatenate([best_positions, positions])
+                if len(best_scores) > k:
+                    keep = np.argpartition(best_scores, -k, axis=0)[-k:]
+                    best_scores = np.take_along_axis(best_scores, keep, axis=0)
+                    best_positions = np.take_along_axis(best_positions, keep, axis=0)
+            best_scores /= query_norms
+
+        with self.metrics.timer('search.top_k'):
+            order = np.argsort(-best_scores, axis=0, kind='stable')
+            best_scores = np.take_along_axis(best_scores, order, axis=0)
+            best_positions = np.take_along_axis(best_positions, order, axis=0)
+        candidates = best_positions if rows is None else rows[best_positions]
+        if not use_rerank:
+            return [[(int(idx), float(score)) for idx, score in zip(candidates[:, q], best_scores[:, q])]
+                    for q in range(len(queries))]
+
+        # One fetch of the full-precision rows for every query's candidates
+        with self.metrics.timer('search.rerank'):
+            row_ids = np.unique(candidates)
+            full_rows = self.rerank_rows(row_ids)
+            if full_rows is None:
+                logger.warning("Full-precision rows unavailable, keeping approximate scores")
+            else:
+                full_rows = np.asarray(full_rows, dtype=np.float32)
+                row_norms = np.linalg.norm(full_rows, axis=1)
+                row_norms[row_norms == 0] = 1.0
+                exact = (full_rows @ queries.T) / row_norms[:, None] / query_norms
+                best_scores = exact[np.searchsorted(row_ids, candidates), np.arange(len(queries))]
+
+        results = []
+        for q in range(len(queries)):
+            order = np.argsort(best_scores[:, q])[::-1][:top_k]
+            results.append([(int(candidates[i, q]), float(best_scores[i, q])) for i in order])
+        return results
+
+
+class CoarseIndex:
+    """
+    Two-stage (coarse-to-fine) search. Every row is first scored on a compact
+    matrix of PCA-reduced embeddings, then only the top_k * candidate_factor best
+    rows are searched by the full-dimension index, so results keep the exact
+    scores (and the quantized re-ranking) of VectorIndex.search.
+    """
+
+    def __init__(self, index: VectorIndex, reduced: np.ndarray, components: np.ndarray,
+                 candidate_factor: int = COARSE_CANDIDATE_FACTOR):
+        """
+        Initialize the coarse index.
+
+        Args:
+            index: Full-dimension index over the same rows
+            reduced: Projected, normalized embedding of every row
+            components: Projection the reduced rows were built with
+            candidate_factor: Candidate multiplier for the second stage (0 disables the first)
+        """
+        self.index = index
+        self.reduced = reduced
+        self.components = components
+        self.candidate_factor = candidate_factor
+
+    @property
+    def quantized(self) -> bool:
+        """Whether the full-dimension matrix is stored below full precision."""
+        return self.index.quantized
+
+    @property
+    def metrics(self) -> MetricsRegistry:
+        """Registry the full-dimension index records timings in."""
+        return self.index.metrics
+
+    @property
+    def row_norms(self) -> np.ndarray:
+        """L2 norms of the full-dimension rows."""
+        return self.index.row_norms
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def score(self, query_embedding: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Calculate exact cosine similarity between the query and every row (see VectorIndex.score)."""
+        return self.index.score(query_embedding, rows)
+
+    def _candidate_count(self, top_k: int, rows: Optional[np.ndarray]) -> int:
+        """Get the rows kept by the first stage, or 0 when it would not prune anything."""
+        count = top_k * self.candidate_factor
+        total = len(self) if rows is None else len(rows)
+        return count if 0 < count < total else 0
+
+    def search(self, query_embedding: np.ndarray, top_k: int,
+               rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Find the most similar rows to a query.
+
+        Args:
+            query_embedding: Query embedding vector
+            top_k: Number of top results to return
+            rows: Optional sorted row ids to restrict the search to
+
+        Returns:
+            List of tuples (index, similarity_score) sorted by similarity
+        """
+        count = self._candidate_count(top_k, rows)
+        if not count:
+            return self.index.search(query_embedding, top_k, rows)
+
+        with self.metrics.timer('search.coarse'):
+            query = project_embeddings(np.asarray(query_embedding).reshape(-1), self.components)
+            matrix = self.reduced if rows is None else self.reduced[rows]
+            positions = top_k_indices(matrix @ query, count)
+            candidates = np.sort(positions if rows is None else rows[positions])
+        return self.index.search(query_embedding, top_k, candidates)
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int,
+                     rows: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Search several queries. The first stage scores all queries in one pass over
+        the reduced matrix; each query's candidates are then searched separately.
+
+        Args:
+            query_embeddings: Query embedding matrix, one row per query
+            top_k: Number of top results per query
+            rows: Optional sorted row ids to restrict the search to
+
+        Returns:
+            One list of (index, similarity_score) tuples per query, as search returns
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        count = self._candidate_count(top_k, rows)
+        if not count or len(queries) == 0:
+            return self.index.search_batch(queries, top_k, rows)
+
+        with self.metrics.timer('search.coarse'):
+            projected = project_embeddings(queries, self.components)
+            total = len(self) if rows is None else len(rows)
+            best_scores = np.empty((0, len(queries)), dtype=np.float32)
+            best_positions = np.empty((0, len(queries)), dtype=np.int64)
+            for start in range(0, total, SCORING_CHUNK_ROWS):
+                stop = min(start + SCORING_CHUNK_ROWS, total)
+                block = self.reduced[start:stop] if rows is None else self.reduced[rows[start:stop]]
+                positions = np.broadcast_to(np.arange(start, stop)[:, None], (stop - start, len(queries)))
+                best_scores = np.concatenate([best_scores, block @ projected.T])
+                best_positions = np.concatenate([best_positions, positions])
+                if len(best_scores) > count:
+                    keep = np.argpartition(best_scores, -count, axis=0)[-count:]
+                    best_scores = np.take_along_axis(best_scores, keep, axis=0)
+                    best_positions = np.take_along_axis(best_positions, keep, axis=0)
+            candidates = np.sort(best_positions if rows is None else rows[best_positions], axis=0)
+
+        return [self.index.search(queries[q], top_k, candidates[:, q]) for q in range(len(queries))]
+
+
+class PassageIndex:
+    """
+    Section-level search over passage embeddings. Passages are scored with a
+    VectorIndex and section scores are aggregated from them, so results keep
+    the (section row, score) shape of VectorIndex.search.
+    """
+
+    def __init__(self, passage_index: VectorIndex, offsets: np.ndarray,
+                 aggregation: str = PASSAGE_AGGREGATION, top_n: int = PASSAGE_TOP_N):
+        """
+        Initialize the passage index.
+
+        Args:
+            passage_index: Vector index over all passages, grouped by section
+            offsets: Passages of section i are rows offsets[i]:offsets[i + 1]
+            aggregation: 'max' or 'mean' (mean of the top_n passages)
+            top_n: Passages averaged per section for 'mean'
+        """
+        self.passage_index = passage_index
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.aggregation = aggregation
+        self.top_n = top_n
+
+    @property
+    def quantized(self) -> bool:
+        """Whether the passage matrix is stored below full precision."""
+        return self.passage_index.quantized
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def passages_of(self, sections: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Expand section rows into their passage rows.
+
+        Args:
+            sections: Section rows
+
+        Returns:
+            Tuple of (passage rows, offsets of each section within them)
+        """
+        sections = np.asarray(sections, dtype=np.int64)
+        starts = self.offsets[sections]
+        counts = self.offsets[sections + 1] - starts
+        local_offsets = np.zeros(len(sections) + 1, dtype=np.int64)
+        np.cumsum(counts, out=local_offsets[1:])
+        within = np.arange(local_offsets[-1]) - np.repeat(local_offsets[:-1], counts)
+        return np.repeat(starts, counts) + within, local_offsets
+
+    def score(self, query_embedding: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Calculate aggregated section scores.
+
+        Args:
+            query_embedding: Query embedding vector
+            rows: Optional section rows to restrict scoring to
+
+        Returns:
+            Array of section scores (aligned with rows when given)
+        """
+        if rows is None:
+            passage_rows, offsets = None, self.offsets
+        else:
+            passage_rows, offsets = self.passages_of(rows)
+        scores = self.passage_index.score(query_embedding, passage_rows)
+        return aggregate_passage_scores(scores, offsets, self.aggregation, self.top_n)
+
+    def search(self, query_embedding: np.ndarray, top_k: int,
+               rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Find the sections whose passages best match a query.
+
+        Args:
+            query_embedding: Query embedding vector
+            top_k: Number of sections to return
+            rows: Optional sorted section rows to restrict the search to
+
+        Returns:
+            List of tuples (section row, aggregated score) sorted by score
+        """
+        index = self.passage_index
+        metrics = index.metrics
+        with metrics.timer('search.score'):
+            scores = self.score(query_embedding, rows)
+
+        use_rerank = index.quantized and index.rerank_rows is not None and index.rerank_factor > 0
+        with metrics.timer('search.top_k'):
+            positions = top_k_indices(scores, top_k * index.rerank_factor if use_rerank else top_k)
+        candidates = positions if rows is None else rows[positions]
+        if not use_rerank:
+            return [(int(idx), float(score)) for idx, score in zip(candidates, scores[positions])]
+
+        # Re-score every passage of the candidate sections at full precision
+        with metrics.timer('search.rerank'):
+            passage_rows, offsets = self.passages_of(candidates)
+            exact = index.rerank_scores(query_embedding, passage_rows)
+        if exact is None:
+            exact = scores[positions]
+        else:
+            exact = aggregate_passage_scores(exact, offsets, self.aggregation, self.top_n)
+
+        order = np.argsort(exact)[::-1][:top_k]
+        return [(int(candidates[i]), float(exact[i])) for i in order]
+
+    def search_batch(self, query_embeddings: np.ndarray, top_k: int,
+                     rows: Optional[np.ndarray] = None) -> List[List[Tuple[int, float]]]:
+        """
+        Search several queries. Aggregation needs every passage score of a query,
+        so queries are scored one after another.
+
+        Args:
+            query_embeddings: Query embedding matrix, one row per query
+            top_k: Number of sections per query
+            rows: Optional sorted section rows to restrict the search to
+
+        Returns:
+            One list of (section row, aggregated score) tuples per query
+        """
+        return [self.search(query_embedding, top_k, rows) for query_embedding in query_embeddings]
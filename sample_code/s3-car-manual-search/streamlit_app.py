@@ -9,7 +9,7 @@ from typing import List, Dict, Any
 sys.path.append(str(Path(__file__).parent))
 
 from src.search_service import SearchService
-from config import APP_TITLE, APP_DESCRIPTION, SAMPLE_QUERIES, MANUAL_CATEGORIES
+from config import APP_TITLE, APP_DESCRIPTION, SAMPLE_QUERIES, MANUAL_CATEGORIES, SEARCH_MODE
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +34,10 @@ def initialize_search_service():
     """Initialize the search service (cached to avoid reloading)."""
     try:
         search_service = SearchService()
+        # Pick up newly published manifests in the background
+        search_service.start_refresher()
+        # Probe S3 in the background so status reruns don't hit S3
+        search_service.start_health_monitor()
         return search_service
     except Exception as e:
         st.error(f"Error initializing search service: {e}")
@@ -99,6 +103,9 @@ def display_system_status():
         s3_connected = status.get('s3_connection') == 'connected'
         s3_icon = "✅" if s3_connected else "❌"
         st.sidebar.markdown(f"{s3_icon} S3 Connection")
+        s3_details = status.get('s3_details', {})
+        if 'age_seconds' in s3_details:
+            st.sidebar.caption(f"Checked {s3_details['age_seconds']:.0f}s ago")
         
         # Data status
         embeddings_loaded = status.get('embeddings_loaded', False)
@@ -167,6 +174,26 @@ def main():
         with col2:
             search_button = st.button("🔍 Search", type="primary")
         
+        filter_col, mode_col = st.columns([2, 3])
+        
+        with filter_col:
+            category_filter = st.selectbox(
+                "Restrict to category:",
+                ["All categories"] + MANUAL_CATEGORIES,
+                help="Only sections in this category are scored"
+            )
+        
+        with mode_col:
+            hybrid = st.checkbox(
+                "Hybrid search (semantic + keyword)",
+                value=SEARCH_MODE == 'hybrid',
+                help="Fuse vector similarity with BM25 keyword ranking"
+            )
+        
+        filters = None
+        if category_filter != "All categories":
+            filters = {'category': category_filter}
+        
         # Sample queries
         st.markdown("**Quick searches:**")
         sample_cols = st.columns(len(SAMPLE_QUERIES[:5]))
@@ -180,7 +207,9 @@ def main():
         # Perform search
         if (search_button and query) or (query and len(query) > 2):
             with st.spinner(f"Searching for '{query}'..."):
-                results = st.session_state.search_service.search(query, top_k=5)
+                results = st.session_state.search_service.search(
+                    query, top_k=5, mode='hybrid' if hybrid else 'vector', filters=filters
+                )
             
             if results:
                 st.success(f"Found {len(results)} relevant results:")
@@ -276,7 +305,8 @@ def main():
     # Refresh button in sidebar
     st.sidebar.markdown("---")
     if st.sidebar.button("🔄 Refresh System Status"):
-        st.session_state.search_service.clear_cache()
+        st.session_state.search_service.request_refresh()
+        st.session_state.search_service.request_health_check()
         st.rerun()
 
 if __name__ == "__main__":
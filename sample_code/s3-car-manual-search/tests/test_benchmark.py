@@ -0,0 +1,49 @@
+"""
+Unit tests for the offline scale benchmark
+"""
+
+import unittest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.benchmark import run_worker, format_report, generate_corpus
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test cases for the benchmark harness"""
+
+    def test_generate_corpus_is_deterministic(self):
+        """Test that the same seed generates the same corpus"""
+        sections, embeddings = generate_corpus(50, 16, seed=3)
+        again, again_embeddings = generate_corpus(50, 16, seed=3)
+
+        self.assertEqual(sections, again)
+        self.assertTrue((embeddings == again_embeddings).all())
+        self.assertEqual(embeddings.shape, (50, 16))
+
+    def test_worker_measures_every_mode(self):
+        """Test a small run end to end on the S3 stand-in"""
+        run = run_worker(300, dimension=32, queries=10, top_k=3, shard_rows=128, thread_counts=(1, 2),
+                         batch_clients=4)
+
+        self.assertGreater(run['cold_load_seconds'], 0)
+        self.assertEqual(set(run['modes']), {'vector', 'filtered', 'hybrid'})
+        for mode in run['modes'].values():
+            self.assertEqual(mode['queries'], 10)
+            self.assertGreater(mode['qps'], 0)
+            self.assertLessEqual(mode['p50_ms'], mode['p99_ms'])
+        # Float32 storage is exact
+        self.assertEqual(run['modes']['vector']['recall_at_k'], 1.0)
+        self.assertEqual(run['concurrency']['cold_start']['snapshot_loads'], 1)
+        self.assertEqual(set(run['concurrency']['scaling']), {'1', '2'})
+        self.assertGreater(run['batching']['mean_batch_size'], 1)
+
+        report = format_report({'runs': [run]}, baseline={'runs': [run]})
+        self.assertIn('(+0%)', report)
+
+
+if __name__ == '__main__':
+    unittest.main()
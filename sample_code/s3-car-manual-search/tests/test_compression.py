@@ -0,0 +1,111 @@
+"""
+Unit tests for compressed shard artifacts
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_search_service import make_search_service
+from src.compression import (
+    compress_array, compress_bytes, decompress, is_compressed, resolve_codec, MAGIC
+)
+from src.section_store import pack_sections, unpack_sections
+
+
+class TestCompression(unittest.TestCase):
+    """Test cases for the compressed frame format"""
+
+    def test_arrays_round_trip_in_parallel_chunks(self):
+        """Test that shuffled arrays split into many chunks decompress exactly"""
+        rng = np.random.default_rng(0)
+        arrays = [
+            rng.standard_normal((300, 16)).astype(np.float32),
+            rng.integers(-128, 127, (50, 8), dtype=np.int8),
+            np.arange(11, dtype=np.int64),
+            np.empty((0, 4), dtype=np.float16)
+        ]
+        for array in arrays:
+            frame = compress_array(array, 'zlib', chunk_size=1000)
+            self.assertTrue(is_compressed(frame))
+            restored = decompress(frame, max_workers=4)
+            self.assertEqual((restored.dtype, restored.shape), (array.dtype, array.shape))
+            np.testing.assert_array_equal(restored, array)
+
+        text = b'brake pads squeal when worn ' * 500
+        frame = compress_bytes(text, 'zlib', chunk_size=4096)
+        self.assertLess(len(frame), len(text) / 5)
+        self.assertEqual(decompress(frame).tobytes(), text)
+        with self.assertRaises(ValueError):
+            decompress(text)
+
+    def test_codec_resolution(self):
+        """Test that zstd falls back to zlib without the zstandard package"""
+        self.assertIsNone(resolve_codec(''))
+        self.assertEqual(resolve_codec('zlib'), 'zlib')
+        with self.assertRaises(ValueError):
+            resolve_codec('lzma')
+        resolve_codec.cache_clear()
+        with patch('src.compression.zstandard', None):
+            self.assertEqual(resolve_codec('zstd'), 'zlib')
+        resolve_codec.cache_clear()
+
+    def test_sections_compress_one_by_one(self):
+        """Test that compressed sections stay addressable by byte range"""
+        sections = [{'id': f"S{i}", 'content': 'Check the brake fluid level. ' * (i + 5)} for i in range(4)]
+        blob, offsets = pack_sections(sections, 'zlib')
+        self.assertLess(len(blob), len(pack_sections(sections)[0]))
+        self.assertEqual(unpack_sections(blob, offsets, 'zlib'), sections)
+
+
+class TestSearchCompression(unittest.TestCase):
+    """Test cases for compressed shards in SearchService"""
+
+    def setUp(self):
+        self.plain = make_search_service()
+        self.assertTrue(self.plain.initialize_data())
+        self.service = make_search_service()
+        with patch('src.manifest.ARTIFACT_COMPRESSION', 'zlib'):
+            self.assertTrue(self.service.initialize_data())
+        self.objects = self.service.s3_service.s3_client.buckets[self.service.s3_service.bucket_name]
+
+    def test_shards_are_compressed_and_search_matches(self):
+        """Test that a compressed upload is recorded, smaller, and searches like an uncompressed one"""
+        manifest = self.service.s3_service.download_manifest()
+        shard = manifest['shards'][0]
+        self.assertEqual((manifest['compression'], shard['compression']), ('zlib', 'zlib'))
+        for key in (shard['embeddings'], shard['metadata_columns'], shard['section_offsets'],
+                    manifest['keyword_index']):
+            self.assertTrue(self.objects[key][0].startswith(MAGIC), key)
+        plain = self.plain.s3_service.s3_client.buckets[self.plain.s3_service.bucket_name]
+        self.assertLess(len(self.objects[shard['section_blob']][0]), len(plain[shard['section_blob']][0]))
+
+        for service in (self.plain, self.service):
+            self.assertTrue(service._load_data_from_s3())
+        for query in ("How to change engine oil", "brake pads squeaking"):
+            self.assertEqual(self.service.search(query, 3), self.plain.search(query, 3))
+        self.assertGreater(self.service.metrics.snapshot()['latency']['s3.decompress']['count'], 0)
+
+    def test_cached_compressed_artifacts_load(self):
+        """Test that compressed artifacts load from the local cache, then from cached copies"""
+        self.service.s3_service.cache_dir = tempfile.mkdtemp()
+        self.assertTrue(self.service._load_data_from_s3())
+        section_id = self.service.snapshot.metadata[0]['id']
+        self.assertEqual(self.service.get_section_by_id(section_id)['id'], section_id)
+
+        reloaded = make_search_service()
+        reloaded.s3_service.s3_client = self.service.s3_service.s3_client
+        reloaded.s3_service.cache_dir = self.service.s3_service.cache_dir
+        self.assertTrue(reloaded._load_data_from_s3())
+        self.assertEqual(reloaded.search("engine oil", 3), self.service.search("engine oil", 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
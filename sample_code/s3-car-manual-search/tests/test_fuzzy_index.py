@@ -0,0 +1,97 @@
+"""
+Unit tests for the trigram fuzzy-match index
+"""
+
+import unittest
+import sys
+import os
+import json
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_search_service import make_search_service, MANUAL_FILE
+from src.fuzzy_index import TrigramIndex, trigrams
+from src.keyword_index import tokenize
+from src.metadata_table import MetadataTable
+
+
+class TestTrigramIndex(unittest.TestCase):
+    """Test cases for TrigramIndex"""
+
+    def setUp(self):
+        with open(MANUAL_FILE, 'r', encoding='utf-8') as file:
+            self.sections = json.load(file)['sections']
+        self.index = TrigramIndex.from_metadata(self.sections)
+        self.titles = [section['title'] for section in self.sections]
+
+    def test_misspelled_terms_match(self):
+        """Test that misspelled terms reach the right indexed terms and rows"""
+        self.assertEqual(trigrams('ac'), {'  a', ' ac', 'ac '})
+        terms, similarities = self.index.similar_terms('alternater')
+        self.assertEqual(self.index.vocabulary[terms[0]], 'alternator')
+        self.assertTrue(np.all(np.diff(similarities) <= 0))
+
+        for query, title in [("alternater", "Alternator Testing"),
+                             ("trasmission fluid", "Transmission Fluid Service"),
+                             ("brak pad replacment", "Brake Pad Replacement")]:
+            matches = self.index.search(query, 3)
+            self.assertEqual(self.titles[matches[0][0]], title, query)
+            self.assertTrue(all(0 < score <= 1 for _, score in matches))
+        self.assertEqual(self.index.search("xyzzy", 3), [])
+        self.assertEqual(self.index.search("", 3), [])
+
+    def test_filters_and_build_paths_agree(self):
+        """Test that row filters apply and every way of building gives the same index"""
+        rows = np.flatnonzero([section['category'] == 'Electrical' for section in self.sections])
+        matches = self.index.search("batery", 5, rows)
+        self.assertTrue(matches)
+        self.assertTrue(all(row in rows for row, _ in matches))
+
+        table = TrigramIndex.from_metadata(MetadataTable.from_records(self.sections))
+        documents = TrigramIndex.build(
+            tokenize(' '.join([s['title']] + s.get('keywords', []))) for s in self.sections
+        )
+        for query in ("coolant leek", "check engin light", "tire presure"):
+            expected = self.index.search(query, 5)
+            self.assertEqual(table.search(query, 5), expected)
+            self.assertEqual(documents.search(query, 5), expected)
+
+
+class TestSearchFuzzyFallback(unittest.TestCase):
+    """Test cases for the typo-tolerant fallback in SearchService"""
+
+    def setUp(self):
+        self.service = make_search_service()
+
+    def test_fallback_tolerates_typos(self):
+        """Test that misspelled queries find sections with and without a loaded snapshot"""
+        local = self.service._fallback_search("alternater", 3)
+        self.assertTrue(self.service.initialize_data())
+        self.assertTrue(self.service._load_data_from_s3())
+        loaded = self.service._fallback_search("alternater", 3)
+
+        for results in (local, loaded):
+            self.assertEqual(results[0]['metadata']['title'], "Alternator Testing")
+            self.assertEqual(results[0]['search_type'], 'fuzzy_fallback')
+            self.assertGreater(results[0]['fuzzy_score'], 0.5)
+
+        fused = self.service._fallback_search("trasmission fluid", 3, {'category': 'Transmission'})
+        self.assertEqual(fused[0]['metadata']['title'], "Transmission Fluid Service")
+        self.assertTrue(all(r['metadata']['category'] == 'Transmission' for r in fused))
+        self.assertEqual([r['rank'] for r in fused], list(range(1, len(fused) + 1)))
+
+    def test_correct_spelling_keeps_bm25(self):
+        """Test that queries whose terms are all known skip the fuzzy index"""
+        self.assertTrue(self.service.initialize_data())
+        self.assertTrue(self.service._load_data_from_s3())
+        results = self.service._fallback_search("alternator", 3)
+        self.assertEqual({r['search_type'] for r in results}, {'keyword_fallback'})
+        self.assertEqual(results[0]['similarity_score'], 1.0)
+        self.assertNotIn('search.fuzzy', self.service.metrics.snapshot()['latency'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Unit tests for the background S3 health monitor
+"""
+
+import unittest
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_search_service import make_search_service
+from src.health_monitor import HealthMonitor
+
+
+class CountingProbe:
+    """Probe returning a configurable status and counting its calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.connected = True
+        self.probed = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.probed.set()
+        if not self.connected:
+            return {'connected': False, 'error': 'Connection error: unreachable'}
+        return {'connected': True, 'error': None}
+
+
+class TestHealthMonitor(unittest.TestCase):
+    """Test cases for HealthMonitor"""
+
+    def test_status_is_cached_within_interval(self):
+        """Test that repeated status calls reuse the last probe"""
+        probe = CountingProbe()
+        monitor = HealthMonitor(probe, interval=60, max_backoff=600)
+
+        for _ in range(5):
+            status = monitor.status()
+        self.assertEqual(probe.calls, 1)
+        self.assertTrue(status['connected'])
+        self.assertIn('checked_at', status)
+        self.assertLess(status['age_seconds'], 60)
+
+    def test_backoff_while_failing(self):
+        """Test that the probe delay doubles while failing and resets on recovery"""
+        probe = CountingProbe()
+        probe.connected = False
+        monitor = HealthMonitor(probe, interval=10, max_backoff=60)
+
+        delays = []
+        for _ in range(4):
+            monitor.check_now()
+            delays.append(monitor.next_delay())
+        self.assertEqual(delays, [20, 40, 60, 60])
+        self.assertEqual(monitor.status()['consecutive_failures'], 4)
+
+        probe.connected = True
+        monitor.check_now()
+        self.assertEqual(monitor.next_delay(), 10)
+
+    def test_probe_exception_is_reported(self):
+        """Test that a raising probe is cached as a failed status"""
+        def probe():
+            raise RuntimeError("boom")
+
+        status = HealthMonitor(probe, interval=10, max_backoff=60).status()
+        self.assertFalse(status['connected'])
+        self.assertIn('boom', status['error'])
+
+    def test_background_thread_probes_and_stops(self):
+        """Test that the monitor thread probes on start and on trigger"""
+        probe = CountingProbe()
+        monitor = HealthMonitor(probe, interval=60, max_backoff=600)
+        monitor.start()
+        try:
+            self.assertTrue(probe.probed.wait(5))
+            probe.probed.clear()
+            monitor.trigger()
+            self.assertTrue(probe.probed.wait(5))
+            self.assertEqual(probe.calls, 2)
+        finally:
+            monitor.stop(timeout=5)
+        self.assertFalse(monitor.running)
+
+
+class TestSystemStatus(unittest.TestCase):
+    """Test cases for serving the system status from the health monitor"""
+
+    def test_status_calls_do_not_hit_s3(self):
+        """Test that status reruns are answered without S3 requests"""
+        service = make_search_service()
+        self.assertTrue(service.initialize_data())
+        client = service.s3_service.s3_client
+
+        status = service.get_system_status()
+        self.assertEqual(status['s3_connection'], 'connected')
+        self.assertIsNone(status['s3_details']['can_write'])
+
+        calls = len(client.calls)
+        for _ in range(10):
+            service.get_system_status()
+        self.assertEqual(len(client.calls), calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
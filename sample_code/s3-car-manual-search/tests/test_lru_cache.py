@@ -0,0 +1,69 @@
+"""
+Unit tests for the bounded LRU cache shared by the query, result and section caches
+"""
+
+import unittest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.lru_cache import LRUCache
+from src.metrics import MetricsRegistry
+
+
+class FakeClock:
+    """Manually advanced time source."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test cases for LRUCache"""
+
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+        self.clock = FakeClock()
+        self.cache = LRUCache(2, ttl=10, name='test_cache', metrics=self.metrics, clock=self.clock)
+
+    def test_lru_eviction_and_ttl(self):
+        """Test that the least recently used entry is evicted and old entries expire"""
+        self.cache.put('oil change', 1)
+        self.cache.put('battery dead', 2)
+        self.assertEqual(self.cache.get('oil change'), 1)
+        self.cache.put('brake noise', 3)
+
+        self.assertIsNone(self.cache.get('battery dead'))
+        self.assertEqual(self.cache.get('oil change'), 1)
+        self.assertEqual(self.metrics.counter('test_cache.evictions'), 1)
+
+        self.clock.now = 11
+        self.assertIsNone(self.cache.get('oil change'))
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.metrics.counter('test_cache.expired'), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (2, 2, 0.5))
+
+    def test_explicit_eviction_and_disabled_cache(self):
+        """Test pop_oldest and record_miss, and that a zero-size cache stores nothing"""
+        self.cache.put('a', 1)
+        self.cache.put('b', 2)
+        self.assertEqual(self.cache.pop_oldest(), ('a', 1))
+        self.assertEqual(self.cache.pop('b'), 2)
+        self.assertIsNone(self.cache.pop_oldest())
+        self.cache.record_miss()
+        self.assertEqual(self.metrics.counter('test_cache.misses'), 1)
+
+        disabled = LRUCache(0)
+        disabled.put('a', 1)
+        self.assertIsNone(disabled.get('a'))
+        self.assertEqual(len(disabled), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
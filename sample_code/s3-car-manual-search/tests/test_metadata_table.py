@@ -0,0 +1,118 @@
+"""
+Unit tests for the columnar metadata format
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_search_service import make_search_service, MANUAL_FILE
+from src.metadata_table import MetadataTable
+from src.section_index import SectionIndex
+from src.manifest import stamp
+
+
+class TestMetadataTable(unittest.TestCase):
+    """Test cases for MetadataTable"""
+
+    def setUp(self):
+        self.records = [
+            {'id': 'BRK_001', 'category': 'Brakes', 'title': 'Bremsbeläge', 'keywords': ['pads', 'squeal']},
+            {'id': 'ENG_001', 'category': 'Engine', 'title': 'Oil change', 'keywords': []},
+            {'id': 'X', 'category': None, 'title': 'Misc', 'keywords': ['ünïcode']},
+            {'id': 'BRK_002', 'category': 'Brakes', 'title': 'Fluid', 'keywords': ['fluid', 'dot4', 'bleed']}
+        ]
+
+    def test_round_trip_is_zero_copy(self):
+        """Test that a serialized table decodes to the same rows as views of the buffer"""
+        data = MetadataTable.from_records(self.records, passage_offsets=[0, 2, 3, 3, 5]).to_bytes()
+        table = MetadataTable.from_bytes(data)
+
+        self.assertEqual(list(table), self.records)
+        self.assertEqual(table[-1], self.records[-1])
+        self.assertEqual(table.passage_offsets.tolist(), [0, 2, 3, 3, 5])
+        self.assertEqual(table.ids(), [r['id'] for r in self.records])
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        self.assertTrue(all(np.shares_memory(column, buffer) for column in table.columns.values() if len(column)))
+        with self.assertRaises(IndexError):
+            table[4]
+        with self.assertRaises(ValueError):
+            MetadataTable.from_bytes(json.dumps(self.records).encode('utf-8'))
+
+    def test_take_and_concat(self):
+        """Test that selecting and stacking rows merges category dictionaries and passage offsets"""
+        first = MetadataTable.from_records(self.records[:2], passage_offsets=[0, 2, 3])
+        second = MetadataTable.from_records(self.records[2:], passage_offsets=[0, 1, 4])
+        table = MetadataTable.concat([first.take([1, 0]), second.take([1])])
+
+        self.assertEqual(list(table), [self.records[1], self.records[0], self.records[3]])
+        self.assertEqual(table.categories, ['Brakes', 'Engine', None])
+        self.assertEqual(SectionIndex(table).category_counts, {'Engine': 1, 'Brakes': 2})
+        self.assertEqual(table.passage_offsets.tolist(), [0, 1, 3, 6])
+
+    def test_section_index_matches_records(self):
+        """Test that an index over a table answers like one over dictionaries"""
+        table = MetadataTable.from_records(self.records).take([0, 1, 3])
+        columnar, records = SectionIndex(table), SectionIndex([self.records[row] for row in (0, 1, 3)])
+
+        self.assertEqual(columnar.categories, records.categories)
+        self.assertEqual(columnar.category_counts, records.category_counts)
+        self.assertEqual(columnar.rows_for({'category': 'Brakes'}).tolist(), [0, 2])
+        self.assertEqual([columnar.row_for_id(r['id']) for r in self.records], [0, 1, None, 2])
+        self.assertIsNone(columnar.row_for_id('BRK_001_LONGER_THAN_ANY_ID'))
+
+
+class TestSearchMetadataTable(unittest.TestCase):
+    """Test cases for columnar metadata in SearchService"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        self.assertTrue(self.service.initialize_data())
+        with open(MANUAL_FILE, 'r', encoding='utf-8') as file:
+            self.sections = json.load(file)['sections']
+
+    def test_published_shards_are_columnar(self):
+        """Test that shards carry columnar metadata that loads memory-mapped from the cache"""
+        s3 = self.service.s3_service
+        manifest = s3.download_manifest()
+        self.assertTrue(all('metadata' not in shard for shard in manifest['shards']))
+
+        s3.cache_dir = tempfile.mkdtemp()
+        self.assertTrue(self.service._load_data_from_s3())
+        metadata = self.service.snapshot.metadata
+        self.assertIsInstance(metadata, MetadataTable)
+        self.assertIsInstance(metadata.columns['id_data'].base.obj, np.memmap)
+
+        results = self.service.search("brake pads", 3, filters={'category': 'Brakes'})
+        self.assertTrue(results)
+        for result in results:
+            self.assertEqual(result['metadata']['id'], result['section']['id'])
+            self.assertEqual(result['metadata']['keywords'], result['section'].get('keywords', []))
+
+    def test_json_metadata_still_loads(self):
+        """Test that shards written before columnar metadata existed still load"""
+        s3 = self.service.s3_service
+        manifest = s3.download_manifest()
+        for shard in manifest['shards']:
+            shard['metadata'] = f"shards/{shard['id']}/metadata.json"
+            metadata = [{key: section.get(key) for key in ('id', 'category', 'title', 'keywords')}
+                        for section in self.sections]
+            self.assertTrue(s3.upload_json_data({'metadata': metadata}, shard['metadata']))
+            del shard['metadata_columns']
+        manifest['version'] += 1
+        self.assertTrue(s3.upload_manifest(stamp(manifest)))
+
+        self.assertTrue(self.service._load_data_from_s3())
+        self.assertEqual([m['id'] for m in self.service.snapshot.metadata], [s['id'] for s in self.sections])
+        self.assertEqual(self.service.get_section_by_id(self.sections[2]['id']), self.sections[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
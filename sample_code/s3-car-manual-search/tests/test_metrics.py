@@ -0,0 +1,99 @@
+"""
+Unit tests for the in-process latency metrics
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_search_service import make_search_service
+from src.metrics import MetricsRegistry, LatencyHistogram, NULL_METRICS
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test cases for LatencyHistogram"""
+
+    def test_percentiles_within_bucket_width(self):
+        """Test that percentiles are within one bucket of the exact value"""
+        rng = np.random.default_rng(0)
+        samples = rng.lognormal(mean=-5, sigma=1, size=5000)
+        histogram = LatencyHistogram()
+        for sample in samples:
+            histogram.record(float(sample))
+
+        for p in (50, 95, 99):
+            exact = np.percentile(samples, p)
+            self.assertLessEqual(abs(histogram.percentile(p) - exact) / exact, 0.25)
+        self.assertEqual(histogram.count, 5000)
+        self.assertAlmostEqual(histogram.max, samples.max())
+
+    def test_empty_histogram(self):
+        """Test that an empty histogram reports zeros"""
+        summary = LatencyHistogram().summary()
+        self.assertEqual(summary['count'], 0)
+        self.assertEqual(summary['p99_ms'], 0.0)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test cases for MetricsRegistry"""
+
+    def test_timer_and_counters(self):
+        """Test that spans and counters show up in the snapshot"""
+        metrics = MetricsRegistry()
+        for _ in range(3):
+            with metrics.timer('stage'):
+                pass
+        metrics.increment('search.queries', 4)
+        metrics.increment('search.fallbacks')
+
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot['latency']['stage']['count'], 3)
+        self.assertEqual(snapshot['counters']['search.queries'], 4)
+        self.assertEqual(snapshot['rates']['fallback_rate'], 0.25)
+
+    def test_disabled_registry_records_nothing(self):
+        """Test that a disabled registry uses a shared no-op span"""
+        self.assertIs(NULL_METRICS.timer('a'), NULL_METRICS.timer('b'))
+        with NULL_METRICS.timer('a'):
+            NULL_METRICS.increment('c')
+        self.assertEqual(NULL_METRICS.snapshot()['latency'], {})
+        self.assertEqual(NULL_METRICS.snapshot()['counters'], {})
+
+    def test_export_json(self):
+        """Test that the exported snapshot is valid JSON"""
+        metrics = MetricsRegistry()
+        metrics.observe('stage', 0.01)
+        path = os.path.join(tempfile.mkdtemp(), 'metrics.json')
+
+        self.assertTrue(metrics.export_json(path))
+        with open(path, 'r', encoding='utf-8') as file:
+            self.assertEqual(json.load(file)['latency']['stage']['count'], 1)
+
+
+class TestSearchInstrumentation(unittest.TestCase):
+    """Test cases for the search stage spans"""
+
+    def test_search_stages_are_recorded(self):
+        """Test that a search records every stage and the fallback rate"""
+        service = make_search_service()
+        self.assertTrue(service.initialize_data())
+        service.search("How to change engine oil", 3)
+        service.search("", 3)
+
+        metrics = service.get_system_status()['metrics']
+        for stage in ('search.total', 'search.encode', 'search.score', 'search.top_k',
+                      'search.threshold', 'search.hydrate', 'snapshot.load'):
+            self.assertGreaterEqual(metrics['latency'][stage]['count'], 1, stage)
+        self.assertEqual(metrics['counters']['search.queries'], 2)
+        self.assertEqual(metrics['rates']['fallback_rate'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
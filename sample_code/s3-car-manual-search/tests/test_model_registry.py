@@ -0,0 +1,115 @@
+"""
+Unit tests for the process-wide embedding model registry
+"""
+
+import unittest
+import sys
+import os
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.model_registry import ModelRegistry
+from src.embedding_service import EmbeddingService
+from src.metrics import MetricsRegistry
+from config import EMBEDDING_DIMENSION
+
+
+class FakeModel:
+    """Minimal stand-in for a SentenceTransformer."""
+
+    device = 'cpu'
+    max_seq_length = 128
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 4
+
+    def encode(self, texts, **kwargs):
+        if isinstance(texts, str):
+            return np.full(4, len(texts), dtype=np.float32)
+        return np.stack([np.full(4, len(text), dtype=np.float32) for text in texts])
+
+
+class CountingLoader:
+    """Loader counting its calls, optionally slow or failing."""
+
+    def __init__(self, delay: float = 0.0, failures: int = 0):
+        self.calls = []
+        self.delay = delay
+        self.failures = failures
+
+    def __call__(self, model_name: str) -> FakeModel:
+        self.calls.append(model_name)
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise OSError(f"cannot download {model_name}")
+        return FakeModel(model_name)
+
+
+class TestModelRegistry(unittest.TestCase):
+    """Test cases for ModelRegistry and its use by EmbeddingService"""
+
+    def test_services_share_one_lazy_load(self):
+        """Test that services load nothing until the first encode, then share the model"""
+        loader = CountingLoader()
+        registry = ModelRegistry(loader, metrics=MetricsRegistry())
+        first = EmbeddingService('model-a', registry=registry)
+        second = EmbeddingService('model-a', registry=registry)
+
+        self.assertEqual(loader.calls, [])
+        self.assertEqual(first.get_model_info(), {'model_name': 'model-a',
+                                                  'embedding_dimension': EMBEDDING_DIMENSION, 'loaded': False})
+
+        self.assertEqual(first.generate_embedding('oil').shape, (4,))
+        self.assertEqual(second.generate_embeddings_batch(['oil', 'brakes']).shape, (2, 4))
+        self.assertEqual(loader.calls, ['model-a'])
+        self.assertIs(first.model, second.model)
+        self.assertIs(first._encode_lock, second._encode_lock)
+        self.assertTrue(second.get_model_info()['loaded'])
+
+    def test_concurrent_first_use_loads_once(self):
+        """Test that threads racing on a cold model wait for a single load"""
+        loader = CountingLoader(delay=0.1)
+        registry = ModelRegistry(loader, metrics=MetricsRegistry())
+        barrier = threading.Barrier(8)
+
+        def first_use(i):
+            barrier.wait()
+            return registry.get('model-a' if i % 2 else 'model-b')
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            models = list(executor.map(first_use, range(8)))
+
+        self.assertEqual(sorted(loader.calls), ['model-a', 'model-b'])
+        self.assertEqual(len({id(model) for model in models}), 2)
+        status = registry.status()
+        self.assertEqual(status['loaded_models'], ['model-a', 'model-b'])
+        self.assertEqual(status['loads'], 2)
+        self.assertEqual(status['load_latency']['count'], 2)
+
+    def test_failed_load_is_retried(self):
+        """Test that a failed load is counted and the next use tries again"""
+        loader = CountingLoader(failures=1)
+        registry = ModelRegistry(loader, metrics=MetricsRegistry())
+        service = EmbeddingService('model-a', registry=registry)
+
+        with self.assertRaises(OSError):
+            service.generate_embedding('oil')
+        self.assertFalse(service.model_loaded)
+        self.assertEqual(service.generate_embedding('oil').shape, (4,))
+        self.assertEqual(len(loader.calls), 2)
+        self.assertEqual(registry.status()['load_failures'], 1)
+        self.assertEqual(registry.status()['loads'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
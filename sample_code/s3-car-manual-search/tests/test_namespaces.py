@@ -0,0 +1,151 @@
+"""
+Unit tests for multi-manual namespaces
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_search_service import make_search_service, MANUAL_FILE
+from src.search_service import SearchService
+from src.search_server import SearchServer
+
+
+class TestNamespaces(unittest.TestCase):
+    """Test cases for namespaced manuals in SearchService"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        with open(MANUAL_FILE, 'r', encoding='utf-8') as file:
+            sections = json.load(file)['sections']
+        self.ids = {
+            'sedan': {s['id'] for s in sections if s['category'] in ('Brakes', 'Engine', 'Electrical')},
+            'suv': {s['id'] for s in sections if s['category'] not in ('Brakes', 'Engine', 'Electrical')}
+        }
+        self.directory = tempfile.mkdtemp()
+        s3 = self.service.s3_service
+        for namespace, ids in self.ids.items():
+            path = os.path.join(self.directory, f'{namespace}.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({'sections': [s for s in sections if s['id'] in ids]}, file)
+            publisher = SearchService(namespace, s3_client=s3.s3_client,
+                                      embedding_service=self.service.embedding_service)
+            publisher.s3_service.bucket_name, publisher.s3_service.cache_dir = s3.bucket_name, s3.cache_dir
+            self.assertTrue(publisher.initialize_data(file_path=path))
+        self.objects = s3.s3_client.buckets[s3.bucket_name]
+
+    def test_namespaces_are_isolated(self):
+        """Test that each namespace has its own artifacts and only returns its own sections"""
+        self.assertIn('namespaces/sedan/embeddings/manifest.json', self.objects)
+        self.assertNotIn('embeddings/manifest.json', self.objects)
+        self.assertEqual(self.service.s3_service.list_namespaces(), ['sedan', 'suv'])
+        sedan = self.service.namespaces.searcher('sedan').s3_service
+        self.assertTrue(all(key.startswith(('embeddings/', 'shards/')) for key in sedan.list_bucket_contents()))
+
+        for namespace, ids in self.ids.items():
+            results = self.service.search_namespaces("How to change engine oil", [namespace], top_k=5)
+            self.assertTrue(results)
+            self.assertEqual({r['namespace'] for r in results}, {namespace})
+            self.assertTrue({r['section']['id'] for r in results} <= ids)
+
+        self.assertEqual(self.service.search_namespaces("brakes", ['trailer-2020']), [])
+        self.assertNotIn('trailer-2020', self.service.namespaces)
+        with self.assertRaises(ValueError):
+            self.service.search_namespaces("brakes", ['../sedan'])
+        self.service.namespaces.max_fanout = 1
+        with self.assertRaises(ValueError):
+            self.service.search_namespaces("brakes", ['sedan', 'suv'])
+
+    def test_searchers_share_caches(self):
+        """Test that namespaces hold only a snapshot and share the section cache safely"""
+        searchers = [self.service.namespaces.searcher(namespace) for namespace in ('sedan', 'suv')]
+        for searcher in searchers:
+            self.assertIs(searcher.section_cache, self.service.section_cache)
+            self.assertEqual(searcher.result_cache.max_size, 0)
+            self.assertFalse(hasattr(searcher, 'refresher') or hasattr(searcher, 'namespaces'))
+            self.assertEqual(searcher.s3_service.bucket_name, self.service.s3_service.bucket_name)
+
+        # Both namespaces have shards with the same relative keys; cached sections must not mix
+        for _ in range(2):
+            for namespace, ids in self.ids.items():
+                snapshot = self.service.namespaces.acquire(namespace).snapshot
+                sections = snapshot.get_sections(list(range(len(snapshot))))
+                self.assertEqual({section['id'] for section in sections}, ids)
+        self.assertGreater(self.service.section_cache.stats()['hits'], 0)
+
+    def test_lazy_load_and_lru_eviction(self):
+        """Test that namespaces load on first query and cold ones are evicted over the budget"""
+        pool = self.service.namespaces
+        self.assertEqual(pool.stats()['loaded'], {})
+
+        self.service.search_namespaces("brake pads", ['sedan'])
+        self.assertEqual(list(pool.stats()['loaded']), ['sedan'])
+        pool.memory_budget = pool.memory_usage()['sedan'] + 1
+
+        self.service.search_namespaces("air conditioning", ['suv'])
+        self.assertEqual(list(pool.stats()['loaded']), ['suv'])
+        self.service.search_namespaces("brake pads", ['sedan'])
+        self.assertEqual(list(pool.stats()['loaded']), ['sedan'])
+        self.assertEqual((pool.loads, pool.evictions), (3, 2))
+
+        pool.memory_budget = 1
+        self.service.search_namespaces("brake pads", ['sedan', 'suv'])
+        self.assertEqual(len(pool.stats()['loaded']), 1)
+        self.assertEqual(self.service.get_system_status()['namespaces']['evictions'], 3)
+
+    def test_fan_out_merges_top_k(self):
+        """Test that a cross-namespace query encodes once and merges the best results"""
+        query = "strange noise when braking"
+        single = [r for namespace in ('sedan', 'suv')
+                  for r in self.service.search_namespaces(query, [namespace], top_k=6)]
+        expected = sorted(single, key=lambda r: -r['similarity_score'])[:6]
+
+        encodes = self.service.metrics.snapshot()['latency']['search.encode']['count']
+        merged = self.service.search_namespaces(query, ['sedan', 'suv'], top_k=6)
+        self.assertEqual(self.service.metrics.snapshot()['latency']['search.encode']['count'], encodes + 1)
+        self.assertEqual([(r['namespace'], r['section']['id']) for r in merged],
+                         [(r['namespace'], r['section']['id']) for r in expected])
+        self.assertEqual([r['rank'] for r in merged], list(range(1, 7)))
+
+        calls = self.service.s3_service.s3_client.calls
+        self.assertEqual(self.service.list_namespaces(), ['sedan', 'suv'])
+        listed = calls.count('list_objects_v2')
+        self.assertEqual(self.service.list_namespaces(), ['sedan', 'suv'])
+        self.assertEqual(calls.count('list_objects_v2'), listed)
+
+    def test_fallback_namespace_does_not_outrank_vector_matches(self):
+        """Test that a namespace falling back to keyword search is merged by rank, not score"""
+        query = "strange noise when braking"
+        self.service.namespaces.acquire('suv').snapshot.vector_index.search = lambda *args: []
+        fallback = self.service.search_namespaces(query, ['suv'], top_k=6)
+        vector = self.service.search_namespaces(query, ['sedan'], top_k=6)
+        self.assertTrue(all(r['search_type'].endswith('fallback') for r in fallback))
+        self.assertGreater(fallback[-1]['similarity_score'], vector[0]['similarity_score'])
+
+        merged = self.service.search_namespaces(query, ['sedan', 'suv'], top_k=6)
+        self.assertEqual([(r['namespace'], r['namespace_rank']) for r in merged[:4]],
+                         [('sedan', 1), ('suv', 1), ('sedan', 2), ('suv', 2)])
+        ranks = [r['namespace_rank'] for r in merged]
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertEqual([r['section']['id'] for r in merged if r['namespace'] == 'sedan'],
+                         [r['section']['id'] for r in vector[:3]])
+
+    def test_server_parses_namespaces(self):
+        """Test that the server accepts namespaces as a list or a comma-separated parameter"""
+        server = SearchServer(self.service)
+        request = {'method': 'GET', 'params': {'q': 'oil', 'namespaces': 'sedan,suv'}}
+        self.assertEqual(server._parse_search(request)['namespaces'], ['sedan', 'suv'])
+        for namespaces in (['a b'], [f'model-{i}' for i in range(17)]):
+            request = {'method': 'POST', 'body': json.dumps({'query': 'oil', 'namespaces': namespaces}).encode()}
+            with self.assertRaises(ValueError):
+                server._parse_search(request)
+
+
+if __name__ == '__main__':
+    unittest.main()
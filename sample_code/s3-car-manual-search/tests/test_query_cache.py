@@ -0,0 +1,78 @@
+"""
+Unit tests for the query embedding cache
+"""
+
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_model_registry import FakeModel
+from src.model_registry import ModelRegistry
+from src.embedding_service import EmbeddingService
+from src.query_cache import normalize_query
+from src.metrics import MetricsRegistry
+
+
+class CountingModel(FakeModel):
+    """Fake model recording every text it encodes."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend([texts] if isinstance(texts, str) else texts)
+        return super().encode(texts, **kwargs)
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    """Test cases for QueryEmbeddingCache and its use by EmbeddingService"""
+
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+        self.service = EmbeddingService('model-a', registry=ModelRegistry(CountingModel),
+                                        metrics=self.metrics, cache_size=3, cache_ttl=60)
+        self.model = self.service.model
+
+    def test_repeated_query_skips_the_model(self):
+        """Test that a normalized repeat is served from the cache as a read-only vector"""
+        first = self.service.generate_embedding("How to change oil?")
+        second = self.service.generate_embedding("  how to CHANGE   oil? ")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.model.encoded, ["How to change oil?"])
+        self.assertEqual(first.dtype, np.float32)
+        with self.assertRaises(ValueError):
+            first[0] = 1.0
+        self.assertEqual(self.metrics.counter('query_cache.hits'), 1)
+        self.assertEqual(self.metrics.counter('query_cache.misses'), 1)
+        self.assertEqual(self.metrics.snapshot()['rates']['query_cache_hit_rate'], 0.5)
+
+    def test_query_batch_encodes_each_miss_once(self):
+        """Test that a batch encodes only uncached, distinct queries"""
+        cached = self.service.generate_embedding("battery dead")
+        batch = self.service.generate_query_embeddings(["Battery dead", "brake noise", "brake  noise", "tire"])
+
+        self.assertEqual(self.model.encoded, ["battery dead", "brake noise", "tire"])
+        np.testing.assert_array_equal(batch[0], cached)
+        np.testing.assert_array_equal(batch[1], batch[2])
+        self.assertEqual(batch.shape, (4, 4))
+
+    def test_disabled_cache(self):
+        """Test that a zero-size cache always encodes but still returns read-only vectors"""
+        service = EmbeddingService('model-a', registry=ModelRegistry(CountingModel), cache_size=0)
+        service.generate_embedding("oil change")
+        vector = service.generate_embedding("oil change")
+
+        self.assertEqual(len(service.model.encoded), 2)
+        self.assertFalse(vector.flags.writeable)
+        self.assertEqual(normalize_query("  Oil\tChange "), "oil change")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Unit tests for the semantic search result cache
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_search_service import make_search_service, MANUAL_FILE
+from src.result_cache import SemanticResultCache
+from src.metrics import MetricsRegistry
+
+
+class Snapshot:
+    """Stand-in for a search snapshot (the cache only tracks its identity)."""
+
+
+class TestSemanticResultCache(unittest.TestCase):
+    """Test cases for SemanticResultCache"""
+
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+        self.cache = SemanticResultCache(2, threshold=0.9, metrics=self.metrics)
+        self.snapshot = Snapshot()
+
+    def test_near_duplicate_embedding_hits(self):
+        """Test that a close embedding hits and a distant one misses"""
+        self.cache.store(self.snapshot, 'k', np.array([1.0, 0.0, 0.0]), [(3, 0.8)], 0.02, 'brakes squeal')
+
+        self.assertEqual(self.cache.lookup(self.snapshot, 'k', np.array([2.0, 0.3, 0.0])),
+                         ([(3, 0.8)], 'brakes squeal'))
+        self.assertIsNone(self.cache.lookup(self.snapshot, 'k', np.array([1.0, 1.0, 0.0])))
+        self.assertIsNone(self.cache.lookup(self.snapshot, 'other', np.array([1.0, 0.0, 0.0])))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.metrics.counter('result_cache.misses'), 2)
+        self.assertAlmostEqual(self.cache.stats()['saved_seconds'], 0.02)
+        self.assertEqual(self.metrics.snapshot()['latency']['result_cache.saved']['count'], 1)
+
+    def test_slot_reuse_and_snapshot_change(self):
+        """Test that a full cache reuses the least recently used slot and a new snapshot clears all"""
+        x, y, z = np.eye(3)
+        self.cache.store(self.snapshot, 'k', x, [(0, 1.0)], 0.01)
+        self.cache.store(self.snapshot, 'k', y, [(1, 1.0)], 0.01)
+        self.assertIsNotNone(self.cache.lookup(self.snapshot, 'k', x))
+        self.cache.store(self.snapshot, 'k', z, [(2, 1.0)], 0.01)
+
+        self.assertIsNone(self.cache.lookup(self.snapshot, 'k', y))
+        self.assertEqual(self.cache.lookup(self.snapshot, 'k', z), ([(2, 1.0)], None))
+
+        self.assertIsNone(self.cache.lookup(Snapshot(), 'k', x))
+        self.assertEqual(len(self.cache), 0)
+
+
+class TestSearchResultCache(unittest.TestCase):
+    """Test cases for the result cache inside SearchService"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        self.service.result_cache = SemanticResultCache(256, 0.9, metrics=self.service.metrics)
+        self.assertTrue(self.service.initialize_data())
+        self.assertTrue(self.service._load_data_from_s3())
+        self.scored = []
+        vector_index = self.service.snapshot.vector_index
+        search, search_batch = vector_index.search, vector_index.search_batch
+
+        def counting_search(query, *args):
+            self.scored.append(1)
+            return search(query, *args)
+
+        def counting_search_batch(queries, *args):
+            self.scored.append(len(queries))
+            return search_batch(queries, *args)
+
+        vector_index.search = counting_search
+        vector_index.search_batch = counting_search_batch
+
+    def ids(self, results):
+        return [r['metadata']['id'] for r in results]
+
+    def test_paraphrase_reuses_matches(self):
+        """Test that a reordered query reuses the vector matches of the first one"""
+        first = self.service.search("brake pads squeaking", 3)
+        second = self.service.search("squeaking brake pads", 3)
+
+        self.assertEqual(self.ids(first), self.ids(second))
+        self.assertEqual(self.scored, [1])
+        self.assertNotIn('cached_from', first[0])
+        self.assertEqual({r['cached_from'] for r in second}, {"brake pads squeaking"})
+        self.service.search("squeaking brake pads", 3, filters={'category': 'Brakes'})
+        self.service.search("squeaking brake pads", 5)
+        self.assertEqual(self.scored, [1, 1, 1])
+
+        stats = self.service.get_system_status()['result_cache']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 3))
+        self.assertEqual(self.service.metrics.snapshot()['rates']['result_cache_hit_rate'], 0.25)
+
+    def test_batch_scores_only_misses(self):
+        """Test that a batch reuses cached matches and scores the rest in one pass"""
+        expected = self.ids(self.service.search("battery dead", 3))
+        results = self.service.search_batch(["dead battery", "engine oil change", "battery dead"], 3)
+
+        self.assertEqual(self.ids(results[0]), expected)
+        self.assertEqual(self.ids(results[2]), expected)
+        self.assertEqual(results[2][0]['cached_from'], "battery dead")
+        self.assertNotIn('cached_from', results[1][0])
+        self.assertEqual(self.scored, [1, 1])
+
+    def test_disabled_by_default(self):
+        """Test that the default service scores every query itself"""
+        service = make_search_service()
+        self.assertEqual(service.result_cache.max_size, 0)
+        self.assertTrue(service.initialize_data())
+        service.search("brake pad", 3)
+        self.assertFalse(any('cached_from' in r for r in service.search("brake pads", 3)))
+
+    def test_snapshot_swap_invalidates(self):
+        """Test that results are recomputed once a new snapshot is swapped in"""
+        self.service.search("battery dead", 3)
+        with open(MANUAL_FILE, 'r', encoding='utf-8') as file:
+            sections = json.load(file)['sections']
+        path = os.path.join(tempfile.mkdtemp(), 'manual.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'sections': sections[1:]}, file)
+        self.assertTrue(self.service.indexer.upsert(path)['success'])
+        self.assertTrue(self.service.refresh_snapshot())
+
+        self.service.search("battery dead", 3)
+        self.assertEqual(self.service.result_cache.stats()['hits'], 0)
+        self.assertEqual(len(self.service.result_cache), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
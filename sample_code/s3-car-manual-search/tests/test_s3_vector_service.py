@@ -0,0 +1,283 @@
+"""
+Unit tests for the S3 vector service
+"""
+
+import unittest
+import sys
+import os
+import io
+import tempfile
+import threading
+import time
+import numpy as np
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scripts.local_s3 import LocalS3Client
+from src.s3_vector_service import S3VectorService
+from src.multipart_upload import MIN_PART_SIZE, iter_npy_parts, npy_size
+
+
+def make_service(cache_dir=None) -> S3VectorService:
+    """Create an S3 vector service backed by the local S3 stand-in."""
+    service = S3VectorService(bucket_name='test-bucket', cache_dir=cache_dir)
+    service.s3_client = LocalS3Client()
+    service.create_bucket_if_not_exists()
+    return service
+
+
+class TestLocalCache(unittest.TestCase):
+    """Test cases for the local artifact cache tier"""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.service = make_service(self.cache_dir)
+        self.embeddings = np.random.rand(10, 8).astype(np.float32)
+
+    def test_embeddings_are_memory_mapped(self):
+        """Test that cached embeddings are opened with mmap"""
+        self.service.upload_embeddings(self.embeddings)
+        loaded = self.service.download_embeddings()
+
+        self.assertIsInstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, self.embeddings)
+
+    def test_unchanged_artifact_is_revalidated_not_downloaded(self):
+        """Test that a second load only revalidates the ETag"""
+        self.service.upload_json_data({'a': 1}, 'data/test.json')
+        self.assertEqual(self.service.download_json_data('data/test.json'), {'a': 1})
+
+        # A fresh service shares the on-disk cache
+        second = make_service(self.cache_dir)
+        second.s3_client = self.service.s3_client
+        path, _ = second._cache_paths('data/test.json')
+        mtime = os.path.getmtime(path)
+
+        self.assertEqual(second.download_json_data('data/test.json'), {'a': 1})
+        self.assertEqual(os.path.getmtime(path), mtime)
+
+    def test_changed_artifact_is_refreshed(self):
+        """Test that a new ETag replaces the cached copy"""
+        self.service.upload_json_data({'version': 1}, 'data/test.json')
+        self.service.download_json_data('data/test.json')
+        self.service.upload_json_data({'version': 2}, 'data/test.json')
+
+        self.assertEqual(self.service.download_json_data('data/test.json'), {'version': 2})
+
+    def test_interleaved_writers_never_pair_data_with_a_foreign_etag(self):
+        """Test that a writer's ETag landing after another writer's data forces a fresh download"""
+        key = 'data/test.json'
+        writers = {'old': make_service(self.cache_dir), 'new': make_service(self.cache_dir)}
+        for writer in writers.values():
+            writer.s3_client = self.service.s3_client
+
+        # 'new' pauses before renaming its ETag, 'old' before renaming its data
+        pause_at = {'old': 1, 'new': 2}
+        paused = {name: threading.Event() for name in writers}
+        resume = {name: threading.Event() for name in writers}
+        calls = {name: 0 for name in writers}
+        replace = os.replace
+
+        def interleaved_replace(src, dst):
+            name = threading.current_thread().name
+            if name in writers:
+                calls[name] += 1
+                if calls[name] == pause_at[name]:
+                    paused[name].set()
+                    resume[name].wait(5)
+            replace(src, dst)
+
+        def start(name):
+            thread = threading.Thread(target=writers[name].fetch_to_cache, args=(key,), name=name)
+            thread.start()
+            self.assertTrue(paused[name].wait(5))
+            return thread
+
+        with patch('os.replace', interleaved_replace):
+            self.service.upload_json_data({'version': 1}, key)
+            old = start('old')
+            self.service.upload_json_data({'version': 2}, key)
+            new = start('new')
+            # Data of version 1 lands after data of version 2, ETag of version 2 last
+            resume['old'].set()
+            old.join(5)
+            resume['new'].set()
+            new.join(5)
+
+        self.assertEqual(self.service.download_json_data(key), {'version': 2})
+
+    def test_sections_are_decoded_incrementally(self):
+        """Test that sections files are parsed from bounded reads of the body, with and without the cache"""
+        sections = [{'id': f'S{i}', 'content': 'x' * 1000} for i in range(200)]
+        self.service.upload_manual_data(sections)
+        self.assertEqual(self.service.download_manual_data(), sections)
+
+        service = make_service(None)
+        service.s3_client = self.service.s3_client
+        get_object = service.s3_client.get_object
+        reads = []
+
+        class RecordingBody(io.BytesIO):
+            def read(self, size=-1):
+                reads.append(size)
+                return super().read(size)
+
+        def recording_get_object(**kwargs):
+            response = get_object(**kwargs)
+            return dict(response, Body=RecordingBody(response['Body'].read()))
+
+        service.s3_client.get_object = recording_get_object
+        self.assertEqual(service.download_sections(), sections)
+        self.assertGreater(len(reads), 1)
+        self.assertTrue(all(size is not None and size >= 0 for size in reads))
+
+    def test_missing_artifact_returns_none(self):
+        """Test that missing keys are reported as None"""
+        self.assertIsNone(self.service.download_embeddings('embeddings/missing.npy'))
+        self.assertIsNone(self.service.download_json_data('data/missing.json'))
+
+    def test_cache_disabled(self):
+        """Test that downloads work without a cache directory"""
+        service = make_service(None)
+        service.upload_embeddings(self.embeddings)
+        loaded = service.download_embeddings()
+
+        self.assertNotIsInstance(loaded, np.memmap)
+        np.testing.assert_array_equal(loaded, self.embeddings)
+
+
+class TestQuantizedArtifacts(unittest.TestCase):
+    """Test cases for quantized embedding storage"""
+
+    def setUp(self):
+        self.service = make_service()
+        self.embeddings = np.random.rand(50, 16).astype(np.float32)
+
+    def test_int8_round_trip(self):
+        """Test that int8 artifacts come back with their scales"""
+        self.assertTrue(self.service.upload_quantized_embeddings(self.embeddings, 'int8'))
+        quantized, scales = self.service.download_quantized_embeddings('int8')
+
+        self.assertEqual(quantized.dtype, np.int8)
+        self.assertEqual(scales.shape, (50, 1))
+        np.testing.assert_allclose(quantized * scales, self.embeddings, atol=scales.max())
+
+    def test_float16_has_no_scales(self):
+        """Test that float16 artifacts are stored without scales"""
+        self.service.upload_quantized_embeddings(self.embeddings, 'float16')
+        quantized, scales = self.service.download_quantized_embeddings('float16')
+
+        self.assertEqual(quantized.dtype, np.float16)
+        self.assertIsNone(scales)
+
+    def test_download_embedding_rows(self):
+        """Test ranged reads of selected full-precision rows"""
+        self.service.upload_embeddings(self.embeddings)
+        row_ids = np.array([0, 1, 2, 10, 30, 49])
+
+        rows = self.service.download_embedding_rows(row_ids)
+        np.testing.assert_array_equal(rows, self.embeddings[row_ids])
+
+    def test_rewritten_object_rereads_header(self):
+        """Test that rows are not read at stale offsets after another writer replaces the object"""
+        self.service.upload_embeddings(self.embeddings)
+        self.service.download_embedding_rows(np.array([0]))
+
+        # Another process rewrites the key with a different dtype (so different row offsets)
+        writer = make_service()
+        writer.s3_client = self.service.s3_client
+        replacement = np.random.rand(50, 16).astype(np.float16)
+        writer.upload_embeddings(replacement)
+
+        rows = self.service.download_embedding_rows(np.array([3, 4, 40]))
+        np.testing.assert_array_equal(rows, replacement[[3, 4, 40]])
+        self.assertEqual(len(self.service._npy_headers), 1)
+
+
+class TestMultipartUpload(unittest.TestCase):
+    """Test cases for streaming multipart .npy uploads"""
+
+    def setUp(self):
+        self.service = make_service()
+        self.service.upload_part_size = MIN_PART_SIZE
+        self.client = self.service.s3_client
+        # 3000 x 1024 float32 is about 12 MiB, i.e. three 5 MiB parts
+        self.embeddings = np.random.rand(3000, 1024).astype(np.float32)
+
+    def test_parts_match_np_save(self):
+        """Test that streamed parts concatenate to the bytes np.save writes"""
+        arrays = [
+            np.random.rand(37, 5).astype(np.float32),
+            np.random.randint(-127, 127, (20, 7)).astype(np.int8),
+            np.random.rand(11, 3).astype(np.float16),
+            np.random.rand(9, 1).astype(np.float32),
+            np.empty((0, 4), dtype=np.float32),
+            np.asfortranarray(np.random.rand(6, 4)).astype(np.float32)
+        ]
+        for array in arrays:
+            expected = io.BytesIO()
+            np.save(expected, np.ascontiguousarray(array))
+            parts = list(iter_npy_parts(array, 64))
+
+            self.assertEqual(b''.join(parts), expected.getvalue())
+            self.assertTrue(all(len(part) == 64 for part in parts[:-1]))
+            self.assertEqual(npy_size(array), len(expected.getvalue()))
+
+    def test_large_embeddings_use_multipart(self):
+        """Test that embeddings larger than a part are uploaded in parts"""
+        self.assertTrue(self.service.upload_embeddings(self.embeddings))
+
+        self.assertEqual(self.client.calls.count('upload_part'), 3)
+        self.assertIn('complete_multipart_upload', self.client.calls)
+        np.testing.assert_array_equal(self.service.download_embeddings(), self.embeddings)
+
+    def test_small_embeddings_use_single_put(self):
+        """Test that embeddings within one part are uploaded with one PUT"""
+        self.assertTrue(self.service.upload_embeddings(self.embeddings[:10]))
+
+        self.assertNotIn('create_multipart_upload', self.client.calls)
+        np.testing.assert_array_equal(self.service.download_embeddings(), self.embeddings[:10])
+
+    def test_parts_in_flight_are_bounded(self):
+        """Test that no more parts than workers are held at once"""
+        self.service.upload_concurrency = 2
+        upload_part = self.client.upload_part
+        state = {'active': 0, 'peak': 0}
+        lock = threading.Lock()
+
+        def slow_upload_part(**kwargs):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.05)
+            try:
+                return upload_part(**kwargs)
+            finally:
+                with lock:
+                    state['active'] -= 1
+
+        self.client.upload_part = slow_upload_part
+        self.assertTrue(self.service.upload_embeddings(self.embeddings))
+        self.assertEqual(state['peak'], 2)
+
+    def test_checksum_mismatch_aborts_upload(self):
+        """Test that a corrupted part fails the upload and aborts it"""
+        upload_part = self.client.upload_part
+
+        def corrupting_upload_part(**kwargs):
+            kwargs['Body'] = kwargs['Body'][:-1] + b'\x00'
+            return upload_part(**kwargs)
+
+        self.client.upload_part = corrupting_upload_part
+        self.assertFalse(self.service.upload_embeddings(self.embeddings))
+
+        self.assertIn('abort_multipart_upload', self.client.calls)
+        self.assertEqual(self.client.uploads, {})
+        self.assertIsNone(self.service.download_embeddings())
+
+
+if __name__ == '__main__':
+    unittest.main()
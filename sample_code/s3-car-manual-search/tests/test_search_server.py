@@ -0,0 +1,156 @@
+"""
+Unit tests for the micro-batching HTTP search server
+"""
+
+import unittest
+import sys
+import os
+import json
+import asyncio
+import threading
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_search_service import make_search_service
+from src.search_server import SearchServer
+
+
+async def http_request(port: int, method: str, target: str, body: dict = None):
+    """Send one HTTP request and return (status, JSON payload)."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n"
+                 f"Connection: close\r\n\r\n".encode('latin-1') + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(payload)
+
+
+class TestSearchServer(unittest.IsolatedAsyncioTestCase):
+    """Test cases for SearchServer"""
+
+    async def asyncSetUp(self):
+        self.service = make_search_service()
+        self.assertTrue(self.service.initialize_data())
+        self.server = None
+
+    async def asyncTearDown(self):
+        if self.server is not None:
+            await self.server.stop()
+
+    async def start_server(self, **kwargs) -> int:
+        self.server = SearchServer(self.service, host='127.0.0.1', port=0, **kwargs)
+        await self.server.start()
+        return self.server.port
+
+    async def test_concurrent_requests_are_batched(self):
+        """Test that concurrent queries share batches and get their own results"""
+        port = await self.start_server(max_batch_size=16, max_wait_ms=20)
+        queries = ["How to change engine oil", "brake pads squeaking", "battery dead", "AC not cooling"] * 4
+
+        responses = await asyncio.gather(*[
+            http_request(port, 'GET', f"/search?q={query.replace(' ', '+')}&top_k=3") for query in queries
+        ])
+
+        for query, (status, payload) in zip(queries, responses):
+            self.assertEqual(status, 200)
+            expected = [r['metadata']['id'] for r in self.service.search(query, 3)]
+            self.assertEqual([r['metadata']['id'] for r in payload['results']], expected)
+        self.assertLess(self.service.metrics.counter('search.batches'), len(queries))
+
+    async def test_post_with_filters(self):
+        """Test a JSON search request with a category filter"""
+        port = await self.start_server()
+        status, payload = await http_request(port, 'POST', '/search', {
+            'query': 'noise when stopping', 'top_k': 3, 'filters': {'category': 'Brakes'}
+        })
+
+        self.assertEqual(status, 200)
+        self.assertTrue(payload['results'])
+        self.assertTrue(all(r['metadata']['category'] == 'Brakes' for r in payload['results']))
+
+    async def test_invalid_requests(self):
+        """Test that bad arguments and unknown paths are rejected"""
+        port = await self.start_server()
+        self.assertEqual((await http_request(port, 'GET', '/search'))[0], 400)
+        self.assertEqual((await http_request(port, 'GET', '/search?q=oil&top_k=0'))[0], 400)
+        self.assertEqual((await http_request(port, 'GET', '/search?q=oil&mode=fuzzy'))[0], 400)
+        status, payload = await http_request(port, 'POST', '/search', {'query': 'oil', 'filters': {'categroy': 'Engine'}})
+        self.assertEqual(status, 400)
+        self.assertIn('categroy', payload['error'])
+        status, payload = await http_request(port, 'POST', '/search', {'query': 'oil', 'filters': {'category': []}})
+        self.assertEqual(status, 400)
+        self.assertIn('must not be empty', payload['error'])
+        self.assertEqual((await http_request(port, 'GET', '/nothing'))[0], 404)
+
+        for length in ('abc', '-5'):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f"POST /search HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode('latin-1'))
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            self.assertTrue(response.startswith(b'HTTP/1.1 400'), length)
+            self.assertIn(b'Invalid Content-Length', response)
+
+        status, payload = await http_request(port, 'GET', '/health')
+        self.assertEqual(status, 200)
+        self.assertEqual(payload['snapshot_version'], 1)
+
+    async def test_full_queue_is_rejected(self):
+        """Test that requests beyond the queue bound get 503 instead of waiting"""
+        started, release = threading.Event(), threading.Event()
+        search_batch = self.service.search_batch
+
+        def blocked_search_batch(*args):
+            started.set()
+            release.wait(10)
+            return search_batch(*args)
+
+        self.service.search_batch = blocked_search_batch
+        port = await self.start_server(max_batch_size=1, max_wait_ms=0, queue_size=2)
+
+        # One request runs (blocked), two fill the queue, the next one is rejected
+        send = lambda: asyncio.ensure_future(http_request(port, 'GET', '/search?q=oil+change'))
+        requests = [send()]
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        requests += [send(), send()]
+        while self.server.batcher.depth < 2:
+            await asyncio.sleep(0.01)
+        status, _ = await http_request(port, 'GET', '/search?q=oil+change')
+        self.assertEqual(status, 503)
+
+        release.set()
+        self.assertEqual([status for status, _ in await asyncio.gather(*requests)], [200] * 3)
+        self.assertEqual(self.service.metrics.counter('server.rejected'), 1)
+
+
+    async def test_full_namespace_queue_is_rejected(self):
+        """Test that namespaced requests share the queue bound instead of piling up threads"""
+        started, release = threading.Event(), threading.Event()
+        self.service.search_namespaces = lambda *args: (started.set(), release.wait(10), [])[2]
+        port = await self.start_server(queue_size=2, namespace_workers=1)
+
+        # One request runs (blocked), one waits for the worker, the next one is rejected
+        send = lambda: asyncio.ensure_future(http_request(port, 'GET', '/search?q=oil&namespaces=sedan'))
+        requests = [send()]
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        requests.append(send())
+        while self.server.namespace_pending < 2:
+            await asyncio.sleep(0.01)
+        status, _ = await http_request(port, 'GET', '/search?q=oil&namespaces=sedan')
+        self.assertEqual(status, 503)
+
+        release.set()
+        self.assertEqual([status for status, _ in await asyncio.gather(*requests)], [200] * 2)
+        self.assertEqual(self.server.namespace_pending, 0)
+        self.assertEqual(self.service.metrics.counter('server.rejected'), 1)
+
+if __name__ == '__main__':
+    unittest.main()
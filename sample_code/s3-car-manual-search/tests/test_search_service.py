@@ -0,0 +1,871 @@
+"""
+Unit tests for the search and indexing components
+"""
+
+import unittest
+import sys
+import os
+import json
+import tempfile
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from scripts.local_s3 import LocalS3Client
+from scripts.stub_encoder import HashingEmbeddingService
+
+from src.quantization import quantize_embeddings
+from src.vector_index import VectorIndex, PassageIndex, CoarseIndex, aggregate_passage_scores, top_k_indices
+from src.projection import fit_projection, project_embeddings
+from src.keyword_index import BM25Index, reciprocal_rank_fusion
+from src.manual_processor import ManualProcessor
+from src.search_service import SearchService
+from src.section_index import SectionIndex
+from src.manifest import keyword_index_key, manifest_version_key, manifest_keys, shard_entry
+from src.section_stream import iter_sections
+
+MANUAL_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'data', 'car_manual_sections.json')
+
+
+def exact_top_k(embeddings: np.ndarray, query: np.ndarray, k: int) -> list:
+    """Reference cosine top-k."""
+    scores = embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+    return list(np.argsort(scores)[::-1][:k])
+
+
+def make_search_service() -> SearchService:
+    """Create a search service backed by the local S3 stand-in and a hashing encoder."""
+    with patch('src.search_service.EmbeddingService', HashingEmbeddingService):
+        service = SearchService()
+    service.s3_service.cache_dir = None
+    service.s3_service.s3_client = LocalS3Client()
+    service.manual_processor.load_manual_data(MANUAL_FILE)
+    return service
+
+
+class TestVectorIndex(unittest.TestCase):
+    """Test cases for VectorIndex"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.embeddings = rng.standard_normal((500, 32)).astype(np.float32)
+        self.query = rng.standard_normal(32).astype(np.float32)
+
+    def test_top_k_indices(self):
+        """Test that top-k indices are sorted by descending score"""
+        scores = np.array([0.1, 0.9, 0.5, 0.7])
+        self.assertEqual(list(top_k_indices(scores, 2)), [1, 3])
+        self.assertEqual(list(top_k_indices(scores, 10)), [1, 3, 2, 0])
+
+    def test_float32_matches_exact_search(self):
+        """Test that float32 scoring is exact cosine similarity"""
+        index = VectorIndex(self.embeddings)
+        results = index.search(self.query, 5)
+
+        self.assertEqual([idx for idx, _ in results], exact_top_k(self.embeddings, self.query, 5))
+
+    def test_int8_rerank_returns_exact_scores(self):
+        """Test that quantized candidates are re-scored at full precision"""
+        for scale_mode in ('vector', 'dimension'):
+            quantized, scales = quantize_embeddings(self.embeddings, 'int8', scale_mode)
+            requested = []
+
+            def rerank_rows(row_ids):
+                requested.append(row_ids)
+                return self.embeddings[row_ids]
+
+            index = VectorIndex(quantized, scales, rerank_rows=rerank_rows, rerank_factor=4)
+            results = index.search(self.query, 5)
+
+            self.assertEqual(len(requested[0]), 20)
+            self.assertEqual([idx for idx, _ in results], exact_top_k(self.embeddings, self.query, 5))
+            idx, score = results[0]
+            expected = self.embeddings[idx] @ self.query / (
+                np.linalg.norm(self.embeddings[idx]) * np.linalg.norm(self.query))
+            self.assertAlmostEqual(score, float(expected), places=5)
+
+    def test_float16_without_rerank(self):
+        """Test approximate scoring when re-ranking is disabled"""
+        quantized, _ = quantize_embeddings(self.embeddings, 'float16')
+        index = VectorIndex(quantized, rerank_factor=0)
+
+        results = index.search(self.query, 5)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0][0], exact_top_k(self.embeddings, self.query, 1)[0])
+
+    def test_search_batch_matches_single_queries(self):
+        """Test that a batch returns what one search per query returns"""
+        queries = np.random.default_rng(1).standard_normal((6, 32)).astype(np.float32)
+        rows = np.arange(0, 500, 3)
+        quantized, scales = quantize_embeddings(self.embeddings, 'int8')
+        requested = []
+
+        def rerank_rows(row_ids):
+            requested.append(row_ids)
+            return self.embeddings[row_ids]
+
+        with patch('src.vector_index.SCORING_CHUNK_ROWS', 64):
+            for index in (VectorIndex(self.embeddings), VectorIndex(quantized, scales, rerank_rows=rerank_rows)):
+                for restrict in (None, rows):
+                    batch = index.search_batch(queries, 5, restrict)
+                    for query, results in zip(queries, batch):
+                        single = index.search(query, 5, restrict)
+                        self.assertEqual([idx for idx, _ in results], [idx for idx, _ in single])
+                        self.assertTrue(np.allclose([s for _, s in results], [s for _, s in single], atol=1e-5))
+        # Every batch fetched its re-rank rows once
+        self.assertEqual(len(requested), 2 + 2 * len(queries))
+
+
+    def test_quantized_snapshot_reranks_from_cached_rows(self):
+        """Test that quantized snapshots re-rank from mapped float32 shards instead of ranged GETs"""
+        services = []
+        with patch('src.incremental_indexer.shard_entry', partial(shard_entry, storage_dtype='int8')), \
+                patch('src.search_snapshot.EMBEDDING_STORAGE_DTYPE', 'int8'):
+            for cache_dir in (tempfile.mkdtemp(), None):
+                service = make_search_service()
+                service.s3_service.cache_dir = cache_dir
+                if services:
+                    service.s3_service.s3_client = services[0].s3_service.s3_client
+                else:
+                    self.assertTrue(service.initialize_data())
+                self.assertTrue(service._load_data_from_s3())
+                services.append(service)
+
+        cached, uncached = services
+        self.assertEqual(cached.snapshot.embeddings.dtype, np.int8)
+        self.assertTrue(all(isinstance(rows, np.memmap) for rows in cached.snapshot.row_locations[3]))
+        self.assertEqual(uncached.snapshot.row_locations[3], [None])
+
+        client = cached.s3_service.s3_client
+        get_object = client.get_object
+        embedding_reads = []
+
+        def tracking_get_object(**kwargs):
+            if kwargs['Key'].endswith('embeddings.npy'):
+                embedding_reads.append(kwargs)
+            return get_object(**kwargs)
+
+        client.get_object = tracking_get_object
+        query = "How to change engine oil and filter"
+        results = cached.search(query, 3)
+        full_rows = cached.snapshot.fetch_full_rows(np.arange(5))
+        self.assertEqual(embedding_reads, [])
+
+        # Without a local cache rows are read by range from S3 instead
+        self.assertEqual(uncached.search(query, 3), results)
+        np.testing.assert_array_equal(uncached.snapshot.fetch_full_rows(np.arange(5)), full_rows)
+        self.assertTrue(embedding_reads)
+        self.assertTrue(all('Range' in read for read in embedding_reads))
+
+
+class TestKeywordIndex(unittest.TestCase):
+    """Test cases for the BM25 keyword index"""
+
+    def setUp(self):
+        self.processor = ManualProcessor()
+        self.sections = self.processor.load_manual_data(MANUAL_FILE)
+
+    def test_multi_word_query_matches_without_exact_phrase(self):
+        """Test that terms are matched individually and ranked"""
+        results = self.processor.search_sections_by_keywords("change oil drain")
+
+        self.assertGreater(len(results), 0)
+        self.assertEqual(results[0]['id'], 'ENG_001')
+
+    def test_unknown_terms_return_nothing(self):
+        """Test that queries without indexed terms have no matches"""
+        self.assertEqual(self.processor.keyword_search("zzzz qqqq", 5), [])
+
+    def test_serialization_round_trip(self):
+        """Test that a deserialized index ranks identically"""
+        index = BM25Index.from_sections(self.sections)
+        restored = BM25Index.from_bytes(index.to_bytes())
+
+        self.assertEqual(index.search("brake noise", 5), restored.search("brake noise", 5))
+
+    def test_reciprocal_rank_fusion(self):
+        """Test that rows ranked by both lists come first"""
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+
+        self.assertEqual(fused[0][0], 1)
+        self.assertEqual({row for row, _ in fused}, {1, 2, 3, 4})
+
+
+class TestSearchService(unittest.TestCase):
+    """Test cases for SearchService against the local S3 stand-in"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        self.assertTrue(self.service.initialize_data())
+
+    def test_vector_search(self):
+        """Test that vector search returns ranked results"""
+        results = self.service.search("engine oil change drain plug", top_k=3)
+
+        self.assertGreater(len(results), 0)
+        self.assertEqual(results[0]['rank'], 1)
+        self.assertEqual(results[0]['metadata']['id'], 'ENG_001')
+
+    def test_hybrid_search(self):
+        """Test that hybrid search fuses vector and keyword rankings"""
+        results = self.service.search("oil filter", top_k=3, mode='hybrid')
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['search_type'], 'hybrid')
+        self.assertLessEqual(results[0]['similarity_score'], 1.0)
+
+    def test_search_batch_matches_search(self):
+        """Test that batched searches return the same results as single searches"""
+        queries = ["How to change engine oil", "brake pads squeaking", "battery dead"]
+        for mode in ('vector', 'hybrid'):
+            batch = self.service.search_batch(queries, top_k=3, mode=mode)
+            for query, results in zip(queries, batch):
+                single = self.service.search(query, top_k=3, mode=mode)
+                self.assertEqual([r['metadata']['id'] for r in results], [r['metadata']['id'] for r in single])
+        self.assertEqual(self.service.metrics.counter('search.batches'), 2)
+
+    def test_fallback_uses_bm25_scores(self):
+        """Test that the fallback ranks by BM25 instead of a fixed score"""
+        self.service._load_data_from_s3()
+        results = self.service._fallback_search("brake fluid", 5)
+
+        self.assertEqual(results[0]['similarity_score'], 1.0)
+        self.assertTrue(all(r['search_type'] == 'keyword_fallback' for r in results))
+        self.assertGreater(results[0]['keyword_score'], results[-1]['keyword_score'])
+
+
+class TestFilteredSearch(unittest.TestCase):
+    """Test cases for category-filtered search"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        self.assertTrue(self.service.initialize_data())
+
+    def test_section_index_rows(self):
+        """Test that category filters resolve to sorted row ids"""
+        records = [{'category': 'A'}, {'category': 'B'}, {'category': 'A'}]
+        index = SectionIndex(records)
+
+        self.assertEqual(list(index.rows_for({'category': 'A'})), [0, 2])
+        self.assertEqual(list(index.rows_for({'category': ['B', 'A']})), [0, 1, 2])
+        self.assertEqual(len(index.rows_for({'category': 'C'})), 0)
+        self.assertIsNone(index.rows_for(None))
+        with self.assertRaises(ValueError):
+            index.rows_for({'title': 'x'})
+
+    def test_vector_index_scores_only_filtered_rows(self):
+        """Test that filtered vector search only returns allowed rows"""
+        embeddings = np.random.default_rng(1).standard_normal((100, 8)).astype(np.float32)
+        index = VectorIndex(embeddings)
+
+        # Sparse filters gather rows, dense filters scan and select
+        for rows in (np.arange(0, 100, 7), np.arange(0, 90)):
+            results = index.search(embeddings[14], 5, rows)
+            self.assertTrue(all(idx in rows for idx, _ in results))
+            self.assertEqual(results[0][0], 14)
+
+    def test_filtered_search(self):
+        """Test that search results are restricted to the category"""
+        for mode in ('vector', 'hybrid'):
+            results = self.service.search("noise when stopping", top_k=5, mode=mode,
+                                          filters={'category': 'Brakes'})
+            self.assertGreater(len(results), 0)
+            self.assertTrue(all(r['metadata']['category'] == 'Brakes' for r in results))
+
+    def test_filtered_fallback(self):
+        """Test that the keyword fallback honours filters"""
+        self.service._load_data_from_s3()
+        results = self.service._fallback_search("fluid", 10, {'category': 'Transmission'})
+
+        self.assertGreater(len(results), 0)
+        self.assertTrue(all(r['metadata']['category'] == 'Transmission' for r in results))
+
+    def test_unknown_category_returns_nothing(self):
+        """Test that an unknown category yields no results"""
+        self.assertEqual(self.service.search("oil", filters={'category': 'Nope'}), [])
+
+    def test_invalid_filters_raise(self):
+        """Test that a misspelled filter field or an empty category list is reported instead of falling back"""
+        for call in (lambda: self.service.search("oil", filters={'categroy': 'Engine'}),
+                     lambda: self.service.search_batch(["oil"], filters={'category': 3}),
+                     lambda: self.service.search("oil", filters={'category': []}),
+                     lambda: self.service.manual_processor.section_index.rows_for({'category': []})):
+            with self.assertRaises(ValueError):
+                call()
+        self.assertEqual(self.service.metrics.counter('search.errors'), 0)
+        self.assertEqual(self.service.metrics.counter('search.fallbacks'), 0)
+
+    def test_search_by_category(self):
+        """Test category browsing through the category row lists"""
+        results = self.service.search_by_category('Engine', top_k=3)
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(r['metadata']['category'] == 'Engine' for r in results))
+
+
+class TestLookups(unittest.TestCase):
+    """Test cases for id and category lookups"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        self.assertTrue(self.service.initialize_data())
+        self.processor = self.service.manual_processor
+
+    def test_section_by_id(self):
+        """Test id lookups on the processor and the service"""
+        self.assertEqual(self.processor.get_section_by_id('BRK_001')['id'], 'BRK_001')
+        self.assertEqual(self.processor.get_section_by_id('missing'), {})
+        self.assertEqual(self.service.get_section_by_id('BRK_001')['id'], 'BRK_001')
+        self.assertIsNone(self.service.get_section_by_id('missing'))
+
+    def test_categories_and_counts(self):
+        """Test that categories and counts match a full scan"""
+        sections = self.processor.sections
+        expected = sorted({s['category'] for s in sections})
+
+        self.assertEqual(self.processor.get_categories(), expected)
+        self.assertEqual(self.service.get_available_categories(), expected)
+        self.assertEqual(sum(self.processor.get_section_count_by_category().values()), len(sections))
+
+    def test_clear_cache_drops_indexes(self):
+        """Test that clearing the cache drops the loaded snapshot"""
+        self.service.get_available_categories()
+        self.assertIsNotNone(self.service.snapshot)
+
+        self.service.clear_cache()
+        self.assertIsNone(self.service.snapshot)
+
+    def test_replaced_sections_are_reindexed(self):
+        """Test that same-length replacements of the processor's sections never leave stale lookups"""
+        sections = self.processor.sections
+        self.assertEqual(self.processor.get_section_by_id('BRK_001')['id'], 'BRK_001')
+        renamed = [dict(section, id=f"NEW_{row}", category='Renamed') for row, section in enumerate(sections)]
+
+        # A new list of the same length is picked up on its own
+        self.processor.sections = renamed
+        self.assertEqual(self.processor.get_section_by_id('NEW_0')['id'], 'NEW_0')
+        self.assertEqual(self.processor.get_section_by_id('BRK_001'), {})
+        self.assertEqual(self.processor.get_categories(), ['Renamed'])
+
+        # Edits in place are picked up after clear_cache
+        renamed[0] = dict(renamed[0], id='EDITED', category='Edited')
+        self.service.clear_cache()
+        self.assertEqual(self.processor.get_section_by_id('EDITED')['id'], 'EDITED')
+        self.assertEqual(self.processor.get_categories(), ['Edited', 'Renamed'])
+        self.assertEqual(self.processor.keyword_search(renamed[0]['title'], 1)[0][0], 0)
+
+
+class TestIncrementalIndexer(unittest.TestCase):
+    """Test cases for content-hash driven incremental uploads"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        self.assertTrue(self.service.initialize_data())
+        with open(MANUAL_FILE, 'r', encoding='utf-8') as file:
+            self.sections = json.load(file)['sections']
+        self.embedded = []
+        original = self.service.embedding_service.generate_embeddings_batch
+
+        def counting_batch(texts, batch_size=32, show_progress_bar=True):
+            self.embedded.extend(texts)
+            return original(texts)
+
+        self.service.embedding_service.generate_embeddings_batch = counting_batch
+
+    def write_manual(self, sections) -> str:
+        path = os.path.join(tempfile.mkdtemp(), 'manual.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'sections': sections}, file)
+        return path
+
+    def reload(self) -> SearchService:
+        self.service.clear_cache()
+        self.assertTrue(self.service._load_data_from_s3())
+        return self.service
+
+    def test_unchanged_manual_embeds_nothing(self):
+        """Test that re-uploading the same manual is a no-op"""
+        report = self.service.indexer.upsert(MANUAL_FILE)
+
+        self.assertTrue(report['success'])
+        self.assertEqual(report['unchanged'], len(self.sections))
+        self.assertEqual(self.embedded, [])
+
+    def test_changed_section_is_the_only_one_embedded(self):
+        """Test that one edit re-embeds one section into a new shard"""
+        sections = [dict(s) for s in self.sections]
+        sections[0]['title'] = 'Engine Oil and Filter Change'
+        report = self.service.indexer.upsert(self.write_manual(sections))
+
+        self.assertEqual((report['changed'], report['added'], report['deleted']), (1, 0, 0))
+        self.assertEqual(len(self.embedded), 1)
+
+        service = self.reload()
+        self.assertEqual(len(service.snapshot.manifest['shards']), 2)
+        self.assertEqual(len(service.snapshot), len(sections))
+        self.assertEqual(service.get_section_by_id(sections[0]['id'])['title'], 'Engine Oil and Filter Change')
+
+    def test_deleted_section_becomes_tombstone_until_compaction(self):
+        """Test that deletes are hidden at load and dropped by compaction"""
+        removed = self.sections[3]['id']
+        report = self.service.indexer.upsert(self.write_manual(self.sections[:3] + self.sections[4:]))
+
+        self.assertEqual(report['deleted'], 1)
+        service = self.reload()
+        self.assertEqual(service.snapshot.manifest['tombstones'], [removed])
+        self.assertIsNone(service.get_section_by_id(removed))
+
+        self.assertTrue(service.indexer.compact())
+        service = self.reload()
+        self.assertEqual(len(service.snapshot.manifest['shards']), 1)
+        self.assertEqual(service.snapshot.manifest['tombstones'], [])
+        self.assertEqual(len(service.snapshot), len(self.sections) - 1)
+        self.assertEqual(self.embedded, [])
+
+        results = service._fallback_search("oil change", 3)
+        self.assertEqual(results[0]['metadata']['id'], 'ENG_001')
+
+
+class TestStreamingIngest(unittest.TestCase):
+    """Test cases for streaming manual files through bounded embed and upload stages"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        self.assertTrue(self.service.initialize_data())
+        with open(MANUAL_FILE, 'r', encoding='utf-8') as file:
+            self.sections = json.load(file)['sections']
+        self.directory = tempfile.mkdtemp()
+
+    def write_file(self, name: str, text: str) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return path
+
+    def test_reader_layouts(self):
+        """Test that sections stream from JSON objects, bare arrays and JSON Lines"""
+        wrapped = self.write_file('wrapped.json', json.dumps(
+            {'info': {'sections': 1, 'pages': [1, 2]}, 'sections': self.sections, 'revision': 12345}))
+        bare = self.write_file('bare.json', json.dumps(self.sections, indent=2))
+        lines = self.write_file('manual.jsonl', '\n'.join(json.dumps(s) for s in self.sections) + '\n\n')
+
+        for chunk_size in (1, 7, 4096):
+            self.assertEqual(list(iter_sections(wrapped, chunk_size)), self.sections)
+            self.assertEqual(list(iter_sections(bare, chunk_size)), self.sections)
+        self.assertEqual(list(iter_sections(lines)), self.sections)
+        self.assertEqual(ManualProcessor().load_manual_data(lines), self.sections)
+
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_sections(self.write_file('bad.json', '{"sections": [{"id": 1}, {"id": ]}'), 4))
+
+    def test_stream_rebuild_writes_shards(self):
+        """Test that a streamed rebuild matches the source file shard by shard"""
+        report = self.service.indexer.stream_rebuild(MANUAL_FILE, batch_size=4, shard_rows=10, queue_depth=1)
+
+        self.assertTrue(report['success'])
+        self.assertEqual((report['added'], report['shards'], report['version']), (len(self.sections), 3, 2))
+        self.assertTrue(self.service.refresh_snapshot())
+        snapshot = self.service.snapshot
+        self.assertEqual([shard['rows'] for shard in snapshot.manifest['shards']], [10, 10, 8])
+        self.assertEqual([m['id'] for m in snapshot.metadata], [s['id'] for s in self.sections])
+
+        # Keyword postings built while streaming match an index built from the whole file
+        expected = BM25Index.from_sections(self.sections)
+        for query in ("oil change", "brake pads squeaking", "tire pressure"):
+            self.assertEqual(snapshot.keyword_index.search(query, 5), expected.search(query, 5))
+
+    def test_queues_bound_work_in_flight(self):
+        """Test that a stalled upload stops reading and embedding"""
+        release = threading.Event()
+        embedded = []
+        write_shard = self.service.indexer._write_shard
+        embed = self.service.indexer._embed
+
+        def counting_embed(sections, **kwargs):
+            embedded.extend(sections)
+            return embed(sections, **kwargs)
+
+        def blocked_write_shard(*args):
+            release.wait(10)
+            return write_shard(*args)
+
+        self.service.indexer._embed = counting_embed
+        self.service.indexer._write_shard = blocked_write_shard
+        report = {}
+        thread = threading.Thread(target=lambda: report.update(self.service.indexer.stream_rebuild(
+            MANUAL_FILE, batch_size=2, shard_rows=2, queue_depth=1, upload_workers=1)))
+        thread.start()
+
+        # One shard uploading, one queued and one waiting to be queued
+        time.sleep(0.5)
+        self.assertLessEqual(len(embedded), 6)
+        release.set()
+        thread.join(10)
+        self.assertTrue(report['success'])
+        self.assertEqual(len(embedded), len(self.sections))
+
+    def test_failed_upload_leaves_no_shards(self):
+        """Test that a failed rebuild deletes its shards and keeps the old manifest"""
+        write_shard = self.service.indexer._write_shard
+
+        def failing_write_shard(shard_id, *args):
+            entry = write_shard(shard_id, *args)
+            return None if shard_id.endswith('0001') else entry
+
+        self.service.indexer._write_shard = failing_write_shard
+        report = self.service.indexer.stream_rebuild(MANUAL_FILE, batch_size=5, shard_rows=5, upload_workers=1)
+
+        self.assertFalse(report['success'])
+        self.assertEqual(self.service.s3_service.download_manifest()['version'], 1)
+        self.assertEqual(self.service.s3_service.list_bucket_contents('shards/v000002'), [])
+
+        duplicated = self.write_file('duplicated.jsonl', '\n'.join(json.dumps(s) for s in self.sections[:2] * 2))
+        report = self.service.indexer.stream_rebuild(duplicated)
+        self.assertFalse(report['success'])
+        self.assertIn('duplicate section id', report['error'])
+
+
+class TestPassageSearch(unittest.TestCase):
+    """Test cases for passage-level embeddings with section aggregation"""
+
+    def setUp(self):
+        self.processor = ManualProcessor()
+        self.sections = self.processor.load_manual_data(MANUAL_FILE)
+        rng = np.random.default_rng(2)
+        counts = rng.integers(1, 5, 200)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.passages = rng.standard_normal((self.offsets[-1], 24)).astype(np.float32)
+        self.query = rng.standard_normal(24).astype(np.float32)
+
+    def reference(self, method: str, top_n: int = 2) -> np.ndarray:
+        scores = VectorIndex(self.passages).score(self.query)
+        groups = [np.sort(scores[a:b])[::-1] for a, b in zip(self.offsets[:-1], self.offsets[1:])]
+        if method == 'max':
+            return np.array([g[0] for g in groups])
+        return np.array([g[:top_n].mean() for g in groups])
+
+    def test_short_section_is_one_passage(self):
+        """Test that a section within the window keeps its section text"""
+        section = self.sections[0]
+        self.assertEqual(self.processor.split_into_passages(section, 500, 50),
+                         [self.processor.prepare_text_for_embedding(section)])
+
+    def test_long_section_is_split_with_overlap(self):
+        """Test that passages overlap and cover every content word"""
+        section = self.sections[0]
+        words = section['content'].split()
+        passages = self.processor.split_into_passages(section, 30, 10)
+        prefix = f"{section['category']}: {section['title']}."
+
+        self.assertGreater(len(passages), 1)
+        self.assertTrue(all(passage.startswith(prefix) for passage in passages))
+        self.assertIn('Keywords:', passages[0])
+        self.assertIn(' '.join(words[20:30]), passages[1])
+        self.assertTrue(passages[-1].endswith(words[-1]))
+
+    def test_passage_batch_offsets(self):
+        """Test that offsets map every section to its passages"""
+        texts, offsets = self.processor.get_passages_for_embedding(self.sections, 30, 10)
+
+        self.assertEqual(len(offsets), len(self.sections) + 1)
+        self.assertEqual(offsets[-1], len(texts))
+        self.assertTrue(np.all(np.diff(offsets) >= 1))
+
+    def test_aggregation_matches_reference(self):
+        """Test the vectorized max and top-n mean group-by"""
+        scores = VectorIndex(self.passages).score(self.query)
+        for method in ('max', 'mean'):
+            np.testing.assert_allclose(aggregate_passage_scores(scores, self.offsets, method, 2),
+                                       self.reference(method), rtol=1e-5)
+
+    def test_passage_index_search(self):
+        """Test section ranking, filtering and re-ranking over passages"""
+        expected = self.reference('max')
+        index = PassageIndex(VectorIndex(self.passages), self.offsets, 'max')
+        self.assertEqual(len(index), 200)
+        self.assertEqual([row for row, _ in index.search(self.query, 5)],
+                         list(np.argsort(expected)[::-1][:5]))
+
+        rows = np.arange(0, 200, 3)
+        filtered = index.search(self.query, 5, rows)
+        self.assertEqual([row for row, _ in filtered],
+                         list(rows[np.argsort(expected[rows])[::-1][:5]]))
+
+        quantized, scales = quantize_embeddings(self.passages, 'int8')
+        reranked = PassageIndex(
+            VectorIndex(quantized, scales, rerank_rows=lambda ids: self.passages[ids]),
+            self.offsets, 'max'
+        )
+        results = reranked.search(self.query, 5)
+        self.assertEqual([row for row, _ in results], list(np.argsort(expected)[::-1][:5]))
+        np.testing.assert_allclose([score for _, score in results],
+                                   np.sort(expected)[::-1][:5], rtol=1e-5)
+
+    def test_passage_mode_end_to_end(self):
+        """Test that passage manifests load, search and compact by section"""
+        with patch('src.manifest.PASSAGE_MODE', 'passage'), \
+                patch('src.manifest.PASSAGE_MAX_TOKENS', 40), \
+                patch('src.manifest.PASSAGE_OVERLAP_TOKENS', 10):
+            service = make_search_service()
+            self.assertTrue(service.initialize_data())
+            self.assertTrue(service._load_data_from_s3())
+
+            snapshot = service.snapshot
+            self.assertIsInstance(snapshot.vector_index, PassageIndex)
+            self.assertEqual(len(snapshot.vector_index), len(self.sections))
+            self.assertGreater(len(snapshot.embeddings), len(self.sections))
+
+            results = service.search("How to change engine oil and filter", 3)
+            self.assertEqual(results[0]['metadata']['id'], 'ENG_001')
+            self.assertEqual(set(results[0]), {'section', 'metadata', 'similarity_score', 'rank'})
+
+            # Deleting a section and compacting keeps the passage offsets aligned
+            path = os.path.join(tempfile.mkdtemp(), 'manual.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({'sections': self.sections[1:]}, file)
+            self.assertTrue(service.indexer.upsert(path)['success'])
+            self.assertTrue(service.indexer.compact())
+            self.assertTrue(service.refresh_snapshot())
+            self.assertEqual(len(service.snapshot.vector_index), len(self.sections) - 1)
+            self.assertEqual(service.snapshot.vector_index.offsets[-1], len(service.snapshot.embeddings))
+
+        # Switching back to section mode re-embeds everything
+        report = service.indexer.upsert(MANUAL_FILE)
+        self.assertEqual(report['unchanged'], 0)
+        self.assertTrue(service.refresh_snapshot())
+        self.assertIsInstance(service.snapshot.vector_index, VectorIndex)
+
+
+class TestCoarseSearch(unittest.TestCase):
+    """Test cases for two-stage search over PCA-reduced vectors"""
+
+    def setUp(self):
+        # Embeddings with 8 strong directions and a little noise in the other 24
+        rng = np.random.default_rng(0)
+        self.embeddings = (rng.standard_normal((500, 8)) @ rng.standard_normal((8, 32))
+                           + 0.05 * rng.standard_normal((500, 32))).astype(np.float32)
+        self.queries = self.embeddings[:6] + 0.1 * rng.standard_normal((6, 32)).astype(np.float32)
+        self.components = fit_projection(self.embeddings, 8)
+        self.index = CoarseIndex(VectorIndex(self.embeddings),
+                                 project_embeddings(self.embeddings, self.components),
+                                 self.components, candidate_factor=4)
+
+    def test_projection_is_orthonormal(self):
+        """Test that the fitted components are orthonormal and reduce single vectors too"""
+        self.assertEqual(self.components.shape, (32, 8))
+        np.testing.assert_allclose(self.components.T @ self.components, np.eye(8), atol=1e-5)
+        self.assertEqual(project_embeddings(self.queries[0], self.components).shape, (8,))
+        with self.assertRaises(ValueError):
+            fit_projection(self.embeddings, 64)
+
+    def test_two_stage_matches_exact_search(self):
+        """Test that re-scored candidates give the exact top-k and exact scores"""
+        exact = VectorIndex(self.embeddings)
+        for query in self.queries:
+            self.assertEqual(self.index.search(query, 5), exact.search(query, 5))
+
+        rows = np.arange(0, 500, 3)
+        results = self.index.search(self.queries[0], 5, rows)
+        self.assertTrue(all(row % 3 == 0 for row, _ in results))
+        self.assertEqual(results, exact.search(self.queries[0], 5, rows))
+        self.assertEqual(self.index.search_batch(self.queries, 5),
+                         [self.index.search(query, 5) for query in self.queries])
+
+    def test_coarse_manifest_end_to_end(self):
+        """Test that uploads store reduced vectors and upserts and compaction keep the projection"""
+        with open(MANUAL_FILE, 'r', encoding='utf-8') as file:
+            sections = json.load(file)['sections']
+        with patch('src.manifest.COARSE_DIMENSIONS', 16):
+            service = make_search_service()
+            self.assertTrue(service.initialize_data())
+            self.assertTrue(service._load_data_from_s3())
+
+            index = service.snapshot.vector_index
+            self.assertIsInstance(index, CoarseIndex)
+            self.assertEqual(index.reduced.shape, (len(sections), 16))
+            projection = service.snapshot.manifest['coarse']['projection']
+            self.assertIn(projection, manifest_keys(service.snapshot.manifest))
+
+            index.candidate_factor = 2
+            coarse = service.search("How to change engine oil and filter", 3)
+            index.candidate_factor = 0
+            self.assertEqual(coarse, service.search("How to change engine oil and filter", 3))
+
+            path = os.path.join(tempfile.mkdtemp(), 'manual.json')
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump({'sections': [dict(sections[0], title='Oil Service')] + sections[2:]}, file)
+            self.assertTrue(service.indexer.upsert(path)['success'])
+            self.assertTrue(service.indexer.compact())
+            self.assertTrue(service.refresh_snapshot())
+            self.assertEqual(service.snapshot.manifest['coarse']['projection'], projection)
+            self.assertEqual(len(service.snapshot.vector_index.reduced), len(sections) - 1)
+
+        # Disabling two-stage search re-embeds everything without reduced vectors
+        self.assertEqual(service.indexer.upsert(path)['unchanged'], 0)
+        self.assertTrue(service.refresh_snapshot())
+        self.assertIsInstance(service.snapshot.vector_index, VectorIndex)
+        self.assertIsNone(service.snapshot.manifest['coarse'])
+
+
+class TestSnapshotRefresh(unittest.TestCase):
+    """Test cases for versioned snapshots and hot swapping"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        self.assertTrue(self.service.initialize_data())
+        with open(MANUAL_FILE, 'r', encoding='utf-8') as file:
+            self.sections = json.load(file)['sections']
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.service.stop_refresher()
+
+    def publish_edit(self, title: str) -> int:
+        """Publish a new manifest version with the first section retitled."""
+        sections = [dict(s) for s in self.sections]
+        sections[0]['title'] = title
+        path = os.path.join(self.directory, 'manual.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'sections': sections}, file)
+        return self.service.indexer.upsert(path)['version']
+
+    def test_queries_use_old_snapshot_until_swap(self):
+        """Test that a published version is invisible until the snapshot is swapped"""
+        self.service.search("oil change", 3)
+        old = self.service.snapshot
+        self.assertEqual(old.version, 1)
+
+        self.assertEqual(self.publish_edit('Oil Service'), 2)
+        self.assertIs(self.service.snapshot, old)
+        self.assertNotEqual(self.service.get_section_by_id(self.sections[0]['id'])['title'], 'Oil Service')
+
+        self.assertTrue(self.service.refresh_snapshot())
+        self.assertEqual(self.service.snapshot.version, 2)
+        self.assertEqual(self.service.get_section_by_id(self.sections[0]['id'])['title'], 'Oil Service')
+        self.assertFalse(self.service.refresh_snapshot())
+
+        # The replaced snapshot is still complete for queries that hold it
+        self.assertEqual(len(old), len(self.sections))
+        self.assertIsNotNone(old.fetch_full_rows(np.arange(3)))
+
+    def test_old_versions_are_retained(self):
+        """Test that artifacts are only deleted once their version leaves the retention window"""
+        keys = lambda: set(self.service.s3_service.list_bucket_contents())
+        for version in (2, 3):
+            self.publish_edit(f'Oil Service {version}')
+        self.assertIn(keyword_index_key(1), keys())
+        self.assertIn(manifest_version_key(1), keys())
+
+        self.publish_edit('Oil Service 4')
+        self.assertNotIn(keyword_index_key(1), keys())
+        self.assertNotIn(manifest_version_key(1), keys())
+        self.assertIn(keyword_index_key(2), keys())
+        self.assertEqual(self.service.s3_service.download_manifest(2)['version'], 2)
+
+    def test_artifacts_are_fetched_concurrently(self):
+        """Test that cold-start latency tracks the slowest artifact, not the sum"""
+        client = self.service.s3_service.s3_client
+        get_object = client.get_object
+
+        def slow_get_object(**kwargs):
+            time.sleep(0.2)
+            return get_object(**kwargs)
+
+        client.get_object = slow_get_object
+        self.service.clear_cache()
+        self.assertTrue(self.service._load_data_from_s3())
+
+        timings = self.service.snapshot.load_timings
+        shard = self.service.snapshot.manifest['shards'][0]
+        self.assertIn(shard['embeddings'], timings['artifacts'])
+        self.assertIn(shard['section_offsets'], timings['artifacts'])
+        self.assertNotIn(shard['section_blob'], timings['artifacts'])
+        self.assertGreaterEqual(min(timings['artifacts'].values()), 0.2)
+        self.assertLess(timings['fetch_seconds'], sum(timings['artifacts'].values()) * 0.75)
+        self.assertIn('build_seconds', self.service.get_system_status()['snapshot_load'])
+
+    def test_refresher_swaps_in_background(self):
+        """Test that the refresher thread picks up a new manifest version"""
+        self.assertTrue(self.service._load_data_from_s3())
+        self.service.refresher.interval = 60
+        self.service.start_refresher()
+        self.publish_edit('Oil Service')
+
+        self.service.request_refresh()
+        deadline = time.time() + 10
+        while self.service.snapshot.version != 2 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.service.snapshot.version, 2)
+        self.assertEqual(self.service.get_system_status()['snapshot_refresher'], 'running')
+
+
+class TestConcurrentQueries(unittest.TestCase):
+    """Test cases for sharing one search service between threads"""
+
+    def setUp(self):
+        publisher = make_search_service()
+        self.assertTrue(publisher.initialize_data())
+        self.client = publisher.s3_service.s3_client
+        self.service = make_search_service()
+        self.service.s3_service.s3_client = self.client
+
+    def test_concurrent_first_queries_share_one_load(self):
+        """Test that simultaneous cold queries trigger a single snapshot load"""
+        get_object = self.client.get_object
+
+        def slow_get_object(**kwargs):
+            time.sleep(0.05)
+            return get_object(**kwargs)
+
+        self.client.get_object = slow_get_object
+        barrier = threading.Barrier(8)
+
+        def first_query(_):
+            barrier.wait()
+            return self.service.search("How to change engine oil", 3)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(first_query, range(8)))
+
+        self.assertTrue(all(results))
+        self.assertEqual(self.service.metrics.counter('snapshot.swaps'), 1)
+        self.assertEqual(self.service.metrics.counter('search.fallbacks'), 0)
+
+    def test_failed_load_is_not_retried_by_waiters(self):
+        """Test that callers waiting on a failed load share its failure"""
+        self.service.s3_service.download_manifest = lambda version=None: None
+        self.service.s3_service.download_embeddings = lambda *args, **kwargs: time.sleep(0.1)
+        barrier = threading.Barrier(4)
+
+        def first_query(_):
+            barrier.wait()
+            return self.service.search("brake pads", 3)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(first_query, range(4)))
+
+        self.assertTrue(all(r[0]['search_type'] == 'keyword_fallback' for r in results))
+        self.assertEqual(self.service.metrics.counter('snapshot.load_failures'), 1)
+
+    def test_snapshot_arrays_are_read_only(self):
+        """Test that the shared index arrays reject in-place writes"""
+        self.assertTrue(self.service._load_data_from_s3())
+        snapshot = self.service.snapshot
+        with self.assertRaises(ValueError):
+            snapshot.embeddings[0, 0] = 1.0
+        with self.assertRaises(ValueError):
+            snapshot.vector_index.row_norms[0] = 1.0
+        with self.assertRaises(ValueError):
+            snapshot.keyword_index.weights[0] = 1.0
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Unit tests for the byte-range addressable section store
+"""
+
+import unittest
+import sys
+import os
+import json
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_search_service import make_search_service, MANUAL_FILE
+from src.section_store import SectionStore, SectionCache, pack_sections, unpack_sections
+from src.manifest import stamp
+from src.metrics import MetricsRegistry
+
+
+class RecordingReader:
+    """Range reader over in-memory blobs, recording every request."""
+
+    def __init__(self, blobs):
+        self.blobs = blobs
+        self.requests = []
+
+    def __call__(self, key, ranges):
+        self.requests.append((key, list(ranges)))
+        return [self.blobs[key][start:end] for start, end in ranges]
+
+
+class TestSectionStore(unittest.TestCase):
+    """Test cases for SectionStore and SectionCache"""
+
+    def setUp(self):
+        self.sections = [{'id': f"S{i}", 'title': f"Sëction {i}", 'content': 'x' * i} for i in range(6)]
+        blob, self.offsets = pack_sections(self.sections)
+        self.reader = RecordingReader({'blob': blob})
+        self.metrics = MetricsRegistry()
+        # Rows 0-3 come from the blob (row 1 of the blob is dead), rows 4-5 from a JSON shard
+        self.store = SectionStore(self.reader, [('blob', self.offsets, None), [{'id': 'J0'}, {'id': 'J1'}]],
+                                  np.array([0, 0, 0, 0, 1, 1]), np.array([0, 2, 3, 4, 0, 1]),
+                                  SectionCache(3, metrics=self.metrics))
+
+    def test_pack_round_trip(self):
+        """Test that offsets address every packed section"""
+        blob, offsets = pack_sections(self.sections)
+        self.assertEqual(unpack_sections(blob, offsets), self.sections)
+        self.assertEqual(offsets[-1], len(blob))
+
+    def test_ranged_reads_are_coalesced_and_cached(self):
+        """Test that adjacent rows share a request and hot rows are served from the cache"""
+        sections = self.store.get_many([3, 1, 4, 0, 2])
+        self.assertEqual([s['id'] for s in sections], ['S4', 'S2', 'J0', 'S0', 'S3'])
+        self.assertEqual(self.reader.requests, [('blob', [(self.offsets[0], self.offsets[1]),
+                                                          (self.offsets[2], self.offsets[5])])])
+
+        self.assertEqual(self.store[-3]['id'], 'S4')
+        self.assertEqual(len(self.reader.requests), 1)
+        self.assertEqual(self.metrics.counter('section_cache.hits'), 1)
+        self.assertEqual([s['id'] for s in self.store], ['S0', 'S2', 'S3', 'S4', 'J0', 'J1'])
+        with self.assertRaises(IndexError):
+            self.store[6]
+
+
+class TestSearchSectionStore(unittest.TestCase):
+    """Test cases for lazy section hydration in SearchService"""
+
+    def setUp(self):
+        self.service = make_search_service()
+        self.assertTrue(self.service.initialize_data())
+        client = self.service.s3_service.s3_client
+        get_object = client.get_object
+        self.gets = []
+
+        def recording_get_object(**kwargs):
+            self.gets.append((kwargs['Key'], kwargs.get('Range')))
+            return get_object(**kwargs)
+
+        client.get_object = recording_get_object
+
+    def blob_gets(self):
+        return [get for get in self.gets if get[0].endswith('sections.bin')]
+
+    def test_startup_skips_section_content(self):
+        """Test that loading reads no section content and searches read only their hits"""
+        self.assertTrue(self.service._load_data_from_s3())
+        self.assertEqual(self.blob_gets(), [])
+
+        results = self.service.search("How to change engine oil", 3)
+        self.assertTrue(results)
+        self.assertTrue(all(byte_range for _, byte_range in self.blob_gets()))
+        self.assertEqual(results[0]['section']['id'], results[0]['metadata']['id'])
+
+        fetched = len(self.blob_gets())
+        self.service.result_cache.clear()
+        self.assertEqual(self.service.search("How to change engine oil", 3), results)
+        self.assertEqual(len(self.blob_gets()), fetched)
+        self.assertGreaterEqual(self.service.get_system_status()['section_cache']['hits'], len(results))
+
+    def test_missing_keyword_index_skips_section_content(self):
+        """Test that a manifest without a keyword index loads without reading every section"""
+        s3 = self.service.s3_service
+        manifest = s3.download_manifest()
+        manifest['keyword_index'] = None
+        manifest['version'] += 1
+        self.assertTrue(s3.upload_manifest(stamp(manifest)))
+
+        self.assertTrue(self.service._load_data_from_s3())
+        self.assertEqual(self.blob_gets(), [])
+        self.assertEqual(self.service.snapshot.keyword_index.num_docs, 0)
+        vector = self.service.search("How to change engine oil", 3, mode='vector')
+        self.assertEqual(self.service.search("How to change engine oil", 3, mode='hybrid'), vector)
+        self.assertEqual(self.service._fallback_search("alternater", 3)[0]['metadata']['title'],
+                         "Alternator Testing")
+
+    def test_json_shards_still_load(self):
+        """Test that shards written before packed blobs existed load and compact"""
+        s3 = self.service.s3_service
+        manifest = s3.download_manifest()
+        with open(MANUAL_FILE, 'r', encoding='utf-8') as file:
+            sections = json.load(file)['sections']
+        for shard in manifest['shards']:
+            shard['sections'] = f"shards/{shard['id']}/sections.json"
+            self.assertTrue(s3.upload_json_data({'sections': sections}, shard['sections']))
+            del shard['section_blob'], shard['section_offsets']
+        manifest['version'] += 1
+        self.assertTrue(s3.upload_manifest(stamp(manifest)))
+
+        self.assertTrue(self.service._load_data_from_s3())
+        self.assertEqual(self.service.get_section_by_id(sections[2]['id']), sections[2])
+        self.assertEqual(self.blob_gets(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()